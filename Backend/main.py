@@ -7,8 +7,10 @@ from typing import cast
 from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
 
+from Backend.middleware.admission import AdmissionMiddleware
+from Backend.middleware.beta_keys import BetaKeyMiddleware
+from Backend.middleware.cors_audit import CORSAuditMiddleware
 from Backend.middleware.observability import ObservabilityMiddleware
 from Backend.models.errors import (
     ErrorPayload,
@@ -19,17 +21,30 @@ from Backend.models.errors import (
 )
 from Backend.routers.forecasts import router as forecasts_router
 from Backend.routers.internal import router as internal_router
+from Backend.routers.internal_cache import router as internal_cache_router
+from Backend.routers.recommend import curated_photo_ids, is_cached_request
 from Backend.routers.recommend import router as recommend_router
 from Backend.routers.telemetry import router as telemetry_router
 from Backend.routers.unsplash import router as unsplash_router
 from Backend.services.geocode import geocode
 from Backend.services.http import close_http_client, get_http_client
 from Backend.services.metrics import get_metrics, prometheus_metrics
+from Backend.services.photo_meta_db import start_photo_meta_db, stop_photo_meta_db
+from Backend.services.photo_meta_store import (
+    start_photo_meta_store,
+    stop_photo_meta_store,
+)
+from Backend.services.track_queue import start_track_queue, stop_track_queue
 from Backend.services.telemetry_sink import (
     start_telemetry_batcher,
     stop_telemetry_batcher,
 )
 from Backend.utils.cache import cached
+from Backend.utils.cache_bus import start_cache_bus, stop_cache_bus
+from Backend.utils.cache_snapshot import restore_cache_snapshot, save_cache_snapshot
+from Backend.utils.external_cache import close_cache, get_cache_backend
+from Backend.utils.http_client import close_client as close_unsplash_client
+from Backend.utils.peer_cache import close_peer_cache
 from datetime import datetime
 import subprocess
 
@@ -63,11 +78,47 @@ async def lifespan(app: FastAPI):
         logging.getLogger("sunshine_backend.telemetry.sink").exception(
             "Failed to start telemetry batcher"
         )
+    # Cross-instance cache propagation (no-op unless CACHE_BUS_BACKEND is set)
+    try:
+        await start_cache_bus()
+    except Exception:
+        logging.getLogger(__name__).exception("Failed to start cache bus")
+    # Warm in-process caches from the last deploy (CACHE_SNAPSHOT_PATH)
+    try:
+        await restore_cache_snapshot()
+    except Exception:
+        logging.getLogger(__name__).exception("Failed to restore cache snapshot")
+    # Unsplash download tracking runs in the background
+    try:
+        await start_track_queue()
+    except Exception:
+        logging.getLogger(__name__).exception("Failed to start track queue")
+    # Durable photo meta with ETags (no-op unless PHOTO_META_DB_PATH is set)
+    try:
+        await start_photo_meta_db()
+    except Exception:
+        logging.getLogger(__name__).exception("Failed to open photo meta db")
+    # Prefetch meta for the curated photo pool (/recommend?photo_meta=true)
+    try:
+        await start_photo_meta_store(curated_photo_ids())
+    except Exception:
+        logging.getLogger(__name__).exception("Failed to start photo meta store")
     try:
         yield
     finally:
         # Cleanup shared resources
+        try:
+            await save_cache_snapshot()
+        except Exception:
+            logging.getLogger(__name__).exception("Failed to save cache snapshot")
+        await stop_photo_meta_store()
+        await stop_photo_meta_db()
+        await stop_track_queue()
         await close_http_client()
+        await close_unsplash_client()
+        await stop_cache_bus()
+        await close_peer_cache()
+        await close_cache()
         try:
             await stop_telemetry_batcher()
         except Exception:
@@ -119,10 +170,17 @@ app = FastAPI(
 )
 app.include_router(recommend_router)
 app.include_router(internal_router)
+app.include_router(internal_cache_router)
 app.include_router(forecasts_router)
 app.include_router(telemetry_router)
 app.include_router(unsplash_router)
 
+# Admission control: queue or shed /recommend under overload. Registered
+# first (innermost) so shed responses still get CORS and request-id headers.
+cast(_Any, app).add_middleware(
+    AdmissionMiddleware, fast_paths={"/recommend": is_cached_request}
+)
+
 # Add observability middleware
 cast(_Any, app).add_middleware(cast(_Any, ObservabilityMiddleware))
 
@@ -160,82 +218,14 @@ elif cors_allowed:
     # Log rejected CORS origins for auditing.
     # Optionally enforce by returning 403 when CORS_ENFORCE is enabled.
     cors_enforce = os.environ.get("CORS_ENFORCE", "").lower() in ("1", "true", "yes")
-
-    @app.middleware("http")
-    async def cors_rejected_logging_middleware(request: Request, call_next):
-        origin = request.headers.get("origin")
-        if origin:
-            norm = origin.rstrip("/")
-            if norm not in origins:
-                client = request.client.host if request.client else "unknown"
-                # Structured-ish log fields for easier parsing in log sinks
-                extra = {
-                    "origin": origin,
-                    "path": request.url.path,
-                    "method": request.method,
-                    "client": client,
-                }
-                logger.warning("Rejected CORS origin", extra=extra)
-                if cors_enforce:
-                    # Return JSON error when enforcement enabled
-                    return JSONResponse(
-                        status_code=403,
-                        content={
-                            "error": "cors_forbidden",
-                            "detail": f"Origin {origin} not allowed",
-                        },
-                    )
-        return await call_next(request)
-
-
-# Beta key gate middleware: always register a middleware that checks the
-# BETA_KEYS environment variable at request time. This avoids import-order
-# test flakiness where tests set env vars after the app has been constructed.
-class BetaKeyMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, *args, **kwargs):
-        super().__init__(app)
-
-    async def dispatch(self, request: Request, call_next):
-        # Allow CORS preflight and public health/debug endpoints without a key
-        if request.method == "OPTIONS":
-            return await call_next(request)
-
-        # Exempt simple health/debug endpoints and telemetry ingestion so uptime
-        # checks and client-side telemetry can work without a beta key.
-        if request.url.path in ("/health", "/_debug_env", "/telemetry"):
-            return await call_next(request)
-
-        # Read keys at request time so tests that mutate env before a request
-        # are honored even if the app was constructed earlier.
-        env = os.environ.get("BETA_KEYS", "").strip()
-        if not env:
-            # No keys configured -> no gating enforced
-            return await call_next(request)
-
-        keys = {k.strip() for k in env.split(",") if k.strip()}
-        header = request.headers.get("x-beta-key") or request.headers.get("X-Beta-Key")
-        if not header:
-            return JSONResponse(
-                status_code=401,
-                content={
-                    "error": "beta_key_required",
-                    "detail": "Missing X-Beta-Key header",
-                },
-            )
-        if header not in keys:
-            return JSONResponse(
-                status_code=401,
-                content={
-                    "error": "beta_key_invalid",
-                    "detail": "Invalid X-Beta-Key",
-                },
-            )
-        return await call_next(request)
+    cast(_Any, app).add_middleware(
+        CORSAuditMiddleware, origins=origins, enforce=cors_enforce
+    )
 
 
-# Always register the middleware so it runs before FastAPI validation. The
-# middleware is a no-op unless BETA_KEYS is set in the environment at request
-# time.
+# Beta key gate: always register the middleware so it runs before FastAPI
+# validation. It is a no-op unless BETA_KEYS is set; the key table is
+# recompiled when the variable changes, so tests may set it after import.
 cast(_Any, app).add_middleware(BetaKeyMiddleware)
 
 
@@ -358,7 +348,15 @@ async def version_info():
         504: {"description": "Gateway Timeout - geocoding request timeout"},
     },
 )
-@cached(ttl=604800, key_prefix="geocode")  # 7 days TTL
+# 7 days TTL; misses are negatively cached briefly so repeated unknown
+# queries don't each call Mapbox
+@cached(
+    ttl=604800,
+    key_prefix="geocode",
+    error_ttl=60,
+    cache_errors=(LocationNotFound,),
+    store=get_cache_backend,
+)
 async def geocode_endpoint(
     q: str = Query(..., description="Location query (e.g., 'Seattle, WA')")
 ):
@@ -0,0 +1,272 @@
+"""Admission control for expensive endpoints (CoDel-style load shedding).
+
+Without it, a traffic spike admits every /recommend request; they share one
+event loop and one upstream budget and then all time out together at
+REQUEST_BUDGET_MS. Here at most `max_inflight` requests run at once and the
+rest wait in a FIFO queue. Queueing delay (sojourn time) is tracked as in
+CoDel: while it stays above `target` for a whole `interval` the controller
+is overloaded, and then
+
+- new arrivals are shed at once, and
+- queued requests that waited longer than `target` are shed when dequeued,
+
+until a request gets through with a delay below `target` again. A request
+that would wait longer than `max_wait` is shed too. Shed requests get a fast
+503 with Retry-After instead of a slow 504, so the requests that are
+admitted still finish within budget.
+
+Requests run in one of three priority lanes:
+
+- exempt: /health, /metrics and every path not given to
+  `AdmissionMiddleware` always pass;
+- fast: requests a controlled path can serve from cache without upstream
+  calls (its fast-path predicate) never queue behind full rankings; they
+  have their own concurrency budget and are shed only when it is used up;
+- full: everything else goes through the CoDel-managed queue above.
+
+Configuration:
+    ADMISSION_ENABLED: set to "false" to admit everything (default true)
+    ADMISSION_MAX_INFLIGHT: requests running at once (default 100)
+    ADMISSION_MAX_QUEUE: requests waiting at once (default 200)
+    ADMISSION_FAST_MAX_INFLIGHT: fast-lane requests running at once (default 200)
+    ADMISSION_TARGET_MS: acceptable queueing delay (default 50)
+    ADMISSION_INTERVAL_MS: how long delay may stay above target (default 500)
+    ADMISSION_MAX_WAIT_MS: longest wait before a request is shed (default 500)
+    ADMISSION_RETRY_AFTER_SEC: Retry-After on shed responses (default 1)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import suppress
+from typing import Callable, Deque, Dict, Mapping, Optional
+
+from starlette.datastructures import QueryParams
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from Backend.models.errors import ErrorPayload
+from Backend.services import metrics
+
+logger = logging.getLogger(__name__)
+
+FastPath = Callable[[Mapping[str, str]], bool]
+
+
+class Shed(Exception):
+    """The request was not admitted."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """Bounded concurrency with a CoDel-managed wait queue (one event loop)."""
+
+    def __init__(
+        self,
+        max_inflight: int = 100,
+        max_queue: int = 200,
+        target_s: float = 0.05,
+        interval_s: float = 0.5,
+        max_wait_s: float = 0.5,
+        fast_max_inflight: int = 200,
+    ):
+        self.max_inflight = max(1, max_inflight)
+        self.fast_max_inflight = fast_max_inflight
+        self.fast_inflight = 0
+        self.max_queue = max_queue
+        self.target_s = target_s
+        self.interval_s = interval_s
+        self.max_wait_s = max_wait_s
+        self.inflight = 0
+        self.overloaded = False
+        self._first_above = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def saturated(self) -> bool:
+        """True if a new request could not start right away."""
+        return self.inflight >= self.max_inflight or bool(self._waiters)
+
+    def _observe(self, sojourn: float, now: float) -> None:
+        metrics.incr("admission.sojourn_ms", int(sojourn * 1000))
+        if sojourn < self.target_s:
+            self._first_above = 0.0
+            if self.overloaded:
+                self.overloaded = False
+                logger.info("Admission: queueing delay back under target")
+        elif not self._first_above:
+            self._first_above = now + self.interval_s
+        elif now >= self._first_above and not self.overloaded:
+            self.overloaded = True
+            logger.warning("Admission: overloaded, shedding /recommend requests")
+
+    def _gauges(self) -> None:
+        metrics.set_gauge("admission.inflight", self.inflight)
+        metrics.set_gauge("admission.queued", len(self._waiters))
+
+    def _shed(self, reason: str) -> Shed:
+        metrics.incr(f"admission.shed.{reason}")
+        return Shed(reason)
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the time spent queued.
+
+        Raises Shed if the request should be turned away instead.
+        """
+        started = now = time.monotonic()
+        if not self.saturated:
+            self.inflight += 1
+            self._observe(0.0, now)
+            self._gauges()
+            return 0.0
+        if self.overloaded:
+            raise self._shed("overload")
+        if len(self._waiters) >= self.max_queue:
+            raise self._shed("queue_full")
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        self._gauges()
+        timer = loop.call_later(self.max_wait_s, _expire, waiter)
+        try:
+            await waiter
+        except asyncio.TimeoutError:
+            self._forget(waiter)
+            raise self._shed("timeout")
+        except asyncio.CancelledError:
+            if not waiter.cancelled() and waiter.exception() is None:
+                # Slot was handed over just as the caller went away
+                self.release()
+            self._forget(waiter)
+            raise
+        finally:
+            timer.cancel()
+
+        now = time.monotonic()
+        sojourn = now - started
+        self._observe(sojourn, now)
+        if self.overloaded and sojourn > self.target_s:
+            # CoDel drops at the head of a standing queue
+            self.release()
+            raise self._shed("overload")
+        return sojourn
+
+    def acquire_fast(self) -> None:
+        """Admit a cache-served request in its own lane, or raise Shed."""
+        if self.fast_inflight >= self.fast_max_inflight:
+            raise self._shed("fast_lane_full")
+        self.fast_inflight += 1
+        metrics.set_gauge("admission.fast_inflight", self.fast_inflight)
+
+    def release_fast(self) -> None:
+        self.fast_inflight -= 1
+        metrics.set_gauge("admission.fast_inflight", self.fast_inflight)
+
+    def _forget(self, waiter: asyncio.Future) -> None:
+        with suppress(ValueError):
+            self._waiters.remove(waiter)
+        self._gauges()
+
+    def release(self) -> None:
+        """Free a slot, handing it to the oldest live waiter if any."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._gauges()
+                return
+        self.inflight -= 1
+        self._gauges()
+
+
+def _expire(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_exception(asyncio.TimeoutError())
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        env = os.environ.get
+        _controller = AdmissionController(
+            max_inflight=int(env("ADMISSION_MAX_INFLIGHT", "100")),
+            max_queue=int(env("ADMISSION_MAX_QUEUE", "200")),
+            target_s=float(env("ADMISSION_TARGET_MS", "50")) / 1000.0,
+            interval_s=float(env("ADMISSION_INTERVAL_MS", "500")) / 1000.0,
+            max_wait_s=float(env("ADMISSION_MAX_WAIT_MS", "500")) / 1000.0,
+            fast_max_inflight=int(env("ADMISSION_FAST_MAX_INFLIGHT", "200")),
+        )
+    return _controller
+
+
+class AdmissionMiddleware:
+    """Queue or shed requests to `fast_paths` paths; pass everything else."""
+
+    def __init__(self, app: ASGIApp, fast_paths: Dict[str, FastPath]) -> None:
+        self.app = app
+        self.fast_paths = fast_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        fast_path = self.fast_paths.get(scope.get("path", ""))
+        if (
+            scope["type"] != "http"
+            or fast_path is None
+            or os.environ.get("ADMISSION_ENABLED", "true").lower() == "false"
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        controller = get_admission_controller()
+        # Only pay for the cache check when the request would have to wait
+        if controller.saturated and fast_path(QueryParams(scope["query_string"])):
+            try:
+                controller.acquire_fast()
+            except Shed as exc:
+                await self._shed_response(exc)(scope, receive, send)
+                return
+            metrics.incr("admission.fast_path")
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                controller.release_fast()
+            return
+
+        try:
+            waited = await controller.acquire()
+        except Shed as exc:
+            await self._shed_response(exc)(scope, receive, send)
+            return
+
+        metrics.incr("admission.admitted")
+        # Handlers subtract queueing time from their own budget
+        scope.setdefault("state", {})["admission_wait_s"] = waited
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release()
+
+    @staticmethod
+    def _shed_response(exc: Shed) -> JSONResponse:
+        retry_after = os.environ.get("ADMISSION_RETRY_AFTER_SEC", "1")
+        return JSONResponse(
+            status_code=503,
+            content=ErrorPayload(
+                error="overloaded",
+                detail=f"Server is busy ({exc.reason})",
+                hint=f"Retry after {retry_after} seconds",
+            ).model_dump(),
+            headers={"Retry-After": retry_after},
+        )
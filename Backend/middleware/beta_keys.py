@@ -0,0 +1,252 @@
+"""Beta key gate with per-key quotas and /recommend concurrency limits.
+
+`BETA_KEYS` is a comma-separated list of keys, each optionally followed by
+its own limits: `key[:rate_per_min[:recommend_concurrency]]`, e.g.
+`alpha123,beta456:30:1`. Keys without limits use the defaults below; a
+limit of 0 means unlimited. Only trailing numeric parts are limits, so keys
+may contain colons themselves (`org:alpha123:30` is key `org:alpha123`).
+Entries with an empty key or a limit that is not a whole number are logged
+(by key id) and skipped.
+
+The list is compiled into a `BetaKeyTable` once and recompiled only when the
+environment value changes (tests and config reloads set it after the app is
+built). Per-key state survives a recompile for keys whose limits did not
+change, so editing the list does not hand everyone a fresh quota.
+
+Each key has a GCRA token bucket (`rate_per_min` requests a minute, bursts
+of the same size) and a cap on concurrent `/recommend` requests, so one busy
+tester cannot use up the shared upstream budget. Rejections are 429 with
+Retry-After. Usage is exported as `beta.<id>.*` metrics, where `<id>` is a
+short hash of the key so the key itself never reaches a metrics backend.
+
+Configuration:
+    BETA_KEYS: allowed keys; unset or empty disables the gate
+    BETA_KEY_RATE_PER_MIN: default requests per minute per key (default 120)
+    BETA_KEY_RECOMMEND_CONCURRENCY: default concurrent /recommend requests
+        per key (default 4)
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from Backend.services import metrics
+from Backend.utils.rate_limiter import GCRARateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Paths that never need a key: uptime checks and client-side telemetry
+EXEMPT_PATHS = frozenset(("/health", "/_debug_env", "/telemetry"))
+# Peer cache fill between instances authenticates with its own token
+EXEMPT_PREFIXES = ("/internal/cache/peer/",)
+CONCURRENCY_PATHS = frozenset(("/recommend",))
+
+
+def key_id(key: str) -> str:
+    """Stable, non-reversible label for a key in metrics and logs."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:8]
+
+
+@dataclass
+class BetaKey:
+    """Limits and live usage for one beta key."""
+
+    id: str
+    rate_per_min: int
+    max_concurrent: int
+    limiter: Optional[GCRARateLimiter] = None
+    inflight: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.rate_per_min > 0:
+            self.limiter = GCRARateLimiter(60, self.rate_per_min, max_keys=1)
+
+    @property
+    def limits(self) -> Tuple[int, int]:
+        return (self.rate_per_min, self.max_concurrent)
+
+    def take_quota(self) -> float:
+        """Consume one request; returns 0, or seconds to wait if over quota."""
+        if self.limiter is None or self.limiter.is_allowed(self.id):
+            return 0.0
+        return self.limiter.get_reset_time(self.id)
+
+    def enter(self) -> bool:
+        with self._lock:
+            if self.max_concurrent > 0 and self.inflight >= self.max_concurrent:
+                return False
+            self.inflight += 1
+            return True
+
+    def leave(self) -> None:
+        with self._lock:
+            self.inflight -= 1
+
+
+_LIMIT = re.compile(r"\d*")
+# Looks like a limit but isn't a whole number: a typo, not part of the key
+_BAD_LIMIT = re.compile(r"[-+]?[\d.]+")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        logger.warning("Ignoring non-integer %s", name)
+        return default
+
+
+def _parse_entry(
+    item: str, default_rate: int, default_conc: int
+) -> Optional[Tuple[str, int, int]]:
+    """(key, rate, concurrency) for one `BETA_KEYS` entry, or None if malformed."""
+    parts = [p.strip() for p in item.strip().rsplit(":", 2)]
+    limits: List[str] = []
+    while len(parts) > 1 and len(limits) < 2 and _LIMIT.fullmatch(parts[-1]):
+        limits.insert(0, parts.pop())
+    key = ":".join(parts)
+    if not key or any(_BAD_LIMIT.fullmatch(p) for p in parts[1:]):
+        return None
+    rate = int(limits[0]) if limits and limits[0] else default_rate
+    conc = int(limits[1]) if len(limits) > 1 and limits[1] else default_conc
+    return key, rate, conc
+
+
+class BetaKeyTable:
+    """Compiled `BETA_KEYS`: key -> BetaKey."""
+
+    def __init__(
+        self, raw: str, previous: Optional["BetaKeyTable"] = None
+    ) -> None:
+        self.raw = raw
+        default_rate = _env_int("BETA_KEY_RATE_PER_MIN", 120)
+        default_conc = _env_int("BETA_KEY_RECOMMEND_CONCURRENCY", 4)
+        old = previous.keys if previous else {}
+        self.keys: Dict[str, BetaKey] = {}
+        for position, item in enumerate(raw.split(",")):
+            if not item.strip():
+                continue
+            parsed = _parse_entry(item, default_rate, default_conc)
+            if parsed is None:
+                logger.warning(
+                    "Skipping malformed BETA_KEYS entry #%d (%s)",
+                    position + 1,
+                    key_id(item.strip()),
+                )
+                continue
+            key, rate, conc = parsed
+            kept = old.get(key)
+            if kept is not None and kept.limits == (rate, conc):
+                self.keys[key] = kept
+            else:
+                self.keys[key] = BetaKey(key_id(key), rate, conc)
+
+    def get(self, key: str) -> Optional[BetaKey]:
+        return self.keys.get(key)
+
+
+_table: Optional[BetaKeyTable] = None
+_table_lock = threading.Lock()
+
+
+def get_beta_key_table() -> Optional[BetaKeyTable]:
+    """Current key table, recompiled when BETA_KEYS changes; None if ungated."""
+    global _table
+    raw = os.environ.get("BETA_KEYS", "").strip()
+    table = _table
+    if table is None or table.raw != raw:
+        with _table_lock:
+            if _table is None or _table.raw != raw:
+                _table = BetaKeyTable(raw, _table)
+            table = _table
+    return table if table.keys else None
+
+
+def _rejected(status: int, error: str, detail: str, retry_after: float = 0) -> JSONResponse:
+    headers = {"Retry-After": str(max(1, math.ceil(retry_after)))} if status == 429 else None
+    return JSONResponse(
+        status_code=status, content={"error": error, "detail": detail}, headers=headers
+    )
+
+
+class BetaKeyMiddleware:
+    """Require a known X-Beta-Key and enforce its quota and concurrency.
+
+    Pure ASGI, so responses (including streamed ones) pass through untouched
+    and a /recommend slot is held until the response has been fully sent.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Allow CORS preflight and exempt endpoints without a key
+        path = scope["path"]
+        if (
+            scope["method"] == "OPTIONS"
+            or path in EXEMPT_PATHS
+            or path.startswith(EXEMPT_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        table = get_beta_key_table()
+        if table is None:
+            # No keys configured -> no gating enforced
+            await self.app(scope, receive, send)
+            return
+
+        header = Headers(scope=scope).get("x-beta-key")
+        entry = table.get(header) if header else None
+        rejection = self._check(header, entry, path)
+        if rejection is not None:
+            await rejection(scope, receive, send)
+            return
+        if entry is None or path not in CONCURRENCY_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        metrics.set_gauge(f"beta.{entry.id}.inflight", entry.inflight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            entry.leave()
+            metrics.set_gauge(f"beta.{entry.id}.inflight", entry.inflight)
+
+    @staticmethod
+    def _check(
+        header: Optional[str], entry: Optional[BetaKey], path: str
+    ) -> Optional[JSONResponse]:
+        """Rejection response, or None once the request holds what it needs."""
+        if not header:
+            return _rejected(401, "beta_key_required", "Missing X-Beta-Key header")
+        if entry is None:
+            return _rejected(401, "beta_key_invalid", "Invalid X-Beta-Key")
+
+        metrics.incr(f"beta.{entry.id}.requests")
+        wait = entry.take_quota()
+        if wait:
+            metrics.incr(f"beta.{entry.id}.rejected_quota")
+            return _rejected(
+                429, "beta_key_quota", "Request quota exceeded for this key", wait
+            )
+        if path in CONCURRENCY_PATHS and not entry.enter():
+            metrics.incr(f"beta.{entry.id}.rejected_concurrency")
+            return _rejected(
+                429, "beta_key_concurrency", "Too many concurrent requests for this key"
+            )
+        return None
@@ -0,0 +1,46 @@
+import logging
+from typing import Iterable
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger("sunshine_backend")
+
+
+class CORSAuditMiddleware:
+    """Log requests from origins outside the CORS allowlist.
+
+    With `enforce` the request is answered with a JSON 403 instead of being
+    passed on. Runs outside `CORSMiddleware`, which decides the CORS headers.
+    """
+
+    def __init__(self, app: ASGIApp, origins: Iterable[str], enforce: bool = False):
+        self.app = app
+        self.origins = frozenset(origins)
+        self.enforce = enforce
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            origin = Headers(scope=scope).get("origin")
+            if origin and origin.rstrip("/") not in self.origins:
+                client = scope.get("client")
+                # Structured-ish log fields for easier parsing in log sinks
+                extra = {
+                    "origin": origin,
+                    "path": scope["path"],
+                    "method": scope["method"],
+                    "client": client[0] if client else "unknown",
+                }
+                logger.warning("Rejected CORS origin", extra=extra)
+                if self.enforce:
+                    response = JSONResponse(
+                        status_code=403,
+                        content={
+                            "error": "cors_forbidden",
+                            "detail": f"Origin {origin} not allowed",
+                        },
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
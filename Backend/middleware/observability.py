@@ -3,8 +3,8 @@ import logging
 import time
 import uuid
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # Use a dedicated logger to avoid uvicorn access log formatting conflicts
 app_logger = logging.getLogger("sun.observ")
@@ -16,22 +16,40 @@ if not app_logger.handlers:
     app_logger.propagate = False
 
 
-class ObservabilityMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class ObservabilityMiddleware:
+    """Tag responses with X-Request-ID / X-Processing-Time and log one line.
+
+    Pure ASGI: headers are added to the response start message as it passes
+    through, so the body is never buffered or re-streamed.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         request_id = str(uuid.uuid4())
         start = time.time()
-        response = await call_next(request)
-        duration = int((time.time() - start) * 1000)
-        response.headers["X-Request-ID"] = request_id
-        response.headers["X-Processing-Time"] = str(duration)
-        # Keep the logged payload compact to avoid long-line lints
-        payload = {
-            "t": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            "id": request_id,
-            "m": request.method,
-            "p": request.url.path,
-            "s": response.status_code,
-            "lat": duration,
-        }
-        app_logger.info(json.dumps(payload))
-        return response
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                duration = int((time.time() - start) * 1000)
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Processing-Time"] = str(duration)
+                # Keep the logged payload compact to avoid long-line lints
+                payload = {
+                    "t": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "id": request_id,
+                    "m": scope["method"],
+                    "p": scope["path"],
+                    "s": message["status"],
+                    "lat": duration,
+                }
+                app_logger.info(json.dumps(payload))
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
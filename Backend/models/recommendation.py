@@ -1,9 +1,21 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
 
+class RecommendationPhoto(BaseModel):
+    """Photo metadata embedded in a recommendation (`photo_meta=true`)."""
+
+    id: str = Field(..., description="Unsplash photo id")
+    urls: Dict[str, Optional[str]] = Field(..., description="Image URLs by size")
+    links: Dict[str, Optional[str]] = Field(
+        ..., description="Photo page (html) and download_location for tracking"
+    )
+    attribution_html: str = Field(..., description="Required Unsplash attribution")
+    source: str = Field(..., description="live or demo")
+
+
 class Recommendation(BaseModel):
     """A recommended sunshine location with weather forecast and metadata."""
 
@@ -26,6 +38,17 @@ class Recommendation(BaseModel):
     photo_id: Optional[str] = Field(
         None, description="Unsplash photo id for attribution/tracking (optional)"
     )
+    photo: Optional[RecommendationPhoto] = Field(
+        None,
+        description=(
+            "Prewarmed metadata for photo_id when requested with photo_meta=true "
+            "and available"
+        ),
+    )
+    weather_stale: bool = Field(
+        False,
+        description="Scored from a last known good forecast during a weather outage",
+    )
 
 
 class Location(BaseModel):
@@ -59,3 +82,10 @@ class RecommendResponse(BaseModel):
         description="UTC timestamp when response was generated",
     )
     version: str = Field("v1", description="API version for compatibility tracking")
+    mode: str = Field(
+        "full",
+        description=(
+            "Ranking mode: full (live weather), cached, snapshot or distance "
+            "(degraded during upstream outages or overload)"
+        ),
+    )
@@ -1,6 +1,6 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class PhotoMetaResponse(BaseModel):
@@ -15,11 +15,42 @@ class PhotoMetaResponse(BaseModel):
     debug: Optional[Dict[str, Any]] = None
 
 
+class PhotoMetaBatchRequest(BaseModel):
+    """Request model for batch photo metadata."""
+
+    photo_ids: List[str]
+    # Optional category per photo id, used for the live random fallback
+    categories: Dict[str, str] = Field(default_factory=dict)
+
+
+class PhotoMetaBatchItem(BaseModel):
+    """Photo metadata for one requested id in a batch."""
+
+    photo_id: str  # as requested; `id` differs after a random fallback
+    id: str
+    urls: Dict[str, str]
+    links: Dict[str, Optional[str]]
+    attribution_html: str
+    source: str
+    random_fallback: Optional[bool] = None
+    etag: Optional[str] = None
+    cache_status: str  # 'hit_fresh', 'hit_stale' or 'miss' before this request
+
+
+class PhotoMetaBatchResponse(BaseModel):
+    """Response model for batch photo metadata."""
+
+    results: List[PhotoMetaBatchItem]
+
+
 class TrackResponse(BaseModel):
     """Response model for photo tracking endpoint."""
 
     tracked: bool
-    reason: Optional[str] = None  # 'deduped', 'missing_params', 'api_failure', 'mocked'
+    # True when accepted for the background tracking queue (HTTP 202)
+    queued: Optional[bool] = None
+    # 'queued', 'deduped', 'rate_limited', 'missing_params', 'queue_full', 'mocked'
+    reason: Optional[str] = None
 
 
 class TrackRequest(BaseModel):
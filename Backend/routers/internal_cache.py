@@ -0,0 +1,144 @@
+import hmac
+import os
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import Response
+
+from Backend.utils import cache_bus
+from Backend.utils.cache_codec import encode_entry
+from Backend.utils.cache_inproc import InProcessCache
+from Backend.utils.external_cache import get_l2_backend, named_caches
+from Backend.utils.peer_cache import get_loader, get_peer_cache, serve_peer
+
+router = APIRouter()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Guard admin endpoints with CACHE_ADMIN_TOKEN.
+
+    Deny by default: without a configured token the endpoints don't exist.
+    """
+    token = os.environ.get("CACHE_ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def _get_named(name: str) -> InProcessCache:
+    cache = named_caches().get(name)
+    if cache is None:
+        raise HTTPException(status_code=404, detail=f"Unknown cache: {name}")
+    return cache
+
+
+@router.get("/internal/cache", tags=["internal"], dependencies=[Depends(require_admin)])
+async def cache_overview(
+    top: int = Query(10, ge=0, le=100, description="Number of hot keys per cache"),
+) -> Dict[str, Any]:
+    """Per-cache, per-namespace counts, sizes, hit/stale/miss rates and age
+    histograms, plus hot keys and the state of the shared tiers."""
+    l2 = get_l2_backend()
+    bus = cache_bus.get_cache_bus()
+    peers = get_peer_cache()
+    l2_info: Optional[Dict[str, Any]] = None
+    if l2 is not None:
+        # Only the shared-memory table keeps its own counters
+        table = getattr(l2, "table", None)
+        l2_info = {
+            "backend": type(l2).__name__,
+            "stats": dict(table.stats) if table is not None else None,
+        }
+    return {
+        "caches": {name: cache.report(top) for name, cache in named_caches().items()},
+        "l2": l2_info,
+        "bus": dict(bus.stats) if bus is not None else None,
+        "peers": dict(peers.stats) if peers is not None else None,
+    }
+
+
+@router.get(
+    "/internal/cache/{name}/keys", tags=["internal"], dependencies=[Depends(require_admin)]
+)
+async def cache_keys(
+    name: str,
+    prefix: str = Query("", description="Only keys starting with this prefix"),
+    limit: int = Query(100, ge=1, le=1000),
+) -> Dict[str, Any]:
+    """List keys of one cache (via the prefix index)."""
+    keys = sorted(_get_named(name).keys(prefix))
+    return {"cache": name, "prefix": prefix, "total": len(keys), "keys": keys[:limit]}
+
+
+@router.get(
+    "/internal/cache/{name}/entry", tags=["internal"], dependencies=[Depends(require_admin)]
+)
+async def cache_entry(
+    name: str, key: str = Query(..., min_length=1)
+) -> Dict[str, Any]:
+    """Inspect one entry's value and freshness without counting it as a hit."""
+    entry = _get_named(name).peek(key)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Key not cached: {key}")
+    return {
+        "cache": name,
+        "key": key,
+        "age_sec": round(time.time() - entry.created_at, 1),
+        "ttl_sec": entry.ttl_seconds,
+        "swr_sec": entry.swr_seconds,
+        "fresh": entry.is_fresh,
+        "hits": entry.hits,
+        "value": entry.value,
+    }
+
+
+@router.delete("/internal/cache", tags=["internal"], dependencies=[Depends(require_admin)])
+async def purge_cache(
+    key: Optional[str] = Query(None, min_length=1),
+    prefix: Optional[str] = Query(None, min_length=1),
+    cache: Optional[str] = Query(None, description="Restrict to one named cache"),
+) -> Dict[str, Any]:
+    """Purge one key or a key prefix, locally, in L2 and (via the cache bus)
+    on every other instance."""
+    if (key is None) == (prefix is None):
+        raise HTTPException(status_code=400, detail="Pass exactly one of key or prefix")
+    if cache is not None:
+        _get_named(cache)
+    if key is not None:
+        removed = await cache_bus.invalidate(key, namespace=cache)
+    elif prefix is not None:
+        removed = await cache_bus.invalidate_prefix(prefix, namespace=cache)
+    return {"key": key, "prefix": prefix, "cache": cache, "removed": removed}
+
+
+@router.get("/internal/cache/peer/{namespace}", include_in_schema=False)
+async def peer_fill(
+    namespace: str,
+    key: str = Query(..., min_length=1, description="Cache key owned by this peer"),
+    x_peer_token: Optional[str] = Header(None),
+):
+    """Serve a cache entry to a peer instance (consistent-hash peer fill).
+
+    The entry is loaded through this instance's cache, so concurrent requests
+    from every peer collapse into one upstream fetch, and is returned in the
+    binary cache codec to keep its creation time and freshness window.
+    """
+    peers = get_peer_cache()
+    if peers is None:
+        raise HTTPException(status_code=404, detail="Peer cache mode is disabled")
+    # Peer mode is never enabled without a token; refuse anyway if it is empty
+    if (
+        not peers.token
+        or not x_peer_token
+        or not hmac.compare_digest(x_peer_token, peers.token)
+    ):
+        raise HTTPException(status_code=403, detail="Invalid peer token")
+    if get_loader(namespace) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown namespace: {namespace}")
+    try:
+        entry = await serve_peer(namespace, key)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Malformed key: {key}")
+    return Response(content=encode_entry(entry), media_type="application/octet-stream")
@@ -1,16 +1,31 @@
 import json
 import os
 import re
+import time
 from hashlib import blake2b
+from typing import Mapping
 
 from fastapi import APIRouter, Depends, Query, Request
 from fastapi.responses import JSONResponse, Response
 
 from Backend.models.errors import ErrorPayload
 from Backend.models.errors import UpstreamError as WeatherError
-from Backend.models.recommendation import Recommendation, RecommendResponse
+from Backend.models.recommendation import (
+    Recommendation,
+    RecommendationPhoto,
+    RecommendResponse,
+)
+from Backend.services import metrics
+from Backend.services.degradation import (
+    MODE_DISTANCE,
+    MODE_FULL,
+    get_degradation_controller,
+    rank_degraded,
+)
 from Backend.services.locations import nearby
-from Backend.services.scoring import rank
+from Backend.services.photo_meta_store import get_photo_meta_store
+from Backend.services.scoring import BUDGET, rank
+from Backend.services.weather import peek_weather
 from Backend.utils.etag import strong_etag_for_obj
 
 # Minimal category -> Unsplash API photo ids for attribution (frontend has a
@@ -49,6 +64,20 @@ CATEGORY_API_IDS = {
 }
 
 
+def curated_photo_ids() -> list[str]:
+    """Every photo id /recommend can hand out, for the prewarmed meta store."""
+    return list(dict.fromkeys(p for pool in CATEGORY_API_IDS.values() for p in pool))
+
+
+def _embed_photo(r: dict) -> None:
+    """Attach prewarmed meta for r's photo_id, if the store has it."""
+    store = get_photo_meta_store()
+    meta = store.get(r["photo_id"]) if store and r.get("photo_id") else None
+    metrics.incr("photo_meta.embed.hit" if meta else "photo_meta.embed.miss")
+    if meta:
+        r["photo"] = {k: meta[k] for k in RecommendationPhoto.model_fields}
+
+
 def _choose_photo_id(loc_id: str, category: str) -> str | None:
     pool = CATEGORY_API_IDS.get(category.lower().strip())
     if not pool:
@@ -82,6 +111,63 @@ def _choose_photo_id_unique(loc_id: str, category: str, used: set[str]) -> str |
     return pool[start]
 
 
+async def _rank_full(origin, cand, max_weather, budget_s, get_weather_fn):
+    """Full weather-scored ranking; returns results or a 502 response."""
+    # Allow tests to override the weather fetch dependency
+    # get_weather_fn is expected to be a callable (lat, lon) -> (slots, status)
+    weather_fetch = get_weather_fn or None
+    if weather_fetch is None:
+        # default to services.weather.get_weather_cached
+        from Backend.services.weather import get_weather_cached as _default_get_weather
+        from Backend.services.weather import prefetch_weather
+
+        weather_fetch = _default_get_weather
+        # One batched L2 read for all candidates before the per-candidate fanout
+        await prefetch_weather((c["lat"], c["lon"]) for c in cand[:max_weather])
+
+    with get_degradation_controller().full_ranking():
+        try:
+            return await rank(
+                origin[0],
+                origin[1],
+                cand,
+                max_weather=max_weather,
+                budget_s=budget_s,
+                weather_fetch=weather_fetch,
+            )
+        except WeatherError:
+            return JSONResponse(
+                status_code=502,
+                content=ErrorPayload(
+                    error="weather_unavailable",
+                    detail="Weather service unavailable",
+                    hint="Try again later",
+                ).model_dump(),
+            )
+
+
+def is_cached_request(params: Mapping[str, str]) -> bool:
+    """True if /recommend can answer without any upstream call.
+
+    Used by admission control to let cache hits through under load: the dev
+    bypass, or every forecast in the weather fanout fresh in-process.
+    """
+    if os.getenv("DEV_BYPASS_SCORING", "false").lower() == "true":
+        return True
+    try:
+        lat, lon = float(params["lat"]), float(params["lon"])
+        radius = int(params.get("radius", "") or os.getenv("RECOMMEND_DEFAULT_RADIUS_MI", "100"))
+    except (KeyError, ValueError):
+        return False
+    radius = max(5, min(radius, int(os.getenv("RECOMMEND_MAX_RADIUS_MI", "300"))))
+    max_weather = int(os.getenv("WEATHER_FANOUT_MAX_CANDIDATES", "20"))
+    for c in nearby(lat, lon, radius, max_candidates=60)[:max_weather]:
+        hit = peek_weather(c["lat"], c["lon"])
+        if hit is None or not hit[1]:
+            return False
+    return True
+
+
 router = APIRouter()
 ENABLE_Q = os.getenv("ENABLE_Q", "false").lower() == "true"
 
@@ -149,8 +235,17 @@ async def recommend(
         ge=1,
         le=12,
     ),
+    photo_meta: bool = Query(
+        default=False,
+        description=(
+            "Embed photo urls and attribution in each result (prewarmed, no "
+            "extra latency), saving a /internal/photos/meta call per card."
+        ),
+    ),
     get_weather_fn=Depends(get_weather_dep),
 ):
+    # Time spent queued by admission control counts against the budget
+    started = time.perf_counter() - getattr(request.state, "admission_wait_s", 0.0)
     # re-evaluate feature flag at request time to avoid stale import-time values
     enable_q = os.getenv("ENABLE_Q", "false").lower() == "true"
 
@@ -239,12 +334,15 @@ async def recommend(
                     str(r["id"]), r.get("category", ""), used_photo_ids
                 ),
             }
+            if photo_meta:
+                _embed_photo(r_out)
             results.append(Recommendation(**r_out))
 
         response_obj = RecommendResponse(
             query={"lat": origin[0], "lon": origin[1], "radius": radius},
             results=results,
             version="v1",
+            mode=MODE_DISTANCE,
         )
         payload = response_obj.model_dump()
         payload_out = dict(payload)
@@ -264,36 +362,28 @@ async def recommend(
             "public, max-age=900, stale-while-revalidate=300"
         )
         resp.headers["X-Processing-Time"] = "TBD"
+        resp.headers["X-Ranking-Mode"] = MODE_DISTANCE
         resp.headers["Last-Modified"] = response_obj.generated_at.strftime(
             "%a, %d %b %Y %H:%M:%S GMT"
         )
         return resp
-    # Allow tests to override the weather fetch dependency
-    # get_weather_fn is expected to be a callable (lat, lon) -> (slots, status)
-    weather_fetch = get_weather_fn or None
-    if weather_fetch is None:
-        # default to services.weather.get_weather_cached
-        from Backend.services.weather import get_weather_cached as _default_get_weather
-
-        weather_fetch = _default_get_weather
-
-    try:
-        ranked = await rank(
-            origin[0],
-            origin[1],
-            cand,
-            max_weather=int(os.getenv("WEATHER_FANOUT_MAX_CANDIDATES", "20")),
-            weather_fetch=weather_fetch,
-        )
-    except WeatherError:
-        return JSONResponse(
-            status_code=502,
-            content=ErrorPayload(
-                error="weather_unavailable",
-                detail="Weather service unavailable",
-                hint="Try again later",
-            ).model_dump(),
+    max_weather = int(os.getenv("WEATHER_FANOUT_MAX_CANDIDATES", "20"))
+    controller = get_degradation_controller()
+    remaining = BUDGET - (time.perf_counter() - started)
+    # Injected weather functions (tests) always get a full ranking
+    reason = controller.reason(remaining) if get_weather_fn is None else None
+    mode = MODE_FULL
+    if reason is not None:
+        # Circuit open, saturated or out of budget: no upstream fanout
+        ranked, mode = await rank_degraded(cand, max_weather)
+    else:
+        full = await _rank_full(
+            origin, cand, max_weather, max(remaining, 0.0), get_weather_fn
         )
+        if isinstance(full, JSONResponse):
+            return full
+        ranked = full
+    controller.record(mode, reason)
 
     top_n = int(os.getenv("RECOMMEND_TOP_N", "3"))
     results = []
@@ -316,6 +406,8 @@ async def recommend(
             )
             if pid:
                 r["photo_id"] = pid
+        if photo_meta:
+            _embed_photo(r)
         results.append(Recommendation(**r))
 
     # Compose response
@@ -323,15 +415,25 @@ async def recommend(
         query={"lat": origin[0], "lon": origin[1], "radius": radius},
         results=results,
         version="v1",
+        mode=mode,
     )
     # Full payload for the response
     payload = response_obj.model_dump()
 
-    # Compute ETag over the payload excluding volatile fields (generated_at)
+    # Compute ETag over the payload excluding volatile fields (generated_at).
+    # The ranking mode stays in: full and degraded bodies (and their
+    # Cache-Control) differ, so a 304 must not cross modes
     etag_payload = {k: v for k, v in payload.items() if k != "generated_at"}
     # Use the helper that canonicalizes Python objects (stable floats, sorted keys)
     etag = strong_etag_for_obj(etag_payload)
 
+    # Degraded rankings are short-lived: don't let clients hold them for long
+    cache_control = (
+        "public, max-age=900, stale-while-revalidate=300"
+        if mode == MODE_FULL
+        else "public, max-age=60"
+    )
+
     # If-None-Match support
     # Support If-None-Match with quoted or unquoted ETags, and comma-separated lists
     inm = request.headers.get("if-none-match")
@@ -347,8 +449,9 @@ async def recommend(
                 # Return empty 304 to avoid mismatched Content-Length
                 headers = {
                     "ETag": etag,
-                    "Cache-Control": "public, max-age=900, stale-while-revalidate=300",
+                    "Cache-Control": cache_control,
                     "X-Processing-Time": "TBD",
+                    "X-Ranking-Mode": mode,
                     "Last-Modified": response_obj.generated_at.strftime(
                         "%a, %d %b %Y %H:%M:%S GMT"
                     ),
@@ -364,8 +467,9 @@ async def recommend(
     )
     resp = JSONResponse(content=json.loads(payload_json))
     resp.headers["ETag"] = etag
-    resp.headers["Cache-Control"] = "public, max-age=900, stale-while-revalidate=300"
+    resp.headers["Cache-Control"] = cache_control
     resp.headers["X-Processing-Time"] = "TBD"
+    resp.headers["X-Ranking-Mode"] = mode
     resp.headers["Last-Modified"] = response_obj.generated_at.strftime(
         "%a, %d %b %Y %H:%M:%S GMT"
     )
@@ -1,15 +1,10 @@
-import asyncio
 import logging
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter
 from pydantic import BaseModel
 
-from Backend.services.telemetry_sink import (
-    enqueue_event,
-    sink_event_forward_http,
-    sink_event_jsonl,
-)
+from Backend.services.telemetry_sink import enqueue_event, offer_event
 
 router = APIRouter()
 logger = logging.getLogger("sunshine_backend.telemetry")
@@ -41,17 +36,13 @@ async def ingest(event: TelemetryEvent):
     except Exception:
         logger.exception("Failed to append telemetry to buffer")
 
-    # Enqueue for batching if available; otherwise fallback to immediate sink
-    try:
-        loop = asyncio.get_running_loop()
-        loop.create_task(enqueue_event(payload))
-    except RuntimeError:
-        # Fallback: write immediately
+    # Hand off to the bounded batcher queue: no task per event, never waits.
+    # Without a batcher (no app lifespan, e.g. scripts) write immediately.
+    if offer_event(payload) is None:
         try:
-            asyncio.ensure_future(sink_event_jsonl(payload))
-            asyncio.ensure_future(sink_event_forward_http(payload))
+            await enqueue_event(payload)
         except Exception:
-            logger.exception("Failed to schedule telemetry sinks")
+            logger.exception("Failed to write telemetry event")
 
     return {"status": "accepted"}
 
@@ -1,15 +1,26 @@
+import asyncio
 import logging
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple, cast
 
 from fastapi import APIRouter, Body, Header, HTTPException
+from fastapi.responses import JSONResponse
 
-from Backend.models.unsplash import PhotoMetaResponse, TrackRequest, TrackResponse
+from Backend.models.unsplash import (
+    PhotoMetaBatchItem,
+    PhotoMetaBatchRequest,
+    PhotoMetaBatchResponse,
+    PhotoMetaResponse,
+    TrackRequest,
+    TrackResponse,
+)
+from Backend.services import photo_meta_db
 from Backend.services import unsplash_integration as ui
 from Backend.services.metrics import incr as metrics_incr
+from Backend.services.track_queue import get_track_queue
 from Backend.utils.debug_logging import debug_log
 from Backend.utils.external_cache import get_cache_backend
-from Backend.utils.rate_limiter import check_rate_limit
+from Backend.utils.rate_limiter import check_rate_limit_async
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -23,7 +34,10 @@ def _make_key(payload: TrackRequest) -> Optional[str]:
     return None
 
 
-@router.post("/internal/photos/track")
+@router.post(
+    "/internal/photos/track",
+    responses={202: {"model": TrackResponse, "description": "Queued for tracking"}},
+)
 async def track_photo(
     payload: TrackRequest = Body(...),
     x_test_mock_trigger: Optional[str] = Header(default=None),
@@ -31,6 +45,9 @@ async def track_photo(
     """Track a photo view. Centralizes the Unsplash download tracking call
     so the Client-ID remains server-side and de-duplicates repeated calls
     within a short TTL.
+
+    The call itself is made by the background tracking queue
+    (`services.track_queue`); accepted views answer 202 at once.
     """
     key = _make_key(payload)
     if not key:
@@ -39,7 +56,7 @@ async def track_photo(
         )
 
     # Apply rate limiting
-    if not check_rate_limit(f"track:{key}"):
+    if not await check_rate_limit_async(f"track:{key}"):
         logger.warning(f"Rate limit exceeded for track request: {key}")
         return TrackResponse(tracked=False, reason="rate_limited")
 
@@ -49,11 +66,22 @@ async def track_photo(
     except Exception:
         dedupe_ttl = 300
 
+    # Resolve download_location if only photo_id provided
+    download_location = payload.download_location
+    if not download_location and payload.photo_id:
+        download_location = (
+            "https://api.unsplash.com/photos/" + payload.photo_id + "/download"
+        )
+
     # Use external cache backend (supports Redis when configured)
     cache_backend = get_cache_backend()
     existing, status = await cache_backend.get_status(key)
     if status != "miss":
         logger.debug("Deduped track request (cache status=%s) for %s", status, key)
+        queue = get_track_queue()
+        if download_location and key in queue:
+            # The queued call has not been sent yet: it stands for this view too
+            queue.submit(key, download_location)
         return TrackResponse(tracked=False, reason="deduped")
 
     # Insert a marker in cache optimistically to prevent immediate duplicates.
@@ -62,13 +90,6 @@ async def track_photo(
     # treated as a dedupe.
     await cache_backend.set(key, True, ttl=dedupe_ttl, swr=0)
 
-    # Resolve download_location if only photo_id provided
-    download_location = payload.download_location
-    if not download_location and payload.photo_id:
-        download_location = (
-            "https://api.unsplash.com/photos/" + payload.photo_id + "/download"
-        )
-
     ACCESS_KEY = os.environ.get("UNSPLASH_CLIENT_ID")
     metrics_incr("unsplash.track.requests_total")
 
@@ -107,8 +128,15 @@ async def track_photo(
 
         # Ensure we have required parameters for the real API call
         if download_location and ACCESS_KEY:
-            ok = ui.trigger_photo_download(download_location, ACCESS_KEY)
-            reason = "api_failure" if not ok else None
+            if get_track_queue().submit(key, download_location):
+                return JSONResponse(
+                    status_code=202,
+                    content=TrackResponse(
+                        tracked=False, queued=True, reason="queued"
+                    ).model_dump(),
+                )
+            ok = False
+            reason = "queue_full"
         else:
             logger.error(
                 "Missing required parameters: download_location=%s, ACCESS_KEY=%s",
@@ -127,30 +155,29 @@ async def track_photo(
     return TrackResponse(tracked=bool(ok), reason=reason)
 
 
-@router.get("/internal/photos/meta")
-async def photo_meta(
-    photo_id: str,
-    category: Optional[str] = None,
-    debug: bool = False,
-    x_debug_unsplash_key: Optional[str] = Header(default=None),
-):
-    """Return minimal photo metadata + attribution.
-
-    Attempts live Unsplash fetch when credentials provided; otherwise falls
-    back to a deterministic synthetic object (demo). This keeps frontend logic
-    stable regardless of environment.
-    """
+def _access_key(x_debug_unsplash_key: Optional[str]) -> Tuple[str, str]:
+    """(key to use, source) for Unsplash calls."""
     access_key = os.environ.get("UNSPLASH_CLIENT_ID")
-    # 'live' was previously assigned but not used; remove to satisfy linters.
     # Support dev-only header 'X-Debug-Unsplash-Key' to override UNSPLASH_CLIENT_ID.
     # Strictly for local debugging; do not rely on it in production.
     if not access_key and x_debug_unsplash_key:
-        access_key_to_use = x_debug_unsplash_key
-        access_key_source = "header"
-    else:
-        access_key_to_use = access_key or ""
-        access_key_source = "env" if access_key else "none"
+        return x_debug_unsplash_key, "header"
+    return access_key or "", "env" if access_key else "none"
 
+
+async def resolve_photo_meta(
+    photo_id: str,
+    category: Optional[str],
+    access_key_to_use: str,
+    access_key_source: str,
+    limit: Optional[asyncio.Semaphore] = None,
+) -> Tuple[Dict[str, Any], str]:
+    """Cached photo meta for one id, as (result, cache status before the call).
+
+    Misses are computed once per key even when several callers ask at once
+    (the cache's single-flight). With `limit`, live Unsplash fetches hold a
+    slot of that semaphore, so a batch cannot open unbounded connections.
+    """
     # Cache key per photo id; category only influences live random fallback on failure.
     cache_key = f"unsplash:meta:{photo_id}"
     cache_backend = get_cache_backend()
@@ -161,8 +188,23 @@ async def photo_meta(
     if cache_value and isinstance(cache_value, dict):
         cached_etag = cache_value.get("etag")
 
-    def compute_result() -> Dict[str, Any]:
-        """Sync factory: compute minimal meta, using live fetch when possible."""
+    async def compute_result() -> Dict[str, Any]:
+        if limit is None or not access_key_to_use:
+            return await fetch_result()
+        async with limit:
+            return await fetch_result()
+
+    async def fetch_result() -> Dict[str, Any]:
+        """Compute minimal meta, using a live fetch when possible.
+
+        Runs on the event loop, so every Unsplash call goes through the
+        pooled async client; a slow Unsplash never blocks other requests.
+        Photos already in the durable store (PHOTO_META_DB_PATH) cost no
+        Unsplash call; the store revalidates them in the background.
+        """
+        stored = await photo_meta_db.lookup(photo_id)
+        if stored is not None:
+            return stored
         photo: Dict[str, Any] = {}
         live_local = None
         used_random = False
@@ -182,9 +224,14 @@ async def photo_meta(
                 )
             except Exception:
                 pass
-            live_local = ui.fetch_photo_meta(
+            live_local = await ui.fetch_photo_meta_async(
                 photo_id, access_key_to_use, etag=cached_etag
-            )  # Keep sync for now, can be async later
+            )
+            if live_local and live_local.get("not_modified"):
+                # 304 for our ETag: the cached result is still current
+                metrics_incr("unsplash_meta_not_modified")
+                await photo_meta_db.touch(photo_id)
+                return dict(cast(Dict[str, Any], cache_value))
             try:
                 debug_log(
                     "router_helper_report: live_present=%s pid=%s"
@@ -206,7 +253,7 @@ async def photo_meta(
                 except Exception:
                     pass
             elif category:
-                rand = ui.fetch_random_photo(category, access_key_to_use)
+                rand = await ui.fetch_random_photo_async(category, access_key_to_use)
                 if rand:
                     used_random = True
                     live_local = {"data": rand}
@@ -221,39 +268,16 @@ async def photo_meta(
 
         if not photo:
             # fallback synthetic demo object
-            regular_url = (
-                "https://images.unsplash.com/" + photo_id + "?auto=format&fit=crop"
-            )
-            html_url = "https://unsplash.com/photos/" + photo_id
-            download_url = (
-                "https://api.unsplash.com/photos/" + photo_id + "/download"
-            )
-            photo = {
-                "id": photo_id,
-                "urls": {"regular": regular_url},
-                "links": {"html": html_url, "download": download_url},
-                "user": {
-                    "name": "Demo Photographer",
-                    "links": {"html": "https://unsplash.com/@demo"},
-                },
-            }
-
-        attribution = ui.build_attribution_html(photo)
-        download_location = (photo.get("links") or {}).get("download")
-        html_link = (photo.get("links") or {}).get("html")
-        result_local = {
-            "id": photo.get("id") or photo_id,
-            "urls": photo.get("urls") or {},
-            "links": {"download_location": download_location, "html": html_link},
-            "attribution_html": attribution,
-            "source": "live" if live_local else "demo",
-        }
-        if used_random:
-            result_local["random_fallback"] = True
-        # Include ETag in result for caching
-        if live_local and "etag" in live_local:
-            result_local["etag"] = live_local["etag"]
-        return result_local
+            photo = ui.demo_photo(photo_id)
+        result = ui.meta_result(
+            photo_id,
+            photo,
+            live=bool(live_local),
+            etag=(live_local or {}).get("etag"),
+            random_fallback=used_random,
+        )
+        await photo_meta_db.remember(photo_id, result)
+        return result
 
     # Use in-proc cache to reduce Unsplash API calls
     ttl_seconds = int(os.getenv("UNSPLASH_META_TTL", "3600"))
@@ -280,12 +304,32 @@ async def photo_meta(
     )
     if result.get("random_fallback"):
         metrics_incr("unsplash_meta_random_fallback")
+    return result, cache_status
+
+
+@router.get("/internal/photos/meta")
+async def photo_meta(
+    photo_id: str,
+    category: Optional[str] = None,
+    debug: bool = False,
+    x_debug_unsplash_key: Optional[str] = Header(default=None),
+):
+    """Return minimal photo metadata + attribution.
+
+    Attempts live Unsplash fetch when credentials provided; otherwise falls
+    back to a deterministic synthetic object (demo). This keeps frontend logic
+    stable regardless of environment.
+    """
+    access_key_to_use, access_key_source = _access_key(x_debug_unsplash_key)
+    result, cache_status = await resolve_photo_meta(
+        photo_id, category, access_key_to_use, access_key_source
+    )
 
     # Dev-only debug output: when debug=true, include cache status and key source
     debug_info = None
     if debug:
         debug_info = {
-            "access_key_present": bool(access_key),
+            "access_key_present": access_key_source == "env",
             "access_key_source": access_key_source,
             "x_debug_unsplash_key_present": bool(x_debug_unsplash_key),
             "cache_status": cache_status,
@@ -300,3 +344,60 @@ async def photo_meta(
         random_fallback=result.get("random_fallback"),
         debug=debug_info,
     )
+
+
+@router.post("/internal/photos/meta/batch")
+async def photo_meta_batch(
+    payload: PhotoMetaBatchRequest = Body(...),
+    x_debug_unsplash_key: Optional[str] = Header(default=None),
+):
+    """Photo meta for many ids in one round trip (e.g. every card on a page).
+
+    Ids are answered from cache where possible; misses are fetched
+    concurrently, at most UNSPLASH_META_BATCH_CONCURRENCY at a time per
+    batch, and each id is resolved once even if it is listed twice or being
+    fetched by another request already. Results keep the request order.
+    """
+    photo_ids = list(dict.fromkeys(p for p in payload.photo_ids if p))
+    if not photo_ids:
+        raise HTTPException(status_code=400, detail="missing photo_ids")
+    max_items = int(os.environ.get("UNSPLASH_META_BATCH_MAX", "50"))
+    if len(photo_ids) > max_items:
+        raise HTTPException(
+            status_code=400, detail=f"at most {max_items} photo_ids per batch"
+        )
+
+    access_key_to_use, access_key_source = _access_key(x_debug_unsplash_key)
+    limit = asyncio.Semaphore(
+        max(1, int(os.environ.get("UNSPLASH_META_BATCH_CONCURRENCY", "4")))
+    )
+    metrics_incr("unsplash_meta_batch_requests")
+    metrics_incr("unsplash_meta_batch_items", len(photo_ids))
+    resolved = await asyncio.gather(
+        *(
+            resolve_photo_meta(
+                photo_id,
+                payload.categories.get(photo_id),
+                access_key_to_use,
+                access_key_source,
+                limit,
+            )
+            for photo_id in photo_ids
+        )
+    )
+    return PhotoMetaBatchResponse(
+        results=[
+            PhotoMetaBatchItem(
+                photo_id=photo_id,
+                id=result["id"],
+                urls=result["urls"],
+                links=result["links"],
+                attribution_html=result["attribution_html"],
+                source=result["source"],
+                random_fallback=result.get("random_fallback"),
+                etag=result.get("etag"),
+                cache_status=cache_status,
+            )
+            for photo_id, (result, cache_status) in zip(photo_ids, resolved)
+        ]
+    )
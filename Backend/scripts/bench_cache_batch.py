@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Benchmark batched L2 cache access and the binary entry codec.
+
+Runs against the in-memory Redis stand-in with a simulated round-trip
+latency, so it needs no server:
+
+    python -m Backend.scripts.bench_cache_batch --keys 20 --latency-ms 0.5
+
+Compares, for one /recommend-sized fanout of forecast keys:
+- sequential GET per key vs a single MGET (`get_many`)
+- sequential SET per key vs one pipelined write (`set_many`)
+- JSON envelope vs binary codec size and encode/decode time
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from Backend.utils.cache_codec import decode_entry, encode_entry  # noqa: E402
+from Backend.utils.cache_inproc import CacheEntry  # noqa: E402
+from Backend.utils.external_cache import RedisCacheBackend  # noqa: E402
+from Backend.utils.local_redis import LocalRedis  # noqa: E402
+
+
+def _forecast(seed: int) -> list:
+    return [
+        {
+            "ts_local": f"2025-06-{1 + h // 24:02d}T{h % 24:02d}:00",
+            "cloud_pct": (seed * 7 + h * 13) % 101,
+            "temp_f": round(55.0 + ((seed + h) % 30) * 0.5, 1),
+        }
+        for h in range(48)
+    ]
+
+
+def _json_envelope(entry: CacheEntry) -> bytes:
+    return json.dumps(
+        {
+            "v": entry.value,
+            "c": entry.created_at,
+            "t": entry.ttl_seconds,
+            "s": entry.swr_seconds,
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+async def _bench_roundtrips(keys: int, latency_ms: float, rounds: int) -> None:
+    client = LocalRedis(latency_sec=latency_ms / 1000.0)
+    backend = RedisCacheBackend(client=client)
+    items = {f"wx:{47 + i / 100}:{-122 - i / 100}": _forecast(i) for i in range(keys)}
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for key, value in items.items():
+            await backend.set(key, value, ttl=1200, swr=600)
+    seq_set = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await backend.set_many(items, ttl=1200, swr=600)
+    batch_set = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for key in items:
+            await backend.get_status(key)
+    seq_get = (time.perf_counter() - start) / rounds
+
+    client.commands = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await backend.get_many(items)
+    batch_get = (time.perf_counter() - start) / rounds
+
+    print(f"{keys} keys, {latency_ms} ms simulated RTT, {rounds} rounds")
+    print(f"  set:  sequential {seq_set * 1000:8.2f} ms   pipelined {batch_set * 1000:8.2f} ms")
+    print(f"  get:  sequential {seq_get * 1000:8.2f} ms   mget      {batch_get * 1000:8.2f} ms")
+    print(f"  round trips per batched read: {client.commands // rounds}")
+
+
+def _bench_codec(iterations: int) -> None:
+    entry = CacheEntry(
+        value=_forecast(3), created_at=time.time(), ttl_seconds=1200, swr_seconds=600
+    )
+    as_json = _json_envelope(entry)
+    as_binary = encode_entry(entry)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        json.loads(_json_envelope(entry))
+    json_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode_entry(encode_entry(entry))
+    binary_us = (time.perf_counter() - start) / iterations * 1e6
+
+    print("48-slot forecast entry")
+    print(f"  size:       json {len(as_json):6d} B   binary {len(as_binary):6d} B")
+    print(f"  round trip: json {json_us:6.1f} us  binary {binary_us:6.1f} us")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.5)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    asyncio.run(_bench_roundtrips(args.keys, args.latency_ms, args.rounds))
+    _bench_codec(args.iterations)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
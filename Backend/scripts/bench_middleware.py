@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Benchmark the pure-ASGI middleware stack against BaseHTTPMiddleware.
+
+Serves the app's routes twice in process, over httpx's ASGI transport, so it
+needs no server or network:
+
+- legacy: observability, CORS audit and beta gate as `BaseHTTPMiddleware`
+  dispatch functions (the previous implementation),
+- asgi: the current pure-ASGI middleware.
+
+Both stacks sit behind the same CORSMiddleware with an allowlisted Origin
+and a configured beta key, so every layer does its full work. /recommend
+runs with DEV_BYPASS_SCORING so that no weather upstream is involved:
+
+    python -m Backend.scripts.bench_middleware --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from Backend.main import app  # noqa: E402
+from Backend.middleware import beta_keys  # noqa: E402
+from Backend.middleware.beta_keys import BetaKeyMiddleware  # noqa: E402
+from Backend.middleware.cors_audit import CORSAuditMiddleware  # noqa: E402
+from Backend.middleware.observability import (  # noqa: E402
+    ObservabilityMiddleware,
+    app_logger,
+)
+
+ORIGIN = "https://bench.example"
+HEADERS = {"Origin": ORIGIN, "X-Beta-Key": "bench"}
+PATHS = ("/health", "/recommend?lat=47.6&lon=-122.3&radius=100")
+
+
+class LegacyObservability(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        request_id = str(uuid.uuid4())
+        start = time.time()
+        response = await call_next(request)
+        duration = int((time.time() - start) * 1000)
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Processing-Time"] = str(duration)
+        payload = {
+            "t": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "id": request_id,
+            "m": request.method,
+            "p": request.url.path,
+            "s": response.status_code,
+            "lat": duration,
+        }
+        app_logger.info(json.dumps(payload))
+        return response
+
+
+class LegacyCORSAudit(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        origin = request.headers.get("origin")
+        if origin and origin.rstrip("/") not in (ORIGIN,):
+            logging.getLogger("sunshine_backend").warning("Rejected CORS origin")
+        return await call_next(request)
+
+
+class LegacyBetaKey(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        if request.method == "OPTIONS" or request.url.path == "/health":
+            return await call_next(request)
+        env = os.environ.get("BETA_KEYS", "").strip()
+        if not env:
+            return await call_next(request)
+        keys = {k.strip() for k in env.split(",") if k.strip()}
+        if request.headers.get("x-beta-key") not in keys:
+            return JSONResponse(status_code=401, content={"error": "beta_key_invalid"})
+        return await call_next(request)
+
+
+def _build(stack) -> FastAPI:
+    """A FastAPI app with `app`'s routes and handlers and the given middleware."""
+    bench = FastAPI()
+    bench.router.routes.extend(app.router.routes)
+    bench.exception_handlers.update(app.exception_handlers)
+    legacy = stack == "legacy"
+    bench.add_middleware(LegacyObservability if legacy else ObservabilityMiddleware)
+    bench.add_middleware(
+        CORSMiddleware,
+        allow_origins=[ORIGIN],
+        allow_methods=["GET"],
+        allow_headers=["*"],
+    )
+    if legacy:
+        bench.add_middleware(LegacyCORSAudit)
+        bench.add_middleware(LegacyBetaKey)
+    else:
+        bench.add_middleware(CORSAuditMiddleware, origins=[ORIGIN])
+        bench.add_middleware(BetaKeyMiddleware)
+    return bench
+
+
+async def _run(bench: FastAPI, path: str, requests: int, concurrency: int):
+    transport = httpx.ASGITransport(app=bench)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(min(50, requests)):  # warm up
+            await client.get(path, headers=HEADERS)
+        queue = iter(range(requests))
+
+        async def worker():
+            for _ in queue:
+                t0 = time.perf_counter()
+                resp = await client.get(path, headers=HEADERS)
+                latencies.append(time.perf_counter() - t0)
+                assert resp.status_code == 200, resp.status_code
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return requests / elapsed, statistics.median(latencies), p99
+
+
+async def _bench(requests: int, concurrency: int) -> None:
+    print(f"{requests} requests per run, concurrency {concurrency}")
+    for path in PATHS:
+        print(f"  {path.split('?')[0]}")
+        for stack in ("legacy", "asgi"):
+            rps, p50, p99 = await _run(_build(stack), path, requests, concurrency)
+            print(
+                f"    {stack:7s} {rps:8.0f} req/s   p50 {p50 * 1000:6.2f} ms"
+                f"   p99 {p99 * 1000:6.2f} ms"
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ["BETA_KEYS"] = "bench"
+    # Quota checks still run, but never reject
+    os.environ["BETA_KEY_RATE_PER_MIN"] = str(10**9)
+    os.environ["BETA_KEY_RECOMMEND_CONCURRENCY"] = "0"
+    os.environ["DEV_BYPASS_SCORING"] = "true"
+    beta_keys._table = None
+    app_logger.setLevel(logging.WARNING)  # keep access lines out of the timing
+    asyncio.run(_bench(args.requests, args.concurrency))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Benchmark the telemetry JSONL sink: reopen-per-batch vs the writer thread.
+
+- legacy: every batch opens TELEMETRY_SINK_PATH in append mode inside
+  `asyncio.to_thread` (the previous implementation),
+- writer: batches go to the long-lived `JsonlWriter` thread.
+
+Both write the same events to a temporary directory; CPU time is process
+time, so it includes the writer thread:
+
+    python -m Backend.scripts.bench_telemetry_sink --events 200000 --batch 25
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from Backend.services.telemetry_writer import JsonlWriter  # noqa: E402
+
+EVENT = {"event": "bench", "properties": {"screen": "home", "n": 1}}
+
+
+async def _legacy(path: str, batches: int, batch: int) -> None:
+    for _ in range(batches):
+        lines = [json.dumps(EVENT, ensure_ascii=False) + "\n" for _ in range(batch)]
+
+        def _write_lines():
+            with open(path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+        await asyncio.to_thread(_write_lines)
+
+
+async def _writer(path: str, batches: int, batch: int) -> None:
+    writer = JsonlWriter(path, max_bytes=0, rotate_sec=0, fsync="never")
+    for _ in range(batches):
+        writer.write(json.dumps(EVENT, ensure_ascii=False) + "\n" for _ in range(batch))
+        await asyncio.sleep(0)
+    writer.close(timeout=60)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=25)
+    args = parser.parse_args()
+    batches = max(1, args.events // args.batch)
+
+    print(f"{batches * args.batch} events in batches of {args.batch}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, run in (("legacy", _legacy), ("writer", _writer)):
+            path = os.path.join(tmp, f"{name}.jsonl")
+            wall, cpu = time.perf_counter(), time.process_time()
+            asyncio.run(run(path, batches, args.batch))
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            print(
+                f"  {name:7s} {batches * args.batch / wall:10.0f} events/s"
+                f"   cpu {cpu:6.2f} s"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
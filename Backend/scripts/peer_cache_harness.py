@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Multi-process harness for consistent-hash peer cache fill.
+
+Starts a fake Open-Meteo upstream that counts requests per cell, launches N
+backend instances (separate uvicorn processes) configured as peers of each
+other, sends the same /recommend request to every instance and reports how
+often each cell was fetched upstream. With peer fill every cell should be
+fetched exactly once per fleet; without it (``--no-peers``) roughly N times.
+
+    python Backend/scripts/peer_cache_harness.py --instances 3
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _FakeWeather(BaseHTTPRequestHandler):
+    calls: Counter = Counter()
+    lock = threading.Lock()
+
+    def do_GET(self):  # noqa: N802 - http.server API
+        qs = parse_qs(urlparse(self.path).query)
+        cell = (qs["latitude"][0], qs["longitude"][0])
+        with self.lock:
+            self.calls[cell] += 1
+        time.sleep(0.05)  # make concurrent fetches overlap
+        hours = [f"2025-06-01T{h:02d}:00" for h in range(24)]
+        body = json.dumps(
+            {
+                "hourly": {
+                    "time": hours,
+                    "cloudcover": [10] * 24,
+                    "temperature_2m": [65.0] * 24,
+                }
+            }
+        ).encode("utf-8")
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except BrokenPipeError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def _wait_healthy(url: str, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"instance {url} did not become healthy")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--instances", type=int, default=3)
+    parser.add_argument("--lat", type=float, default=47.6)
+    parser.add_argument("--lon", type=float, default=-122.3)
+    parser.add_argument("--no-peers", action="store_true")
+    args = parser.parse_args()
+
+    upstream = ThreadingHTTPServer(("127.0.0.1", _free_port()), _FakeWeather)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    upstream_url = f"http://127.0.0.1:{upstream.server_address[1]}/v1/forecast"
+
+    urls = [f"http://127.0.0.1:{_free_port()}" for _ in range(args.instances)]
+    procs = []
+    try:
+        for url in urls:
+            env = dict(os.environ)
+            env.update(
+                {
+                    "WEATHER_BASE_URL": upstream_url,
+                    "CACHE_PEERS": "" if args.no_peers else ",".join(urls),
+                    "CACHE_SELF_URL": url,
+                    "CACHE_PEER_TOKEN": "harness",
+                    "BETA_KEYS": "",
+                    "DEV_BYPASS_SCORING": "false",
+                    # Measure fetch counts, not latency: don't cut ranking short
+                    "REQUEST_BUDGET_MS": "20000",
+                }
+            )
+            port = url.rsplit(":", 1)[1]
+            procs.append(
+                subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "Backend.main:app", "--port", port],
+                    cwd=ROOT,
+                    env=env,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+            )
+        for url in urls:
+            _wait_healthy(url)
+
+        params = {"lat": args.lat, "lon": args.lon}
+        with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+            statuses = list(
+                pool.map(
+                    lambda u: httpx.get(f"{u}/recommend", params=params, timeout=30).status_code,
+                    urls,
+                )
+            )
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=10)
+        upstream.shutdown()
+
+    calls = _FakeWeather.calls
+    print(f"instances={len(urls)} peers={'off' if args.no_peers else 'on'} statuses={statuses}")
+    print(f"cells={len(calls)} upstream_requests={sum(calls.values())}")
+    print(f"max fetches per cell={max(calls.values()) if calls else 0}")
+    if args.no_peers:
+        return 0
+    return 0 if calls and max(calls.values()) == 1 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Export or import the durable photo-meta store (PHOTO_META_DB_PATH).
+
+Rows travel as JSON lines, so a new deployment can start from another
+instance's photos and ETags instead of fetching them from Unsplash:
+
+    python -m Backend.scripts.photo_meta_db export photo_meta.jsonl
+    python -m Backend.scripts.photo_meta_db import photo_meta.jsonl --db data/photo_meta.db
+
+Import keeps whichever copy of a row was checked most recently.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from Backend.services.photo_meta_db import PhotoMetaDB  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("file", help="JSON lines file to write or read")
+    parser.add_argument(
+        "--db",
+        default=os.environ.get("PHOTO_META_DB_PATH", ""),
+        help="SQLite file (default: $PHOTO_META_DB_PATH)",
+    )
+    args = parser.parse_args()
+    if not args.db:
+        parser.error("no --db given and PHOTO_META_DB_PATH is not set")
+
+    db = PhotoMetaDB(args.db)
+    try:
+        if args.command == "export":
+            print(f"Exported {db.export_jsonl(args.file)} rows to {args.file}")
+        else:
+            print(f"Imported {db.import_jsonl(args.file)} rows into {args.db}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,256 @@
+"""Automatic degraded ranking modes for /recommend.
+
+`DEV_BYPASS_SCORING` forces distance-only ranking by hand. This controller
+picks a cheaper mode on its own when a full weather fanout would fail or
+overload the service:
+
+- the weather circuit breaker is open (and not yet due for a probe),
+- too many full rankings are already in flight (saturation), or
+- too little of the request budget is left for a fanout.
+
+Degraded requests never call the weather upstream. They rank, in order of
+preference, from forecasts already cached in-process (including last known
+good ones), from the latest forecast snapshot (`forecast_snapshot.db`, while
+it is younger than DEGRADE_SNAPSHOT_MAX_AGE_SEC), or by distance alone. The
+mode used is reported on the response, and time spent in each mode is
+exported as metrics.
+
+Configuration:
+    DEGRADE_MIN_BUDGET_MS: degrade when less budget than this remains (default 250)
+    RECOMMEND_MAX_INFLIGHT: full rankings allowed at once (default 64)
+    DEGRADE_SNAPSHOT_MAX_AGE_SEC: oldest snapshot used for ranking (default 43200)
+    DEGRADE_ENABLED: set to "false" to always attempt full ranking
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from Backend.services import metrics
+from Backend.services.scoring import first_sunny_block, score_candidate
+from Backend.services.weather import peek_weather
+from Backend.utils.circuit_breaker import get_weather_circuit_breaker
+
+logger = logging.getLogger(__name__)
+
+MODE_FULL = "full"
+MODE_CACHED = "cached"
+MODE_SNAPSHOT = "snapshot"
+MODE_DISTANCE = "distance"
+MODES = (MODE_FULL, MODE_CACHED, MODE_SNAPSHOT, MODE_DISTANCE)
+
+SNAPSHOT_DB = Path(__file__).resolve().parents[1] / "data" / "forecast_snapshot.db"
+
+
+class DegradationController:
+    """Decides when to degrade and keeps per-mode time accounting."""
+
+    def __init__(self, min_budget_s: float = 0.25, max_inflight: int = 64):
+        self.min_budget_s = min_budget_s
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self._lock = threading.Lock()
+        self._mode = MODE_FULL
+        self._mode_since = time.monotonic()
+        self.time_in_mode: Dict[str, float] = dict.fromkeys(MODES, 0.0)
+
+    def reason(self, remaining_budget_s: float) -> Optional[str]:
+        """Why a request should degrade, or None to rank in full."""
+        if os.getenv("DEGRADE_ENABLED", "true").lower() == "false":
+            return None
+        if get_weather_circuit_breaker().is_rejecting:
+            return "circuit_open"
+        if self.inflight >= self.max_inflight:
+            return "saturated"
+        if remaining_budget_s < self.min_budget_s:
+            return "low_budget"
+        return None
+
+    @contextmanager
+    def full_ranking(self) -> Iterator[None]:
+        """Count a full ranking as in flight for the saturation check."""
+        with self._lock:
+            self.inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.inflight -= 1
+
+    def record(self, mode: str, reason: Optional[str] = None) -> None:
+        """Note the mode a response used; time accrues to the previous mode."""
+        now = time.monotonic()
+        with self._lock:
+            elapsed = now - self._mode_since
+            self.time_in_mode[self._mode] += elapsed
+            previous = self._mode
+            self._mode, self._mode_since = mode, now
+        metrics.incr(f"recommend.mode_time_ms.{previous}", int(elapsed * 1000))
+        metrics.incr(f"recommend.mode.{mode}")
+        if reason:
+            metrics.incr(f"recommend.degraded_reason.{reason}")
+        if mode != previous:
+            logger.info("Ranking mode %s -> %s (%s)", previous, mode, reason or "recovered")
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+
+_snapshot_cache: Tuple[
+    Tuple[str, float], Optional[datetime], Dict[Tuple[float, float], float]
+] = (("", 0.0), None, {})
+_snapshot_reload: Optional["asyncio.Future[bool]"] = None
+
+
+def _parse_generated_at(value: Optional[str]) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _load_snapshot(path: Path, version: Tuple[str, float]) -> bool:
+    """Read the snapshot into `_snapshot_cache` (blocking; run in a thread)."""
+    global _snapshot_cache
+    try:
+        conn = sqlite3.connect(str(path))
+        try:
+            rows = conn.execute(
+                "SELECT lat, lon, score, generated_at FROM snapshots"
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        logger.warning("Unreadable forecast snapshot %s", path, exc_info=True)
+        return False
+    stamps = [t for t in (_parse_generated_at(r[3]) for r in rows) if t is not None]
+    scores = {
+        (round(lat, 4), round(lon, 4)): float(score) for lat, lon, score, _ in rows
+    }
+    _snapshot_cache = (version, min(stamps) if stamps else None, scores)
+    return True
+
+
+async def _snapshot_scores(
+    path: Optional[Path] = None,
+) -> Dict[Tuple[float, float], float]:
+    """Sun fraction per (lat, lon) from the forecast snapshot, reloaded on change.
+
+    Reloads read SQLite in a worker thread. While one runs, the scores
+    already loaded from the same file are served; only a first load is
+    waited for. Empty if the snapshot is missing, unreadable, undated or
+    older than DEGRADE_SNAPSHOT_MAX_AGE_SEC, so ranking falls through to
+    distance only.
+    """
+    global _snapshot_reload
+    path = path or SNAPSHOT_DB
+    try:
+        version = (str(path), path.stat().st_mtime)
+    except OSError:
+        return {}
+    if version != _snapshot_cache[0]:
+        reload = _snapshot_reload
+        if (
+            reload is None
+            or reload.done()
+            or reload.get_loop() is not asyncio.get_running_loop()
+        ):
+            reload = _snapshot_reload = asyncio.ensure_future(
+                asyncio.to_thread(_load_snapshot, path, version)
+            )
+        if _snapshot_cache[0][0] != str(path) and not await asyncio.shield(reload):
+            return {}
+    (loaded_path, _), generated_at, scores = _snapshot_cache
+    if loaded_path != str(path):
+        return {}
+    max_age = float(os.getenv("DEGRADE_SNAPSHOT_MAX_AGE_SEC", "43200"))
+    if generated_at is None:
+        return {}
+    age = (datetime.now(timezone.utc) - generated_at).total_seconds()
+    if age > max_age:
+        logger.info("Forecast snapshot is %.0fs old; not ranking from it", age)
+        return {}
+    return scores
+
+
+def _result(c: dict, start_iso: Optional[str], duration: int) -> dict:
+    distance = c.get("distance_mi", 0.0)
+    return {
+        "id": c.get("id"),
+        "name": c.get("name"),
+        "lat": c.get("lat"),
+        "lon": c.get("lon"),
+        "distance_mi": round(distance, 1),
+        "elevation": c.get("elevation"),
+        "category": c.get("category"),
+        "state": c.get("state"),
+        "timezone": c.get("timezone"),
+        "sun_start_iso": start_iso,
+        "duration_hours": duration,
+        "score": round(score_candidate(distance, duration, start_iso), 2),
+    }
+
+
+def _sorted(results: List[dict]) -> List[dict]:
+    # Same ordering as scoring.rank
+    return sorted(
+        results,
+        key=lambda r: (
+            -r["score"],
+            r.get("sun_start_iso") or "9999-12-31T00:00",
+            r.get("distance_mi", 0.0),
+            str(r.get("id", "")),
+        ),
+    )
+
+
+async def rank_degraded(
+    candidates: List[dict], max_weather: int
+) -> Tuple[List[dict], str]:
+    """Rank without touching the weather upstream; returns (results, mode)."""
+    pool = candidates[:max_weather]
+    cached = [(c, peek_weather(c["lat"], c["lon"])) for c in pool]
+    if any(hit is not None for _, hit in cached):
+        results = []
+        for c, hit in cached:
+            # No forecast at all counts as stale: the score is distance only
+            slots, fresh = hit if hit is not None else ([], False)
+            r = _result(c, *first_sunny_block(slots))
+            r["weather_stale"] = not fresh
+            results.append(r)
+        return _sorted(results), MODE_CACHED
+
+    snapshot = await _snapshot_scores()
+    matched = [
+        (c, snapshot.get((round(c["lat"], 4), round(c["lon"], 4)))) for c in pool
+    ]
+    if any(score is not None for _, score in matched):
+        # Snapshot score is the sunny fraction of the next 24 hours
+        return (
+            _sorted([_result(c, None, int(round((s or 0.0) * 24))) for c, s in matched]),
+            MODE_SNAPSHOT,
+        )
+
+    return _sorted([_result(c, None, 0) for c in candidates]), MODE_DISTANCE
+
+
+_controller: Optional[DegradationController] = None
+
+
+def get_degradation_controller() -> DegradationController:
+    global _controller
+    if _controller is None:
+        _controller = DegradationController(
+            min_budget_s=float(os.getenv("DEGRADE_MIN_BUDGET_MS", "250")) / 1000.0,
+            max_inflight=int(os.getenv("RECOMMEND_MAX_INFLIGHT", "64")),
+        )
+    return _controller
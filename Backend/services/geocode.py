@@ -7,7 +7,9 @@ from typing import Any, Mapping
 
 import httpx
 
-from Backend.models.errors import LocationNotFound
+from Backend.models.errors import LocationNotFound, UpstreamError
+from Backend.services import upstream_budget
+from Backend.utils.circuit_breaker import CircuitBreakerOpenException, breaker_for_url
 
 
 async def geocode(query: str) -> tuple[float, float]:
@@ -22,6 +24,9 @@ async def geocode(query: str) -> tuple[float, float]:
 
     Raises:
         LocationNotFound: If no location is found
+        UpstreamError: If Mapbox is unreachable, failing (5xx), throttling
+            (429) or rejecting our token, or the Mapbox budget is used up;
+            these must not be cached as misses
     """
     mapbox_token = os.getenv("MAPBOX_TOKEN")
     if not mapbox_token:
@@ -46,9 +51,19 @@ async def geocode(query: str) -> tuple[float, float]:
     url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{query}.json"
     params: Mapping[str, Any] = {"access_token": mapbox_token, "limit": 1}
 
+    budget = upstream_budget.get_budget("mapbox")
+    if not budget.acquire(upstream_budget.META):
+        raise UpstreamError("Geocoding quota exhausted, try again later")
+
+    breaker = breaker_for_url(url)
     async with httpx.AsyncClient() as client:
         try:
-            response = await client.get(url, params=params, timeout=10.0)
+            with breaker.guard() as outcome:
+                response = await client.get(url, params=params, timeout=10.0)
+                budget.observe(response.status_code, response.headers)
+                # Only upstream trouble trips the breaker, not bad queries
+                if response.status_code >= 500 or response.status_code == 429:
+                    outcome.fail()
             response.raise_for_status()
             data = response.json()
 
@@ -62,9 +77,13 @@ async def geocode(query: str) -> tuple[float, float]:
             longitude, latitude = coordinates
             return latitude, longitude
 
+        except CircuitBreakerOpenException as e:
+            raise UpstreamError("Geocoding provider unavailable (circuit open)") from e
         except httpx.RequestError as e:
-            raise LocationNotFound(f"Geocoding request failed: {e}") from e
+            raise UpstreamError(f"Geocoding request failed: {e}") from e
         except httpx.HTTPStatusError as e:
-            raise LocationNotFound(
-                f"Geocoding API error: {e.response.status_code}"
-            ) from e
+            status = e.response.status_code
+            if status >= 500 or status in (401, 403, 429):
+                raise UpstreamError(f"Geocoding API error: {status}") from e
+            # Other 4xx: Mapbox rejected the query itself
+            raise LocationNotFound(f"Geocoding API error: {status}") from e
@@ -1,17 +1,19 @@
 import threading
-from typing import Dict
+from typing import Any, Dict
 
 _lock = threading.Lock()
 _counters: Dict[str, int] = {}
+_gauges: Dict[str, float] = {}
 
 # Optional Prometheus integration (used if prometheus_client is installed)
 prometheus_available = False
 CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
 _prom_generate_latest = None
-_prom_counters = {}
+_prom_counters: Dict[str, Any] = {}
+_prom_gauges: Dict[str, Any] = {}
 try:
     from prometheus_client import CONTENT_TYPE_LATEST as _CT
-    from prometheus_client import Counter, generate_latest
+    from prometheus_client import Counter, Gauge, generate_latest
 
     prometheus_available = True
     CONTENT_TYPE_LATEST = _CT
@@ -23,6 +25,12 @@ try:
             _prom_counters[name] = Counter(cname, f"Counter for {name}")
         return _prom_counters[name]
 
+    def _get_prom_gauge(name: str):
+        if name not in _prom_gauges:
+            gname = name.replace(".", "_").replace("-", "_")
+            _prom_gauges[name] = Gauge(gname, f"Gauge for {name}")
+        return _prom_gauges[name]
+
     _prom_generate_latest = generate_latest
 except Exception:
     prometheus_available = False
@@ -43,14 +51,26 @@ def incr(name: str, amount: int = 1) -> None:
             pass
 
 
-def get_metrics() -> Dict[str, int]:
+def set_gauge(name: str, value: float) -> None:
+    """Set a named gauge (current value, e.g. a circuit breaker state)."""
+    with _lock:
+        _gauges[name] = value
+    if prometheus_available:
+        try:
+            _get_prom_gauge(name).set(value)
+        except Exception:
+            pass
+
+
+def get_metrics() -> Dict[str, float]:
     with _lock:
-        return dict(_counters)
+        return {**_counters, **_gauges}
 
 
 def reset() -> None:
     with _lock:
         _counters.clear()
+        _gauges.clear()
 
 
 def prometheus_metrics() -> bytes:
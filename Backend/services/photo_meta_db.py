@@ -0,0 +1,283 @@
+"""Durable photo-meta results with their ETags (SQLite).
+
+Photo metadata almost never changes, but `unsplash:meta:<id>` cache entries
+expire after UNSPLASH_META_TTL and vanish on restart, so every cold instance
+used to spend Unsplash quota on photos it had already seen. With
+PHOTO_META_DB_PATH set, live results are also kept in a SQLite file:
+
+- /internal/photos/meta and the prewarmed photo store read through it
+  before calling Unsplash, and write live results back (random fallbacks
+  and demo results are not stored: they are not the photo asked for);
+- a background sweep revalidates rows last checked more than
+  PHOTO_META_DB_REVALIDATE_SEC ago with `If-None-Match`, at `prewarm`
+  budget priority, so unchanged photos cost a 304;
+- `export_jsonl` / `import_jsonl` (and `python -m
+  Backend.scripts.photo_meta_db`) move rows between instances, so a new
+  deployment can start with a seeded file.
+
+SQLite calls are quick but blocking, so async callers go through
+`asyncio.to_thread` (the `lookup`/`remember`/`touch` helpers). Errors are
+logged and treated as a miss: the file is an optimization, never required.
+
+Configuration:
+    PHOTO_META_DB_PATH: SQLite file (default: not persisted)
+    PHOTO_META_DB_REVALIDATE_SEC: row age before revalidation (default 86400)
+    PHOTO_META_DB_SWEEP_SEC: seconds between sweeps (default 600)
+    PHOTO_META_DB_SWEEP_BATCH: rows revalidated per sweep (default 10)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from Backend.services import metrics, upstream_budget
+from Backend.services import unsplash_integration as ui
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS photo_meta (
+    photo_id TEXT PRIMARY KEY,
+    meta TEXT NOT NULL,
+    etag TEXT,
+    checked_at REAL NOT NULL
+)
+"""
+
+
+class PhotoMetaDB:
+    """Live photo-meta results keyed by photo id, in one SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        dirpath = os.path.dirname(path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM photo_meta").fetchone()[0]
+
+    def get(self, photo_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT meta FROM photo_meta WHERE photo_id = ?", (photo_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(
+        self, photo_id: str, result: Dict[str, Any], checked_at: Optional[float] = None
+    ) -> None:
+        """Store a live meta result under the id it was requested by.
+
+        Unsplash may answer with a different (canonical) id than the one
+        asked for, so rows are not keyed by `result["id"]`. Its "etag" is
+        kept for revalidation.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO photo_meta VALUES (?, ?, ?, ?)",
+                (
+                    photo_id,
+                    json.dumps(result),
+                    result.get("etag"),
+                    time.time() if checked_at is None else checked_at,
+                ),
+            )
+
+    def touch(self, photo_id: str) -> None:
+        """Record that Unsplash confirmed the stored copy (304)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE photo_meta SET checked_at = ? WHERE photo_id = ?",
+                (time.time(), photo_id),
+            )
+
+    def stale(self, max_age_sec: float, limit: int) -> List[Tuple[str, Optional[str]]]:
+        """(photo_id, etag) of the rows checked longest ago, if older than max_age."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT photo_id, etag FROM photo_meta WHERE checked_at < ? "
+                "ORDER BY checked_at LIMIT ?",
+                (time.time() - max_age_sec, limit),
+            ).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # -- bulk import/export --
+
+    def export_jsonl(self, path: str) -> int:
+        """Write every row as one JSON object per line; returns the count."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT photo_id, meta, checked_at FROM photo_meta ORDER BY photo_id"
+            ).fetchall()
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for photo_id, meta, checked_at in rows:
+                row = {
+                    "photo_id": photo_id,
+                    "meta": json.loads(meta),
+                    "checked_at": checked_at,
+                }
+                f.write(json.dumps(row))
+                f.write("\n")
+        os.replace(tmp, path)
+        return len(rows)
+
+    def import_jsonl(self, path: str) -> int:
+        """Load rows written by export_jsonl; keeps whichever copy is newer."""
+        with open(path, encoding="utf-8") as f:
+            return self.import_rows(json.loads(line) for line in f if line.strip())
+
+    def import_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        imported = 0
+        with self._lock, self._conn:
+            for row in rows:
+                meta = row.get("meta") or {}
+                photo_id = row.get("photo_id") or meta.get("id")
+                if not photo_id or meta.get("source") != "live":
+                    continue
+                cur = self._conn.execute(
+                    "INSERT INTO photo_meta VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(photo_id) DO UPDATE SET meta = excluded.meta, "
+                    "etag = excluded.etag, checked_at = excluded.checked_at "
+                    "WHERE excluded.checked_at > photo_meta.checked_at",
+                    (
+                        photo_id,
+                        json.dumps(meta),
+                        meta.get("etag"),
+                        float(row.get("checked_at") or 0),
+                    ),
+                )
+                imported += cur.rowcount
+        return imported
+
+    # -- background revalidation --
+
+    async def revalidate(self, max_age_sec: float, batch: int) -> Dict[str, int]:
+        """Conditionally refetch up to `batch` stale rows."""
+        counts = {"not_modified": 0, "updated": 0, "failed": 0}
+        access_key = os.environ.get("UNSPLASH_CLIENT_ID", "")
+        if not access_key:
+            return counts
+        for photo_id, etag in await asyncio.to_thread(self.stale, max_age_sec, batch):
+            fetched = await ui.fetch_photo_meta_async(
+                photo_id, access_key, etag=etag, priority=upstream_budget.PREWARM
+            )
+            if fetched and fetched.get("not_modified"):
+                await asyncio.to_thread(self.touch, photo_id)
+                counts["not_modified"] += 1
+            elif fetched and fetched.get("data"):
+                result = ui.meta_result(
+                    photo_id, fetched["data"], live=True, etag=fetched.get("etag")
+                )
+                await asyncio.to_thread(self.put, photo_id, result)
+                counts["updated"] += 1
+            else:
+                # Budget held back or Unsplash failed: try again next sweep
+                counts["failed"] += 1
+        for outcome, n in counts.items():
+            if n:
+                metrics.incr(f"photo_meta.db.revalidate.{outcome}", n)
+        return counts
+
+    async def _run(self, interval_sec: float, max_age_sec: float, batch: int) -> None:
+        while True:
+            try:
+                await self.revalidate(max_age_sec, batch)
+                metrics.set_gauge("photo_meta.db.rows", await asyncio.to_thread(len, self))
+            except Exception:
+                logger.exception("Photo meta revalidation failed")
+            await asyncio.sleep(interval_sec)
+
+    def start(self, interval_sec: float, max_age_sec: float, batch: int) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval_sec, max_age_sec, batch))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_db: Optional[PhotoMetaDB] = None
+
+
+def get_photo_meta_db() -> Optional[PhotoMetaDB]:
+    """The open store, or None before startup or when not configured."""
+    return _db
+
+
+async def lookup(photo_id: str) -> Optional[Dict[str, Any]]:
+    """Stored result for photo_id, or None (also when there is no store)."""
+    db = _db
+    if db is None:
+        return None
+    try:
+        result = await asyncio.to_thread(db.get, photo_id)
+    except sqlite3.Error:
+        logger.warning("Photo meta db read failed for %s", photo_id, exc_info=True)
+        return None
+    metrics.incr("photo_meta.db.hit" if result else "photo_meta.db.miss")
+    return result
+
+
+async def remember(photo_id: str, result: Dict[str, Any]) -> None:
+    """Store a live result for photo_id; anything else is ignored."""
+    db = _db
+    if db is None or result.get("source") != "live" or result.get("random_fallback"):
+        return
+    try:
+        await asyncio.to_thread(db.put, photo_id, result)
+    except sqlite3.Error:
+        logger.warning("Photo meta db write failed for %s", photo_id, exc_info=True)
+
+
+async def touch(photo_id: str) -> None:
+    db = _db
+    if db is None:
+        return
+    try:
+        await asyncio.to_thread(db.touch, photo_id)
+    except sqlite3.Error:
+        logger.warning("Photo meta db write failed for %s", photo_id, exc_info=True)
+
+
+async def start_photo_meta_db() -> None:
+    global _db
+    path = os.getenv("PHOTO_META_DB_PATH", "").strip()
+    if _db is not None or not path:
+        return
+    _db = PhotoMetaDB(path)
+    _db.start(
+        interval_sec=float(os.getenv("PHOTO_META_DB_SWEEP_SEC", "600")),
+        max_age_sec=float(os.getenv("PHOTO_META_DB_REVALIDATE_SEC", "86400")),
+        batch=int(os.getenv("PHOTO_META_DB_SWEEP_BATCH", "10")),
+    )
+
+
+async def stop_photo_meta_db() -> None:
+    global _db
+    if _db is None:
+        return
+    await _db.stop()
+    _db.close()
+    _db = None
@@ -0,0 +1,178 @@
+"""Prewarmed metadata for the curated Unsplash photo pool.
+
+`/recommend` picks photo ids from a small, fixed pool (`CATEGORY_API_IDS`),
+so their metadata can be fetched ahead of time instead of by the client
+after every response. The store:
+
+- fetches every curated id at startup and then every
+  PHOTO_META_REFRESH_SEC, with `If-None-Match` so unchanged photos cost a
+  304 instead of a full response;
+- keeps the last good result when Unsplash fails, and demo metadata for ids
+  it could never fetch (or when no UNSPLASH_CLIENT_ID is set);
+- also fills the `unsplash:meta:<id>` cache entries with live results, so
+  /internal/photos/meta answers curated ids without an upstream call;
+- starts from the durable photo-meta db (`services.photo_meta_db`) when one
+  is configured, so after a restart known photos revalidate with their
+  stored ETag instead of being fetched in full, and writes results back.
+
+Reads (`get`) never touch the network, so `/recommend?photo_meta=true` can
+embed urls and attribution at no latency cost.
+
+Configuration:
+    PHOTO_META_PREWARM: set to "false" to disable the store (default true)
+    PHOTO_META_REFRESH_SEC: seconds between refreshes (default 21600)
+    PHOTO_META_PREWARM_CONCURRENCY: Unsplash fetches at once (default 2)
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from Backend.services import metrics, photo_meta_db, upstream_budget
+from Backend.services import unsplash_integration as ui
+from Backend.utils.external_cache import get_cache_backend
+
+logger = logging.getLogger(__name__)
+
+
+class PhotoMetaStore:
+    """In-memory photo-meta results for a fixed set of photo ids."""
+
+    def __init__(self, photo_ids: Iterable[str], concurrency: int = 2):
+        self.photo_ids: List[str] = list(dict.fromkeys(photo_ids))
+        self.concurrency = max(1, concurrency)
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {
+            "refreshes": 0,
+            "fetched": 0,
+            "not_modified": 0,
+            "failed": 0,
+        }
+
+    def get(self, photo_id: str) -> Optional[Dict[str, Any]]:
+        """Prewarmed result for photo_id, or None if it isn't in the store."""
+        return self._meta.get(photo_id)
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    async def refresh(self) -> None:
+        """Revalidate every photo id once (conditional requests)."""
+        access_key = os.environ.get("UNSPLASH_CLIENT_ID", "")
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def one(photo_id: str) -> None:
+            async with sem:
+                await self._refresh_one(photo_id, access_key)
+
+        await asyncio.gather(*(one(p) for p in self.photo_ids))
+        self.stats["refreshes"] += 1
+        metrics.set_gauge("photo_meta.store.size", len(self._meta))
+        metrics.set_gauge(
+            "photo_meta.store.live",
+            sum(1 for m in self._meta.values() if m.get("source") == "live"),
+        )
+
+    async def _refresh_one(self, photo_id: str, access_key: str) -> None:
+        current = self._meta.get(photo_id) or await photo_meta_db.lookup(photo_id)
+        fetched = None
+        if access_key:
+            etag = current.get("etag") if current else None
+            fetched = await ui.fetch_photo_meta_async(
+                photo_id, access_key, etag=etag, priority=upstream_budget.PREWARM
+            )
+            if fetched and fetched.get("not_modified") and current is None:
+                # Nothing to keep: treat it as a miss and fetch the full body
+                fetched = await ui.fetch_photo_meta_async(
+                    photo_id, access_key, priority=upstream_budget.PREWARM
+                )
+        if fetched and fetched.get("not_modified") and current is not None:
+            self.stats["not_modified"] += 1
+            metrics.incr("photo_meta.store.not_modified")
+            await photo_meta_db.touch(photo_id)
+            result = current
+        elif fetched and fetched.get("data"):
+            self.stats["fetched"] += 1
+            metrics.incr("photo_meta.store.fetched")
+            result = ui.meta_result(
+                photo_id, fetched["data"], live=True, etag=fetched.get("etag")
+            )
+        else:
+            if access_key:
+                self.stats["failed"] += 1
+                metrics.incr("photo_meta.store.failed")
+            # Keep the last good copy; demo metadata only until we have one
+            result = current or ui.meta_result(
+                photo_id, ui.demo_photo(photo_id), live=False
+            )
+        first_load = photo_id not in self._meta
+        self._meta[photo_id] = result
+        if result is not current:
+            await photo_meta_db.remember(photo_id, result)
+        if (first_load or result is not current) and result["source"] == "live":
+            await self._fill_cache(photo_id, result)
+
+    @staticmethod
+    async def _fill_cache(photo_id: str, result: Dict[str, Any]) -> None:
+        try:
+            await get_cache_backend().set(
+                f"unsplash:meta:{photo_id}",
+                result,
+                ttl=int(os.getenv("UNSPLASH_META_TTL", "3600")),
+                swr=int(os.getenv("UNSPLASH_META_SWR", "600")),
+            )
+        except Exception:
+            logger.warning("Failed to seed photo meta cache for %s", photo_id)
+
+    async def _run(self, interval_sec: float) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Photo meta refresh failed")
+            await asyncio.sleep(interval_sec)
+
+    def start(self, interval_sec: float) -> None:
+        """Refresh now and then every interval_sec, in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval_sec))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_store: Optional[PhotoMetaStore] = None
+
+
+def get_photo_meta_store() -> Optional[PhotoMetaStore]:
+    """The running store, or None before startup or when disabled."""
+    return _store
+
+
+async def start_photo_meta_store(photo_ids: Iterable[str]) -> None:
+    global _store
+    if _store is not None:
+        return
+    if os.getenv("PHOTO_META_PREWARM", "true").lower() == "false":
+        return
+    _store = PhotoMetaStore(
+        photo_ids,
+        concurrency=int(os.getenv("PHOTO_META_PREWARM_CONCURRENCY", "2")),
+    )
+    _store.start(float(os.getenv("PHOTO_META_REFRESH_SEC", "21600")))
+
+
+async def stop_photo_meta_store() -> None:
+    global _store
+    if _store is None:
+        return
+    await _store.stop()
+    _store = None
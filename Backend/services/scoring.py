@@ -79,6 +79,7 @@ async def rank(
                 "sun_start_iso": start_iso,
                 "duration_hours": duration,
                 "score": round(score, 2),
+                "weather_stale": wx_status == "stale",
             }
 
     async def run_all():
@@ -3,11 +3,13 @@ import json
 import logging
 import os
 import random
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import httpx
 
-from Backend.services.metrics import incr
+from Backend.services.metrics import incr, set_gauge
+from Backend.services.telemetry_spool import TelemetrySpool
+from Backend.services.telemetry_writer import close_jsonl_writer, get_jsonl_writer
 
 logger = logging.getLogger("sunshine_backend.telemetry.sink")
 
@@ -15,38 +17,17 @@ logger = logging.getLogger("sunshine_backend.telemetry.sink")
 async def sink_event_jsonl(payload: Dict[str, Any]) -> None:
     """Append telemetry payload as a JSON-line to TELEMETRY_SINK_PATH when set.
 
-    This uses asyncio.to_thread to avoid blocking the event loop during file I/O.
+    The line is handed to the long-lived writer thread
+    (services.telemetry_writer), so this never blocks the event loop.
     """
-    path = os.getenv("TELEMETRY_SINK_PATH", "").strip()
-    if not path:
+    writer = get_jsonl_writer()
+    if writer is None:
         return
+    writer.write([json.dumps(payload, ensure_ascii=False) + "\n"])
 
-    line = json.dumps(payload, ensure_ascii=False)
 
-    def _write():
-        try:
-            # Ensure parent dir exists
-            dirpath = os.path.dirname(path)
-            if dirpath and not os.path.exists(dirpath):
-                os.makedirs(dirpath, exist_ok=True)
-            with open(path, "a", encoding="utf-8") as f:
-                f.write(line + "\n")
-        except Exception:
-            logger.exception("Failed to write telemetry to %s", path)
-
-    await asyncio.to_thread(_write)
-
-
-async def sink_event_forward_http(payload: Dict[str, Any]) -> None:
-    """Optional forwarder: POST telemetry to TELEMETRY_SINK_URL if set.
-
-    This is fire-and-forget and times out quickly to avoid blocking pipeline.
-    """
-    url = os.getenv("TELEMETRY_SINK_URL", "").strip()
-    if not url:
-        return
-
-    # Retry/backoff configuration
+def _forward_settings() -> Tuple[int, float, float]:
+    """(retries, base delay, max delay) for forwarding, from the environment."""
     try:
         max_retries = int(os.getenv("TELEMETRY_FORWARD_RETRIES", "3"))
     except Exception:
@@ -59,16 +40,91 @@ async def sink_event_forward_http(payload: Dict[str, Any]) -> None:
         max_delay = float(os.getenv("TELEMETRY_FORWARD_MAX_DELAY_SEC", "5.0"))
     except Exception:
         max_delay = 5.0
+    return max_retries, base_delay, max_delay
+
+
+def _max_inflight_forwards() -> int:
+    try:
+        return max(1, int(os.getenv("TELEMETRY_FORWARD_MAX_INFLIGHT", "2")))
+    except Exception:
+        return 2
+
+
+# Shared pooled client for forwarding (one connection pool, reused per batch)
+_forward_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_forward_client() -> httpx.AsyncClient:
+    global _forward_client
+    if _forward_client is None:
+        max_inflight = _max_inflight_forwards()
+        _forward_client = httpx.AsyncClient(
+            timeout=2.0,
+            limits=httpx.Limits(
+                max_connections=max_inflight, max_keepalive_connections=max_inflight
+            ),
+        )
+    return _forward_client
+
+
+async def close_forward_client() -> None:
+    """Close the shared forwarding client (call on shutdown)."""
+    global _forward_client
+    if _forward_client is not None:
+        await _forward_client.aclose()
+        _forward_client = None
+
+
+def _encode_batch(items: List[Dict[str, Any]]) -> Tuple[bytes, str]:
+    """Request body and content type: a JSON array, or NDJSON if configured."""
+    if os.getenv("TELEMETRY_FORWARD_FORMAT", "json").strip().lower() == "ndjson":
+        body = "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in items)
+        return body.encode("utf-8"), "application/x-ndjson"
+    return json.dumps(items, ensure_ascii=False).encode("utf-8"), "application/json"
+
+
+async def forward_batch_http(items: List[Dict[str, Any]]) -> bool:
+    """POST a batch of telemetry events to TELEMETRY_SINK_URL as one request.
+
+    The body is a JSON array (TELEMETRY_FORWARD_FORMAT=ndjson: one event per
+    line). Network errors, 5xx and 429 are retried for the whole batch with
+    exponential backoff; other 4xx mean the receiver rejected it, so it is
+    dropped at once. Returns False if the batch could not be delivered and
+    may be retried later; True once it is done with (delivered, rejected,
+    or there is nowhere to send it).
+    """
+    url = os.getenv("TELEMETRY_SINK_URL", "").strip()
+    if not url or not items:
+        return True
+
+    max_retries, base_delay, max_delay = _forward_settings()
+    body, content_type = _encode_batch(items)
+    client = _get_forward_client()
 
     attempt = 0
     while attempt < max_retries:
         attempt += 1
         incr("telemetry_forward_attempts")
         try:
-            async with httpx.AsyncClient(timeout=2.0) as client:
-                await client.post(url, json=payload)
+            resp = await client.post(
+                url, content=body, headers={"Content-Type": content_type}
+            )
+            if resp.status_code >= 500 or resp.status_code == 429:
+                raise httpx.HTTPStatusError(
+                    f"status {resp.status_code}", request=resp.request, response=resp
+                )
+            if resp.status_code >= 400:
+                incr("telemetry_forward_final_failures")
+                incr("telemetry_forward_dropped_events", len(items))
+                logger.warning(
+                    "Telemetry sink rejected a batch of %d events: %s",
+                    len(items),
+                    resp.status_code,
+                )
+                return True
             incr("telemetry_forward_success")
-            return
+            incr("telemetry_forward_events", len(items))
+            return True
         except Exception:
             incr("telemetry_forward_failures")
             logger.warning(
@@ -77,17 +133,27 @@ async def sink_event_forward_http(payload: Dict[str, Any]) -> None:
                 max_retries,
             )
             logger.warning("target url=%s", url)
-            logger.info("payload=%s", payload)
+            logger.info("batch size=%d", len(items))
             if attempt >= max_retries:
                 incr("telemetry_forward_final_failures")
+                incr("telemetry_forward_dropped_events", len(items))
                 logger.exception(
                     "Failed to forward telemetry to %s after %d attempts", url, attempt
                 )
-                return
+                return False
             # exponential backoff with jitter
             delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
             jitter = random.uniform(0, base_delay)
             await asyncio.sleep(delay + jitter)
+    return False
+
+
+async def sink_event_forward_http(payload: Dict[str, Any]) -> None:
+    """Optional forwarder: POST one event to TELEMETRY_SINK_URL if set.
+
+    A batch of one (see forward_batch_http), on the shared pooled client.
+    """
+    await forward_batch_http([payload])
 
 
 # --- Batching support -------------------------------------------------
@@ -95,11 +161,76 @@ async def sink_event_forward_http(payload: Dict[str, Any]) -> None:
 # flushes periodically or when the batch size threshold is reached.
 
 
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "sample")
+
+
+def _parse_sample_rates(raw: str) -> Dict[str, float]:
+    """`event=rate,...` (`*` for every other event) -> {event: rate}."""
+    rates: Dict[str, float] = {}
+    for item in raw.split(","):
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(value)))
+        except ValueError:
+            logger.warning("Ignoring bad TELEMETRY_SAMPLE_RATES entry %r", item)
+    return rates
+
+
 class TelemetryBatcher:
-    def __init__(self, *, batch_size: int = 25, interval_sec: float = 2.0):
-        self.queue: asyncio.Queue = asyncio.Queue()
+    """Collects events and flushes them in batches.
+
+    The queue holds at most `max_queue` events, and `offer` never blocks or
+    creates a task, so a burst of telemetry cannot grow memory or flood the
+    event loop. When the queue is full, `overflow` decides what is lost:
+
+    - drop_oldest: the oldest queued event makes room (default);
+    - drop_newest: the new event is dropped;
+    - sample: once the queue is `sample_high_water` full, each event type is
+      kept at its rate in `sample_rates` (`*` for types not listed, default
+      1.0); the new event is dropped if the queue is still full.
+
+    Each flushed batch is written to TELEMETRY_SINK_PATH and forwarded as
+    one request (forward_batch_http). At most `max_inflight` forwards run at
+    once; when they are all busy, flushing waits for one to finish, so an
+    outage backs up the queue instead of piling up tasks and connections.
+
+    With a `spool` (services.telemetry_spool), batches are appended to it
+    instead, and one replay task forwards from the spool in order, moving
+    its checkpoint only after a delivery. Failed batches are retried with
+    backoff rather than dropped, and whatever is undelivered at shutdown is
+    replayed by the next process.
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = 25,
+        interval_sec: float = 2.0,
+        max_inflight: int = 2,
+        max_queue: int = 10000,
+        overflow: str = "drop_oldest",
+        sample_rates: Optional[Dict[str, float]] = None,
+        sample_high_water: float = 0.5,
+        spool: Optional[TelemetrySpool] = None,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown telemetry overflow policy: {overflow}")
+        self.max_queue = max(1, int(max_queue))
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        self.overflow = overflow
+        self.sample_rates = dict(sample_rates or {})
+        self.sample_above = int(self.max_queue * sample_high_water)
         self.batch_size = max(1, int(batch_size))
         self.interval_sec = float(interval_sec)
+        self.max_inflight = max(1, int(max_inflight))
+        self._forward_slots = asyncio.Semaphore(self.max_inflight)
+        self._forwards: Set[asyncio.Task] = set()
+        self._inflight = 0
+        self.spool = spool
+        self._spool_wakeup = asyncio.Event()
+        self._replay_task: Optional[asyncio.Task] = None
         self._task: Optional[asyncio.Task] = None
         self._stopping = False
 
@@ -107,6 +238,10 @@ class TelemetryBatcher:
         if self._task is None:
             self._stopping = False
             self._task = asyncio.create_task(self._worker())
+        if self.spool is not None and self._replay_task is None:
+            # Replays anything a previous process left undelivered
+            self._spool_wakeup.set()
+            self._replay_task = asyncio.create_task(self._replay())
 
     async def stop(self) -> None:
         self._stopping = True
@@ -119,9 +254,51 @@ class TelemetryBatcher:
                 pass
             await self._task
             self._task = None
+        # let in-flight forwards finish (they have their own retry limit)
+        if self._forwards:
+            await asyncio.gather(*self._forwards, return_exceptions=True)
+        if self._replay_task is not None:
+            # One last replay pass; undelivered events stay in the spool
+            self._spool_wakeup.set()
+            try:
+                await asyncio.wait_for(self._replay_task, timeout=self.interval_sec)
+            except asyncio.TimeoutError:
+                pass
+            self._replay_task = None
+
+    def offer(self, payload: Dict[str, Any]) -> bool:
+        """Queue an event without waiting; False if it was dropped."""
+        kept = self._admit(payload)
+        set_gauge("telemetry_queue_depth", self.queue.qsize())
+        return kept
+
+    def _admit(self, payload: Dict[str, Any]) -> bool:
+        if self.overflow == "sample" and self.queue.qsize() >= self.sample_above:
+            event = str(payload.get("event"))
+            key = event if event in self.sample_rates else "*"
+            rate = self.sample_rates.get(key, 1.0)
+            set_gauge(f"telemetry_queue_sample_rate.{key}", rate)
+            if rate < 1.0 and random.random() >= rate:
+                incr("telemetry_queue_sampled_out")
+                return False
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if self.overflow != "drop_oldest":
+            incr("telemetry_queue_dropped_newest")
+            return False
+        try:
+            self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        incr("telemetry_queue_dropped_oldest")
+        self.queue.put_nowait(payload)
+        return True
 
     async def enqueue(self, payload: Dict[str, Any]) -> None:
-        await self.queue.put(payload)
+        self.offer(payload)
 
     async def _worker(self) -> None:
         while not self._stopping:
@@ -150,6 +327,7 @@ class TelemetryBatcher:
                     break
 
             if items:
+                set_gauge("telemetry_queue_depth", self.queue.qsize())
                 await self._flush(items)
 
         # flush remaining items after stop requested
@@ -166,35 +344,93 @@ class TelemetryBatcher:
             await self._flush(leftover)
 
     async def _flush(self, items: List[Dict[str, Any]]) -> None:
-        # Write JSONL for each item in a thread to avoid blocking
-        path = os.getenv("TELEMETRY_SINK_PATH", "").strip()
-        if path:
-            lines = [json.dumps(p, ensure_ascii=False) + "\n" for p in items]
+        # One hand-off per batch to the JSONL writer thread
+        writer = get_jsonl_writer()
+        if writer is not None:
+            writer.write(json.dumps(p, ensure_ascii=False) + "\n" for p in items)
 
-            def _write_lines():
-                try:
-                    dirpath = os.path.dirname(path)
-                    if dirpath and not os.path.exists(dirpath):
-                        os.makedirs(dirpath, exist_ok=True)
-                    with open(path, "a", encoding="utf-8") as f:
-                        f.writelines(lines)
-                except Exception:
-                    logger.exception("Failed to write telemetry batch to %s", path)
-
-            await asyncio.to_thread(_write_lines)
-
-        # Forward each event asynchronously (do not await here to avoid blocking)
-        for payload in items:
+        if not os.getenv("TELEMETRY_SINK_URL", "").strip():
+            return
+        if self.spool is not None:
             try:
-                asyncio.create_task(sink_event_forward_http(payload))
+                await asyncio.to_thread(self.spool.append, items)
             except Exception:
-                logger.exception("Failed to schedule forward for telemetry payload")
+                logger.exception("Failed to spool telemetry batch, forwarding directly")
+            else:
+                self._spool_wakeup.set()
+                return
+        # One request per batch; wait for a slot rather than queueing tasks
+        await self._forward_slots.acquire()
+        task = asyncio.create_task(self._forward(items))
+        self._forwards.add(task)
+        task.add_done_callback(self._forwards.discard)
+
+    async def _replay(self) -> None:
+        """Forward spooled batches in order until stopped."""
+        assert self.spool is not None
+        _, _, max_delay = _forward_settings()
+        delay = 0.0
+        failures = 0
+        while True:
+            if delay:
+                await asyncio.sleep(delay)
+            else:
+                await self._spool_wakeup.wait()
+            self._spool_wakeup.clear()
+            delay = 0.0
+            try:
+                while True:
+                    items, position = await asyncio.to_thread(
+                        self.spool.read, self.batch_size
+                    )
+                    if not items:
+                        # Skip past unreadable lines, if any
+                        await asyncio.to_thread(self.spool.commit, position)
+                        break
+                    if not await forward_batch_http(items):
+                        # Sink still down after the batch's own retries
+                        failures += 1
+                        delay = min(60.0, max_delay * 2 ** (failures - 1))
+                        break
+                    failures = 0
+                    await asyncio.to_thread(self.spool.commit, position)
+                    incr("telemetry_spool_replayed_events", len(items))
+            except Exception:
+                logger.exception("Telemetry spool replay failed")
+                delay = max_delay
+            if self._stopping:
+                return
+
+    async def _forward(self, items: List[Dict[str, Any]]) -> None:
+        self._inflight += 1
+        set_gauge("telemetry_forward_inflight", self._inflight)
+        try:
+            await forward_batch_http(items)
+        except Exception:
+            logger.exception("Failed to forward telemetry batch")
+        finally:
+            self._inflight -= 1
+            set_gauge("telemetry_forward_inflight", self._inflight)
+            self._forward_slots.release()
 
 
 # Global batcher instance managed by start/stop helpers
 _BATCHER: Optional[TelemetryBatcher] = None
 
 
+def _spool_from_env() -> Optional[TelemetrySpool]:
+    directory = os.getenv("TELEMETRY_SPOOL_DIR", "").strip()
+    if not directory:
+        return None
+    env = os.environ.get
+    return TelemetrySpool(
+        directory,
+        segment_bytes=int(env("TELEMETRY_SPOOL_SEGMENT_BYTES", str(1 << 20))),
+        max_bytes=int(env("TELEMETRY_SPOOL_MAX_BYTES", str(64 << 20))),
+        max_age_sec=float(env("TELEMETRY_SPOOL_MAX_AGE_SEC", "604800")),
+    )
+
+
 async def start_telemetry_batcher() -> None:
     global _BATCHER
     if _BATCHER is not None:
@@ -207,7 +443,28 @@ async def start_telemetry_batcher() -> None:
         interval = float(os.getenv("TELEMETRY_BATCH_INTERVAL_SEC", "2.0"))
     except Exception:
         interval = 2.0
-    _BATCHER = TelemetryBatcher(batch_size=batch_size, interval_sec=interval)
+    overflow = os.getenv("TELEMETRY_QUEUE_POLICY", "drop_oldest").strip().lower()
+    if overflow not in OVERFLOW_POLICIES:
+        logger.warning("Unknown TELEMETRY_QUEUE_POLICY %r, using drop_oldest", overflow)
+        overflow = "drop_oldest"
+    try:
+        max_queue = int(os.getenv("TELEMETRY_QUEUE_MAX", "10000"))
+    except Exception:
+        max_queue = 10000
+    try:
+        high_water = float(os.getenv("TELEMETRY_SAMPLE_HIGH_WATER", "0.5"))
+    except Exception:
+        high_water = 0.5
+    _BATCHER = TelemetryBatcher(
+        batch_size=batch_size,
+        interval_sec=interval,
+        max_inflight=_max_inflight_forwards(),
+        max_queue=max_queue,
+        overflow=overflow,
+        sample_rates=_parse_sample_rates(os.getenv("TELEMETRY_SAMPLE_RATES", "")),
+        sample_high_water=high_water,
+        spool=_spool_from_env(),
+    )
     await _BATCHER.start()
 
 
@@ -217,12 +474,24 @@ async def stop_telemetry_batcher() -> None:
         return
     await _BATCHER.stop()
     _BATCHER = None
+    await close_forward_client()
+    await asyncio.to_thread(close_jsonl_writer)
+
+
+def offer_event(payload: Dict[str, Any]) -> Optional[bool]:
+    """Queue an event on the running batcher without waiting.
+
+    Returns whether it was kept, or None if no batcher is running.
+    """
+    if _BATCHER is None:
+        return None
+    return _BATCHER.offer(payload)
 
 
 async def enqueue_event(payload: Dict[str, Any]) -> None:
     """Enqueue an event for batching, or write immediately if not running."""
     if _BATCHER is not None:
-        await _BATCHER.enqueue(payload)
+        _BATCHER.offer(payload)
         return
 
     # fallback: write immediately
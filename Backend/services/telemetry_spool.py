@@ -0,0 +1,245 @@
+"""On-disk spool between the telemetry batcher and the HTTP forwarder.
+
+Without it, events that still failed after TELEMETRY_FORWARD_RETRIES were
+logged and discarded, and batches queued or in flight at shutdown were
+lost. With TELEMETRY_SPOOL_DIR set, every flushed batch is first appended to
+the spool, and the forwarder reads from there:
+
+- the spool is a directory of append-only segment files
+  (`<seq>.seg`, one JSON event per line); a segment is closed once it
+  passes `segment_bytes` and a new one is started;
+- `checkpoint.json` records how far the forwarder has delivered (segment
+  and byte offset). It is only advanced after a batch was sent, so after a
+  restart the forwarder replays everything past it;
+- fully delivered segments are deleted; retention also deletes the oldest
+  segments, delivered or not, once the spool exceeds `max_bytes` or a
+  segment is older than `max_age_sec` (counted as dropped events).
+
+Appends are fsynced. All methods block on file I/O and share one lock, so
+callers on the event loop run them with `asyncio.to_thread`.
+
+Configuration (see `telemetry_sink.start_telemetry_batcher`):
+    TELEMETRY_SPOOL_DIR: spool directory (default: no spool)
+    TELEMETRY_SPOOL_SEGMENT_BYTES: segment size (default 1048576)
+    TELEMETRY_SPOOL_MAX_BYTES: total size kept (default 67108864)
+    TELEMETRY_SPOOL_MAX_AGE_SEC: oldest segment kept (default 604800)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from Backend.services.metrics import incr, set_gauge
+
+logger = logging.getLogger("sunshine_backend.telemetry.spool")
+
+Position = Tuple[int, int]  # (segment seq, byte offset)
+
+_SUFFIX = ".seg"
+
+
+class TelemetrySpool:
+    """Segmented append-only event log with a delivery checkpoint."""
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 1 << 20,
+        max_bytes: int = 64 << 20,
+        max_age_sec: float = 7 * 86400,
+    ):
+        self.directory = directory
+        self.segment_bytes = max(1, segment_bytes)
+        self.max_bytes = max_bytes
+        self.max_age_sec = max_age_sec
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        segments = self._segments()
+        self._current = segments[-1] if segments else 1
+        self._checkpoint = self._load_checkpoint(segments)
+        if segments:
+            self._drop_torn_tail(self._current)
+        self._gauges()
+
+    # -- files --
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:012d}{_SUFFIX}")
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[: -len(_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(_SUFFIX) and name[: -len(_SUFFIX)].isdigit()
+        )
+
+    def _size(self, seq: int) -> int:
+        try:
+            return os.path.getsize(self._path(seq))
+        except OSError:
+            return 0
+
+    def _load_checkpoint(self, segments: List[int]) -> Position:
+        try:
+            with open(os.path.join(self.directory, "checkpoint.json")) as f:
+                raw = json.load(f)
+            return int(raw["segment"]), int(raw["offset"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return (segments[0] if segments else 1), 0
+
+    def _save_checkpoint(self) -> None:
+        path = os.path.join(self.directory, "checkpoint.json")
+        tmp = f"{path}.tmp"
+        seq, offset = self._checkpoint
+        with open(tmp, "w") as f:
+            json.dump({"segment": seq, "offset": offset}, f)
+        os.replace(tmp, path)
+
+    def _drop_torn_tail(self, seq: int) -> None:
+        """Cut a segment back to its last complete line.
+
+        A crash during an append can leave a partial last line; appending
+        after it would glue the next event onto it and lose both.
+        """
+        try:
+            with open(self._path(seq), "rb+") as f:
+                size = end = f.seek(0, os.SEEK_END)
+                while end > 0:
+                    start = max(0, end - 4096)
+                    f.seek(start)
+                    newline = f.read(end - start).rfind(b"\n")
+                    if newline >= 0:
+                        end = start + newline + 1
+                        break
+                    end = start
+                if end == size:
+                    return
+                f.truncate(end)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            logger.warning("Could not repair spool segment %d", seq, exc_info=True)
+            return
+        incr("telemetry_spool_corrupt_lines")
+        logger.warning("Dropped a torn line from spool segment %d", seq)
+
+    def _gauges(self) -> None:
+        segments = self._segments()
+        set_gauge("telemetry_spool_segments", len(segments))
+        set_gauge("telemetry_spool_bytes", sum(self._size(s) for s in segments))
+
+    # -- writer side --
+
+    def append(self, items: List[Dict[str, Any]]) -> None:
+        """Durably append a batch of events."""
+        if not items:
+            return
+        data = "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in items)
+        with self._lock:
+            if self._size(self._current) >= self.segment_bytes:
+                self._current += 1
+            with open(self._path(self._current), "ab") as f:
+                f.write(data.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            incr("telemetry_spool_appended_events", len(items))
+            self._enforce_retention()
+            self._gauges()
+
+    def _enforce_retention(self) -> None:
+        segments = self._segments()
+        total = sum(self._size(s) for s in segments)
+        cutoff = time.time() - self.max_age_sec
+        for seq in segments:
+            if seq == self._current:
+                break
+            try:
+                too_old = os.path.getmtime(self._path(seq)) < cutoff
+            except OSError:
+                continue
+            if total <= self.max_bytes and not too_old:
+                break
+            total -= self._size(seq)
+            self._drop(seq)
+
+    def _drop(self, seq: int) -> None:
+        """Delete a segment before it was delivered."""
+        done_seq, done_offset = self._checkpoint
+        if seq >= done_seq:
+            skipped = self._count_lines(seq, done_offset if seq == done_seq else 0)
+            if skipped:
+                incr("telemetry_spool_dropped_events", skipped)
+                logger.warning("Telemetry spool full or stale, dropped %d events", skipped)
+            self._checkpoint = (seq + 1, 0)
+            self._save_checkpoint()
+        os.remove(self._path(seq))
+
+    def _count_lines(self, seq: int, offset: int) -> int:
+        try:
+            with open(self._path(seq), "rb") as f:
+                f.seek(offset)
+                return sum(1 for _ in f)
+        except OSError:
+            return 0
+
+    # -- forwarder side --
+
+    def read(self, max_items: int) -> Tuple[List[Dict[str, Any]], Position]:
+        """Up to max_items undelivered events, and the position after them.
+
+        Pass the position to `commit` once the events are delivered. Lines
+        that are not valid JSON are skipped; an incomplete last line is left
+        until it is complete (a torn one is cut off when the spool is opened).
+        """
+        items: List[Dict[str, Any]] = []
+        with self._lock:
+            seq, offset = self._checkpoint
+            while len(items) < max_items and seq <= self._current:
+                try:
+                    f = open(self._path(seq), "rb")
+                except OSError:
+                    if seq == self._current:
+                        break
+                    seq, offset = seq + 1, 0
+                    continue
+                with f:
+                    f.seek(offset)
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break
+                        offset += len(line)
+                        try:
+                            items.append(json.loads(line))
+                        except ValueError:
+                            incr("telemetry_spool_corrupt_lines")
+                            continue
+                        if len(items) >= max_items:
+                            break
+                if len(items) >= max_items or seq == self._current:
+                    break
+                seq, offset = seq + 1, 0
+            return items, (seq, offset)
+
+    def commit(self, position: Position) -> None:
+        """Mark everything before `position` delivered."""
+        with self._lock:
+            if position <= self._checkpoint:
+                return
+            self._checkpoint = position
+            self._save_checkpoint()
+            for seq in self._segments():
+                if seq >= position[0]:
+                    break
+                os.remove(self._path(seq))
+            self._gauges()
+
+    def pending(self) -> bool:
+        """True if there are bytes past the checkpoint."""
+        with self._lock:
+            seq, offset = self._checkpoint
+            if seq < self._current:
+                return True
+            return self._size(seq) > offset
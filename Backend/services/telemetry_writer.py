@@ -0,0 +1,267 @@
+"""Long-lived JSONL writer for the telemetry file sink.
+
+The sink used to reopen TELEMETRY_SINK_PATH in append mode for every event
+or batch (through `asyncio.to_thread`), and the file grew forever. A
+`JsonlWriter` instead owns one open, buffered file handle on its own
+thread:
+
+- `write(lines)` only puts the lines on a queue, so it is cheap and never
+  blocks the event loop; the thread drains whatever is queued in one go
+  and flushes once per drain. The queue holds at most `max_queue`
+  batches: when the disk cannot keep up, further batches are dropped
+  (counted as `telemetry_sink_dropped_events`) instead of piling up in
+  memory;
+- the file is rotated when it reaches `max_bytes` or has been open for
+  `rotate_sec`: it is renamed to `<path>.<UTC timestamp>-<n>` and compressed to
+  `.gz`, or `.zst` when `compression="zstd"` and the optional `zstandard`
+  package is installed (gzip otherwise);
+- `fsync` is "never" (leave it to the OS), "interval" (at most once every
+  `fsync_sec`) or "always" (after every drain).
+
+Configuration (see `get_jsonl_writer`):
+    TELEMETRY_SINK_PATH: file to write (default: no file sink)
+    TELEMETRY_SINK_MAX_BYTES: rotate at this size; 0 disables (default 67108864)
+    TELEMETRY_SINK_ROTATE_SEC: rotate after this long; 0 disables (default 86400)
+    TELEMETRY_SINK_COMPRESSION: gzip, zstd or none (default gzip)
+    TELEMETRY_SINK_FSYNC: never, interval or always (default interval)
+    TELEMETRY_SINK_FSYNC_SEC: seconds between interval fsyncs (default 1.0)
+    TELEMETRY_SINK_QUEUE_MAX: batches waiting for the writer (default 1024)
+"""
+
+import gzip
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import IO, Iterable, List, Optional
+
+from Backend.services.metrics import incr
+
+logger = logging.getLogger("sunshine_backend.telemetry.sink")
+
+# Optional zstd compression (used if zstandard is installed)
+try:
+    import zstandard
+
+    zstd_available = True
+except Exception:
+    zstandard = None
+    zstd_available = False
+
+FSYNC_POLICIES = ("never", "interval", "always")
+COMPRESSIONS = ("gzip", "zstd", "none")
+
+_STOP = object()
+
+
+class JsonlWriter:
+    """Appends lines to one file from a dedicated thread, with rotation."""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 64 << 20,
+        rotate_sec: float = 86400.0,
+        compression: str = "gzip",
+        fsync: str = "interval",
+        fsync_sec: float = 1.0,
+        max_queue: int = 1024,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == "zstd" and not zstd_available:
+            logger.warning("zstandard is not installed, compressing with gzip")
+            compression = "gzip"
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_sec = rotate_sec
+        self.compression = compression
+        self.fsync = fsync
+        self.fsync_sec = fsync_sec
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_queue))
+        self._file: Optional[IO[str]] = None
+        self._opened_at = 0.0
+        self._last_fsync = 0.0
+        self._thread = threading.Thread(
+            target=self._run, name="telemetry-jsonl-writer", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, lines: Iterable[str]) -> bool:
+        """Queue newline-terminated lines; returns at once.
+
+        False if the queue is full and the lines were dropped.
+        """
+        batch = list(lines)
+        try:
+            self._queue.put_nowait(batch)
+        except queue.Full:
+            incr("telemetry_sink_dropped_events", len(batch))
+            return False
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write what is queued, then close the file and stop the thread."""
+        self._queue.put(_STOP)  # waits for room: the thread is draining
+        self._thread.join(timeout)
+
+    # -- writer thread --
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self._idle_timeout())
+            except queue.Empty:
+                self._maybe_rotate()
+                continue
+            batches: List[List[str]] = []
+            for item in self._drain(first):
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batches.append(item)
+            try:
+                if batches:
+                    self._write(batches)
+                self._maybe_rotate()
+            except Exception:
+                incr("telemetry_sink_write_errors")
+                logger.exception("Failed to write telemetry to %s", self.path)
+                self._close_file()
+        self._close_file()
+
+    def _drain(self, first) -> List:
+        items = [first]
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _idle_timeout(self) -> Optional[float]:
+        if self.rotate_sec > 0 and self._file is not None:
+            return max(0.05, self._opened_at + self.rotate_sec - time.time())
+        return None
+
+    def _open(self) -> IO[str]:
+        if self._file is None:
+            dirpath = os.path.dirname(self.path)
+            if dirpath:
+                os.makedirs(dirpath, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1 << 16)
+            self._opened_at = time.time()
+        return self._file
+
+    def _write(self, batches: List[List[str]]) -> None:
+        f = self._open()
+        count = 0
+        for lines in batches:
+            f.writelines(lines)
+            count += len(lines)
+        f.flush()
+        now = time.time()
+        if self.fsync == "always" or (
+            self.fsync == "interval" and now - self._last_fsync >= self.fsync_sec
+        ):
+            os.fsync(f.fileno())
+            self._last_fsync = now
+        incr("telemetry_sink_written_events", count)
+
+    def _close_file(self) -> None:
+        if self._file is None:
+            return
+        try:
+            self._file.flush()
+            if self.fsync != "never":
+                os.fsync(self._file.fileno())
+            self._file.close()
+        except Exception:
+            logger.exception("Failed to close telemetry file %s", self.path)
+        self._file = None
+
+    def _maybe_rotate(self) -> None:
+        f = self._file
+        if f is None:
+            return
+        too_big = self.max_bytes > 0 and f.tell() >= self.max_bytes
+        too_old = self.rotate_sec > 0 and time.time() - self._opened_at >= self.rotate_sec
+        if too_big or too_old:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        self._close_file()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        # Numbered within the second, so names sort in rotation order
+        n = 0
+        target = f"{self.path}.{stamp}-{n:03d}"
+        while any(os.path.exists(target + ext) for ext in ("", ".gz", ".zst")):
+            n += 1
+            target = f"{self.path}.{stamp}-{n:03d}"
+        os.replace(self.path, target)
+        incr("telemetry_sink_rotations")
+        if self.compression != "none":
+            self._compress(target)
+
+    def _compress(self, path: str) -> None:
+        try:
+            if self.compression == "zstd" and zstandard is not None:
+                with open(path, "rb") as src, open(path + ".zst", "wb") as dst:
+                    zstandard.ZstdCompressor().copy_stream(src, dst)
+            else:
+                with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            os.remove(path)
+        except Exception:
+            # Keep the uncompressed segment rather than lose it
+            logger.exception("Failed to compress rotated telemetry file %s", path)
+
+
+_writer: Optional[JsonlWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_jsonl_writer() -> Optional[JsonlWriter]:
+    """Writer for TELEMETRY_SINK_PATH, reopened if the path changes."""
+    global _writer
+    path = os.getenv("TELEMETRY_SINK_PATH", "").strip()
+    writer = _writer
+    if writer is not None and writer.path == path:
+        return writer
+    with _writer_lock:
+        if _writer is not None and _writer.path != path:
+            _writer.close(timeout=0)  # finishes its queue on its own thread
+            _writer = None
+        if path and _writer is None:
+            env = os.environ.get
+            compression = env("TELEMETRY_SINK_COMPRESSION", "gzip").strip().lower()
+            if compression not in COMPRESSIONS:
+                logger.warning("Unknown TELEMETRY_SINK_COMPRESSION %r, using gzip", compression)
+                compression = "gzip"
+            fsync = env("TELEMETRY_SINK_FSYNC", "interval").strip().lower()
+            if fsync not in FSYNC_POLICIES:
+                logger.warning("Unknown TELEMETRY_SINK_FSYNC %r, using interval", fsync)
+                fsync = "interval"
+            _writer = JsonlWriter(
+                path,
+                max_bytes=int(env("TELEMETRY_SINK_MAX_BYTES", str(64 << 20))),
+                rotate_sec=float(env("TELEMETRY_SINK_ROTATE_SEC", "86400")),
+                compression=compression,
+                fsync=fsync,
+                fsync_sec=float(env("TELEMETRY_SINK_FSYNC_SEC", "1.0")),
+                max_queue=int(env("TELEMETRY_SINK_QUEUE_MAX", "1024")),
+            )
+        return _writer
+
+
+def close_jsonl_writer() -> None:
+    """Flush and close the writer (call on shutdown)."""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
@@ -0,0 +1,247 @@
+"""Background queue for Unsplash download tracking.
+
+Unsplash asks for a call to a photo's `download_location` whenever it is
+shown. Doing that inline made `/internal/photos/track` as slow as Unsplash
+and spent the hourly API allowance one request at a time. Now the endpoint
+only dedupes and queues (202), and a worker started with the app drains the
+queue:
+
+- at most UNSPLASH_TRACK_CONCURRENCY calls at once, on the pooled async
+  client;
+- repeats of a location that is still pending are coalesced into one call
+  (its `count` records how many views it stands for);
+- calls spend an hourly budget (UNSPLASH_TRACK_BUDGET_PER_HOUR, GCRA, so it
+  refills smoothly) and the shared Unsplash budget at `tracking`, the lowest
+  priority; when either is used up items wait in the queue instead of
+  hitting Unsplash's rate limit;
+- with UNSPLASH_TRACK_QUEUE_PATH set, pending items are written to that
+  JSON file after each drain and at shutdown, and loaded at startup, so a
+  restart does not lose them.
+
+Failed calls are counted and dropped, as before: retrying tracking calls in
+a loop would only spend more of the budget.
+
+Configuration:
+    UNSPLASH_TRACK_CONCURRENCY: calls in flight (default 4)
+    UNSPLASH_TRACK_BUDGET_PER_HOUR: tracking calls per hour (default 40)
+    UNSPLASH_TRACK_QUEUE_MAX: pending locations kept (default 10000)
+    UNSPLASH_TRACK_QUEUE_PATH: file for pending items (default: not persisted)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from Backend.services import metrics, upstream_budget
+from Backend.services import unsplash_integration as ui
+from Backend.utils.rate_limiter import GCRARateLimiter
+
+logger = logging.getLogger(__name__)
+
+_BUDGET_KEY = "unsplash.track"
+
+
+@dataclass
+class TrackItem:
+    key: str
+    download_location: str
+    count: int = 1
+    first_seen: float = 0.0
+
+
+class TrackQueue:
+    """Pending tracking calls, coalesced by key and drained within a budget."""
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        budget_per_hour: int = 40,
+        max_pending: int = 10000,
+        path: Optional[str] = None,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.max_pending = max_pending
+        self.path = path or None
+        self._budget = GCRARateLimiter(3600, max(1, budget_per_hour), max_keys=1)
+        self._pending: "OrderedDict[str, TrackItem]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._pending
+
+    def submit(self, key: str, download_location: str) -> bool:
+        """Queue a tracking call; False if the queue is full.
+
+        Never blocks or creates a task, so it is safe on the request path.
+        """
+        item = self._pending.get(key)
+        if item is not None:
+            item.count += 1
+            metrics.incr("unsplash.track.coalesced")
+        elif len(self._pending) >= self.max_pending:
+            metrics.incr("unsplash.track.queue_full")
+            return False
+        else:
+            self._pending[key] = TrackItem(key, download_location, 1, time.time())
+            metrics.incr("unsplash.track.queued")
+        self._dirty = True
+        metrics.set_gauge("unsplash.track.pending", len(self._pending))
+        self._wakeup.set()
+        return True
+
+    async def drain(self) -> float:
+        """Send pending items while budget lasts.
+
+        Returns 0 once the queue is empty, or seconds until the budget allows
+        the next call.
+        """
+        while self._pending:
+            batch: List[TrackItem] = []
+            wait = 0.0
+            while self._pending and len(batch) < self.concurrency:
+                wait = self._take_budget()
+                if wait:
+                    break
+                batch.append(self._pending.popitem(last=False)[1])
+            if batch:
+                self._dirty = True
+                await asyncio.gather(*(self._send(item) for item in batch))
+            metrics.set_gauge("unsplash.track.pending", len(self._pending))
+            if wait and self._pending:
+                metrics.incr("unsplash.track.budget_deferred")
+                return wait
+        return 0.0
+
+    def _take_budget(self) -> float:
+        """Spend one call from both budgets; else seconds until one refills."""
+        upstream = upstream_budget.get_budget("unsplash")
+        wait = upstream.wait_time(upstream_budget.TRACKING)
+        if wait:
+            return wait
+        if not self._budget.is_allowed(_BUDGET_KEY):
+            return max(self._budget.get_reset_time(_BUDGET_KEY), 0.001)
+        upstream.acquire(upstream_budget.TRACKING)
+        return 0.0
+
+    async def _send(self, item: TrackItem) -> None:
+        access_key = os.environ.get("UNSPLASH_CLIENT_ID", "")
+        # Budget was spent when the item was taken off the queue
+        ok = await ui.trigger_photo_download_async(
+            item.download_location, access_key, priority=None
+        )
+        metrics.incr(
+            "unsplash.track.success_total" if ok else "unsplash.track.failure_total"
+        )
+        if item.count > 1:
+            metrics.incr("unsplash.track.views_coalesced", item.count - 1)
+
+    # -- persistence --
+
+    def load(self) -> None:
+        """Restore items persisted by a previous process."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                items = [TrackItem(**raw) for raw in json.load(f)]
+        except (OSError, ValueError, TypeError):
+            logger.warning("Ignoring unreadable track queue %s", self.path)
+            return
+        for item in items[: self.max_pending]:
+            self._pending.setdefault(item.key, item)
+        metrics.set_gauge("unsplash.track.pending", len(self._pending))
+        logger.info("Restored %d pending tracking calls", len(items))
+
+    async def persist(self) -> None:
+        if not self.path or not self._dirty:
+            return
+        self._dirty = False
+        items = [asdict(item) for item in self._pending.values()]
+        try:
+            await asyncio.to_thread(_write_json, self.path, items)
+        except OSError:
+            self._dirty = True
+            logger.warning("Failed to persist track queue to %s", self.path)
+
+    # -- worker --
+
+    async def _run(self) -> None:
+        wait = 0.0
+        while not self._stopping:
+            try:
+                # Sleep until new items arrive, or the budget refills
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait or None)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            try:
+                wait = await self.drain()
+            except Exception:
+                logger.exception("Track queue drain failed")
+                wait = 1.0
+            await self.persist()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.persist()
+
+
+def _write_json(path: str, items: List[Dict]) -> None:
+    dirpath = os.path.dirname(path)
+    if dirpath:
+        os.makedirs(dirpath, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(items, f)
+    os.replace(tmp, path)
+
+
+_queue: Optional[TrackQueue] = None
+
+
+def get_track_queue() -> TrackQueue:
+    global _queue
+    if _queue is None:
+        _queue = TrackQueue(
+            concurrency=int(os.getenv("UNSPLASH_TRACK_CONCURRENCY", "4")),
+            budget_per_hour=int(os.getenv("UNSPLASH_TRACK_BUDGET_PER_HOUR", "40")),
+            max_pending=int(os.getenv("UNSPLASH_TRACK_QUEUE_MAX", "10000")),
+            path=os.getenv("UNSPLASH_TRACK_QUEUE_PATH", "").strip() or None,
+        )
+    return _queue
+
+
+async def start_track_queue() -> None:
+    queue = get_track_queue()
+    queue.load()
+    queue.start()
+
+
+async def stop_track_queue() -> None:
+    global _queue
+    if _queue is None:
+        return
+    await _queue.stop()
+    _queue = None
@@ -6,6 +6,15 @@
     attribution links
 - fetch_photo_meta(photo_id, access_key): fetch photo metadata
 - fetch_random_photo(query, access_key): fetch random photo by query
+- meta_result(photo_id, photo, live) / demo_photo(photo_id): the photo-meta
+    shape served to clients, and its offline stand-in
+
+Each has an `_async` twin on the pooled httpx client
+(`Backend.utils.http_client`). Request handlers must use those: the sync
+versions block on `requests` and are only for scripts and threads. The async
+versions also spend the shared Unsplash budget
+(`Backend.services.upstream_budget`) at their `priority`, and return their
+"no data" value without calling Unsplash when that priority is held back.
 
 These are intentionally small and dependency-light so they can be used from
 both API handlers and background tasks.
@@ -14,9 +23,14 @@ both API handlers and background tasks.
 import logging
 from typing import Dict, Optional
 
+import httpx
 import requests
 
-from Backend.utils.circuit_breaker import get_unsplash_circuit_breaker
+from Backend.services import upstream_budget
+from Backend.utils.circuit_breaker import (
+    CircuitBreakerOpenException,
+    get_unsplash_circuit_breaker,
+)
 from Backend.utils.debug_logging import debug_log
 from Backend.utils.http_client import async_get
 
@@ -46,12 +60,6 @@ def trigger_photo_download(
         )
         return False
 
-    # Check circuit breaker
-    circuit_breaker = get_unsplash_circuit_breaker()
-    if circuit_breaker.is_open:
-        logger.warning("Unsplash circuit breaker is open, skipping download tracking")
-        return False
-
     # Per Unsplash API guidelines, include Accept-Version header along with Client-ID
     headers = {
         "Authorization": f"Client-ID {access_key}",
@@ -62,7 +70,10 @@ def trigger_photo_download(
             "trigger_photo_download: url=%s timeout=%s"
             % (download_location, timeout)
         )
-        resp = requests.get(download_location, headers=headers, timeout=timeout)
+        with get_unsplash_circuit_breaker().guard() as outcome:
+            resp = requests.get(download_location, headers=headers, timeout=timeout)
+            if not 200 <= resp.status_code < 400:
+                outcome.fail()
 
         # Log status and a short snippet of the body for troubleshooting.
         # Some tests may patch `requests.get` with a Mock that does not
@@ -82,45 +93,35 @@ def trigger_photo_download(
             % (resp.status_code, body_snippet)
         )
 
-        # Handle different status codes appropriately
+        # Handle different status codes appropriately (the breaker has already
+        # counted anything outside 2xx/3xx as a failure)
         if resp.status_code == 429:
-            # Rate limited - this counts as a failure for circuit breaker
-            circuit_breaker._record_failure()
             logger.warning("Unsplash download tracking rate limited")
             return False
-        elif 200 <= resp.status_code < 300:
-            # Success - reset circuit breaker on success
-            if (
-                hasattr(circuit_breaker, "_state")
-                and circuit_breaker._state.name == "HALF_OPEN"
-            ):
-                circuit_breaker._record_success()
-            return True
-        elif 300 <= resp.status_code < 400:
+        elif 200 <= resp.status_code < 400:
             # Redirects are also considered successful for tracking
-            if (
-                hasattr(circuit_breaker, "_state")
-                and circuit_breaker._state.name == "HALF_OPEN"
-            ):
-                circuit_breaker._record_success()
             return True
         else:
-            # Other errors - record as failure
-            circuit_breaker._record_failure()
             logger.warning(
                 "Unsplash download tracking failed with status: %s", resp.status_code
             )
             return False
 
+    except CircuitBreakerOpenException:
+        logger.warning("Unsplash circuit breaker is open, skipping download tracking")
+        return False
     except Exception as exc:
         # Log exception with stack trace at debug to aid diagnosis without failing
         logger.exception("Failed to call Unsplash download endpoint")
         debug_log("trigger_photo_download: exception=%s" % (exc,))
-        # Record failure for circuit breaker
-        circuit_breaker._record_failure()
         return False
 
 
+def _is_upstream_failure(status_code: int) -> bool:
+    """Statuses that count against the Unsplash breaker (outage or rate limit)."""
+    return status_code >= 500 or status_code == 429
+
+
 def build_attribution_html(photo: Dict) -> str:
     """Return a short HTML attribution snippet for embedding in UI.
 
@@ -146,6 +147,48 @@ def build_attribution_html(photo: Dict) -> str:
     )
 
 
+def demo_photo(photo_id: str) -> Dict:
+    """Deterministic stand-in photo used when Unsplash can't be reached."""
+    return {
+        "id": photo_id,
+        "urls": {
+            "regular": "https://images.unsplash.com/" + photo_id + "?auto=format&fit=crop"
+        },
+        "links": {
+            "html": "https://unsplash.com/photos/" + photo_id,
+            "download": "https://api.unsplash.com/photos/" + photo_id + "/download",
+        },
+        "user": {
+            "name": "Demo Photographer",
+            "links": {"html": "https://unsplash.com/@demo"},
+        },
+    }
+
+
+def meta_result(
+    photo_id: str,
+    photo: Dict,
+    live: bool,
+    etag: Optional[str] = None,
+    random_fallback: bool = False,
+) -> Dict:
+    """The cached photo-meta shape served to clients, from a trimmed photo."""
+    links = photo.get("links") or {}
+    result = {
+        "id": photo.get("id") or photo_id,
+        "urls": photo.get("urls") or {},
+        "links": {"download_location": links.get("download"), "html": links.get("html")},
+        "attribution_html": build_attribution_html(photo),
+        "source": "live" if live else "demo",
+    }
+    if random_fallback:
+        result["random_fallback"] = True
+    # Kept for If-None-Match revalidation
+    if etag:
+        result["etag"] = etag
+    return result
+
+
 def _trim_photo_data(data: Dict) -> Dict:
     """Trim Unsplash photo response to minimal needed fields."""
     return {
@@ -199,7 +242,10 @@ def fetch_photo_meta(
             "fetch_photo_meta: url=%s photo_id=%s timeout=%s"
             % (url, photo_id, timeout)
         )
-        resp = requests.get(url, headers=headers, timeout=timeout)
+        with get_unsplash_circuit_breaker().guard() as outcome:
+            resp = requests.get(url, headers=headers, timeout=timeout)
+            if _is_upstream_failure(resp.status_code):
+                outcome.fail()
 
         # If not 200, log the status and a snippet of the response body
         if resp.status_code == 304:
@@ -240,6 +286,9 @@ def fetch_photo_meta(
 
         # Return both data and etag
         return {"data": trimmed_data, "etag": response_etag}
+    except CircuitBreakerOpenException:
+        logger.warning("Unsplash circuit breaker is open, skipping meta for %s", photo_id)
+        return None
     except Exception:
         # Log the full exception with traceback at warning level
         logger.exception("Exception fetching Unsplash photo meta for %s", photo_id)
@@ -260,7 +309,10 @@ def fetch_random_photo(
     params = {"query": query, "orientation": "landscape", "content_filter": "high"}
     try:
         debug_log("fetch_random_photo: query=%s url=%s" % (query, url))
-        resp = requests.get(url, headers=headers, params=params, timeout=timeout)
+        with get_unsplash_circuit_breaker().guard() as outcome:
+            resp = requests.get(url, headers=headers, params=params, timeout=timeout)
+            if _is_upstream_failure(resp.status_code):
+                outcome.fail()
         if resp.status_code != 200:
             body = str(getattr(resp, "text", "") or "")
             logger.warning(
@@ -277,23 +329,105 @@ def fetch_random_photo(
         data = resp.json()
         # Trim to needed fields only
         return _trim_photo_data(data)
+    except CircuitBreakerOpenException:
+        logger.warning("Unsplash circuit breaker is open, skipping random photo")
+        return None
     except Exception:
         logger.exception("Exception fetching Unsplash random photo for query=%s", query)
         return None
 
 
-async def fetch_photo_meta_async(photo_id: str, access_key: str) -> Optional[Dict]:
-    """Async version of fetch_photo_meta using httpx with retry logic."""
-    if not photo_id or not access_key:
+def _budget_denied(priority: Optional[str]) -> bool:
+    """Spend one Unsplash request at `priority` (None: the caller already did)."""
+    if priority is None or upstream_budget.get_budget("unsplash").acquire(priority):
+        return False
+    logger.info("Unsplash budget low, skipping %s call", priority)
+    return True
+
+
+async def _observed_get(url: str, **kwargs) -> httpx.Response:
+    """async_get that feeds the response's rate-limit headers to the budget."""
+    budget = upstream_budget.get_budget("unsplash")
+    try:
+        resp = await async_get(url, **kwargs)
+    except httpx.HTTPStatusError as exc:
+        budget.observe(exc.response.status_code, exc.response.headers)
+        raise
+    budget.observe(resp.status_code, resp.headers)
+    return resp
+
+
+async def trigger_photo_download_async(
+    download_location: str,
+    access_key: str,
+    timeout: float = 5.0,
+    priority: Optional[str] = upstream_budget.TRACKING,
+) -> bool:
+    """Async version of trigger_photo_download on the pooled httpx client."""
+    if not download_location or not access_key:
+        logger.debug(
+            "trigger_photo_download_async called with empty download_location "
+            "or access_key"
+        )
+        return False
+    if _budget_denied(priority):
+        return False
+    headers = {"Authorization": f"Client-ID {access_key}", "Accept-Version": "v1"}
+    try:
+        debug_log(f"trigger_photo_download_async: url={download_location}")
+        with get_unsplash_circuit_breaker().guard() as outcome:
+            resp = await _observed_get(
+                download_location, headers=headers, timeout=timeout
+            )
+            if not 200 <= resp.status_code < 400:
+                outcome.fail()
+        debug_log(f"trigger_photo_download_async: status={resp.status_code}")
+        if 200 <= resp.status_code < 400:
+            return True
+        logger.warning(
+            "Unsplash download tracking failed with status: %s", resp.status_code
+        )
+        return False
+    except CircuitBreakerOpenException:
+        logger.warning("Unsplash circuit breaker is open, skipping download tracking")
+        return False
+    except Exception as exc:
+        logger.warning("Failed to call Unsplash download endpoint: %s", exc)
+        debug_log(f"trigger_photo_download_async: exception={exc}")
+        return False
+
+
+async def fetch_photo_meta_async(
+    photo_id: str,
+    access_key: str,
+    timeout: float = 5.0,
+    etag: Optional[str] = None,
+    priority: str = upstream_budget.META,
+) -> Optional[Dict]:
+    """Async version of fetch_photo_meta using httpx with retry logic.
+
+    Returns {"data", "etag"} like fetch_photo_meta. When `etag` is given and
+    Unsplash answers 304, returns {"data": None, "etag": etag,
+    "not_modified": True} so the caller can keep its copy.
+    """
+    if not photo_id or not access_key or _budget_denied(priority):
         return None
     url = f"https://api.unsplash.com/photos/{photo_id}"
     headers = {"Authorization": f"Client-ID {access_key}", "Accept-Version": "v1"}
+    if etag:
+        headers["If-None-Match"] = etag
     try:
         logger.debug(
             "Fetching Unsplash photo meta async: url=%s, photo_id=%s", url, photo_id
         )
         debug_log(f"fetch_photo_meta_async: url={url} photo_id={photo_id}")
-        resp = await async_get(url, headers=headers)
+        with get_unsplash_circuit_breaker().guard() as outcome:
+            resp = await _observed_get(url, headers=headers, timeout=timeout)
+            if _is_upstream_failure(resp.status_code):
+                outcome.fail()
+        if resp.status_code == 304 and etag:
+            debug_log(f"fetch_photo_meta_async: not_modified photo_id={photo_id}")
+            return {"data": None, "etag": etag, "not_modified": True}
         if resp.status_code != 200:
             logger.warning(
                 "Unsplash meta fetch failed %s for %s: %s",
@@ -319,7 +453,10 @@ async def fetch_photo_meta_async(photo_id: str, access_key: str) -> Optional[Dic
             f"fetch_photo_meta_async: success id={photo_id} "
             f"keys={list(data.keys())}"
         )
-        return _trim_photo_data(data)
+        return {"data": _trim_photo_data(data), "etag": resp.headers.get("ETag")}
+    except CircuitBreakerOpenException:
+        logger.warning("Unsplash circuit breaker is open, skipping meta for %s", photo_id)
+        return None
     except Exception:
         logger.exception(
             "Exception fetching Unsplash photo meta async for %s", photo_id
@@ -327,16 +464,26 @@ async def fetch_photo_meta_async(photo_id: str, access_key: str) -> Optional[Dic
         return None
 
 
-async def fetch_random_photo_async(query: str, access_key: str) -> Optional[Dict]:
+async def fetch_random_photo_async(
+    query: str,
+    access_key: str,
+    timeout: float = 5.0,
+    priority: str = upstream_budget.RANDOM,
+) -> Optional[Dict]:
     """Async version of fetch_random_photo using httpx with retry logic."""
-    if not query or not access_key:
+    if not query or not access_key or _budget_denied(priority):
         return None
     url = "https://api.unsplash.com/photos/random"
     headers = {"Authorization": f"Client-ID {access_key}", "Accept-Version": "v1"}
     params = {"query": query, "orientation": "landscape", "content_filter": "high"}
     try:
         debug_log(f"fetch_random_photo_async: query={query} url={url}")
-        resp = await async_get(url, headers=headers, params=params)
+        with get_unsplash_circuit_breaker().guard() as outcome:
+            resp = await _observed_get(
+                url, headers=headers, params=params, timeout=timeout
+            )
+            if _is_upstream_failure(resp.status_code):
+                outcome.fail()
         if resp.status_code != 200:
             logger.warning(
                 "Unsplash random fetch failed %s for query=%s: %s",
@@ -351,6 +498,9 @@ async def fetch_random_photo_async(query: str, access_key: str) -> Optional[Dict
             return None
         data = resp.json()
         return _trim_photo_data(data)
+    except CircuitBreakerOpenException:
+        logger.warning("Unsplash circuit breaker is open, skipping random photo")
+        return None
     except Exception:
         logger.exception(
             "Exception fetching Unsplash random photo async for query=%s", query
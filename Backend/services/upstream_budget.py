@@ -0,0 +1,194 @@
+"""Shared request budgets for rate-limited upstreams (Unsplash, Mapbox).
+
+Unsplash demo keys allow about 50 requests an hour and Mapbox has its own
+per-minute quota. Until now every caller spent that allowance blindly and
+found out only from a 429. An `UpstreamBudget` keeps a live estimate of
+what is left:
+
+- each call spends one request from the local estimate;
+- each response corrects it from the provider's rate-limit headers
+  (Unsplash `X-Ratelimit-Limit`/`X-Ratelimit-Remaining`, Mapbox
+  `X-Rate-Limit-Limit`/`X-Rate-Limit-Interval`/`X-Rate-Limit-Reset`);
+- a 429 empties it until `Retry-After` (or the end of the window).
+
+Calls have a priority, highest first: `meta` (a user is waiting for the
+photo), `prewarm` (background refresh), `random` (fallback photo) and
+`tracking` (download pings, which can wait). Every priority but `meta`
+keeps a reserve: it is only allowed while more than that fraction of the
+limit remains, so low-priority work stops first as the budget runs low and
+the last requests of a window go to users. Callers drop a denied call
+(returning their usual "no data" value) or defer it until `wait_time()`.
+
+Usage is exported as `upstream.<name>.remaining` and `.limit` gauges and
+`upstream.<name>.calls.<priority>` / `.denied.<priority>` counters.
+
+Configuration:
+    UNSPLASH_BUDGET_PER_HOUR: assumed Unsplash limit until headers say
+        otherwise (default 50)
+    MAPBOX_BUDGET_PER_MIN: assumed Mapbox limit per minute (default 600)
+    UPSTREAM_RESERVE_PREWARM: fraction kept back from prewarm (default 0.2)
+    UPSTREAM_RESERVE_RANDOM: fraction kept back from random (default 0.3)
+    UPSTREAM_RESERVE_TRACKING: fraction kept back from tracking (default 0.5)
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+from Backend.services import metrics
+
+logger = logging.getLogger(__name__)
+
+META = "meta"
+PREWARM = "prewarm"
+RANDOM = "random"
+TRACKING = "tracking"
+PRIORITIES = (META, PREWARM, RANDOM, TRACKING)
+
+DEFAULT_RESERVES = {META: 0.0, PREWARM: 0.2, RANDOM: 0.3, TRACKING: 0.5}
+
+
+def _header_float(headers: Mapping[str, str], *names: str) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+class UpstreamBudget:
+    """Remaining-request estimate for one upstream, shared by all callers."""
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        window_sec: float,
+        reserves: Optional[Dict[str, float]] = None,
+    ):
+        self.name = name
+        self.limit = max(1, limit)
+        self.window_sec = window_sec
+        self.reserves = dict(DEFAULT_RESERVES, **(reserves or {}))
+        self.remaining = self.limit
+        # Wall-clock end of the current window; 0 until the first call
+        self.reset_at = 0.0
+        self._lock = threading.Lock()
+        self._gauges()
+
+    def _gauges(self) -> None:
+        metrics.set_gauge(f"upstream.{self.name}.remaining", self.remaining)
+        metrics.set_gauge(f"upstream.{self.name}.limit", self.limit)
+
+    def _refill(self, now: float) -> None:
+        if self.reset_at and now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = 0.0
+
+    def floor(self, priority: str) -> int:
+        """Requests kept back from `priority`."""
+        return math.ceil(self.limit * self.reserves.get(priority, 0.0))
+
+    def wait_time(self, priority: str) -> float:
+        """0 if a `priority` call may go now, else seconds until the refill."""
+        now = time.time()
+        with self._lock:
+            self._refill(now)
+            if self.remaining > self.floor(priority):
+                return 0.0
+            if not self.reset_at:
+                return self.window_sec
+            return max(self.reset_at - now, 1.0)
+
+    def acquire(self, priority: str) -> bool:
+        """Spend one request for a `priority` call; False if it should not go."""
+        if self.wait_time(priority):
+            metrics.incr(f"upstream.{self.name}.denied.{priority}")
+            return False
+        with self._lock:
+            self.remaining -= 1
+            if not self.reset_at:
+                self.reset_at = time.time() + self.window_sec
+        metrics.incr(f"upstream.{self.name}.calls.{priority}")
+        self._gauges()
+        return True
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Correct the estimate from a response's rate-limit headers."""
+        now = time.time()
+        headers = {k.lower(): v for k, v in headers.items()}
+        limit = _header_float(headers, "x-ratelimit-limit", "x-rate-limit-limit")
+        remaining = _header_float(
+            headers, "x-ratelimit-remaining", "x-rate-limit-remaining"
+        )
+        interval = _header_float(headers, "x-rate-limit-interval")
+        reset = _header_float(headers, "x-rate-limit-reset")
+        with self._lock:
+            if limit and limit > 0:
+                self.limit = int(limit)
+                self.remaining = min(self.remaining, self.limit)
+            if interval and interval > 0:
+                self.window_sec = interval
+            if remaining is not None:
+                self.remaining = max(0, min(int(remaining), self.limit))
+            if reset and reset > now:
+                self.reset_at = reset
+            elif not self.reset_at:
+                self.reset_at = now + self.window_sec
+            if status_code == 429:
+                self.remaining = 0
+                retry_after = _header_float(headers, "retry-after")
+                if retry_after and retry_after > 0:
+                    self.reset_at = now + retry_after
+                elif self.reset_at <= now:
+                    self.reset_at = now + self.window_sec
+                logger.warning("%s rate limit hit; budget empty until reset", self.name)
+        self._gauges()
+
+
+_budgets: Dict[str, UpstreamBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def _reserves_from_env() -> Dict[str, float]:
+    reserves = {}
+    for priority in (PREWARM, RANDOM, TRACKING):
+        raw = os.environ.get(f"UPSTREAM_RESERVE_{priority.upper()}")
+        if raw:
+            try:
+                reserves[priority] = min(1.0, max(0.0, float(raw)))
+            except ValueError:
+                logger.warning("Ignoring non-numeric UPSTREAM_RESERVE_%s", priority.upper())
+    return reserves
+
+
+def _from_env(name: str) -> UpstreamBudget:
+    if name == "mapbox":
+        limit, window = int(os.environ.get("MAPBOX_BUDGET_PER_MIN", "600")), 60.0
+    else:
+        limit, window = int(os.environ.get("UNSPLASH_BUDGET_PER_HOUR", "50")), 3600.0
+    return UpstreamBudget(name, limit, window, _reserves_from_env())
+
+
+def get_budget(name: str) -> UpstreamBudget:
+    """Get (or create) the budget for an upstream ("unsplash", "mapbox")."""
+    budget = _budgets.get(name)
+    if budget is None:
+        with _budgets_lock:
+            budget = _budgets.get(name)
+            if budget is None:
+                budget = _budgets[name] = _from_env(name)
+    return budget
+
+
+def reset_budgets() -> None:
+    """Drop every budget (tests, config reloads)."""
+    with _budgets_lock:
+        _budgets.clear()
@@ -1,12 +1,21 @@
 import logging
 import os
-from typing import List, Tuple, TypedDict
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TypedDict
 
 import httpx
 from tenacity import before_sleep_log, retry, stop_after_attempt, wait_random
 
 from Backend.models.errors import UpstreamError
-from Backend.utils.cache_inproc import InProcessCache
+from Backend.utils.cache_inproc import CacheEntry, InProcessCache
+from Backend.utils.circuit_breaker import (
+    CircuitBreakerOpenException,
+    get_weather_circuit_breaker,
+)
+from Backend.utils.external_cache import cache_backend_for, register_cache
+from Backend.utils.peer_cache import get_peer_cache, register_loader
 
 
 # Backwards-compatible alias expected by some tests
@@ -35,10 +44,12 @@ class WeatherSlot(TypedDict):
     stop=stop_after_attempt(2),
     wait=wait_random(min=0.2, max=0.4),
     before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True,
 )
 async def fetch_weather_raw(lat: float, lon: float) -> dict:
+    base_url = os.getenv("WEATHER_BASE_URL", "https://api.open-meteo.com/v1/forecast")
     url = (
-        "https://api.open-meteo.com/v1/forecast"
+        f"{base_url}"
         f"?latitude={lat}&longitude={lon}"
         "&hourly=cloudcover,temperature_2m"
         "&temperature_unit=fahrenheit"
@@ -80,21 +91,228 @@ def parse_weather(payload: dict) -> List[WeatherSlot]:
     return out
 
 
-_weather_cache = InProcessCache(maxsize=256, default_ttl=1200, default_swr=600)
+_weather_cache = register_cache(
+    "weather", InProcessCache(maxsize=256, default_ttl=1200, default_swr=600)
+)
+
+
+class LastKnownGood:
+    """Bounded LRU of the last successful forecast per key (stale-if-error).
+
+    Unlike the main cache it keeps forecasts past TTL + SWR (up to `max_age`),
+    so an upstream outage serves an old forecast instead of nothing. It also
+    remembers which keys are currently failing so hits on their short-lived
+    fallback entries can be reported as stale.
+    """
+
+    def __init__(self, maxsize: int = 1024, max_age: float = 21600):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self._items: "OrderedDict[str, Tuple[List[WeatherSlot], float]]" = OrderedDict()
+        self._failing: Dict[str, float] = {}
+        self._lock = Lock()
+
+    def put(self, key: str, slots: List[WeatherSlot]) -> None:
+        with self._lock:
+            self._items[key] = (slots, time.time())
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+            self._failing.pop(key, None)
+
+    def get(self, key: str) -> Optional[List[WeatherSlot]]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if time.time() - item[1] > self.max_age:
+                del self._items[key]
+                return None
+            return item[0]
+
+    def mark_failed(self, key: str, ttl: float) -> None:
+        with self._lock:
+            self._failing[key] = time.time() + ttl
+            if len(self._failing) > self.maxsize:
+                now = time.time()
+                for k in [k for k, until in self._failing.items() if until <= now]:
+                    del self._failing[k]
+
+    def is_failing(self, key: str) -> bool:
+        with self._lock:
+            until = self._failing.get(key)
+            if until is None:
+                return False
+            if until <= time.time():
+                del self._failing[key]
+                return False
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._failing.clear()
+
+
+_last_known_good = LastKnownGood(
+    maxsize=int(os.getenv("WEATHER_LKG_MAXSIZE", "1024")),
+    max_age=float(os.getenv("WEATHER_LKG_MAX_AGE_SEC", "21600")),
+)
+
+
+def _weather_key(lat: float, lon: float) -> str:
+    return f"wx:{round(lat,4)}:{round(lon,4)}"
+
+
+async def prefetch_weather(coords: Iterable[Tuple[float, float]]) -> int:
+    """Warm the local cache for many coordinates with one batched L2 read.
+
+    With a shared L2 configured, forecasts other instances already fetched
+    are pulled in a single MGET (instead of one round trip per candidate)
+    and copied into the in-process cache, so the per-candidate lookups in
+    `rank` are local hits. Returns the number of keys found.
+    """
+    keys = [_weather_key(lat, lon) for lat, lon in coords]
+    if not keys:
+        return 0
+    try:
+        found = await cache_backend_for(_weather_cache).get_many(keys)
+    except Exception:
+        logger.debug("Weather prefetch failed", exc_info=True)
+        return 0
+    return sum(1 for _, status in found.values() if status != "miss")
+
+
+def peek_weather(lat: float, lon: float) -> Optional[Tuple[List[WeatherSlot], bool]]:
+    """Forecast already held locally, without any upstream call.
+
+    Returns (slots, fresh) from the in-process cache or the last known good
+    store, or None. Used by degraded ranking modes.
+    """
+    key = _weather_key(lat, lon)
+    entry = _weather_cache.peek(key)
+    if entry is not None and entry.value and not entry.should_evict:
+        return entry.value, entry.is_fresh and not _last_known_good.is_failing(key)
+    good = _last_known_good.get(key)
+    return (good, False) if good else None
+
+
+async def _serve_on_error(key: str) -> Tuple[List[WeatherSlot], str]:
+    """Fallback after an upstream failure: last known good forecast, else [].
+
+    The fallback is negatively cached in-process only, with its own short TTL
+    and no SWR, so the upstream is probed again soon and the shared L2 never
+    holds it.
+    """
+    error_ttl = int(os.getenv("WEATHER_ERROR_TTL_SEC", "60"))
+    good = _last_known_good.get(key)
+    _last_known_good.mark_failed(key, error_ttl)
+    await _weather_cache.set(key, good if good is not None else [], error_ttl, 0)
+    if good is None:
+        logger.warning("Weather fetch failed for %s and no forecast to fall back to", key)
+        return [], "error"
+    logger.warning("Weather fetch failed for %s, serving last known good forecast", key)
+    return good, "stale"
 
 
 async def get_weather_cached(lat: float, lon: float) -> Tuple[List[WeatherSlot], str]:
-    key = f"wx:{round(lat,4)}:{round(lon,4)}"
+    """Cached forecast slots for a location plus a status.
+
+    Status is "cached" for normal results, "stale" when a last known good
+    forecast is served during an upstream outage, and "error" when the
+    upstream failed and nothing is known for this location (empty slots).
+    """
+    key = _weather_key(lat, lon)
     ttl = int(os.getenv("WEATHER_TTL_SEC", "1200"))
     swr = int(os.getenv("WEATHER_STALE_REVAL_SEC", "600"))
+    backend = cache_backend_for(_weather_cache)
+
+    # Peer mode: a non-owner asks the key's owner instead of going upstream
+    peers = get_peer_cache()
+    if peers is not None and peers.should_forward(key):
+        value, status = await backend.get_status(key)
+        if status == "hit_fresh":
+            return _hit(key, value)
+        entry = await peers.fetch("weather", key)
+        if entry is not None:
+            return await _adopt_from_peer(key, entry)
 
     async def producer():
         try:
-            raw = await fetch_weather_raw(lat, lon)
-            return parse_weather(raw)
-        except UpstreamError:
-            logger.warning("Weather fetch failed, returning empty slots as fallback")
-            return []
+            # Outside the retry loop: an open circuit fails fast, no retry sleeps
+            raw = await get_weather_circuit_breaker().call(fetch_weather_raw, lat, lon)
+        except CircuitBreakerOpenException as e:
+            raise UpstreamError("Weather circuit breaker is open") from e
+        slots = parse_weather(raw)
+        _last_known_good.put(key, slots)
+        return slots
+
+    # Layered over the shared L2 when configured so instances share forecasts
+    try:
+        value = await backend.get_or_set(key, producer, ttl, swr)
+    except UpstreamError:
+        return await _serve_on_error(key)
+    return _hit(key, value)
 
-    value = await _weather_cache.get_or_set(key, producer, ttl, swr)
+
+def _hit(key: str, value: Any) -> Tuple[List[WeatherSlot], str]:
+    if _last_known_good.is_failing(key):
+        # Hit on a negatively cached fallback entry
+        return value, "stale" if value else "error"
     return value, "cached"
+
+
+async def _adopt_from_peer(
+    key: str, entry: CacheEntry
+) -> Tuple[List[WeatherSlot], str]:
+    """Store a forecast served by the key's owner; returns (slots, status).
+
+    The owner sends its status along with the slots (see `_load_for_peer`),
+    so a fallback it served during its upstream outage is reported as
+    stale or error here too, not as a normal result.
+    """
+    payload = entry.value
+    if isinstance(payload, dict):
+        slots, status = payload.get("slots") or [], payload.get("status", "cached")
+    else:
+        slots, status = payload or [], "cached"
+    if status != "cached" and not slots:
+        # The owner had nothing to fall back to: try our own last known good
+        return await _serve_on_error(key)
+    await _weather_cache.set(
+        key, slots, entry.ttl_seconds, entry.swr_seconds, created_at=entry.created_at
+    )
+    if status != "cached":
+        # Flag hits on it until the owner's short error TTL runs out
+        _last_known_good.mark_failed(
+            key, max(0.0, entry.created_at + entry.ttl_seconds - time.time())
+        )
+    return slots, status
+
+
+async def _load_for_peer(key: str) -> CacheEntry:
+    """Owner side of peer fill: load a `wx:<lat>:<lon>` key through the cache.
+
+    The entry's value is `{"slots": [...], "status": "cached"|"stale"|"error"}`.
+    """
+    _, lat, lon = key.split(":")
+    value, status = await get_weather_cached(float(lat), float(lon))
+    entry = _weather_cache.peek(key)
+    if entry is None:
+        if status != "cached":
+            ttl, swr = int(os.getenv("WEATHER_ERROR_TTL_SEC", "60")), 0
+        else:
+            ttl = int(os.getenv("WEATHER_TTL_SEC", "1200"))
+            swr = int(os.getenv("WEATHER_STALE_REVAL_SEC", "600"))
+        entry = CacheEntry(value, time.time(), ttl, swr)
+    # Keeps the stored freshness (a fallback's short error TTL included) and
+    # sends the status along, so the caller can tell a fallback apart
+    return CacheEntry(
+        value={"slots": value, "status": status},
+        created_at=entry.created_at,
+        ttl_seconds=entry.ttl_seconds,
+        swr_seconds=entry.swr_seconds,
+    )
+
+
+register_loader("weather", _load_for_peer)
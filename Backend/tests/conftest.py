@@ -43,3 +43,23 @@ def enable_sync_cache_refresh():
         os.environ.pop("CACHE_REFRESH_SYNC", None)
     else:
         os.environ["CACHE_REFRESH_SYNC"] = prev
+
+
+@pytest.fixture(autouse=True)
+def reset_degradation_state():
+    """Give each test closed circuit breakers, full upstream budgets and fresh
+    ranking-mode and admission controllers, so overload in one test can't
+    degrade the next."""
+    from Backend.middleware import admission
+    from Backend.services import degradation, upstream_budget
+    from Backend.utils import circuit_breaker
+
+    circuit_breaker.reset_breakers()
+    upstream_budget.reset_budgets()
+    degradation._controller = None
+    admission._controller = None
+    yield
+    circuit_breaker.reset_breakers()
+    upstream_budget.reset_budgets()
+    degradation._controller = None
+    admission._controller = None
@@ -0,0 +1,140 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from Backend.middleware import admission
+from Backend.middleware.admission import AdmissionController, AdmissionMiddleware, Shed
+from Backend.routers.recommend import is_cached_request
+from Backend.services import metrics, weather
+from Backend.services.locations import nearby
+
+
+def _cancel(tasks):
+    for task in tasks:
+        task.cancel()
+
+
+async def test_queue_hands_over_slots_and_sheds_standing_queue():
+    ctl = AdmissionController(
+        max_inflight=2, max_queue=10, target_s=0.01, interval_s=0.02, max_wait_s=1.0
+    )
+    assert await ctl.acquire() == 0.0
+    assert await ctl.acquire() == 0.0
+
+    # Queued requests get a slot when a running one finishes
+    waiters = [asyncio.create_task(ctl.acquire()) for _ in range(3)]
+    arrival = None
+    try:
+        await asyncio.sleep(0.03)
+        assert ctl.queued == 3
+        ctl.release()
+        assert await asyncio.wait_for(waiters[0], 1) >= 0.03
+        assert not ctl.overloaded  # above target, but not for a whole interval yet
+
+        # Still above target an interval later: overloaded. The standing queue
+        # is dropped from the head and new arrivals are shed without queueing.
+        await asyncio.sleep(0.03)
+        ctl.release()
+        arrival = asyncio.create_task(ctl.acquire())
+        for task in (waiters[1], waiters[2], arrival):
+            with pytest.raises(Shed, match="overload"):
+                await asyncio.wait_for(task, 1)
+        assert ctl.overloaded and ctl.inflight == 1 and ctl.queued == 0
+    finally:
+        _cancel(waiters + [arrival] if arrival else waiters)
+
+    # Once requests start without queueing, admission resumes
+    ctl.release()
+    assert await ctl.acquire() == 0.0 and not ctl.overloaded
+
+
+async def test_queue_limits_and_max_wait():
+    ctl = AdmissionController(max_inflight=1, max_queue=1, max_wait_s=0.02)
+    await ctl.acquire()
+    waiter = asyncio.create_task(ctl.acquire())
+    try:
+        await asyncio.sleep(0)
+        with pytest.raises(Shed, match="queue_full"):
+            await ctl.acquire()
+        with pytest.raises(Shed, match="timeout"):
+            await asyncio.wait_for(waiter, 1)
+    finally:
+        waiter.cancel()
+    assert ctl.queued == 0 and ctl.inflight == 1
+
+
+async def test_middleware_sheds_fast_and_always_admits_health(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(
+        admission,
+        "_controller",
+        AdmissionController(max_inflight=2, max_queue=0, fast_max_inflight=1),
+    )
+    release = asyncio.Event()
+
+    async def slow(request):
+        # Cache hits answer at once; full rankings wait for the test
+        if request.query_params.get("cached") != "1":
+            await release.wait()
+        return PlainTextResponse("ranked")
+
+    async def health(request):
+        return PlainTextResponse("ok")
+
+    inner = Starlette(routes=[Route("/recommend", slow), Route("/health", health)])
+    app = AdmissionMiddleware(
+        inner, fast_paths={"/recommend": lambda q: q.get("cached") == "1"}
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+        running = [asyncio.create_task(client.get("/recommend")) for _ in range(2)]
+        try:
+            await asyncio.sleep(0.01)
+
+            shed = await asyncio.wait_for(client.get("/recommend"), 1)
+            assert shed.status_code == 503
+            assert shed.headers["Retry-After"] == "1"
+            assert shed.json()["error"] == "overloaded"
+            health = await asyncio.wait_for(client.get("/health"), 1)
+            assert health.status_code == 200
+            cached = await asyncio.wait_for(client.get("/recommend?cached=1"), 1)
+            assert cached.status_code == 200
+
+            # The fast lane has its own budget
+            admission._controller.fast_inflight = 1
+            lane_full = await asyncio.wait_for(client.get("/recommend?cached=1"), 1)
+            assert lane_full.status_code == 503
+            admission._controller.fast_inflight = 0
+
+            release.set()
+            done = await asyncio.wait_for(asyncio.gather(*running), 1)
+            assert [r.status_code for r in done] == [200, 200]
+        finally:
+            release.set()
+            _cancel(running)
+
+    counters = metrics.get_metrics()
+    assert counters["admission.shed.queue_full"] == 1
+    assert counters["admission.fast_path"] == 1
+    assert counters["admission.shed.fast_lane_full"] == 1
+    assert counters["admission.inflight"] == 0
+
+
+async def test_cached_request_fast_path(monkeypatch):
+    monkeypatch.delenv("DEV_BYPASS_SCORING", raising=False)
+    monkeypatch.setenv("WEATHER_FANOUT_MAX_CANDIDATES", "3")
+    weather._weather_cache.clear()
+    params = {"lat": "46.8", "lon": "-121.7", "radius": "100"}
+    assert not is_cached_request(params)
+    assert not is_cached_request({"lat": "x"})
+
+    slots = [{"ts_local": "2025-06-01T10:00", "cloud_pct": 0, "temp_f": 70.0}]
+    for c in nearby(46.8, -121.7, 100)[:3]:
+        key = weather._weather_key(c["lat"], c["lon"])
+        await weather._weather_cache.set(key, slots, 600)
+    assert is_cached_request(params)
+    weather._weather_cache.clear()
@@ -28,3 +28,78 @@ def test_beta_gate_enforced(monkeypatch):
     # Health endpoint is exempt
     r = client.get("/health")
     assert r.status_code == 200
+
+
+def test_per_key_quota_and_recommend_concurrency(monkeypatch):
+    from Backend.main import app
+    from Backend.middleware.beta_keys import get_beta_key_table, key_id
+    from Backend.services import metrics
+
+    metrics.reset()
+    monkeypatch.setenv("BETA_KEYS", "noisy:2:1, quiet")
+    client = TestClient(app)
+    noisy = {"X-Beta-Key": "noisy"}
+
+    assert client.get("/internal/version", headers=noisy).status_code == 200
+    assert client.get("/internal/version", headers=noisy).status_code == 200
+    r = client.get("/internal/version", headers=noisy)
+    assert r.status_code == 429
+    assert r.json()["error"] == "beta_key_quota"
+    assert int(r.headers["Retry-After"]) >= 1
+    # Other testers keep their own budget
+    quiet = {"X-Beta-Key": "quiet"}
+    assert client.get("/internal/version", headers=quiet).status_code == 200
+
+    # Concurrency: occupy quiet's /recommend slots, then one more is refused
+    entry = get_beta_key_table().get("quiet")
+    assert entry.limits == (120, 4)
+    for _ in range(4):
+        assert entry.enter()
+    r = client.get("/recommend?lat=47.6&lon=-122.3", headers=quiet)
+    assert r.status_code == 429 and r.json()["error"] == "beta_key_concurrency"
+    for _ in range(4):
+        entry.leave()
+
+    counters = metrics.get_metrics()
+    assert counters[f"beta.{key_id('noisy')}.requests"] == 3
+    assert counters[f"beta.{key_id('noisy')}.rejected_quota"] == 1
+    assert counters[f"beta.{key_id('quiet')}.rejected_concurrency"] == 1
+    assert "quiet" not in "".join(counters)
+
+
+def test_key_table_recompiles_only_on_change(monkeypatch):
+    from Backend.middleware.beta_keys import get_beta_key_table
+
+    monkeypatch.setenv("BETA_KEYS", "a:1,b")
+    table = get_beta_key_table()
+    assert get_beta_key_table() is table
+    a = table.get("a")
+    a.take_quota()
+
+    monkeypatch.setenv("BETA_KEYS", "a:1,b:5,c")
+    updated = get_beta_key_table()
+    assert updated is not table and set(updated.keys) == {"a", "b", "c"}
+    # Unchanged limits keep their live state (quota already spent)
+    assert updated.get("a") is a and a.take_quota() > 0
+    assert updated.get("b").limits[0] == 5
+
+    monkeypatch.setenv("BETA_KEYS", "")
+    assert get_beta_key_table() is None
+
+
+def test_key_parsing_skips_malformed_entries(monkeypatch, caplog):
+    from Backend.middleware.beta_keys import get_beta_key_table, key_id
+
+    monkeypatch.setenv("BETA_KEY_RATE_PER_MIN", "60")
+    monkeypatch.setenv(
+        "BETA_KEYS", "org:alpha:30, plain, beta::2, :5, gamma:-1, delta:1.5:2, x:y"
+    )
+    table = get_beta_key_table()
+    assert set(table.keys) == {"org:alpha", "plain", "beta", "x:y"}
+    assert table.get("org:alpha").limits == (30, 4)
+    assert table.get("beta").limits == (60, 2)
+    assert table.get("x:y").limits == (60, 4)
+
+    skipped = [r.getMessage() for r in caplog.records if "malformed" in r.getMessage()]
+    assert len(skipped) == 3
+    assert key_id("gamma:-1") in "".join(skipped) and "gamma" not in "".join(skipped)
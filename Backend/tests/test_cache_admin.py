@@ -0,0 +1,98 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from freezegun import freeze_time
+
+from Backend.main import app
+from Backend.utils import external_cache as ec
+from Backend.utils.cache_inproc import InProcessCache
+
+
+async def test_prefix_index_tracks_sets_deletes_and_evictions():
+    cache = InProcessCache(maxsize=3, default_ttl=60, default_swr=30)
+    await cache.set("wx:1:1", 1)
+    await cache.set("wx:2:2", 2)
+    await cache.set("geocode:x", 3)
+    assert sorted(cache.keys("wx:")) == ["wx:1:1", "wx:2:2"]
+    # A prefix shorter than the namespace still finds its bucket
+    assert sorted(cache.keys("w")) == ["wx:1:1", "wx:2:2"]
+
+    await cache.set("plain", 4)  # evicts LRU wx:1:1
+    assert cache.keys("wx:") == ["wx:2:2"]
+    assert cache.delete_prefix("wx:") == 1
+    assert cache.keys("wx") == []
+    assert "wx" not in cache._buckets
+    assert sorted(cache.keys()) == ["geocode:x", "plain"]
+
+
+async def test_report_counts_rates_ages_and_hot_keys():
+    cache = InProcessCache(maxsize=50, default_ttl=60, default_swr=600)
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        await cache.set("wx:1:1", [1, 2, 3])
+        await cache.set("wx:2:2", [4])
+        frozen.tick(delta=120)
+        await cache.set("geocode:x", {"lat": 1})
+        for _ in range(3):
+            await cache.get_status("geocode:x")
+        await cache.get_status("wx:1:1")  # stale hit
+        await cache.get_status("wx:9:9")  # miss
+
+        report = cache.report(top_n=2)
+
+    wx = report["namespaces"]["wx"]
+    assert wx["count"] == 2 and wx["stale"] == 2
+    assert wx["bytes"] == len("[1,2,3]") + len("[4]")
+    assert wx["age_histogram"]["1-5m"] == 2
+    assert wx["stale_rate"] == 0.5 and wx["miss_rate"] == 0.5
+    geo = report["namespaces"]["geocode"]
+    assert geo["hit_rate"] == 1.0 and geo["age_histogram"]["<1m"] == 1
+    assert [h["key"] for h in report["hot_keys"]] == ["geocode:x", "wx:1:1"]
+
+    # clear() starts the per-namespace counters over too
+    cache.clear()
+    assert cache.report()["namespaces"] == {}
+
+
+def test_admin_endpoints_report_inspect_and_purge(monkeypatch):
+    cache = InProcessCache(maxsize=50, default_ttl=60, default_swr=30)
+    monkeypatch.setitem(ec._named_caches, "admintest", cache)
+    monkeypatch.delenv("BETA_KEYS", raising=False)
+    monkeypatch.delenv("CACHE_ADMIN_TOKEN", raising=False)
+    client = TestClient(app)
+    # No token configured: the admin API is off, not open
+    assert client.get("/internal/cache").status_code == 404
+    assert client.delete("/internal/cache", params={"prefix": "wx:"}).status_code == 404
+    monkeypatch.setenv("CACHE_ADMIN_TOKEN", "s3cret")
+
+    async def fill():
+        await cache.set("wx:1:1", [1])
+        await cache.set("wx:2:2", [2])
+        await cache.set("geocode:y", "y")
+
+    asyncio.run(fill())
+    headers = {"X-Admin-Token": "s3cret"}
+
+    assert client.get("/internal/cache").status_code == 403
+    overview = client.get("/internal/cache", headers=headers).json()
+    assert overview["caches"]["admintest"]["namespaces"]["wx"]["count"] == 2
+
+    keys = client.get(
+        "/internal/cache/admintest/keys", params={"prefix": "wx:"}, headers=headers
+    ).json()
+    assert keys["keys"] == ["wx:1:1", "wx:2:2"]
+    entry = client.get(
+        "/internal/cache/admintest/entry", params={"key": "geocode:y"}, headers=headers
+    ).json()
+    assert entry["value"] == "y" and entry["fresh"] is True
+
+    assert client.delete("/internal/cache", headers=headers).status_code == 400
+    purged = client.delete(
+        "/internal/cache",
+        params={"prefix": "wx:", "cache": "admintest"},
+        headers=headers,
+    ).json()
+    assert purged["removed"] == 2
+    assert cache.keys() == ["geocode:y"]
+    assert (
+        client.get("/internal/cache/missing/keys", headers=headers).status_code == 404
+    )
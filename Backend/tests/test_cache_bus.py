@@ -0,0 +1,132 @@
+import pytest
+from freezegun import freeze_time
+
+from Backend.utils import cache_bus
+from Backend.utils import external_cache as ec
+from Backend.utils.cache import cached
+from Backend.utils.cache_bus import InMemoryBusHub, InMemoryCacheBus
+from Backend.utils.cache_inproc import InProcessCache
+from Backend.utils.external_cache import InProcCacheBackend
+
+
+def _node(hub):
+    """One 'instance': its own weather cache and bus on a shared hub."""
+    caches = {"weather": InProcessCache(maxsize=50, default_ttl=60, default_swr=30)}
+    return caches["weather"], InMemoryCacheBus(hub=hub, caches=lambda: caches)
+
+
+async def _connected(n):
+    hub = InMemoryBusHub()
+    nodes = [_node(hub) for _ in range(n)]
+    for _, bus in nodes:
+        await bus.start()
+    return nodes
+
+
+async def test_peers_adopt_published_value_with_original_age():
+    (c1, b1), (c2, b2) = await _connected(2)
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        await c1.set("wx:1:2", [1, 2], ttl=60, swr=30)
+        await b1.publish_set("weather", "wx:1:2", c1.peek("wx:1:2"))
+        assert await c2.get_status("wx:1:2") == ([1, 2], "hit_fresh")
+        # The sender ignores its own message
+        assert b1.stats["ignored"] == 1 and b2.stats["applied"] == 1
+        frozen.tick(delta=70)
+        assert (await c2.get_status("wx:1:2"))[1] == "hit_stale"
+
+
+async def test_older_broadcast_does_not_replace_newer_local_entry():
+    (c1, b1), (c2, _) = await _connected(2)
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        await c1.set("k", "old", ttl=60, swr=30)
+        old_entry = c1.peek("k")
+        frozen.tick(delta=5)
+        await c2.set("k", "new", ttl=60, swr=30)
+        await b1.publish_set("weather", "k", old_entry)
+        assert (await c2.get_status("k"))[0] == "new"
+
+
+async def test_invalidation_by_key_and_prefix_reaches_peers():
+    (c1, b1), (c2, _), (c3, _) = await _connected(3)
+    for cache in (c2, c3):
+        await cache.set("wx:1:1", 1)
+        await cache.set("wx:2:2", 2)
+        await cache.set("geo:x", 3)
+
+    await b1.publish_delete("wx:1:1", "weather")
+    assert (await c2.get_status("wx:1:1"))[1] == "miss"
+    assert (await c3.get_status("wx:2:2"))[1] == "hit_fresh"
+
+    await b1.publish_delete_prefix("wx:")
+    for cache in (c2, c3):
+        assert (await cache.get_status("wx:2:2"))[1] == "miss"
+        assert (await cache.get_status("geo:x"))[1] == "hit_fresh"
+
+
+async def test_computed_values_are_announced_without_refetch(monkeypatch):
+    hub = InMemoryBusHub()
+    local = InProcessCache(maxsize=10)
+    monkeypatch.setitem(ec._named_caches, "bus-test", local)
+    peer = InProcessCache(maxsize=10)
+    sender = InMemoryCacheBus(hub=hub)
+    receiver = InMemoryCacheBus(hub=hub, caches=lambda: {"bus-test": peer})
+    await sender.start()
+    await receiver.start()
+    monkeypatch.setattr(cache_bus, "_bus", sender)
+
+    calls = 0
+
+    async def producer():
+        nonlocal calls
+        calls += 1
+        return {"temp": 61.5}
+
+    backend = InProcCacheBackend(local)
+    assert await backend.get_or_set("wx:9:9", producer, ttl=60, swr=30) == {"temp": 61.5}
+    assert await peer.get_or_set("wx:9:9", producer, ttl=60) == {"temp": 61.5}
+    assert calls == 1
+
+
+async def test_error_markers_stay_local_and_default_swr_is_shared(monkeypatch):
+    hub = InMemoryBusHub()
+    local = InProcessCache(maxsize=10, default_ttl=60, default_swr=30)
+    monkeypatch.setitem(ec._named_caches, "bus-neg", local)
+    peer = InProcessCache(maxsize=10)
+    sender = InMemoryCacheBus(hub=hub)
+    receiver = InMemoryCacheBus(hub=hub, caches=lambda: {"bus-neg": peer})
+    await sender.start()
+    await receiver.start()
+    monkeypatch.setattr(cache_bus, "_bus", sender)
+    backend = InProcCacheBackend(local)
+
+    @cached(
+        ttl=60, key_prefix="neg", error_ttl=30, cache_errors=(LookupError,), store=backend
+    )
+    async def lookup(name):
+        if name == "missing":
+            raise LookupError(name)
+        return {"name": name}
+
+    with pytest.raises(LookupError):
+        await lookup("missing")
+    assert await lookup("found") == {"name": "found"}
+    # Only the value crossed the bus, with the cache's SWR window
+    (key,) = peer.keys()
+    entry = peer.peek(key)
+    assert entry.value == {"name": "found"} and entry.swr_seconds == 30
+
+
+async def test_module_invalidate_prefix_purges_local_caches(monkeypatch):
+    local = InProcessCache(maxsize=10)
+    monkeypatch.setitem(ec._named_caches, "bus-purge", local)
+    await local.set("wx:a", 1)
+    await local.set("geo:a", 2)
+    assert await cache_bus.invalidate_prefix("wx:", namespace="bus-purge") == 1
+    assert (await local.get_status("geo:a"))[1] == "hit_fresh"
+    with pytest.raises(ValueError):
+        await cache_bus.invalidate_prefix("")
+
+
+def test_bus_without_a_transport_cannot_be_built():
+    with pytest.raises(TypeError):
+        cache_bus.CacheBus()
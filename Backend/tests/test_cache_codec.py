@@ -0,0 +1,75 @@
+import time
+
+from Backend.utils import cache_codec
+from Backend.utils.cache_inproc import CacheEntry, InProcessCache
+from Backend.utils.external_cache import LayeredCacheBackend, RedisCacheBackend
+from Backend.utils.local_redis import LocalRedis
+
+FORECAST = [
+    {"ts_local": "2025-06-01T10:00", "cloud_pct": 12, "temp_f": 61.5},
+    {"ts_local": "2025-06-01T11:00", "cloud_pct": 0, "temp_f": -4.0},
+]
+
+
+def _entry(value):
+    return CacheEntry(
+        value=value, created_at=1700000000.25, ttl_seconds=1200, swr_seconds=600
+    )
+
+
+def test_forecast_slots_use_packed_format_and_round_trip():
+    raw = cache_codec.encode_entry(_entry(FORECAST))
+    assert raw[1] == cache_codec.FORMAT_FORECAST
+    decoded = cache_codec.decode_entry(raw)
+    assert decoded.value == FORECAST
+    assert (decoded.created_at, decoded.ttl_seconds, decoded.swr_seconds) == (
+        1700000000.25,
+        1200,
+        600,
+    )
+
+
+def test_values_that_do_not_pack_exactly_fall_back():
+    odd = [{"ts_local": "2025-06-01T10:00", "cloud_pct": 12, "temp_f": 61.55}]
+    raw = cache_codec.encode_entry(_entry(odd))
+    assert raw[1] != cache_codec.FORMAT_FORECAST
+    assert cache_codec.decode_entry(raw).value == odd
+    assert cache_codec.decode_entry(cache_codec.encode_entry(_entry({"a": [1]}))).value == {
+        "a": [1]
+    }
+
+
+def test_unknown_version_or_garbage_decodes_as_miss():
+    raw = bytearray(cache_codec.encode_entry(_entry(FORECAST)))
+    raw[0] = cache_codec.CODEC_VERSION + 1
+    assert cache_codec.decode_entry(bytes(raw)) is None
+    assert cache_codec.decode_entry(b"{\"v\": 1}") is None
+    assert cache_codec.decode_entry(None) is None
+
+
+async def test_get_many_uses_one_round_trip_and_fills_l1():
+    client = LocalRedis()
+    writer = RedisCacheBackend(client=client)
+    await writer.set_many({f"wx:{i}": FORECAST for i in range(5)}, ttl=60, swr=30)
+
+    reader = LayeredCacheBackend(InProcessCache(maxsize=50), RedisCacheBackend(client=client))
+    client.commands = 0
+    found = await reader.get_many([f"wx:{i}" for i in range(6)])
+    assert client.commands == 1
+    assert found["wx:0"] == (FORECAST, "hit_fresh")
+    assert found["wx:5"] == (None, "miss")
+    assert reader.stats == {"l1_hits": 0, "l2_hits": 5, "misses": 1}
+
+    # Subsequent lookups are served by L1 without touching Redis
+    client.commands = 0
+    assert (await reader.get_status("wx:3"))[1] == "hit_fresh"
+    assert client.commands == 0
+
+
+async def test_set_many_is_pipelined_with_remaining_expiry():
+    client = LocalRedis()
+    backend = RedisCacheBackend(client=client)
+    await backend.set_many({"a": 1, "b": 2, "c": 3}, ttl=10, swr=5)
+    assert client.commands == 1
+    _, expires_at = client._data["a"]
+    assert 14 < expires_at - time.time() <= 15
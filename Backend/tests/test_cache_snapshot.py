@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+from fastapi.testclient import TestClient
+from freezegun import freeze_time
+
+from Backend.utils import cache_snapshot
+from Backend.utils.cache_inproc import InProcessCache
+
+FORECAST = [{"ts_local": "2025-06-01T10:00", "cloud_pct": 5, "temp_f": 70.0}]
+
+
+def _caches():
+    return {
+        "weather": InProcessCache(maxsize=10),
+        "default": InProcessCache(maxsize=10),
+    }
+
+
+async def test_round_trip_adjusts_age_for_downtime(tmp_path):
+    path = str(tmp_path / "snap.bin")
+    before = _caches()
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        await before["weather"].set("wx:1:2", FORECAST, ttl=100, swr=50)
+        frozen.tick(delta=30)
+        await before["default"].set("geocode:geocode:abc", [47.6, -122.3], ttl=600, swr=0)
+        await before["default"].set("dl:https://x", True, ttl=600, swr=0)
+        assert cache_snapshot.dump_snapshot(path, before) == 2
+
+        # 80 s of "downtime": the forecast is now 110 s old (stale, in SWR)
+        frozen.tick(delta=80)
+        after = _caches()
+        assert cache_snapshot.load_snapshot(path, after) == 2
+        assert await after["weather"].get_status("wx:1:2") == (FORECAST, "hit_stale")
+        assert (await after["default"].get_status("geocode:geocode:abc"))[1] == "hit_fresh"
+        # Keys outside the opted-in namespaces are never written
+        assert (await after["default"].get_status("dl:https://x"))[1] == "miss"
+
+
+async def test_expired_entries_and_newer_local_values_are_skipped(tmp_path):
+    path = str(tmp_path / "snap.bin")
+    before = _caches()
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        await before["weather"].set("wx:1:1", "old", ttl=10, swr=5)
+        await before["weather"].set("wx:2:2", "old", ttl=100, swr=0)
+        cache_snapshot.dump_snapshot(path, before)
+        frozen.tick(delta=20)
+        after = _caches()
+        await after["weather"].set("wx:2:2", "new", ttl=100, swr=0)
+        assert cache_snapshot.load_snapshot(path, after) == 0
+        assert (await after["weather"].get_status("wx:2:2"))[0] == "new"
+
+
+def test_missing_or_foreign_files_are_ignored(tmp_path):
+    assert cache_snapshot.load_snapshot(str(tmp_path / "nope.bin"), _caches()) == 0
+    bad = tmp_path / "bad.bin"
+    bad.write_bytes(b"not a snapshot at all, definitely")
+    assert cache_snapshot.load_snapshot(str(bad), _caches()) == 0
+
+
+def test_lifespan_saves_and_restores(tmp_path, monkeypatch):
+    from Backend.main import app
+    from Backend.services import weather
+
+    path = str(tmp_path / "snap.bin")
+    monkeypatch.setenv("CACHE_SNAPSHOT_PATH", path)
+    weather._weather_cache.clear()
+    with TestClient(app):
+        asyncio.run(weather._weather_cache.set("wx:5:5", FORECAST, ttl=300, swr=0))
+    assert os.path.exists(path)
+
+    weather._weather_cache.clear()
+    with TestClient(app):
+        assert weather._weather_cache.peek("wx:5:5").value == FORECAST
+    weather._weather_cache.clear()
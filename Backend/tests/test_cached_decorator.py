@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from freezegun import freeze_time
+
+from Backend.models.errors import LocationNotFound
+from Backend.utils.cache import cached, canonical_key
+from Backend.utils.cache_inproc import InProcessCache
+
+
+@pytest.fixture
+def store():
+    return InProcessCache(maxsize=100, default_ttl=300, default_swr=60)
+
+
+def lookup(q: str, limit: int = 1):
+    return q
+
+
+def test_canonical_key_is_stable_and_binds_signature():
+    positional = canonical_key("geo", lookup, ("Seattle", 1), {})
+    keyword = canonical_key("geo", lookup, (), {"limit": 1, "q": "Seattle"})
+    defaulted = canonical_key("geo", lookup, ("Seattle",), {})
+    assert positional == keyword == defaulted
+    # Digest must not depend on per-process hash salting
+    assert positional == "geo:lookup:7a8eb103f543f1a8cb9a7d74b3b8aba0"
+    assert canonical_key("geo", lookup, ("Portland",), {}) != positional
+
+
+def test_canonical_key_normalizes_values():
+    def f(coords, opts):
+        return None
+
+    a = canonical_key("", f, ((47.0, -122.5),), {"opts": {"b": 1, "a": {2, 1}}})
+    b = canonical_key("", f, ([47, -122.5],), {"opts": {"a": {1, 2}, "b": 1}})
+    assert a == b
+
+
+async def test_single_flight_on_concurrent_misses(store):
+    calls = 0
+
+    @cached(ttl=60, key_prefix="t", store=store)
+    async def slow(q):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return q.upper()
+
+    results = await asyncio.gather(*(slow("x") for _ in range(5)))
+    assert results == ["X"] * 5
+    assert calls == 1
+    stats = slow.cache_stats()
+    assert stats["misses"] == 5
+    assert stats["load_count"] == 1
+
+
+async def test_hits_and_latency_counters(store):
+    @cached(ttl=60, key_prefix="t", store=store)
+    async def double(n):
+        return n * 2
+
+    assert await double(2) == 4
+    assert await double(2) == 4
+    assert await double(n=2) == 4
+    stats = double.cache_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["load_ms_total"] >= 0.0
+    assert stats["hit_ratio"] == pytest.approx(2 / 3, rel=1e-3)
+
+
+async def test_stale_while_revalidate_serves_stale_then_refreshes(store):
+    calls = 0
+
+    @cached(ttl=10, key_prefix="t", swr=30, store=store)
+    async def version():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        assert await version() == 1
+        frozen.tick(delta=15)
+        # Stale value is returned; refresh runs (inline under CACHE_REFRESH_SYNC)
+        assert await version() == 1
+        await asyncio.sleep(0)
+        assert await version() == 2
+    assert version.cache_stats()["stale_hits"] == 1
+
+
+async def test_negative_caching_uses_error_ttl(store):
+    calls = 0
+
+    @cached(
+        ttl=600,
+        key_prefix="t",
+        error_ttl=5,
+        cache_errors=(LocationNotFound,),
+        store=store,
+    )
+    async def find(q):
+        nonlocal calls
+        calls += 1
+        raise LocationNotFound(f"nothing for {q}")
+
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        for _ in range(3):
+            with pytest.raises(LocationNotFound, match="nothing for nowhere"):
+                await find("nowhere")
+        assert calls == 1
+        assert find.cache_stats()["negative_hits"] == 2
+
+        frozen.tick(delta=6)
+        with pytest.raises(LocationNotFound):
+            await find("nowhere")
+        assert calls == 2
+
+
+async def test_uncached_errors_are_not_stored(store):
+    calls = 0
+
+    @cached(ttl=600, key_prefix="t", error_ttl=5, store=store)
+    async def boom():
+        nonlocal calls
+        calls += 1
+        raise ValueError("boom")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await boom()
+    assert calls == 2
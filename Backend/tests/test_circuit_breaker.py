@@ -0,0 +1,111 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from freezegun import freeze_time
+
+from Backend.services import metrics, unsplash_integration
+from Backend.utils.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerOpenException,
+    CircuitState,
+    breaker_for_url,
+    get_breaker,
+    get_unsplash_circuit_breaker,
+)
+
+
+def _fail(breaker, n=1):
+    for _ in range(n):
+        with pytest.raises(RuntimeError):
+            with breaker.guard():
+                raise RuntimeError("boom")
+
+
+def _succeed(breaker, n=1):
+    for _ in range(n):
+        with breaker.guard():
+            pass
+
+
+def test_opens_on_failure_rate_in_rolling_window():
+    breaker = CircuitBreaker("t", window_sec=10, min_calls=4, failure_rate=0.5)
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        _fail(breaker, 3)
+        assert breaker.state is CircuitState.CLOSED  # below min_calls
+
+        # Failures age out of the window instead of accumulating forever
+        frozen.tick(delta=11)
+        _succeed(breaker, 3)
+        _fail(breaker, 1)
+        assert breaker.state is CircuitState.CLOSED
+
+        _fail(breaker, 2)
+        assert breaker.state is CircuitState.OPEN
+        with pytest.raises(CircuitBreakerOpenException):
+            breaker.acquire()
+        assert breaker.stats["rejected"] == 1
+
+
+def test_slow_calls_and_explicit_failures_count():
+    breaker = CircuitBreaker("slow", min_calls=2, slow_call_sec=1.0, slow_call_rate=1.0)
+    breaker.record(True, elapsed=2.0)
+    breaker.record(True, elapsed=3.0)
+    assert breaker.is_open
+
+    other = CircuitBreaker("status", min_calls=2, failure_rate=1.0)
+    for _ in range(2):
+        with other.guard() as outcome:
+            outcome.fail()  # e.g. an HTTP 503 response
+    assert other.is_open
+
+
+async def test_half_open_admits_only_n_probes():
+    breaker = CircuitBreaker("probe", min_calls=1, open_sec=5, half_open_probes=2)
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        _fail(breaker)
+        frozen.tick(delta=6)
+        assert breaker.state is CircuitState.HALF_OPEN
+
+        release = asyncio.Event()
+        upstream_calls = 0
+
+        async def upstream():
+            nonlocal upstream_calls
+            upstream_calls += 1
+            await release.wait()
+            return "ok"
+
+        tasks = [asyncio.create_task(breaker.call(upstream)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert upstream_calls == 2 and breaker.is_rejecting
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert results.count("ok") == 2
+        assert sum(isinstance(r, CircuitBreakerOpenException) for r in results) == 3
+        assert breaker.state is CircuitState.CLOSED
+
+        # A failed probe reopens the breaker
+        _fail(breaker)
+        frozen.tick(delta=6)
+        _fail(breaker)
+        assert breaker.state is CircuitState.OPEN
+
+
+def test_registry_keys_by_host_and_exports_state():
+    metrics.reset()
+    a = breaker_for_url("https://api.example.com/v1/x?y=1")
+    assert a is get_breaker("api.example.com")
+    a._transition(CircuitState.OPEN, 0.0)
+    counters = metrics.get_metrics()
+    assert counters["circuit.api.example.com.state"] == 2
+    assert counters["circuit.api.example.com.transition.closed_to_open"] == 1
+
+
+@patch("Backend.services.unsplash_integration.requests.get")
+def test_open_unsplash_circuit_skips_network(mock_get):
+    get_unsplash_circuit_breaker()._transition(CircuitState.OPEN, time.monotonic())
+    assert unsplash_integration.trigger_photo_download("https://x/dl", "key") is False
+    assert unsplash_integration.fetch_photo_meta("abc", "key") is None
+    mock_get.assert_not_called()
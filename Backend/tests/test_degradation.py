@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from Backend.main import app
+from Backend.services import degradation, metrics, weather
+from Backend.services.locations import nearby
+from Backend.utils.circuit_breaker import CircuitState, get_weather_circuit_breaker
+
+ORIGIN = (46.8, -121.7)
+URL = f"/recommend?lat={ORIGIN[0]}&lon={ORIGIN[1]}&radius=100"
+
+
+@pytest.fixture
+def outage(monkeypatch):
+    """Weather circuit open; any upstream call fails the test."""
+
+    async def no_upstream(lat, lon):
+        raise AssertionError("degraded mode must not call the weather upstream")
+
+    monkeypatch.setattr(weather, "fetch_weather_raw", no_upstream)
+    monkeypatch.delenv("BETA_KEYS", raising=False)
+    monkeypatch.delenv("DEV_BYPASS_SCORING", raising=False)
+    missing = degradation.SNAPSHOT_DB.with_name("missing.db")
+    monkeypatch.setattr(degradation, "SNAPSHOT_DB", missing)
+    breaker = get_weather_circuit_breaker()
+    breaker._transition(CircuitState.OPEN, time.monotonic())
+    weather._weather_cache.clear()
+    weather._last_known_good.clear()
+    yield
+    weather._weather_cache.clear()
+    weather._last_known_good.clear()
+
+
+def test_open_circuit_ranks_from_cached_forecasts(outage):
+    far = nearby(*ORIGIN, 100)[5]
+    sunny = [
+        {"ts_local": f"2025-06-01T{h:02d}:00", "cloud_pct": 0, "temp_f": 70.0}
+        for h in range(8, 14)
+    ]
+    weather._last_known_good.put(weather._weather_key(far["lat"], far["lon"]), sunny)
+
+    resp = TestClient(app).get(URL)
+    assert resp.status_code == 200
+    assert resp.headers["X-Ranking-Mode"] == "cached"
+    assert resp.headers["Cache-Control"] == "public, max-age=60"
+    body = resp.json()
+    assert body["mode"] == "cached"
+    top = body["results"][0]
+    assert top["id"] == str(far["id"]) and top["duration_hours"] == 6
+    # Served from the last known good store, or no forecast at all: stale
+    assert all(r["weather_stale"] for r in body["results"])
+
+
+def test_snapshot_then_distance_fallback(outage, tmp_path, monkeypatch):
+    client = TestClient(app)
+    resp = client.get(URL)
+    assert resp.json()["mode"] == "distance"
+    dists = [r["distance_mi"] for r in resp.json()["results"]]
+    assert dists == sorted(dists)
+
+    far = nearby(*ORIGIN, 100)[3]
+    db = tmp_path / "forecast_snapshot.db"
+    conn = sqlite3.connect(str(db))
+    conn.execute(
+        "CREATE TABLE snapshots (lat REAL, lon REAL, score REAL, generated_at TEXT)"
+    )
+    fresh = datetime.now(timezone.utc).isoformat()
+    conn.execute(
+        "INSERT INTO snapshots VALUES (?, ?, 0.5, ?)", (far["lat"], far["lon"], fresh)
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(degradation, "SNAPSHOT_DB", db)
+
+    body = client.get(URL).json()
+    assert body["mode"] == "snapshot"
+    assert body["results"][0]["id"] == str(far["id"])
+
+    # A snapshot older than the limit is skipped
+    monkeypatch.setenv("DEGRADE_SNAPSHOT_MAX_AGE_SEC", "0")
+    assert client.get(URL).json()["mode"] == "distance"
+
+
+async def test_snapshot_reload_serves_previous_scores(tmp_path):
+    db = tmp_path / "forecast_snapshot.db"
+
+    def write(score, mtime):
+        conn = sqlite3.connect(str(db))
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots"
+            " (lat REAL, lon REAL, score REAL, generated_at TEXT)"
+        )
+        conn.execute("DELETE FROM snapshots")
+        stamp = datetime.now(timezone.utc).isoformat()
+        conn.execute("INSERT INTO snapshots VALUES (1.0, 2.0, ?, ?)", (score, stamp))
+        conn.commit()
+        conn.close()
+        os.utime(db, (mtime, mtime))
+
+    write(0.25, 1_000_000)
+    # Nothing loaded from this file yet: the first load is waited for
+    assert await degradation._snapshot_scores(db) == {(1.0, 2.0): 0.25}
+
+    write(0.75, 2_000_000)
+    # Changed on disk: the old scores are served while it reloads
+    assert await degradation._snapshot_scores(db) == {(1.0, 2.0): 0.25}
+    await degradation._snapshot_reload
+    assert await degradation._snapshot_scores(db) == {(1.0, 2.0): 0.75}
+
+
+def test_controller_reasons_and_time_in_mode(monkeypatch):
+    metrics.reset()
+    ctl = degradation.DegradationController(min_budget_s=0.25, max_inflight=1)
+    assert ctl.reason(1.0) is None
+    assert ctl.reason(0.1) == "low_budget"
+    with ctl.full_ranking():
+        assert ctl.reason(1.0) == "saturated"
+    assert ctl.inflight == 0
+
+    clock = [100.0]
+    monkeypatch.setattr(degradation.time, "monotonic", lambda: clock[0])
+    ctl._mode_since = clock[0]
+    ctl.record("distance", "saturated")
+    clock[0] += 2.0
+    ctl.record("full")
+    assert ctl.time_in_mode["distance"] == pytest.approx(2.0)
+    counters = metrics.get_metrics()
+    assert counters["recommend.mode_time_ms.distance"] == 2000
+    assert counters["recommend.degraded_reason.saturated"] == 1
+    assert counters["recommend.mode.full"] == 1
@@ -6,6 +6,7 @@ from unittest.mock import patch
 
 import pytest
 
+from Backend.models.errors import UpstreamError
 from Backend.services.geocode import LocationNotFound, geocode
 
 
@@ -63,3 +64,43 @@ async def test_geocode_missing_token():
             ValueError, match="MAPBOX_TOKEN environment variable not set"
         ):
             await geocode("Seattle, WA")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status", [429, 503])
+async def test_geocode_upstream_failure_is_not_a_miss(httpx_mock, status):
+    """Throttling and outages surface as UpstreamError, which is never cached"""
+    url = (
+        "https://api.mapbox.com/geocoding/v5/mapbox.places/Seattle, WA.json"
+        "?access_token=test_token&limit=1"
+    )
+    httpx_mock.add_response(url=url, status_code=status)
+
+    with patch.dict("os.environ", {"MAPBOX_TOKEN": "test_token"}):
+        with pytest.raises(UpstreamError):
+            await geocode("Seattle, WA")
+
+
+@pytest.mark.asyncio
+async def test_geocode_spends_mapbox_budget(httpx_mock):
+    """Rate-limit headers update the Mapbox budget; an empty one fails fast"""
+    from Backend.services import upstream_budget
+
+    url = (
+        "https://api.mapbox.com/geocoding/v5/mapbox.places/Renton.json"
+        "?access_token=test_token&limit=1"
+    )
+    httpx_mock.add_response(
+        url=url,
+        json={"features": [{"geometry": {"coordinates": [-122.2, 47.5]}}]},
+        headers={"X-Rate-Limit-Limit": "5", "X-Rate-Limit-Interval": "60"},
+    )
+
+    with patch.dict("os.environ", {"MAPBOX_TOKEN": "test_token"}):
+        assert await geocode("Renton") == (47.5, -122.2)
+        budget = upstream_budget.get_budget("mapbox")
+        assert (budget.limit, budget.remaining) == (5, 5)
+
+        budget.remaining = 0
+        with pytest.raises(UpstreamError, match="quota"):
+            await geocode("Renton")
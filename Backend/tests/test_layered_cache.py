@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from freezegun import freeze_time
+
+from Backend.utils.cache_inproc import InProcessCache
+from Backend.utils.external_cache import (
+    LayeredCacheBackend,
+    RedisCacheBackend,
+)
+from Backend.utils.local_redis import LocalRedis
+
+
+@pytest.fixture
+def shared_redis():
+    return LocalRedis()
+
+
+def _instance(shared_redis):
+    """Build one 'instance': a private L1 over the shared L2."""
+    l1 = InProcessCache(maxsize=100, default_ttl=300, default_swr=60)
+    return LayeredCacheBackend(l1, RedisCacheBackend(client=shared_redis))
+
+
+async def test_redis_backend_reports_fresh_stale_and_miss(shared_redis):
+    backend = RedisCacheBackend(client=shared_redis)
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        await backend.set("k", {"a": 1}, ttl=10, swr=20)
+        assert await backend.get_status("k") == ({"a": 1}, "hit_fresh")
+        frozen.tick(delta=15)
+        assert await backend.get_status("k") == ({"a": 1}, "hit_stale")
+        frozen.tick(delta=20)
+        assert await backend.get_status("k") == (None, "miss")
+
+
+async def test_l1_is_filled_from_l2_with_original_age(shared_redis):
+    a = _instance(shared_redis)
+    b = _instance(shared_redis)
+    calls = 0
+
+    async def producer():
+        nonlocal calls
+        calls += 1
+        return [1, 2, 3]
+
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        assert await a.get_or_set("wx:1:2", producer, ttl=100, swr=50) == [1, 2, 3]
+        frozen.tick(delta=40)
+        # Instance B never computes: its L1 is filled from L2
+        assert await b.get_or_set("wx:1:2", producer, ttl=100, swr=50) == [1, 2, 3]
+        assert calls == 1
+        assert b.stats["l2_hits"] == 1
+
+        # The copied entry keeps A's creation time, so both expire together
+        frozen.tick(delta=70)
+        assert (await b.l1.get_status("wx:1:2"))[1] == "hit_stale"
+
+
+async def test_distributed_single_flight_across_instances(shared_redis):
+    instances = [_instance(shared_redis) for _ in range(4)]
+    calls = 0
+
+    async def slow_producer():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "forecast"
+
+    results = await asyncio.gather(
+        *(
+            inst.get_or_set("wx:hot", slow_producer, ttl=60, swr=30)
+            for inst in instances
+            for _ in range(3)
+        )
+    )
+    assert results == ["forecast"] * 12
+    assert calls == 1
+
+
+async def test_stale_entry_is_served_and_refreshed_once(shared_redis):
+    inst = _instance(shared_redis)
+    calls = 0
+
+    async def producer():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        assert await inst.get_or_set("k", producer, ttl=10, swr=60) == 1
+        frozen.tick(delta=20)
+        # Stale value served; refresh runs inline under CACHE_REFRESH_SYNC
+        assert await inst.get_or_set("k", producer, ttl=10, swr=60) == 1
+        await asyncio.sleep(0)
+        assert await inst.get_or_set("k", producer, ttl=10, swr=60) == 2
+        assert calls == 2
+        # The refreshed value is visible to other instances through L2
+        other = _instance(shared_redis)
+        assert await other.get_status("k") == (2, "hit_fresh")
+
+
+async def test_sync_factories_are_supported(shared_redis):
+    inst = _instance(shared_redis)
+    assert await inst.get_or_set("sync", lambda: {"ok": True}, ttl=10) == {"ok": True}
+
+
+async def test_bad_entries_are_skipped_and_prefixes_are_literal(shared_redis):
+    backend = RedisCacheBackend(client=shared_redis)
+    await backend.set_many({"ok": 1, "bad": object(), "ok2": 2}, ttl=60)
+    found = await backend.get_many(["ok", "bad", "ok2"])
+    assert {k: v for k, (v, _) in found.items()} == {"ok": 1, "bad": None, "ok2": 2}
+
+    for key in ("wx[1]*a", "wx[1]*b", "wx1", "wxa"):
+        await backend.set(key, 1, ttl=60)
+    # Glob characters in the prefix match only themselves
+    assert await backend.delete_prefix("wx[1]*") == 2
+    assert sorted([k async for k in shared_redis.scan_iter(match="wx*")]) == [
+        "wx1",
+        "wxa",
+    ]
@@ -9,3 +9,30 @@ def test_request_id_header():
     assert response.status_code == 200
     assert "X-Request-ID" in response.headers
     assert len(response.headers["X-Request-ID"]) > 0
+
+
+def test_middleware_is_pure_asgi_and_keeps_streaming():
+    from starlette.applications import Starlette
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from starlette.responses import StreamingResponse
+    from starlette.routing import Route
+
+    from Backend.middleware.beta_keys import BetaKeyMiddleware
+    from Backend.middleware.observability import ObservabilityMiddleware
+
+    assert not any(
+        issubclass(m.cls, BaseHTTPMiddleware) for m in app.user_middleware
+    )
+
+    async def chunks(request):
+        async def body():
+            for i in range(3):
+                yield f"chunk{i}\n".encode()
+
+        return StreamingResponse(body(), media_type="text/plain")
+
+    inner = Starlette(routes=[Route("/stream", chunks)])
+    client = TestClient(ObservabilityMiddleware(BetaKeyMiddleware(inner)))
+    with client.stream("GET", "/stream") as response:
+        assert "X-Request-ID" in response.headers
+        assert list(response.iter_lines()) == ["chunk0", "chunk1", "chunk2"]
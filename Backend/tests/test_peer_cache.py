@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from Backend.main import app
+from Backend.utils import peer_cache
+from Backend.utils.cache_codec import decode_entry, encode_entry
+from Backend.utils.cache_inproc import CacheEntry
+from Backend.utils.peer_cache import HashRing, PeerCache
+
+PEERS = ["http://a:8000", "http://b:8000", "http://c:8000"]
+
+
+def test_ring_spreads_keys_and_moves_few_on_membership_change():
+    ring = HashRing(PEERS)
+    keys = [f"wx:{i}:{-i}" for i in range(3000)]
+    owners = {k: ring.owner(k) for k in keys}
+    counts = {p: list(owners.values()).count(p) for p in PEERS}
+    assert all(600 < c < 1400 for c in counts.values())
+
+    smaller = HashRing(PEERS[:2])
+    moved = sum(1 for k in keys if owners[k] != smaller.owner(k))
+    # Only keys owned by the removed peer move
+    assert moved == counts["http://c:8000"]
+
+
+def _peer_for(self_url, owner_calls):
+    """A PeerCache whose HTTP calls are answered by an in-process owner."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        owner_calls.append(request.url.host)
+        entry = await peer_cache.serve_peer("test", request.url.params["key"])
+        return httpx.Response(200, content=encode_entry(entry))
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return PeerCache(PEERS, self_url, client=client)
+
+
+async def test_non_owner_fetches_once_from_owner(monkeypatch):
+    loads = []
+
+    async def loader(key):
+        loads.append(key)
+        await asyncio.sleep(0.01)
+        return CacheEntry(value=key.upper(), created_at=1000.0, ttl_seconds=60, swr_seconds=30)
+
+    monkeypatch.setitem(peer_cache._loaders, "test", loader)
+    owner_calls = []
+    cache = _peer_for("http://a:8000", owner_calls)
+    key = next(f"k{i}" for i in range(100) if cache.owner(f"k{i}") == "http://b:8000")
+
+    entries = await asyncio.gather(*(cache.fetch("test", key) for _ in range(5)))
+    assert {e.value for e in entries} == {key.upper()}
+    assert entries[0].created_at == 1000.0
+    assert owner_calls == ["b"] and loads == [key]
+
+    own_key = next(f"k{i}" for i in range(100) if cache.is_owner(f"k{i}"))
+    assert await cache.fetch("test", own_key) is None
+    assert cache.stats == {"local": 1, "remote_hits": 1, "remote_errors": 0}
+
+
+async def test_serving_a_peer_never_forwards(monkeypatch):
+    cache = PeerCache(PEERS, "http://a:8000")
+    key = next(f"k{i}" for i in range(100) if not cache.is_owner(f"k{i}"))
+    seen = []
+
+    async def loader(k):
+        seen.append(cache.should_forward(k))
+        return CacheEntry(value=1, created_at=time.time(), ttl_seconds=5, swr_seconds=0)
+
+    monkeypatch.setitem(peer_cache._loaders, "test", loader)
+    assert cache.should_forward(key)
+    await peer_cache.serve_peer("test", key)
+    assert seen == [False]
+
+
+async def test_unreachable_owner_falls_back_to_local():
+    def handler(request):
+        raise httpx.ConnectError("refused")
+
+    cache = PeerCache(
+        PEERS,
+        "http://a:8000",
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    key = next(f"k{i}" for i in range(100) if not cache.is_owner(f"k{i}"))
+    assert await cache.fetch("weather", key) is None
+    assert cache.stats["remote_errors"] == 1
+
+
+def test_peer_endpoint_requires_token_and_returns_codec(monkeypatch):
+    async def loader(key):
+        return CacheEntry(value=[1, 2], created_at=time.time(), ttl_seconds=60, swr_seconds=0)
+
+    monkeypatch.setitem(peer_cache._loaders, "test", loader)
+    monkeypatch.setattr(peer_cache, "_peer_checked", True)
+    monkeypatch.setattr(
+        peer_cache, "_peer_cache", PeerCache(PEERS, "http://a:8000", token="s3cret")
+    )
+    client = TestClient(app)
+    url = "/internal/cache/peer/test?key=wx:1:2"
+    assert client.get(url).status_code == 403
+    resp = client.get(url, headers={"X-Peer-Token": "s3cret"})
+    assert resp.status_code == 200
+    assert decode_entry(resp.content).value == [1, 2]
+    assert client.get(
+        "/internal/cache/peer/nope?key=x", headers={"X-Peer-Token": "s3cret"}
+    ).status_code == 404
+
+
+def test_peer_mode_requires_a_token(monkeypatch):
+    monkeypatch.setenv("CACHE_PEERS", ",".join(PEERS))
+    monkeypatch.setenv("CACHE_SELF_URL", "http://a:8000")
+    monkeypatch.delenv("CACHE_PEER_TOKEN", raising=False)
+    monkeypatch.setattr(peer_cache, "_peer_checked", False)
+    monkeypatch.setattr(peer_cache, "_peer_cache", None)
+    assert peer_cache.get_peer_cache() is None
+
+    # Even a tokenless instance built by hand refuses every caller
+    monkeypatch.setattr(peer_cache, "_peer_cache", PeerCache(PEERS, "http://a:8000"))
+    resp = TestClient(app).get("/internal/cache/peer/weather?key=wx:1:2")
+    assert resp.status_code == 403
@@ -0,0 +1,142 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from Backend.main import app
+from Backend.services import photo_meta_db
+from Backend.services import unsplash_integration as ui
+from Backend.services.photo_meta_db import PhotoMetaDB
+from Backend.services.photo_meta_store import PhotoMetaStore
+from Backend.utils import http_client
+from Backend.utils.cache_inproc import cache as inproc_cache
+
+
+def _stub_unsplash(monkeypatch):
+    seen = []
+
+    def handler(request):
+        photo_id = request.url.path.rsplit("/", 1)[-1]
+        seen.append((photo_id, request.headers.get("if-none-match")))
+        if request.headers.get("if-none-match") == f'"{photo_id}-v1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            json={
+                "id": photo_id,
+                "urls": {"regular": f"https://images.example/{photo_id}"},
+                "links": {"html": "https://unsplash.com/p", "download_location": "d"},
+                "user": {"name": "Stub", "links": {"html": "https://unsplash.com/@s"}},
+            },
+            headers={"ETag": f'"{photo_id}-v1"'},
+        )
+
+    stub = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(http_client, "_client", stub)
+    monkeypatch.setenv("UNSPLASH_CLIENT_ID", "test_access_key")
+    return seen
+
+
+def _live(photo_id, etag=None):
+    photo = ui.demo_photo(photo_id)
+    return ui.meta_result(photo_id, photo, live=True, etag=etag)
+
+
+def test_rows_revalidate_oldest_first_and_round_trip_through_jsonl(tmp_path):
+    db = PhotoMetaDB(str(tmp_path / "meta.db"))
+    db.put("a", _live("a", '"a-v1"'), checked_at=100.0)
+    db.put("b", _live("b"), checked_at=50.0)
+    assert db.get("a")["etag"] == '"a-v1"' and db.get("zzz") is None
+    assert db.stale(max_age_sec=60, limit=10) == [("b", None), ("a", '"a-v1"')]
+    db.touch("b")
+    assert db.stale(max_age_sec=60, limit=10) == [("a", '"a-v1"')]
+
+    assert db.export_jsonl(str(tmp_path / "out.jsonl")) == 2
+    other = PhotoMetaDB(str(tmp_path / "other.db"))
+    other.put("a", _live("a", '"a-v2"'))  # newer than the exported copy
+    lines = (tmp_path / "out.jsonl").read_text().splitlines()
+    demo = '{"meta": {"id": "c", "source": "demo"}, "checked_at": 1}'
+    (tmp_path / "in.jsonl").write_text("\n".join(lines + [demo]) + "\n")
+    assert other.import_jsonl(str(tmp_path / "in.jsonl")) == 1
+    assert other.get("a")["etag"] == '"a-v2"' and other.get("b") and not other.get("c")
+    db.close()
+    other.close()
+
+
+def test_meta_route_reads_through_and_sweep_revalidates(monkeypatch, tmp_path):
+    inproc_cache.clear()
+    seen = _stub_unsplash(monkeypatch)
+    db = PhotoMetaDB(str(tmp_path / "meta.db"))
+    monkeypatch.setattr(photo_meta_db, "_db", db)
+    client = TestClient(app)
+    try:
+        first = client.get("/internal/photos/meta?photo_id=p1")
+        assert first.json()["source"] == "live"
+        assert db.get("p1")["etag"] == '"p1-v1"'
+
+        # A cold cache (restart) is answered from the store without Unsplash
+        inproc_cache.clear()
+        again = client.get("/internal/photos/meta?photo_id=p1")
+        assert again.json() == first.json()
+        assert seen == [("p1", None)]
+
+        counts = asyncio.run(db.revalidate(max_age_sec=0, batch=10))
+        assert counts == {"not_modified": 1, "updated": 0, "failed": 0}
+        assert seen[-1] == ("p1", '"p1-v1"')
+    finally:
+        inproc_cache.clear()
+        db.close()
+
+
+def test_rows_are_keyed_by_the_requested_photo_id(monkeypatch, tmp_path):
+    inproc_cache.clear()
+
+    def handler(request):
+        # Unsplash answers a slug with the photo's canonical id
+        return httpx.Response(
+            200,
+            json={
+                "id": "canonical",
+                "urls": {"regular": "https://images.example/c"},
+                "links": {"html": "https://unsplash.com/p", "download_location": "d"},
+                "user": {"name": "Stub", "links": {"html": "https://unsplash.com/@s"}},
+            },
+            headers={"ETag": '"c-v1"'},
+        )
+
+    monkeypatch.setattr(
+        http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setenv("UNSPLASH_CLIENT_ID", "test_access_key")
+    db = PhotoMetaDB(str(tmp_path / "meta.db"))
+    monkeypatch.setattr(photo_meta_db, "_db", db)
+    try:
+        TestClient(app).get("/internal/photos/meta?photo_id=some-slug")
+        assert db.get("some-slug")["etag"] == '"c-v1"' and db.get("canonical") is None
+        assert db.stale(max_age_sec=-1, limit=10) == [("some-slug", '"c-v1"')]
+
+        db.export_jsonl(str(tmp_path / "out.jsonl"))
+        other = PhotoMetaDB(str(tmp_path / "other.db"))
+        assert other.import_jsonl(str(tmp_path / "out.jsonl")) == 1
+        assert other.get("some-slug") is not None
+        other.close()
+    finally:
+        inproc_cache.clear()
+        db.close()
+
+
+async def test_store_cold_start_revalidates_stored_etags(monkeypatch, tmp_path):
+    inproc_cache.clear()
+    seen = _stub_unsplash(monkeypatch)
+    db = PhotoMetaDB(str(tmp_path / "meta.db"))
+    db.put("a", _live("a", '"a-v1"'))
+    monkeypatch.setattr(photo_meta_db, "_db", db)
+    try:
+        store = PhotoMetaStore(["a", "b"])
+        await store.refresh()
+        assert seen == [("a", '"a-v1"'), ("b", None)]
+        assert store.stats["not_modified"] == 1 and store.stats["fetched"] == 1
+        assert store.get("a")["source"] == "live" and db.get("b") is not None
+    finally:
+        inproc_cache.clear()
+        db.close()
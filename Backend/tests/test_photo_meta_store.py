@@ -0,0 +1,120 @@
+import httpx
+from fastapi.testclient import TestClient
+
+from Backend.main import app
+from Backend.services import photo_meta_store
+from Backend.services.photo_meta_store import PhotoMetaStore
+from Backend.utils import http_client
+from Backend.utils.cache_inproc import cache as inproc_cache
+from Backend.utils.external_cache import get_cache_backend
+
+
+def _stub_unsplash(monkeypatch, fail=()):
+    seen = []
+
+    def handler(request):
+        photo_id = request.url.path.rsplit("/", 1)[-1]
+        seen.append((photo_id, request.headers.get("if-none-match")))
+        if photo_id in fail:
+            return httpx.Response(503)
+        if request.headers.get("if-none-match") == f'"{photo_id}-v1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            json={
+                "id": photo_id,
+                "urls": {"regular": f"https://images.example/{photo_id}"},
+                "links": {"html": "https://unsplash.com/p", "download_location": "d"},
+                "user": {"name": "Stub", "links": {"html": "https://unsplash.com/@s"}},
+            },
+            headers={"ETag": f'"{photo_id}-v1"'},
+        )
+
+    stub = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(http_client, "_client", stub)
+    monkeypatch.setenv("UNSPLASH_CLIENT_ID", "test_access_key")
+    return seen
+
+
+async def test_store_prewarms_revalidates_and_keeps_last_good(monkeypatch):
+    inproc_cache.clear()
+    seen = _stub_unsplash(monkeypatch)
+    store = PhotoMetaStore(["a", "b", "a"])
+    await store.refresh()
+    assert len(store) == 2 and store.get("a")["source"] == "live"
+    assert seen == [("a", None), ("b", None)]
+    # Seeded into the meta cache used by /internal/photos/meta
+    cached, status = await get_cache_backend().get_status("unsplash:meta:a")
+    assert status == "hit_fresh" and cached["etag"] == '"a-v1"'
+
+    # Unchanged photos revalidate with their ETag
+    seen.clear()
+    await store.refresh()
+    assert seen == [("a", '"a-v1"'), ("b", '"b-v1"')]
+    assert store.stats["not_modified"] == 2
+
+    # An outage keeps the last good copy
+    _stub_unsplash(monkeypatch, fail=("a",))
+    await store.refresh()
+    assert store.get("a")["source"] == "live" and store.stats["failed"] == 1
+    inproc_cache.clear()
+
+
+async def test_store_refetches_a_304_it_has_nothing_for(monkeypatch):
+    seen = _stub_unsplash(monkeypatch)
+    fetch = photo_meta_store.ui.fetch_photo_meta_async
+    calls = []
+
+    async def not_modified_first(photo_id, access_key, etag=None, **kwargs):
+        calls.append(etag)
+        if len(calls) == 1:
+            return {"not_modified": True}
+        return await fetch(photo_id, access_key, etag=etag, **kwargs)
+
+    monkeypatch.setattr(photo_meta_store.ui, "fetch_photo_meta_async", not_modified_first)
+    store = PhotoMetaStore(["c"])
+    await store.refresh()
+    # Nothing stored to revalidate: a miss, fetched again without an ETag
+    assert calls == [None, None] and seen == [("c", None)]
+    assert store.get("c")["source"] == "live" and store.stats["not_modified"] == 0
+    inproc_cache.clear()
+
+
+async def test_store_serves_demo_meta_without_a_key(monkeypatch):
+    monkeypatch.delenv("UNSPLASH_CLIENT_ID", raising=False)
+    store = PhotoMetaStore(["x"])
+    await store.refresh()
+    assert store.get("x")["source"] == "demo"
+
+
+def test_recommend_embeds_photo_meta_on_request(monkeypatch):
+    monkeypatch.setenv("DEV_BYPASS_SCORING", "true")
+    monkeypatch.delenv("UNSPLASH_CLIENT_ID", raising=False)
+    store = PhotoMetaStore([])
+    monkeypatch.setattr(photo_meta_store, "_store", store)
+    client = TestClient(app)
+    url = "/recommend?lat=47.6&lon=-122.3&radius=100"
+
+    plain = client.get(url).json()["results"]
+    assert all(r["photo"] is None for r in plain)
+
+    store._meta = {
+        r["photo_id"]: {
+            "id": r["photo_id"],
+            "urls": {"regular": "https://images.example/x"},
+            "links": {"download_location": "d", "html": "h"},
+            "attribution_html": "Photo by Stub",
+            "source": "live",
+            "etag": '"v1"',
+        }
+        for r in plain
+        if r["photo_id"]
+    }
+    embedded = client.get(url + "&photo_meta=true")
+    results = embedded.json()["results"]
+    with_photo = [r for r in results if r["photo_id"]]
+    assert with_photo and all(
+        r["photo"]["attribution_html"] == "Photo by Stub" for r in with_photo
+    )
+    assert "etag" not in with_photo[0]["photo"]
+    assert embedded.headers["ETag"] != client.get(url).headers["ETag"]
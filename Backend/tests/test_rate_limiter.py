@@ -0,0 +1,68 @@
+from freezegun import freeze_time
+
+from Backend.utils import rate_limiter
+from Backend.utils.local_redis import LocalRedis
+from Backend.utils.rate_limiter import GCRARateLimiter, RedisRateLimiter
+
+
+def test_gcra_allows_burst_then_one_per_interval():
+    limiter = GCRARateLimiter(window_seconds=60, max_requests=3)
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        assert [limiter.is_allowed("k") for _ in range(4)] == [True, True, True, False]
+        assert limiter.get_remaining_requests("k") == 0
+        assert limiter.get_reset_time("k") == 20.0
+        assert limiter.is_allowed("other")
+
+        frozen.tick(delta=20)
+        assert limiter.is_allowed("k")
+        assert not limiter.is_allowed("k")
+
+        frozen.tick(delta=60)
+        assert limiter.get_remaining_requests("k") == 3
+
+
+def test_idle_keys_expire_and_key_count_is_capped():
+    limiter = GCRARateLimiter(window_seconds=10, max_requests=5, max_keys=100)
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        for i in range(1000):
+            limiter.is_allowed(f"track:{i}")
+        assert len(limiter) == 100
+        assert limiter.stats["evicted"] == 900
+
+        # Once every bucket has refilled, the next call reclaims them
+        frozen.tick(delta=3)
+        limiter.is_allowed("fresh")
+        assert len(limiter) == 1
+        assert limiter.stats["expired"] == 100
+
+
+async def test_redis_limiter_is_shared_and_falls_back():
+    store = LocalRedis()
+    a = RedisRateLimiter(store, window_seconds=60, max_requests=2)
+    b = RedisRateLimiter(store, window_seconds=60, max_requests=2)
+    assert await a.is_allowed("k")
+    assert await b.is_allowed("k")
+    assert not await a.is_allowed("k")
+    allowed, remaining, retry_ms = await b.acquire("k")
+    assert (allowed, remaining) == (0, 0) and 29000 < retry_ms <= 30000
+    assert store.get_now("ratelimit:k") is not None
+
+    class Broken:
+        async def eval(self, *args):
+            raise ConnectionError("redis down")
+
+    degraded = RedisRateLimiter(Broken(), window_seconds=60, max_requests=1)
+    assert await degraded.is_allowed("k")
+    assert not await degraded.is_allowed("k")
+
+
+async def test_track_limit_uses_configured_backend(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_BACKEND", "local")
+    monkeypatch.setenv("RATE_LIMIT_MAX_REQUESTS", "1")
+    rate_limiter.reset_rate_limiters()
+    try:
+        assert isinstance(rate_limiter.get_shared_rate_limiter(), RedisRateLimiter)
+        assert await rate_limiter.check_rate_limit_async("track:x")
+        assert not await rate_limiter.check_rate_limit_async("track:x")
+    finally:
+        rate_limiter.reset_rate_limiters()
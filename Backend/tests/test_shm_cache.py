@@ -0,0 +1,155 @@
+import asyncio
+import multiprocessing
+import struct
+import threading
+import time
+
+import pytest
+from freezegun import freeze_time
+
+from Backend.utils.cache_inproc import CacheEntry, InProcessCache
+from Backend.utils.external_cache import LayeredCacheBackend
+from Backend.utils.shm_cache import SharedMemoryCache, SharedMemoryCacheBackend
+
+FORECAST = [{"ts_local": "2025-06-01T10:00", "cloud_pct": 5, "temp_f": 70.0}]
+
+
+def _entry(value, ttl=60, swr=30, created_at=None):
+    return CacheEntry(
+        value=value,
+        created_at=time.time() if created_at is None else created_at,
+        ttl_seconds=ttl,
+        swr_seconds=swr,
+    )
+
+
+def _writer(path):
+    table = SharedMemoryCache(path=path, slots=64, slot_bytes=512)
+    table.set("wx:1:2", _entry(FORECAST))
+    table.close()
+
+
+def test_entries_written_by_another_process_are_visible(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    reader = SharedMemoryCache(path=path, slots=64, slot_bytes=512)
+    proc = multiprocessing.get_context("fork").Process(target=_writer, args=(path,))
+    proc.start()
+    proc.join(10)
+    assert proc.exitcode == 0
+    assert reader.get("wx:1:2").value == FORECAST
+    assert reader.get("wx:9:9") is None
+
+
+def test_full_probe_window_evicts_expired_then_oldest(tmp_path):
+    table = SharedMemoryCache(path=str(tmp_path / "c.bin"), slots=8, slot_bytes=256)
+    now = time.time()
+    for i in range(8):
+        table.set(f"k{i}", _entry(i, created_at=now - 10 * (8 - i)))
+    table.set("dead", _entry("x", ttl=1, swr=0, created_at=now - 100))  # evicts oldest
+    assert table.get("k0") is None and table.stats["evictions"] == 1
+
+    table.set("k9", _entry(9))
+    # The already-expired entry went first, so every live key survives
+    assert all(table.get(f"k{i}") is not None for i in range(1, 8))
+    assert table.get("k9").value == 9
+
+
+def test_oversize_values_are_skipped(tmp_path):
+    table = SharedMemoryCache(path=str(tmp_path / "c.bin"), slots=8, slot_bytes=128)
+    assert table.set("big", _entry("x" * 500)) is False
+    assert table.stats["oversize"] == 1
+
+
+def test_reader_retries_while_writer_holds_slot(tmp_path):
+    table = SharedMemoryCache(path=str(tmp_path / "c.bin"), slots=1, slot_bytes=256)
+    table.set("k", _entry(1))
+    off = 64
+    (seq,) = struct.unpack_from("!I", table._mm, off)
+    struct.pack_into("!I", table._mm, off, seq | 1)  # writer mid-update
+    assert table.get("k") is None
+    assert table.stats["read_retries"] > 0
+    struct.pack_into("!I", table._mm, off, seq)
+    assert table.get("k").value == 1
+
+
+def test_delete_and_prefix_delete(tmp_path):
+    table = SharedMemoryCache(path=str(tmp_path / "c.bin"), slots=64, slot_bytes=256)
+    for key in ("wx:1", "wx:2", "meta:1"):
+        table.set(key, _entry(key))
+    assert table.delete("wx:1") is True
+    assert table.delete_prefix("wx:") == 1
+    assert sorted(table.keys()) == ["meta:1"]
+
+
+async def test_workers_share_one_load_through_layered_backend(tmp_path):
+    path = str(tmp_path / "c.bin")
+
+    def worker():
+        table = SharedMemoryCache(path=path, slots=64, slot_bytes=1024)
+        return LayeredCacheBackend(
+            InProcessCache(maxsize=10), SharedMemoryCacheBackend(table)
+        )
+
+    a, b = worker(), worker()
+    calls = 0
+
+    async def producer():
+        nonlocal calls
+        calls += 1
+        return FORECAST
+
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        assert await a.get_or_set("wx:1:2", producer, ttl=100, swr=50) == FORECAST
+        frozen.tick(delta=30)
+        assert await b.get_or_set("wx:1:2", producer, ttl=100, swr=50) == FORECAST
+        assert calls == 1 and b.stats["l2_hits"] == 1
+        # Age carried over: stale for both workers at the same moment
+        frozen.tick(delta=75)
+        assert (await b.l1.get_status("wx:1:2"))[1] == "hit_stale"
+
+
+def test_other_geometry_gets_its_own_file_and_bad_headers_are_refused(tmp_path):
+    base = str(tmp_path / "c.bin")
+    small = SharedMemoryCache(path=base, slots=8, slot_bytes=256)
+    small.set("k", _entry(1))
+    big = SharedMemoryCache(path=base, slots=16, slot_bytes=256)
+    assert big.path != small.path
+    # The running worker's mapping is untouched
+    assert small.get("k").value == 1 and big.get("k") is None
+
+    with open(small.path, "r+b") as f:
+        f.write(b"garbage!")
+    with pytest.raises(ValueError, match="unexpected layout"):
+        SharedMemoryCache(path=base, slots=8, slot_bytes=256)
+
+
+def test_key_locks_are_exclusive_within_one_process(tmp_path):
+    table = SharedMemoryCache(path=str(tmp_path / "c.bin"), slots=8, slot_bytes=256)
+    stripe = table.try_lock_key("wx:1")
+    assert stripe is not None
+    assert table.try_lock_key("wx:1") is None
+    table.unlock_key(stripe)
+    assert table.try_lock_key("wx:1") == stripe
+
+
+async def test_busy_writer_lock_is_waited_for_off_the_event_loop(tmp_path):
+    table = SharedMemoryCache(path=str(tmp_path / "c.bin"), slots=8, slot_bytes=256)
+    backend = SharedMemoryCacheBackend(table)
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with table._write_lock():
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait(5)
+    write = asyncio.create_task(backend.set_entry("k", _entry(1)))
+    await asyncio.sleep(0.05)  # the loop keeps running while the write waits
+    assert not write.done() and table.stats["lock_waits"] == 1
+    release.set()
+    await asyncio.wait_for(write, 5)
+    holder.join(5)
+    assert table.get("k").value == 1
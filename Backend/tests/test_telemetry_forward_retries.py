@@ -15,7 +15,7 @@ class DummyClient:
     async def __aexit__(self, exc_type, exc, tb):
         return False
 
-    async def post(self, url, json=None):
+    async def post(self, url, content=None, headers=None):
         if self._fail_times > 0:
             self._fail_times -= 1
             raise RuntimeError("simulated transient error")
@@ -31,10 +31,8 @@ async def _run_forward(monkeypatch):
 
     monkeypatch.setenv("TELEMETRY_SINK_URL", "http://example.invalid/telemetry")
     monkeypatch.setenv("TELEMETRY_FORWARD_RETRIES", "4")
-    # patch httpx.AsyncClient to return our dummy client
-    monkeypatch.setattr(
-        "Backend.services.telemetry_sink.httpx.AsyncClient", lambda timeout=None: dummy
-    )
+    # patch the shared forwarding client with our dummy client
+    monkeypatch.setattr("Backend.services.telemetry_sink._forward_client", dummy)
 
     reset()
     await sink_event_forward_http({"event": "retry_test"})
@@ -48,3 +46,53 @@ async def test_forward_retries(monkeypatch):
     # We expect at least 3 attempts (fail, fail, success) and 1 success
     assert metrics.get("telemetry_forward_attempts", 0) >= 3
     assert metrics.get("telemetry_forward_success", 0) >= 1
+
+
+@pytest.mark.asyncio
+async def test_batches_forward_as_one_request_with_capped_inflight(monkeypatch):
+    import asyncio
+    import json
+
+    import httpx
+
+    from Backend.services import telemetry_sink
+    from Backend.services.telemetry_sink import TelemetryBatcher
+
+    bodies = []
+    active = {"now": 0, "max": 0}
+    outage = {"left": 2}
+
+    async def handler(request):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        try:
+            await asyncio.sleep(0.02)
+            if outage["left"]:
+                outage["left"] -= 1
+                return httpx.Response(503)
+            bodies.append(json.loads(request.content))
+            return httpx.Response(200)
+        finally:
+            active["now"] -= 1
+
+    stub = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(telemetry_sink, "_forward_client", stub)
+    monkeypatch.setenv("TELEMETRY_SINK_URL", "http://example.invalid/telemetry")
+    monkeypatch.setenv("TELEMETRY_FORWARD_BASE_DELAY_SEC", "0.01")
+    monkeypatch.delenv("TELEMETRY_SINK_PATH", raising=False)
+
+    reset()
+    batcher = TelemetryBatcher(batch_size=25, interval_sec=0.05, max_inflight=1)
+    # 75 events -> three batches; the first fails twice as a whole, then succeeds
+    for start in (0, 25, 50):
+        await batcher._flush([{"event": f"e{i}"} for i in range(start, start + 25)])
+    await batcher.stop()
+    await stub.aclose()
+
+    assert [len(b) for b in bodies] == [25, 25, 25]
+    assert bodies[0][0] == {"event": "e0"}
+    assert active["max"] == 1
+    counters = get_metrics()
+    assert counters["telemetry_forward_attempts"] == 5
+    assert counters["telemetry_forward_events"] == 75
+    assert counters["telemetry_forward_inflight"] == 0
@@ -0,0 +1,62 @@
+from fastapi.testclient import TestClient
+
+from Backend.main import app
+from Backend.services import telemetry_sink
+from Backend.services.metrics import get_metrics, reset
+from Backend.services.telemetry_sink import TelemetryBatcher, _parse_sample_rates
+
+
+def _events(batcher):
+    return [batcher.queue.get_nowait()["event"] for _ in range(batcher.queue.qsize())]
+
+
+def test_full_queue_drops_oldest_or_newest():
+    reset()
+    oldest = TelemetryBatcher(max_queue=3)
+    newest = TelemetryBatcher(max_queue=3, overflow="drop_newest")
+    for i in range(5):
+        assert oldest.offer({"event": f"e{i}"})
+        assert newest.offer({"event": f"e{i}"}) == (i < 3)
+    assert _events(oldest) == ["e2", "e3", "e4"]
+    assert _events(newest) == ["e0", "e1", "e2"]
+
+    counters = get_metrics()
+    assert counters["telemetry_queue_dropped_oldest"] == 2
+    assert counters["telemetry_queue_dropped_newest"] == 2
+
+
+def test_sampling_thins_noisy_event_types_under_pressure():
+    reset()
+    assert _parse_sample_rates("scroll=0, *=0.5,bad,x=y") == {"scroll": 0.0, "*": 0.5}
+    batcher = TelemetryBatcher(
+        max_queue=4,
+        overflow="sample",
+        sample_rates={"scroll": 0.0},
+        sample_high_water=0.5,
+    )
+    # Below the high-water mark everything is kept
+    assert batcher.offer({"event": "scroll"}) and batcher.offer({"event": "scroll"})
+    assert not batcher.offer({"event": "scroll"})
+    assert batcher.offer({"event": "click"}) and batcher.offer({"event": "click"})
+    assert not batcher.offer({"event": "click"})  # still full: newest dropped
+    assert _events(batcher) == ["scroll", "scroll", "click", "click"]
+
+    counters = get_metrics()
+    assert counters["telemetry_queue_sampled_out"] == 1
+    assert counters["telemetry_queue_dropped_newest"] == 1
+    assert counters["telemetry_queue_sample_rate.scroll"] == 0.0
+    assert counters["telemetry_queue_sample_rate.*"] == 1.0
+
+
+def test_ingest_offers_to_the_bounded_queue(monkeypatch):
+    reset()
+    batcher = TelemetryBatcher(max_queue=2, overflow="drop_newest")
+    monkeypatch.setattr(telemetry_sink, "_BATCHER", batcher)
+    client = TestClient(app)
+    for i in range(3):
+        r = client.post("/telemetry", json={"event": f"burst{i}", "properties": {}})
+        assert r.status_code == 202
+    assert _events(batcher) == ["burst0", "burst1"]
+    counters = get_metrics()
+    assert counters["telemetry_queue_depth"] == 2
+    assert counters["telemetry_queue_dropped_newest"] == 1
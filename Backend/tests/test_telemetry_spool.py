@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+
+import httpx
+
+from Backend.services import telemetry_sink
+from Backend.services.metrics import get_metrics, reset
+from Backend.services.telemetry_sink import TelemetryBatcher
+from Backend.services.telemetry_spool import TelemetrySpool
+
+
+def _batch(start, n):
+    return [{"event": f"e{i}"} for i in range(start, start + n)]
+
+
+def _names(items):
+    return [p["event"] for p in items]
+
+
+def test_segments_checkpoint_and_restart(tmp_path):
+    spool = TelemetrySpool(str(tmp_path), segment_bytes=40)
+    spool.append(_batch(0, 3))  # ~48 bytes: the next append starts a segment
+    spool.append(_batch(3, 2))
+    assert len(os.listdir(tmp_path)) == 2
+
+    items, position = spool.read(4)
+    assert _names(items) == ["e0", "e1", "e2", "e3"]
+    spool.commit(position)
+    # The first segment was fully delivered and is gone
+    assert sorted(os.listdir(tmp_path)) == ["000000000002.seg", "checkpoint.json"]
+
+    # A torn line from a crash mid-append is cut off on restart, so the
+    # next append starts on a line of its own
+    with open(tmp_path / "000000000002.seg", "ab") as f:
+        f.write(b'not json\n{"event": "e5"}\n{"event": "e')
+    restarted = TelemetrySpool(str(tmp_path), segment_bytes=400)
+    restarted.append(_batch(6, 1))
+    items, position = restarted.read(10)
+    assert _names(items) == ["e4", "e5", "e6"]
+    restarted.commit(position)
+    assert not restarted.pending()
+
+
+def test_retention_drops_oldest_undelivered_segments(tmp_path):
+    reset()
+    spool = TelemetrySpool(str(tmp_path), segment_bytes=40, max_bytes=100)
+    for start in range(0, 12, 3):
+        spool.append(_batch(start, 3))
+    items, _ = spool.read(100)
+    assert _names(items) == [f"e{i}" for i in range(6, 12)]
+    counters = get_metrics()
+    assert counters["telemetry_spool_dropped_events"] == 6
+    assert counters["telemetry_spool_segments"] == 2
+
+    # Age limit: everything but the segment being written goes
+    old = TelemetrySpool(str(tmp_path), segment_bytes=40, max_age_sec=0)
+    old.append(_batch(12, 3))
+    assert _names(old.read(100)[0]) == ["e12", "e13", "e14"]
+
+
+async def test_undelivered_batches_replay_after_restart(monkeypatch, tmp_path):
+    received = []
+    sink_up = {"ok": False}
+
+    async def handler(request):
+        if not sink_up["ok"]:
+            return httpx.Response(503)
+        received.extend(json.loads(request.content))
+        return httpx.Response(200)
+
+    stub = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(telemetry_sink, "_forward_client", stub)
+    monkeypatch.setenv("TELEMETRY_SINK_URL", "http://example.invalid/telemetry")
+    monkeypatch.setenv("TELEMETRY_FORWARD_RETRIES", "1")
+    monkeypatch.delenv("TELEMETRY_SINK_PATH", raising=False)
+    reset()
+
+    # Sink is down: events are spooled, retried, and kept at shutdown
+    first = TelemetryBatcher(
+        batch_size=2, interval_sec=0.05, spool=TelemetrySpool(str(tmp_path))
+    )
+    await first.start()
+    for payload in _batch(0, 3):
+        first.offer(payload)
+    await asyncio.sleep(0.2)
+    await first.stop()
+    assert received == []
+
+    # The next process replays them once the sink is back
+    sink_up["ok"] = True
+    second = TelemetryBatcher(
+        batch_size=2, interval_sec=0.05, spool=TelemetrySpool(str(tmp_path))
+    )
+    await second.start()
+    second.offer({"event": "e3"})
+    for _ in range(50):
+        if len(received) == 4:
+            break
+        await asyncio.sleep(0.02)
+    await second.stop()
+    await stub.aclose()
+
+    assert _names(received) == ["e0", "e1", "e2", "e3"]
+    assert not TelemetrySpool(str(tmp_path)).pending()
+    assert get_metrics()["telemetry_spool_replayed_events"] == 4
@@ -0,0 +1,97 @@
+import gzip
+import json
+import threading
+import time
+
+from Backend.services import telemetry_writer
+from Backend.services.metrics import get_metrics, reset
+from Backend.services.telemetry_writer import JsonlWriter
+
+
+def _lines(start, n):
+    return [json.dumps({"event": f"e{i}"}) + "\n" for i in range(start, start + n)]
+
+
+def _events(text):
+    return [json.loads(line)["event"] for line in text.splitlines()]
+
+
+def test_size_rotation_compresses_segments_in_order(tmp_path):
+    reset()
+    path = tmp_path / "telemetry.jsonl"
+    writer = JsonlWriter(str(path), max_bytes=60, fsync="always")
+    for start in range(0, 12, 3):
+        writer.write(_lines(start, 3))
+        time.sleep(0.02)  # one drain (and rotation check) per batch
+    writer.close()
+
+    rotated = sorted(tmp_path.glob("telemetry.jsonl.*"))
+    assert rotated and all(p.suffix == ".gz" for p in rotated)
+    text = "".join(gzip.open(p, "rt").read() for p in rotated)
+    if path.exists():
+        text += path.read_text()
+    assert _events(text) == [f"e{i}" for i in range(12)]
+
+    counters = get_metrics()
+    assert counters["telemetry_sink_written_events"] == 12
+    assert counters["telemetry_sink_rotations"] == len(rotated)
+
+
+def test_time_rotation_without_compression(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry_writer, "zstd_available", False)
+    path = tmp_path / "t.jsonl"
+    writer = JsonlWriter(
+        str(path), max_bytes=0, rotate_sec=0.1, compression="zstd", fsync="never"
+    )
+    assert writer.compression == "gzip"  # zstandard missing: falls back
+    writer.compression = "none"
+    writer.write(_lines(0, 2))
+    time.sleep(0.4)  # rotated while idle
+    writer.write(_lines(2, 1))
+    writer.close()
+
+    (rotated,) = tmp_path.glob("t.jsonl.*")
+    assert _events(rotated.read_text()) == ["e0", "e1"]
+    assert _events(path.read_text()) == ["e2"]
+
+
+def test_writer_follows_sink_path(tmp_path, monkeypatch):
+    first, second = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    monkeypatch.setenv("TELEMETRY_SINK_PATH", str(first))
+    monkeypatch.setenv("TELEMETRY_SINK_FSYNC", "bogus")
+    writer = telemetry_writer.get_jsonl_writer()
+    assert writer is telemetry_writer.get_jsonl_writer() and writer.fsync == "interval"
+    writer.write(_lines(0, 1))
+
+    monkeypatch.setenv("TELEMETRY_SINK_PATH", str(second))
+    telemetry_writer.get_jsonl_writer().write(_lines(1, 1))
+    telemetry_writer.close_jsonl_writer()
+    writer._thread.join(1)
+    assert _events(first.read_text()) == ["e0"]
+    assert _events(second.read_text()) == ["e1"]
+
+    monkeypatch.delenv("TELEMETRY_SINK_PATH")
+    assert telemetry_writer.get_jsonl_writer() is None
+
+
+def test_full_queue_drops_batches_instead_of_growing(tmp_path, monkeypatch):
+    reset()
+    disk = threading.Event()
+    write = JsonlWriter._write
+
+    def slow_write(self, batches):
+        disk.wait(5)  # a disk that cannot keep up
+        write(self, batches)
+
+    monkeypatch.setattr(JsonlWriter, "_write", slow_write)
+    path = tmp_path / "t.jsonl"
+    writer = JsonlWriter(str(path), max_bytes=0, rotate_sec=0, max_queue=2)
+    assert writer.write(_lines(0, 1))
+    time.sleep(0.05)  # taken by the writer thread, which is now stuck
+    assert writer.write(_lines(1, 1)) and writer.write(_lines(2, 1))
+    assert not writer.write(_lines(3, 2))
+    disk.set()
+    writer.close()
+
+    assert _events(path.read_text()) == ["e0", "e1", "e2"]
+    assert get_metrics()["telemetry_sink_dropped_events"] == 2
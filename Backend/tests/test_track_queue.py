@@ -0,0 +1,89 @@
+import asyncio
+
+from freezegun import freeze_time
+
+from Backend.services import metrics
+from Backend.services import unsplash_integration as ui
+from Backend.services.track_queue import TrackQueue
+
+
+def _stub_trigger(monkeypatch, delay=0.0, ok=True):
+    calls = []
+    active = {"now": 0, "max": 0}
+
+    async def trigger(download_location, access_key, priority=None):
+        calls.append(download_location)
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(delay)
+        active["now"] -= 1
+        return ok
+
+    monkeypatch.setattr(ui, "trigger_photo_download_async", trigger)
+    return calls, active
+
+
+async def test_repeats_coalesce_and_calls_stay_within_hourly_budget(monkeypatch):
+    metrics.reset()
+    calls, _ = _stub_trigger(monkeypatch)
+    queue = TrackQueue(budget_per_hour=2)
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        for key in ("a", "b", "a", "c"):
+            assert queue.submit(key, f"https://dl/{key}")
+        assert len(queue) == 3
+
+        wait = await queue.drain()
+        assert calls == ["https://dl/a", "https://dl/b"]
+        assert len(queue) == 1 and 0 < wait <= 1800
+
+        frozen.tick(delta=wait)
+        assert await queue.drain() == 0.0
+        assert calls[-1] == "https://dl/c" and len(queue) == 0
+
+    counters = metrics.get_metrics()
+    assert counters["unsplash.track.coalesced"] == 1
+    assert counters["unsplash.track.views_coalesced"] == 1
+    assert counters["unsplash.track.success_total"] == 3
+    assert counters["unsplash.track.budget_deferred"] == 1
+
+
+async def test_calls_run_concurrently_up_to_the_limit(monkeypatch):
+    calls, active = _stub_trigger(monkeypatch, delay=0.01)
+    queue = TrackQueue(concurrency=3, budget_per_hour=100)
+    for i in range(10):
+        queue.submit(str(i), f"https://dl/{i}")
+    await queue.drain()
+    assert len(calls) == 10 and active["max"] == 3
+
+
+async def test_queue_is_bounded():
+    queue = TrackQueue(max_pending=1)
+    assert queue.submit("a", "https://dl/a")
+    assert not queue.submit("b", "https://dl/b")
+
+
+async def test_pending_items_survive_a_restart(tmp_path, monkeypatch):
+    calls, _ = _stub_trigger(monkeypatch)
+    path = str(tmp_path / "track" / "pending.json")
+    queue = TrackQueue(path=path)
+    queue.submit("a", "https://dl/a")
+    queue.submit("a", "https://dl/a")
+    await queue.stop()  # shutdown without a drain
+
+    restored = TrackQueue(path=path)
+    restored.load()
+    assert len(restored) == 1
+    restored.start()
+    try:
+        restored.submit("b", "https://dl/b")  # wakes the worker
+        for _ in range(100):
+            if len(calls) == 2:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await restored.stop()
+    assert calls == ["https://dl/a", "https://dl/b"]
+
+    empty = TrackQueue(path=path)
+    empty.load()
+    assert len(empty) == 0
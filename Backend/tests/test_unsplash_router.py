@@ -1,12 +1,17 @@
+import asyncio
 import os
 import time
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
+import httpx
 from fastapi.testclient import TestClient
 
 from Backend.main import app
+from Backend.services import track_queue
 from Backend.services.metrics import get_metrics
 from Backend.services.metrics import reset as metrics_reset
+from Backend.services.track_queue import get_track_queue
+from Backend.utils import http_client
 from Backend.utils.cache_inproc import cache as inproc_cache
 
 client = TestClient(app)
@@ -33,36 +38,61 @@ def teardown_function(_):
                 # If Redis flush fails, ignore errors in teardown
                 pass
     ec._cache_backend = None
+    track_queue._queue = None
     metrics_reset()
 
 
+def _drain():
+    """Run the background tracking calls queued so far."""
+    asyncio.run(get_track_queue().drain())
+
+
+def _queued(r):
+    return r.status_code == 202 and r.json()["queued"] is True
+
+
 def test_track_missing_fields():
     r = client.post("/internal/photos/track", json={})
     assert r.status_code == 400
 
 
-@patch("Backend.routers.unsplash.ui.trigger_photo_download")
+@patch(
+    "Backend.routers.unsplash.ui.trigger_photo_download_async", new_callable=AsyncMock
+)
 @patch.dict("os.environ", {"UNSPLASH_CLIENT_ID": "test_access_key"})
 def test_track_success_and_dedupe(mock_trigger):
     mock_trigger.return_value = True
 
     payload = {"download_location": "https://api.unsplash.com/photos/xyz/download"}
     r1 = client.post("/internal/photos/track", json=payload)
-    assert r1.status_code == 200
-    assert r1.json().get("tracked") is True
+    assert _queued(r1)
+    assert r1.json().get("reason") == "queued"
 
     # Second call should be deduped
     r2 = client.post("/internal/photos/track", json=payload)
     assert r2.status_code == 200
     assert r2.json().get("tracked") is False
     assert r2.json().get("reason") == "deduped"
-    # Metrics: one request, one success
+
+    # The queue makes the Unsplash call in the background
+    mock_trigger.assert_not_called()
+    _drain()
+    mock_trigger.assert_called_once()
+    # Metrics: one request, one success; the repeat rode on the queued call
     metrics = get_metrics()
     assert metrics.get("unsplash.track.requests_total", 0) == 1
     assert metrics.get("unsplash.track.success_total", 0) == 1
+    assert metrics.get("unsplash.track.coalesced", 0) == 1
+    assert metrics.get("unsplash.track.views_coalesced", 0) == 1
 
+    # Once sent, repeats within the TTL are only deduped
+    client.post("/internal/photos/track", json=payload)
+    assert len(get_track_queue()) == 0
 
-@patch("Backend.routers.unsplash.ui.trigger_photo_download")
+
+@patch(
+    "Backend.routers.unsplash.ui.trigger_photo_download_async", new_callable=AsyncMock
+)
 def test_track_failure(mock_trigger):
     mock_trigger.return_value = False
     payload = {"photo_id": "xyz"}
@@ -75,7 +105,9 @@ def test_track_failure(mock_trigger):
 
 
 @patch.dict("os.environ", {"UNSPLASH_CLIENT_ID": "test_access_key"})
-@patch("Backend.routers.unsplash.ui.trigger_photo_download")
+@patch(
+    "Backend.routers.unsplash.ui.trigger_photo_download_async", new_callable=AsyncMock
+)
 def test_dedupe_ttl_expiry(mock_trigger):
     # Use a very small TTL so we can test expiry
     os.environ["UNSPLASH_TRACK_DEDUPE_TTL"] = "1"
@@ -83,8 +115,8 @@ def test_dedupe_ttl_expiry(mock_trigger):
     payload = {"photo_id": "abc"}
 
     r1 = client.post("/internal/photos/track", json=payload)
-    assert r1.status_code == 200
-    assert r1.json().get("tracked") is True
+    assert _queued(r1)
+    _drain()
 
     # Immediately deduped
     r2 = client.post("/internal/photos/track", json=payload)
@@ -93,8 +125,8 @@ def test_dedupe_ttl_expiry(mock_trigger):
     # Wait for TTL to expire
     time.sleep(1.1)
     r3 = client.post("/internal/photos/track", json=payload)
-    assert r3.status_code == 200
-    assert r3.json().get("tracked") is True
+    assert _queued(r3)
+    _drain()
     # Metrics: two requests, two successes (middle deduped call not counted)
     metrics = get_metrics()
     assert metrics.get("unsplash.track.requests_total", 0) == 2
@@ -102,7 +134,9 @@ def test_dedupe_ttl_expiry(mock_trigger):
 
 
 @patch.dict("os.environ", {"UNSPLASH_CLIENT_ID": "test_access_key"})
-@patch("Backend.routers.unsplash.ui.trigger_photo_download")
+@patch(
+    "Backend.routers.unsplash.ui.trigger_photo_download_async", new_callable=AsyncMock
+)
 def test_integration_meta_then_track(mock_trigger):
     """Integration-style test: simulate frontend flow:
     1. GET /internal/photos/meta to obtain download_location
@@ -123,8 +157,8 @@ def test_integration_meta_then_track(mock_trigger):
     r1 = client.post(
         "/internal/photos/track", json={"download_location": download_location}
     )
-    assert r1.status_code == 200
-    assert r1.json().get("tracked") is True
+    assert _queued(r1)
+    _drain()
 
     # Step 3: repeated track -> deduped
     r2 = client.post(
@@ -139,7 +173,9 @@ def test_integration_meta_then_track(mock_trigger):
 
 
 @patch.dict("os.environ", {"UNSPLASH_CLIENT_ID": "test_access_key"})
-@patch("Backend.routers.unsplash.ui.trigger_photo_download")
+@patch(
+    "Backend.routers.unsplash.ui.trigger_photo_download_async", new_callable=AsyncMock
+)
 def test_integration_meta_then_track_with_ttl(mock_trigger):
     """Integration-style test: fetch meta, track, ensure dedupe, wait TTL, track again."""
     mock_trigger.return_value = True
@@ -158,8 +194,8 @@ def test_integration_meta_then_track_with_ttl(mock_trigger):
     r1 = client.post(
         "/internal/photos/track", json={"download_location": download_location}
     )
-    assert r1.status_code == 200
-    assert r1.json().get("tracked") is True
+    assert _queued(r1)
+    _drain()
 
     # Step 3: repeated track -> deduped
     r2 = client.post(
@@ -169,21 +205,21 @@ def test_integration_meta_then_track_with_ttl(mock_trigger):
     assert r2.json().get("tracked") is False
 
     # Wait for TTL to expire and post again
-    import time
-
     time.sleep(1.1)
     r3 = client.post(
         "/internal/photos/track", json={"download_location": download_location}
     )
-    assert r3.status_code == 200
-    assert r3.json().get("tracked") is True
+    assert _queued(r3)
+    _drain()
 
     metrics = get_metrics()
     # We expect at least two successful track calls counted (first and third)
     assert metrics.get("unsplash.track.success_total", 0) >= 2
 
 
-@patch("Backend.routers.unsplash.ui.trigger_photo_download")
+@patch(
+    "Backend.routers.unsplash.ui.trigger_photo_download_async", new_callable=AsyncMock
+)
 def test_mock_header_hardening_accepts_when_allowed(mock_trigger):
     """When ALLOW_TEST_HEADERS and UN_SPLASH_TEST_HEADER_SECRET are set,
     providing the matching header value should simulate success.
@@ -205,7 +241,9 @@ def test_mock_header_hardening_accepts_when_allowed(mock_trigger):
 
 
 @patch.dict("os.environ", {"UNSPLASH_CLIENT_ID": "test_access_key"})
-@patch("Backend.routers.unsplash.ui.trigger_photo_download")
+@patch(
+    "Backend.routers.unsplash.ui.trigger_photo_download_async", new_callable=AsyncMock
+)
 def test_mock_header_rejected_when_not_allowed(mock_trigger):
     """
     If ALLOW_TEST_HEADERS is not set or the secret mismatches, the header must
@@ -224,14 +262,19 @@ def test_mock_header_rejected_when_not_allowed(mock_trigger):
     }
     headers = {"X-Test-Mock-Trigger": "ci-secret-123"}
     r = client.post("/internal/photos/track", json=payload, headers=headers)
-    assert r.status_code == 200
-    # trigger_photo_download was called (mock returns True)
-    assert r.json().get("tracked") is True
+    # Queued for the real call (mock returns True)
+    assert _queued(r)
+    _drain()
+    mock_trigger.assert_called_once()
 
 
 @patch.dict("os.environ", {"UNSPLASH_CLIENT_ID": "test_access_key"})
-@patch("Backend.routers.unsplash.ui.fetch_random_photo")
-@patch("Backend.routers.unsplash.ui.fetch_photo_meta")
+@patch(
+    "Backend.routers.unsplash.ui.fetch_random_photo_async", new_callable=AsyncMock
+)
+@patch(
+    "Backend.routers.unsplash.ui.fetch_photo_meta_async", new_callable=AsyncMock
+)
 def test_meta_random_fallback(mock_fetch_meta, mock_fetch_random):
     """Test that random fallback is used when photo meta fetch fails."""
     mock_fetch_meta.return_value = None  # Simulate meta fetch failure
@@ -258,7 +301,9 @@ def test_meta_random_fallback(mock_fetch_meta, mock_fetch_random):
 
 
 @patch.dict("os.environ", {"UNSPLASH_CLIENT_ID": "test_access_key"})
-@patch("Backend.routers.unsplash.ui.fetch_photo_meta")
+@patch(
+    "Backend.routers.unsplash.ui.fetch_photo_meta_async", new_callable=AsyncMock
+)
 def test_meta_cache_hit_metrics(mock_fetch_meta):
     """Test that cache hit metrics are properly incremented."""
     mock_fetch_meta.return_value = {
@@ -289,7 +334,9 @@ def test_meta_cache_hit_metrics(mock_fetch_meta):
 
 
 @patch.dict("os.environ", {"UNSPLASH_CLIENT_ID": "test_access_key"})
-@patch("Backend.routers.unsplash.ui.fetch_photo_meta")
+@patch(
+    "Backend.routers.unsplash.ui.fetch_photo_meta_async", new_callable=AsyncMock
+)
 def test_meta_debug_flag(mock_fetch_meta):
     """Test that debug=true includes debug information in response."""
     mock_fetch_meta.return_value = {
@@ -328,7 +375,9 @@ def test_meta_demo_fallback():
 
 
 @patch.dict("os.environ", {"UNSPLASH_CLIENT_ID": "test_access_key"})
-@patch("Backend.routers.unsplash.ui.trigger_photo_download")
+@patch(
+    "Backend.routers.unsplash.ui.trigger_photo_download_async", new_callable=AsyncMock
+)
 def test_track_response_reasons(mock_trigger):
     """Test that track endpoint returns appropriate reasons."""
     mock_trigger.return_value = False
@@ -337,16 +386,18 @@ def test_track_response_reasons(mock_trigger):
     r1 = client.post("/internal/photos/track", json={})
     assert r1.status_code == 400
 
-    # Test API failure
+    # API failure: accepted, then counted when the queue makes the call
     payload = {"download_location": "https://api.unsplash.com/photos/fail/download"}
     r2 = client.post("/internal/photos/track", json=payload)
-    assert r2.status_code == 200
-    assert r2.json()["tracked"] is False
-    assert r2.json()["reason"] == "api_failure"
+    assert _queued(r2)
+    _drain()
+    assert get_metrics()["unsplash.track.failure_total"] == 1
 
 
 @patch.dict("os.environ", {"UNSPLASH_CLIENT_ID": "test_access_key"})
-@patch("Backend.routers.unsplash.ui.trigger_photo_download")
+@patch(
+    "Backend.routers.unsplash.ui.trigger_photo_download_async", new_callable=AsyncMock
+)
 def test_track_missing_access_key(mock_trigger):
     """Test track failure when access key is missing."""
     # Remove access key temporarily
@@ -361,7 +412,9 @@ def test_track_missing_access_key(mock_trigger):
 
 
 @patch.dict("os.environ", {"UNSPLASH_CLIENT_ID": "test_access_key"})
-@patch("Backend.routers.unsplash.ui.trigger_photo_download")
+@patch(
+    "Backend.routers.unsplash.ui.trigger_photo_download_async", new_callable=AsyncMock
+)
 def test_concurrent_track_calls_dedupe(mock_trigger):
     """Simulate concurrent POSTs for the same download_location and ensure
     deduplication prevents duplicate trigger calls."""
@@ -382,15 +435,19 @@ def test_concurrent_track_calls_dedupe(mock_trigger):
     for t in threads:
         t.join()
 
-    # Exactly one of the results should have tracked==True, rest deduped
-    tracked_count = sum(1 for r in results if r.get("tracked") is True)
-    deduped_count = sum(1 for r in results if r.get("tracked") is False)
-    assert tracked_count == 1
+    # Exactly one of the results was queued, rest deduped
+    queued_count = sum(1 for r in results if r.get("queued") is True)
+    deduped_count = sum(1 for r in results if r.get("reason") == "deduped")
+    assert queued_count == 1
     assert deduped_count == 4
+    _drain()
+    mock_trigger.assert_called_once()
 
 
 @patch.dict("os.environ", {"UNSPLASH_CLIENT_ID": "test_access_key"})
-@patch("Backend.routers.unsplash.ui.trigger_photo_download")
+@patch(
+    "Backend.routers.unsplash.ui.trigger_photo_download_async", new_callable=AsyncMock
+)
 def test_track_handles_cache_backend_failure(mock_trigger):
     """Simulate cache backend raising an exception and ensure the track
     endpoint still attempts to call trigger_photo_download and records metrics."""
@@ -409,8 +466,118 @@ def test_track_handles_cache_backend_failure(mock_trigger):
     try:
         payload = {"photo_id": "cache-failure-1"}
         r = client.post("/internal/photos/track", json=payload)
-        assert r.status_code == 200
-        # Should still attempt to trigger and mark tracked True
-        assert r.json().get("tracked") in (True, False)
+        # Still accepted for tracking (or answered) without erroring
+        assert r.status_code in (200, 202)
     finally:
         ec.get_cache_backend = original_get
+
+
+class _Log(list):
+    active: dict
+
+
+def _stub_unsplash(monkeypatch, delay=0.0):
+    """Point the pooled Unsplash client at an in-process stub; returns its log."""
+    seen = _Log()
+    active = {"now": 0, "max": 0}
+
+    async def handler(request):
+        seen.append(request)
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            active["now"] -= 1
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        photo_id = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(
+            200,
+            json={
+                "id": photo_id,
+                "urls": {"regular": f"https://images.example/{photo_id}"},
+                "links": {"html": "https://unsplash.com/p", "download_location": "d"},
+                "user": {"name": "Stub", "links": {"html": "https://unsplash.com/@s"}},
+            },
+            headers={"ETag": '"v1"'},
+        )
+
+    stub = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(http_client, "_client", stub)
+    monkeypatch.setenv("UNSPLASH_CLIENT_ID", "test_access_key")
+    seen.active = active
+    return seen
+
+
+async def test_slow_unsplash_does_not_block_the_event_loop(monkeypatch):
+    _stub_unsplash(monkeypatch, delay=0.5)
+    lags = []
+
+    async def ticker():
+        while True:
+            t0 = asyncio.get_running_loop().time()
+            await asyncio.sleep(0.01)
+            lags.append(asyncio.get_running_loop().time() - t0)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as ac:
+        tick = asyncio.create_task(ticker())
+        try:
+            meta = asyncio.create_task(ac.get("/internal/photos/meta?photo_id=slow-1"))
+            await asyncio.sleep(0.05)
+            health = await asyncio.wait_for(ac.get("/health"), 0.3)
+            assert health.status_code == 200 and not meta.done()
+            body = (await asyncio.wait_for(meta, 5)).json()
+        finally:
+            tick.cancel()
+    assert body["source"] == "live" and body["id"] == "slow-1"
+    assert max(lags) < 0.2
+
+
+async def test_meta_revalidates_with_etag_and_keeps_cached_copy(monkeypatch):
+    seen = _stub_unsplash(monkeypatch)
+    monkeypatch.setenv("UNSPLASH_META_TTL", "0")  # every read revalidates
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as ac:
+        first = (await ac.get("/internal/photos/meta?photo_id=etag-1")).json()
+        second = (await ac.get("/internal/photos/meta?photo_id=etag-1")).json()
+    assert first["source"] == second["source"] == "live"
+    assert second["urls"] == first["urls"]
+    assert seen[-1].headers["if-none-match"] == '"v1"'
+    assert get_metrics()["unsplash_meta_not_modified"] == 1
+
+
+async def test_batch_meta_fetches_misses_concurrently_once_each(monkeypatch):
+    seen = _stub_unsplash(monkeypatch, delay=0.05)
+    monkeypatch.setenv("UNSPLASH_META_BATCH_CONCURRENCY", "2")
+    ids = ["b1", "b2", "b1", "b3", "b4", "cached"]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as ac:
+        await ac.get("/internal/photos/meta?photo_id=cached")
+        # A single-id request racing the batch shares its fetch of b2
+        batch, single = await asyncio.gather(
+            ac.post("/internal/photos/meta/batch", json={"photo_ids": ids}),
+            ac.get("/internal/photos/meta?photo_id=b2"),
+        )
+    assert batch.status_code == 200 and single.status_code == 200
+    results = batch.json()["results"]
+    assert [r["photo_id"] for r in results] == ["b1", "b2", "b3", "b4", "cached"]
+    assert all(r["source"] == "live" and r["etag"] == '"v1"' for r in results)
+    assert results[-1]["cache_status"] == "hit_fresh"
+
+    fetched = sorted(r.url.path.rsplit("/", 1)[-1] for r in seen)
+    assert fetched == ["b1", "b2", "b3", "b4", "cached"]
+    # Two batch slots, plus the single request's own fetch
+    assert seen.active["max"] <= 3
+
+
+async def test_batch_meta_validates_size(monkeypatch):
+    monkeypatch.setenv("UNSPLASH_META_BATCH_MAX", "2")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as ac:
+        empty = await ac.post("/internal/photos/meta/batch", json={"photo_ids": []})
+        big = await ac.post(
+            "/internal/photos/meta/batch", json={"photo_ids": ["a", "b", "c"]}
+        )
+    assert empty.status_code == 400 and big.status_code == 400
@@ -0,0 +1,94 @@
+import httpx
+from freezegun import freeze_time
+
+from Backend.services import metrics, upstream_budget
+from Backend.services import unsplash_integration as ui
+from Backend.services.track_queue import TrackQueue
+from Backend.services.upstream_budget import UpstreamBudget
+from Backend.utils import http_client
+
+
+def test_low_priorities_stop_first_and_headers_correct_the_estimate():
+    metrics.reset()
+    budget = UpstreamBudget("unsplash", limit=10, window_sec=3600)
+    with freeze_time("2025-01-01 12:00:00") as frozen:
+        # Tracking keeps half the limit back
+        assert [budget.acquire("tracking") for _ in range(6)] == [True] * 5 + [False]
+        assert budget.acquire("random") and budget.acquire("meta")
+        assert budget.remaining == 3
+
+        # Unsplash reports fewer left than we estimated
+        budget.observe(200, {"X-Ratelimit-Limit": "10", "X-Ratelimit-Remaining": "2"})
+        assert not budget.acquire("random") and not budget.acquire("prewarm")
+        assert budget.wait_time("prewarm") == 3600
+        assert budget.acquire("meta")
+
+        budget.observe(429, {"Retry-After": "120"})
+        assert budget.remaining == 0 and not budget.acquire("meta")
+        assert budget.wait_time("meta") == 120
+
+        frozen.tick(delta=121)
+        assert budget.acquire("tracking") and budget.remaining == 9
+
+    counters = metrics.get_metrics()
+    assert counters["upstream.unsplash.denied.tracking"] == 1
+    assert counters["upstream.unsplash.denied.meta"] == 1
+    assert counters["upstream.unsplash.calls.meta"] == 2
+    assert counters["upstream.unsplash.remaining"] == 9
+    assert counters["upstream.unsplash.limit"] == 10
+
+
+def test_mapbox_headers_set_limit_window_and_reset():
+    budget = UpstreamBudget("mapbox", limit=600, window_sec=60)
+    with freeze_time("2025-01-01 12:00:00"):
+        reset = httpx.Headers(
+            {
+                "X-Rate-Limit-Limit": "100",
+                "X-Rate-Limit-Interval": "60",
+                "X-Rate-Limit-Reset": str(1735732800 + 30),
+            }
+        )
+        budget.acquire("meta")
+        budget.observe(200, reset)
+        assert (budget.limit, budget.window_sec) == (100, 60)
+        assert budget.reset_at == 1735732830
+        budget.remaining = 0
+        assert budget.wait_time("meta") == 30
+
+
+async def test_unsplash_calls_spend_and_respect_the_shared_budget(monkeypatch):
+    monkeypatch.setenv("UNSPLASH_BUDGET_PER_HOUR", "10")
+    monkeypatch.setenv("UNSPLASH_CLIENT_ID", "key")
+    seen = []
+
+    async def handler(request):
+        seen.append(request.url.path)
+        return httpx.Response(
+            200,
+            json={"id": "p1", "urls": {}, "links": {}, "user": {}},
+            headers={"X-Ratelimit-Limit": "10", "X-Ratelimit-Remaining": "2"},
+        )
+
+    stub = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(http_client, "_client", stub)
+    try:
+        assert await ui.fetch_photo_meta_async("p1", "key")
+        budget = upstream_budget.get_budget("unsplash")
+        assert budget.remaining == 2
+
+        # Below the random and tracking reserves: no call is made
+        assert await ui.fetch_random_photo_async("forest", "key") is None
+        assert not await ui.trigger_photo_download_async("https://u/d", "key")
+        assert seen == ["/photos/p1"]
+
+        # The track queue keeps its items until the budget refills
+        queue = TrackQueue(budget_per_hour=100)
+        queue.submit("t1", "https://u/d")
+        assert await queue.drain() > 0
+        assert len(queue) == 1 and seen == ["/photos/p1"]
+
+        budget.remaining = budget.limit
+        assert await queue.drain() == 0 and len(queue) == 0
+        assert seen == ["/photos/p1", "/d"]
+    finally:
+        await stub.aclose()
@@ -0,0 +1,122 @@
+import httpx
+import pytest
+from freezegun import freeze_time
+
+from Backend.models.errors import UpstreamError
+from Backend.services import weather
+from Backend.utils import peer_cache
+from Backend.utils.cache_codec import encode_entry
+from Backend.utils.peer_cache import PeerCache
+
+PAYLOAD = {
+    "hourly": {
+        "time": ["2025-06-01T10:00", "2025-06-01T11:00"],
+        "cloudcover": [5, 10],
+        "temperature_2m": [70.0, 72.0],
+    }
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_weather_state():
+    weather._weather_cache.clear()
+    weather._last_known_good.clear()
+    yield
+    weather._weather_cache.clear()
+    weather._last_known_good.clear()
+
+
+def _upstream(monkeypatch, outcomes):
+    calls = []
+
+    async def fake_fetch(lat, lon):
+        calls.append((lat, lon))
+        result = outcomes[min(len(calls), len(outcomes)) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(weather, "fetch_weather_raw", fake_fetch)
+    return calls
+
+
+async def test_outage_serves_last_known_good_past_swr(monkeypatch):
+    calls = _upstream(monkeypatch, [PAYLOAD, UpstreamError("down")])
+    monkeypatch.setenv("WEATHER_ERROR_TTL_SEC", "60")
+    with freeze_time("2025-06-01 08:00:00") as frozen:
+        slots, status = await weather.get_weather_cached(47.6, -122.3)
+        assert status == "cached" and len(slots) == 2
+
+        # Past TTL + SWR the main cache evicts; the upstream is down
+        frozen.tick(delta=3600)
+        stale, status = await weather.get_weather_cached(47.6, -122.3)
+        assert status == "stale" and stale == slots
+
+        # The failure is negatively cached: no upstream call, still flagged
+        frozen.tick(delta=30)
+        _, status = await weather.get_weather_cached(47.6, -122.3)
+        assert status == "stale" and len(calls) == 2
+
+
+async def test_failure_without_history_uses_short_negative_ttl(monkeypatch):
+    calls = _upstream(monkeypatch, [UpstreamError("down"), UpstreamError("down"), PAYLOAD])
+    monkeypatch.setenv("WEATHER_ERROR_TTL_SEC", "60")
+    with freeze_time("2025-06-01 08:00:00") as frozen:
+        assert await weather.get_weather_cached(1.0, 2.0) == ([], "error")
+        assert await weather.get_weather_cached(1.0, 2.0) == ([], "error")
+        assert len(calls) == 1
+
+        frozen.tick(delta=61)
+        assert (await weather.get_weather_cached(1.0, 2.0))[1] == "error"
+        frozen.tick(delta=61)
+        slots, status = await weather.get_weather_cached(1.0, 2.0)
+        assert status == "cached" and len(slots) == 2 and len(calls) == 3
+
+
+def test_last_known_good_is_bounded_and_ages_out():
+    lkg = weather.LastKnownGood(maxsize=2, max_age=100)
+    with freeze_time("2025-06-01 08:00:00") as frozen:
+        for key in ("a", "b", "c"):
+            lkg.put(key, [])
+        assert lkg.get("a") is None and lkg.get("c") == []
+        frozen.tick(delta=101)
+        assert lkg.get("c") is None
+
+
+async def test_peer_fill_carries_the_owners_fallback_status(monkeypatch):
+    monkeypatch.setenv("WEATHER_ERROR_TTL_SEC", "60")
+    peers = PeerCache(["http://a:8000", "http://b:8000"], "http://a:8000")
+    lat = next(
+        lat
+        for lat in map(float, range(100))
+        if peers.should_forward(weather._weather_key(lat, 0.0))
+    )
+    key = weather._weather_key(lat, 0.0)
+    _upstream(monkeypatch, [PAYLOAD, UpstreamError("down")])
+    with freeze_time("2025-06-01 08:00:00") as frozen:
+        # Owner side: a forecast, then an outage past TTL + SWR
+        await peer_cache.serve_peer("weather", key)
+        frozen.tick(delta=3600)
+        served = await peer_cache.serve_peer("weather", key)
+        assert served.value["status"] == "stale" and len(served.value["slots"]) == 2
+        assert served.ttl_seconds == 60 and served.swr_seconds == 0
+
+        # Caller side (another instance): the fallback stays flagged stale
+        weather._weather_cache.clear()
+        weather._last_known_good.clear()
+        peers._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, content=encode_entry(served))
+            )
+        )
+        monkeypatch.setattr(weather, "get_peer_cache", lambda: peers)
+        slots, status = await weather.get_weather_cached(lat, 0.0)
+        assert status == "stale" and slots == served.value["slots"]
+        _, status = await weather.get_weather_cached(lat, 0.0)  # local hit
+        assert status == "stale" and peers.stats["remote_hits"] == 1
+
+        # Nothing known on the owner either: an error, not an empty forecast
+        frozen.tick(delta=120)
+        weather._last_known_good.clear()
+        served.value = {"slots": [], "status": "error"}
+        assert await weather.get_weather_cached(lat, 0.0) == ([], "error")
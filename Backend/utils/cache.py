@@ -1,66 +1,273 @@
-"""Cache utilities with unified in-process implementation.
+"""Cache utilities built on the in-process cache.
 
-This module exposes a simple `cached` decorator and a `get_or_set` helper
-using the high-performance in-process cache implementation with LRU eviction,
-TTL expiration, and stale-while-revalidate capabilities.
+This module exposes the `cached` decorator and a `get_or_set` helper on top of
+the in-process cache implementation (LRU eviction, TTL expiration and
+stale-while-revalidate).
 
-The previous Redis-based implementation has been removed in favor of a
-simplified single-cache approach optimized for serverless and container
-deployments where in-process caching provides better performance and
-reduced complexity.
+Keys produced by `cached` are canonical: call arguments are bound to the
+function signature (so positional and keyword calls agree), normalized to a
+JSON-compatible form with sorted keys, and digested with BLAKE2b. Unlike the
+builtin `hash()`, the digest is not salted per process, so every worker
+derives the same key for the same call and keys can be shared or persisted.
 """
 
+import asyncio
+import hashlib
 import inspect
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
 from functools import wraps
-from typing import Any, Callable
+from typing import Any, Callable, Dict, Optional, Tuple, Type
 
+from . import cache_inproc
 from .cache_inproc import cache
 
+logger = logging.getLogger(__name__)
 
-def cached(ttl: int = 3600, key_prefix: str = "") -> Callable:
+# Marker key used to store negatively cached errors. The marker is a plain
+# dict so it survives any serializer that can handle the cached values.
+_ERROR_MARKER = "__cached_error__"
+
+
+def _normalize(value: Any) -> Any:
+    """Convert a call argument into a deterministic JSON-compatible structure."""
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        # Collapse -0.0 and integral floats so 47 and 47.0 share a key
+        if value == 0:
+            return 0
+        if value.is_integer():
+            return int(value)
+        return value
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        items = [_normalize(v) for v in value]
+        return sorted(items, key=lambda v: json.dumps(v, sort_keys=True))
+    if hasattr(value, "model_dump"):
+        return _normalize(value.model_dump())
+    return f"{type(value).__qualname__}:{value}"
+
+
+def canonical_key(
+    key_prefix: str, func: Callable, args: tuple, kwargs: dict
+) -> str:
+    """Build a deterministic cache key for a call to `func`.
+
+    Args:
+        key_prefix: Namespace prefix (e.g. "geocode")
+        func: The decorated function
+        args: Positional call arguments
+        kwargs: Keyword call arguments
+
+    Returns:
+        Key of the form ``<prefix>:<qualname>:<digest>``
+    """
+    try:
+        bound = inspect.signature(func).bind_partial(*args, **kwargs)
+        bound.apply_defaults()
+        normalized: Any = _normalize(dict(bound.arguments))
+    except (TypeError, ValueError):
+        # Signature unavailable or call doesn't bind; fall back to raw args
+        normalized = {"args": _normalize(args), "kwargs": _normalize(kwargs)}
+
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+    return ":".join(p for p in (key_prefix, func.__qualname__, digest) if p)
+
+
+@dataclass
+class CacheStats:
+    """Per-function cache counters."""
+
+    hits: int = 0
+    stale_hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    errors: int = 0
+    refreshes: int = 0
+    load_count: int = 0
+    load_ms_total: float = 0.0
+    load_ms_max: float = 0.0
+
+    def record_load(self, elapsed_ms: float) -> None:
+        self.load_count += 1
+        self.load_ms_total += elapsed_ms
+        self.load_ms_max = max(self.load_ms_max, elapsed_ms)
+
+    def as_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = asdict(self)
+        lookups = self.hits + self.stale_hits + self.negative_hits + self.misses
+        data["hit_ratio"] = (
+            round((lookups - self.misses) / lookups, 4) if lookups else 0.0
+        )
+        data["load_ms_avg"] = (
+            round(self.load_ms_total / self.load_count, 3) if self.load_count else 0.0
+        )
+        return data
+
+
+_STATS: Dict[str, CacheStats] = {}
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Return hit/miss/latency counters for every `cached` function."""
+    return {name: stats.as_dict() for name, stats in _STATS.items()}
+
+
+def reset_cache_stats() -> None:
+    """Reset all per-function counters (test helper)."""
+    for stats in _STATS.values():
+        # Reset in place; decorated functions hold references to these objects
+        stats.__dict__.update(asdict(CacheStats()))
+
+
+def _error_marker(exc: BaseException) -> Dict[str, Any]:
+    cls = type(exc)
+    return {
+        _ERROR_MARKER: f"{cls.__module__}.{cls.__qualname__}",
+        "args": [str(a) for a in exc.args],
+    }
+
+
+def _is_error_marker(value: Any) -> bool:
+    return isinstance(value, dict) and _ERROR_MARKER in value
+
+
+def _raise_from_marker(
+    marker: Dict[str, Any], cache_errors: Tuple[Type[BaseException], ...]
+) -> None:
+    name = marker.get(_ERROR_MARKER)
+    for cls in cache_errors:
+        if f"{cls.__module__}.{cls.__qualname__}" == name:
+            raise cls(*marker.get("args", []))
+    # Unknown error type (e.g. configuration changed); surface a generic error
+    raise RuntimeError(f"Cached error: {name}: {marker.get('args')}")
+
+
+def cached(
+    ttl: int = 3600,
+    key_prefix: str = "",
+    *,
+    swr: Optional[int] = None,
+    error_ttl: int = 0,
+    cache_errors: Tuple[Type[BaseException], ...] = (),
+    store: Optional[Any] = None,
+) -> Callable:
     """Decorator for caching coroutine function results.
 
-    Caches function results using the in-process cache implementation with
-    LRU eviction and TTL expiration. Supports stale-while-revalidate for
-    high availability.
+    Concurrent misses for the same key share one call to the wrapped function
+    (single-flight). Entries past their TTL but within the SWR window are
+    served immediately while a single background refresh runs. Exceptions
+    listed in `cache_errors` are cached for `error_ttl` seconds and re-raised
+    on hits, so repeated failing lookups don't reach the upstream.
 
     Args:
         ttl: Time-to-live in seconds for cached results
         key_prefix: Optional prefix for cache keys to avoid collisions
+        swr: Stale-while-revalidate window in seconds (cache default if None)
+        error_ttl: Time-to-live for negatively cached errors (0 disables)
+        cache_errors: Exception types eligible for negative caching
+        store: Cache exposing `get_status`/`set`, or a zero-argument callable
+            returning one (global in-process cache if None)
 
     Returns:
         Decorated function with caching behavior
     """
 
     def decorator(func: Callable):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            cache_key = (
-                f"{key_prefix}:{func.__name__}:" + str(hash(str(args) + str(kwargs)))
-            )
+        stats_name = ":".join(p for p in (key_prefix, func.__qualname__) if p)
+        stats = _STATS.setdefault(stats_name, CacheStats())
+        inflight: Dict[str, asyncio.Future] = {}
+
+        def _store() -> Any:
+            if store is None:
+                return cache
+            # Resolve lazily so backends configured at startup are honored
+            return store() if callable(store) else store
+
+        async def _load(key: str, args: tuple, kwargs: dict) -> Any:
+            start = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(func):
+                    result = await func(*args, **kwargs)
+                else:
+                    result = func(*args, **kwargs)
+            except cache_errors as exc:
+                stats.errors += 1
+                stats.record_load((time.perf_counter() - start) * 1000)
+                if error_ttl > 0:
+                    try:
+                        await _store().set(key, _error_marker(exc), error_ttl, 0)
+                    except Exception:
+                        logger.debug("Negative cache set failed for %s", key)
+                raise
+            except Exception:
+                stats.errors += 1
+                stats.record_load((time.perf_counter() - start) * 1000)
+                raise
 
-            # Try cache get
+            stats.record_load((time.perf_counter() - start) * 1000)
             try:
-                cached_result = await cache.get(cache_key)
+                await _store().set(key, result, ttl, swr)
             except Exception:
-                cached_result = None
+                # Cache set failure doesn't break functionality
+                logger.debug("Cache set failed for %s", key)
+            return result
+
+        def _start(key: str, args: tuple, kwargs: dict) -> asyncio.Future:
+            task = inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(_load(key, args, kwargs))
+                inflight[key] = task
+
+                def _done(_task: asyncio.Future, k: str = key) -> None:
+                    inflight.pop(k, None)
 
-            if cached_result is not None:
-                return cached_result
+                task.add_done_callback(_done)
+            return task
 
-            # Cache miss: execute function and cache result
-            if inspect.iscoroutinefunction(func):
-                result = await func(*args, **kwargs)
-            else:
-                result = func(*args, **kwargs)
+        async def _refresh(key: str, args: tuple, kwargs: dict) -> None:
+            if key in inflight:
+                return
+            stats.refreshes += 1
+            task = _start(key, args, kwargs)
+            task.add_done_callback(_log_refresh_failure)
+            if cache_inproc.SYNC_REFRESH:
+                # Deterministic mode for tests: finish the refresh inline
+                try:
+                    await asyncio.shield(task)
+                except Exception:
+                    pass
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = canonical_key(key_prefix, func, args, kwargs)
 
             try:
-                await cache.set(cache_key, result, ttl)
+                value, status = await _store().get_status(key)
             except Exception:
-                # Cache set failure doesn't break functionality
-                pass
+                value, status = None, "miss"
 
-            return result
+            if status == "hit_fresh" or status == "hit_stale":
+                if _is_error_marker(value):
+                    stats.negative_hits += 1
+                    _raise_from_marker(value, cache_errors)
+                if status == "hit_stale":
+                    stats.stale_hits += 1
+                    await _refresh(key, args, kwargs)
+                else:
+                    stats.hits += 1
+                return value
+
+            stats.misses += 1
+            # Shield so a cancelled caller doesn't cancel the shared load
+            return await asyncio.shield(_start(key, args, kwargs))
 
         # Preserve the original function signature so FastAPI can detect parameters
         try:
@@ -71,11 +278,26 @@ def cached(ttl: int = 3600, key_prefix: str = "") -> Callable:
             # best-effort: if signature cannot be set, continue without failing
             pass
 
+        setattr(
+            wrapper,
+            "cache_key",
+            lambda *a, **kw: canonical_key(key_prefix, func, a, kw),
+        )
+        setattr(wrapper, "cache_stats", stats.as_dict)
+
         return wrapper
 
     return decorator
 
 
+def _log_refresh_failure(task: asyncio.Future) -> None:
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.warning("Background refresh failed: %s", exc)
+
+
 async def get_or_set(
     key: str, factory: Callable, ttl: int = 3600, stale_reval: int = 300
 ) -> tuple[Any, str]:
@@ -0,0 +1,313 @@
+"""Cross-instance cache propagation over pub/sub.
+
+Each instance keeps its own in-process caches. The bus keeps them in step:
+
+- `set`: a freshly computed entry is broadcast (binary-encoded with its
+  creation time, TTL and SWR) and peers adopt it into the matching named
+  cache unless they already hold a newer copy. A forecast fetched on one node
+  is then warm on every node without another upstream call.
+- `del` / `del_prefix`: invalidations by key or prefix drop the entry
+  fleet-wide; `invalidate`/`invalidate_prefix` also purge the shared L2.
+
+Messages carry the sender's instance id so an instance ignores its own
+broadcasts. `RedisCacheBus` uses Redis pub/sub; `InMemoryCacheBus` connects
+buses in one process through a shared hub (tests and single-host dev).
+
+Configuration:
+    CACHE_BUS_BACKEND: "redis" (uses REDIS_URL) or "local"; unset disables
+    CACHE_BUS_CHANNEL: pub/sub channel name (default "sunchaser:cache")
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+from Backend.utils.cache_codec import decode_entry, encode_entry
+from Backend.utils.cache_inproc import CacheEntry, InProcessCache
+from Backend.utils.external_cache import (
+    _connection_pool,
+    get_l2_backend,
+    named_caches,
+)
+
+logger = logging.getLogger(__name__)
+
+OP_SET = "set"
+OP_DELETE = "del"
+OP_DELETE_PREFIX = "del_prefix"
+
+
+def _select(
+    caches: Dict[str, InProcessCache], namespace: Optional[str]
+) -> List[InProcessCache]:
+    if namespace is None:
+        return list(caches.values())
+    return [caches[namespace]] if namespace in caches else []
+
+
+class CacheBus(ABC):
+    """Publishes cache changes and applies changes received from peers.
+
+    Transports implement `_publish`; `start`/`stop` are optional hooks.
+    """
+
+    def __init__(
+        self,
+        caches: Optional[Callable[[], Dict[str, InProcessCache]]] = None,
+        instance_id: Optional[str] = None,
+    ):
+        self.instance_id = instance_id or uuid.uuid4().hex
+        self._caches = caches or named_caches
+        self.stats: Dict[str, int] = {
+            "published": 0,
+            "received": 0,
+            "applied": 0,
+            "ignored": 0,
+            "errors": 0,
+        }
+
+    async def start(self) -> None:
+        """Begin receiving peer messages."""
+
+    async def stop(self) -> None:
+        """Stop receiving peer messages and release resources."""
+
+    @abstractmethod
+    async def _publish(self, raw: bytes) -> None:
+        """Deliver one encoded message to every peer."""
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        message["origin"] = self.instance_id
+        raw = json.dumps(message, separators=(",", ":")).encode("utf-8")
+        await self._publish(raw)
+        self.stats["published"] += 1
+
+    async def publish_set(self, namespace: str, key: str, entry: CacheEntry) -> None:
+        await self._send(
+            {
+                "op": OP_SET,
+                "ns": namespace,
+                "key": key,
+                "entry": base64.b64encode(encode_entry(entry)).decode("ascii"),
+            }
+        )
+
+    async def publish_delete(self, key: str, namespace: Optional[str] = None) -> None:
+        await self._send({"op": OP_DELETE, "ns": namespace, "key": key})
+
+    async def publish_delete_prefix(
+        self, prefix: str, namespace: Optional[str] = None
+    ) -> None:
+        await self._send({"op": OP_DELETE_PREFIX, "ns": namespace, "prefix": prefix})
+
+    async def handle(self, raw: Any) -> None:
+        """Apply one message received from the channel."""
+        self.stats["received"] += 1
+        try:
+            message = json.loads(raw)
+            if message.get("origin") == self.instance_id:
+                self.stats["ignored"] += 1
+                return
+            if await self._apply(message):
+                self.stats["applied"] += 1
+            else:
+                self.stats["ignored"] += 1
+        except Exception:
+            self.stats["errors"] += 1
+            logger.warning("Failed to apply cache bus message", exc_info=True)
+
+    async def _apply(self, message: Dict[str, Any]) -> bool:
+        op = message.get("op")
+        targets = _select(self._caches(), message.get("ns"))
+        if op == OP_DELETE:
+            return sum(c.delete(message["key"]) for c in targets) > 0
+        if op == OP_DELETE_PREFIX:
+            return sum(c.delete_prefix(message["prefix"]) for c in targets) > 0
+        if op != OP_SET or not targets:
+            return False
+
+        entry = decode_entry(base64.b64decode(message["entry"]))
+        if entry is None or entry.should_evict:
+            return False
+        key = message["key"]
+        cache = targets[0]
+        current = cache.peek(key)
+        if current is not None and current.created_at >= entry.created_at:
+            # Keep the newer local copy
+            return False
+        await cache.set(
+            key,
+            entry.value,
+            entry.ttl_seconds,
+            entry.swr_seconds,
+            created_at=entry.created_at,
+        )
+        return True
+
+
+class InMemoryBusHub:
+    """Connects in-memory buses in one process; delivery is immediate."""
+
+    def __init__(self) -> None:
+        self.buses: List["InMemoryCacheBus"] = []
+
+    async def broadcast(self, raw: bytes) -> None:
+        for bus in list(self.buses):
+            await bus.handle(raw)
+
+
+class InMemoryCacheBus(CacheBus):
+    """Stand-in for Redis pub/sub used by tests and single-host dev."""
+
+    def __init__(self, hub: Optional[InMemoryBusHub] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.hub = hub or _default_hub
+
+    async def start(self) -> None:
+        if self not in self.hub.buses:
+            self.hub.buses.append(self)
+
+    async def stop(self) -> None:
+        if self in self.hub.buses:
+            self.hub.buses.remove(self)
+
+    async def _publish(self, raw: bytes) -> None:
+        await self.hub.broadcast(raw)
+
+
+class RedisCacheBus(CacheBus):
+    """Cache bus over Redis pub/sub."""
+
+    def __init__(
+        self, client: Optional[Any] = None, channel: Optional[str] = None, **kwargs: Any
+    ):
+        super().__init__(**kwargs)
+        if client is None:
+            import redis.asyncio as redis  # type: ignore[import-untyped]
+
+            client = redis.Redis(connection_pool=_connection_pool(redis))
+        self._client = client
+        self.channel = channel or os.environ.get("CACHE_BUS_CHANNEL", "sunchaser:cache")
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _publish(self, raw: bytes) -> None:
+        await self._client.publish(self.channel, raw)
+
+    async def _listen(self) -> None:
+        delay = 0.5
+        while True:
+            pubsub = self._client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                delay = 0.5
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self.handle(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Cache bus subscription lost; retrying in %.1fs", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+_default_hub = InMemoryBusHub()
+_bus: Optional[CacheBus] = None
+
+
+def get_cache_bus() -> Optional[CacheBus]:
+    """Return the running cache bus, or None when propagation is disabled."""
+    return _bus
+
+
+async def start_cache_bus() -> Optional[CacheBus]:
+    """Create and start the configured bus (call on startup)."""
+    global _bus
+    if _bus is not None:
+        return _bus
+    kind = os.environ.get("CACHE_BUS_BACKEND", "").lower()
+    if kind == "redis":
+        try:
+            bus: CacheBus = RedisCacheBus()
+        except Exception:
+            logger.warning("Failed to initialize Redis cache bus; propagation disabled")
+            return None
+    elif kind == "local":
+        bus = InMemoryCacheBus()
+    else:
+        return None
+    await bus.start()
+    _bus = bus
+    logger.info("Started %s (instance %s)", type(bus).__name__, bus.instance_id)
+    return bus
+
+
+async def stop_cache_bus() -> None:
+    """Stop the bus (call on shutdown)."""
+    global _bus
+    if _bus is not None:
+        try:
+            await _bus.stop()
+        finally:
+            _bus = None
+
+
+async def invalidate(key: str, namespace: Optional[str] = None) -> int:
+    """Drop `key` locally, in the shared L2 and on every peer.
+
+    Args:
+        key: Cache key to drop
+        namespace: Named cache to target (all caches if None)
+
+    Returns:
+        Number of local entries removed
+    """
+    removed = 0
+    for cache in _select(named_caches(), namespace):
+        removed += int(cache.delete(key))
+    l2 = get_l2_backend()
+    if l2 is not None:
+        await l2.delete(key)
+    if _bus is not None:
+        await _bus.publish_delete(key, namespace)
+    return removed
+
+
+async def invalidate_prefix(prefix: str, namespace: Optional[str] = None) -> int:
+    """Drop every key starting with `prefix` locally, in L2 and on peers."""
+    if not prefix:
+        raise ValueError("prefix must not be empty")
+    removed = 0
+    for cache in _select(named_caches(), namespace):
+        removed += cache.delete_prefix(prefix)
+    l2 = get_l2_backend()
+    if l2 is not None:
+        await l2.delete_prefix(prefix)
+    if _bus is not None:
+        await _bus.publish_delete_prefix(prefix, namespace)
+    return removed
+
+
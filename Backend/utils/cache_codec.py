@@ -0,0 +1,173 @@
+"""Compact binary encoding for cache entries stored outside the process.
+
+Every encoded entry starts with a fixed header::
+
+    version:u8 | format:u8 | created_at:f64 | ttl:u32 | swr:u32
+
+followed by the payload. Bumping `CODEC_VERSION` makes older entries decode
+as misses instead of being misread after a deploy.
+
+Payload formats:
+
+- FORMAT_FORECAST: hourly forecast slots (`ts_local`, `cloud_pct`, `temp_f`)
+  struct-packed at 7 bytes per slot (minutes since epoch, cloud %, tenths of
+  a degree). This is the bulk of what the shared cache holds.
+- FORMAT_MSGPACK: any other value, when `msgpack` is installed.
+- FORMAT_JSON: fallback for everything else.
+"""
+
+import json
+import struct
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from Backend.utils.cache_inproc import CacheEntry
+
+try:  # Optional dependency: msgpack gives smaller/faster generic payloads
+    import msgpack  # type: ignore[import-untyped]
+
+    msgpack_available = True
+except Exception:  # pragma: no cover - depends on environment
+    msgpack = None
+    msgpack_available = False
+
+CODEC_VERSION = 1
+
+FORMAT_JSON = 1
+FORMAT_MSGPACK = 2
+FORMAT_FORECAST = 3
+
+_HEADER = struct.Struct("!BBdII")
+_COUNT = struct.Struct("!H")
+_SLOT_KEYS = {"ts_local", "cloud_pct", "temp_f"}
+_EPOCH = date(1970, 1, 1)
+
+
+def _day_minutes(day: str, cache: Dict[str, Optional[int]]) -> Optional[int]:
+    """Minutes since epoch at midnight of a "YYYY-MM-DD" date (memoized)."""
+    if day not in cache:
+        try:
+            parsed = date(int(day[0:4]), int(day[5:7]), int(day[8:10]))
+        except ValueError:
+            parsed = None
+        # Only pack dates that format back identically
+        if parsed is None or parsed.isoformat() != day:
+            cache[day] = None
+        else:
+            cache[day] = (parsed - _EPOCH).days * 1440
+    return cache[day]
+
+
+def _pack_forecast(value: Any) -> Optional[bytes]:
+    """Pack a list of forecast slots, or return None if it doesn't round-trip."""
+    if not isinstance(value, list) or not value or len(value) > 0xFFFF:
+        return None
+    days: Dict[str, Optional[int]] = {}
+    fields: List[int] = []
+    for slot in value:
+        if not isinstance(slot, dict) or slot.keys() != _SLOT_KEYS:
+            return None
+        ts, cloud, temp = slot["ts_local"], slot["cloud_pct"], slot["temp_f"]
+        if type(cloud) is not int or type(temp) is not float or not 0 <= cloud <= 255:
+            return None
+        if not isinstance(ts, str) or len(ts) != 16 or ts[10] != "T" or ts[13] != ":":
+            return None
+        base = _day_minutes(ts[:10], days)
+        hh, mm = ts[11:13], ts[14:16]
+        if base is None or not (hh.isdigit() and mm.isdigit()):
+            return None
+        hour, minute = int(hh), int(mm)
+        if hour > 23 or minute > 59:
+            return None
+        tenths = round(temp * 10)
+        if tenths / 10 != temp or not -32768 <= tenths <= 32767:
+            return None
+        fields += (base + hour * 60 + minute, cloud, tenths)
+    count = len(value)
+    return _COUNT.pack(count) + struct.pack("!" + "iBh" * count, *fields)
+
+
+def _unpack_forecast(payload: bytes) -> List[dict]:
+    (count,) = _COUNT.unpack_from(payload, 0)
+    fields = struct.unpack_from("!" + "iBh" * count, payload, _COUNT.size)
+    days: Dict[int, str] = {}
+    out = []
+    for i in range(0, len(fields), 3):
+        day, rest = divmod(fields[i], 1440)
+        prefix = days.get(day)
+        if prefix is None:
+            prefix = days[day] = (_EPOCH + timedelta(days=day)).isoformat()
+        out.append(
+            {
+                "ts_local": f"{prefix}T{rest // 60:02d}:{rest % 60:02d}",
+                "cloud_pct": fields[i + 1],
+                "temp_f": fields[i + 2] / 10,
+            }
+        )
+    return out
+
+
+def encode_value(value: Any) -> tuple[int, bytes]:
+    """Return (format, payload) for a cache value."""
+    packed = _pack_forecast(value)
+    if packed is not None:
+        return FORMAT_FORECAST, packed
+    if msgpack_available:
+        try:
+            return FORMAT_MSGPACK, msgpack.packb(value, use_bin_type=True)
+        except Exception:
+            pass
+    return FORMAT_JSON, json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def decode_value(fmt: int, payload: bytes) -> Any:
+    if fmt == FORMAT_FORECAST:
+        return _unpack_forecast(payload)
+    if fmt == FORMAT_MSGPACK:
+        if not msgpack_available:
+            raise ValueError("msgpack payload but msgpack is not installed")
+        return msgpack.unpackb(payload, raw=False)
+    if fmt == FORMAT_JSON:
+        return json.loads(payload.decode("utf-8"))
+    raise ValueError(f"Unknown cache payload format: {fmt}")
+
+
+def encode_entry(entry: CacheEntry) -> bytes:
+    """Serialize a cache entry (value plus freshness metadata)."""
+    fmt, payload = encode_value(entry.value)
+    header = _HEADER.pack(
+        CODEC_VERSION,
+        fmt,
+        float(entry.created_at),
+        max(0, int(entry.ttl_seconds)),
+        max(0, int(entry.swr_seconds)),
+    )
+    return header + payload
+
+
+def peek_header(raw: bytes) -> Optional[Tuple[float, int, int]]:
+    """Return (created_at, ttl, swr) without decoding the value."""
+    if len(raw) < _HEADER.size:
+        return None
+    version, _, created_at, ttl, swr = _HEADER.unpack_from(raw, 0)
+    if version != CODEC_VERSION:
+        return None
+    return created_at, ttl, swr
+
+
+def decode_entry(raw: Any) -> Optional[CacheEntry]:
+    """Deserialize an entry; unknown versions or corrupt data decode as None."""
+    if isinstance(raw, str):
+        raw = raw.encode("latin-1")
+    if not isinstance(raw, (bytes, bytearray)) or len(raw) < _HEADER.size:
+        return None
+    try:
+        version, fmt, created_at, ttl, swr = _HEADER.unpack_from(raw, 0)
+        if version != CODEC_VERSION:
+            return None
+        value = decode_value(fmt, bytes(raw[_HEADER.size :]))
+    except Exception:
+        return None
+    return CacheEntry(
+        value=value, created_at=created_at, ttl_seconds=ttl, swr_seconds=swr
+    )
@@ -3,6 +3,8 @@ In-process cache with SWR (Stale-While-Revalidate) support
 """
 
 import asyncio
+import heapq
+import json
 import logging
 import os
 import time
@@ -21,6 +23,7 @@ class CacheEntry:
     created_at: float
     ttl_seconds: int
     swr_seconds: int
+    hits: int = 0
 
     @property
     def is_fresh(self) -> bool:
@@ -40,6 +43,30 @@ class CacheEntry:
         return age >= (self.ttl_seconds + self.swr_seconds)
 
 
+_NS_EVENTS = ("hits", "stale_hits", "misses", "sets", "evictions", "expirations")
+_AGE_BOUNDS = ((60, "<1m"), (300, "1-5m"), (900, "5-15m"), (3600, "15-60m"))
+_AGE_LABELS = tuple(label for _, label in _AGE_BOUNDS) + (">1h",)
+
+
+def namespace_of(key: str) -> str:
+    """Namespace of a key: the part before the first ':' ('' if none)"""
+    return key.split(":", 1)[0] if ":" in key else ""
+
+
+def _age_bucket(age: float) -> str:
+    for bound, label in _AGE_BOUNDS:
+        if age < bound:
+            return label
+    return ">1h"
+
+
+def _approx_size(value: Any) -> int:
+    try:
+        return len(json.dumps(value, separators=(",", ":"), default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
 class InProcessCache:
     """
     In-process LRU cache with TTL and Stale-While-Revalidate support
@@ -49,6 +76,8 @@ class InProcessCache:
     - TTL-based expiration
     - SWR: serve stale data while refreshing in background
     - Single-flight: prevent duplicate concurrent requests for same key
+    - Prefix index: keys are bucketed by namespace (the part before the first
+      ':'), so prefix purges and per-namespace reports only touch one bucket
     """
 
     def __init__(
@@ -61,6 +90,32 @@ class InProcessCache:
         self._access_order: list[str] = []  # For LRU tracking
         self._lock = Lock()
         self._refresh_tasks: dict[str, asyncio.Task] = {}  # Single-flight tracking
+        self._buckets: dict[str, set[str]] = {}  # namespace -> keys
+        self._ns_stats: dict[str, dict[str, int]] = {}
+
+    def _count(self, key: str, event: str) -> None:
+        ns = namespace_of(key)
+        stats = self._ns_stats.get(ns)
+        if stats is None:
+            stats = self._ns_stats[ns] = dict.fromkeys(_NS_EVENTS, 0)
+        stats[event] += 1
+
+    def _record_lookup(self, key: str, entry: Optional[CacheEntry]) -> None:
+        if entry is None:
+            self._count(key, "misses")
+        elif entry.is_fresh:
+            entry.hits += 1
+            self._count(key, "hits")
+        else:
+            entry.hits += 1
+            self._count(key, "stale_hits")
+
+    def _store(self, key: str, entry: CacheEntry) -> None:
+        """Insert an entry and index it under its namespace"""
+        self._cache[key] = entry
+        self._buckets.setdefault(namespace_of(key), set()).add(key)
+        self._update_access_order(key)
+        self._count(key, "sets")
 
     def _evict_expired(self) -> None:
         """Remove expired entries"""
@@ -70,12 +125,18 @@ class InProcessCache:
                 to_remove.append(key)
 
         for key in to_remove:
+            self._count(key, "expirations")
             self._remove_key(key)
 
     def _remove_key(self, key: str) -> None:
-        """Remove key from cache and access order"""
+        """Remove key from cache, access order and prefix index"""
         if key in self._cache:
             del self._cache[key]
+            bucket = self._buckets.get(namespace_of(key))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[namespace_of(key)]
         if key in self._access_order:
             self._access_order.remove(key)
 
@@ -89,6 +150,7 @@ class InProcessCache:
         """Evict least recently used items if over maxsize"""
         while len(self._cache) >= self.maxsize and self._access_order:
             lru_key = self._access_order[0]
+            self._count(lru_key, "evictions")
             self._remove_key(lru_key)
 
     async def get(self, key: str) -> Optional[Any]:
@@ -97,10 +159,12 @@ class InProcessCache:
             self._evict_expired()
 
             if key not in self._cache:
+                self._record_lookup(key, None)
                 return None
 
             entry = self._cache[key]
             self._update_access_order(key)
+            self._record_lookup(key, entry)
 
             if entry.is_fresh:
                 logger.debug(f"Cache hit (fresh): {key}")
@@ -114,24 +178,35 @@ class InProcessCache:
                 return None
 
     async def set(
-        self, key: str, value: Any, ttl: Optional[int] = None, swr: Optional[int] = None
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        swr: Optional[int] = None,
+        created_at: Optional[float] = None,
     ) -> None:
-        """Set value in cache"""
+        """Set value in cache.
+
+        `created_at` lets callers keep the original age of an entry copied from
+        another tier (e.g. a shared L2) so it expires at the same moment.
+        """
         if ttl is None:
             ttl = self.default_ttl
         if swr is None:
             swr = self.default_swr
 
         entry = CacheEntry(
-            value=value, created_at=time.time(), ttl_seconds=ttl, swr_seconds=swr
+            value=value,
+            created_at=time.time() if created_at is None else created_at,
+            ttl_seconds=ttl,
+            swr_seconds=swr,
         )
 
         with self._lock:
             self._evict_expired()
-            self._evict_lru()
-
-            self._cache[key] = entry
-            self._update_access_order(key)
+            if key not in self._cache:
+                self._evict_lru()
+            self._store(key, entry)
 
         logger.debug(f"Cache set: {key} (TTL: {ttl}s, SWR: {swr}s)")
 
@@ -157,6 +232,7 @@ class InProcessCache:
         with self._lock:
             self._evict_expired()
             entry = self._cache.get(key)
+            self._record_lookup(key, entry)
             if entry is not None:
                 self._update_access_order(key)
                 if entry.is_fresh:
@@ -280,6 +356,7 @@ class InProcessCache:
         with self._lock:
             self._evict_expired()
             entry = self._cache.get(key)
+            self._record_lookup(key, entry)
             if entry is None:
                 return None, "miss"
             self._update_access_order(key)
@@ -317,11 +394,142 @@ class InProcessCache:
                 return True
             raise
 
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """Return the raw entry for key without touching LRU order"""
+        with self._lock:
+            return self._cache.get(key)
+
+    def delete(self, key: str) -> bool:
+        """Remove a single key; returns True if it was present"""
+        with self._lock:
+            present = key in self._cache
+            self._remove_key(key)
+            return present
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Remove every key starting with prefix; returns the number removed"""
+        with self._lock:
+            keys = [k for k in self._keys_with_prefix(prefix)]
+            for key in keys:
+                self._remove_key(key)
+            return len(keys)
+
+    def _keys_with_prefix(self, prefix: str) -> list[str]:
+        """Keys starting with prefix, visiting only matching namespace buckets"""
+        ns, sep, _ = prefix.partition(":")
+        if sep:
+            buckets = [self._buckets.get(ns, set())]
+        else:
+            # Prefix inside the namespace itself (e.g. "w" or "wx")
+            buckets = [b for name, b in self._buckets.items() if name.startswith(ns)]
+        return [k for bucket in buckets for k in bucket if k.startswith(prefix)]
+
+    def keys(self, prefix: str = "") -> list[str]:
+        """List keys, optionally restricted to a prefix"""
+        with self._lock:
+            if not prefix:
+                return list(self._cache)
+            return self._keys_with_prefix(prefix)
+
+    def report(self, top_n: int = 10) -> dict[str, Any]:
+        """Per-namespace counts, sizes, hit rates and age histograms, plus the
+        hottest keys. Sizes are the JSON-encoded length of each value."""
+        # Copy what is needed under the lock; sizing values (a JSON encode
+        # each) happens outside it so a report doesn't stall cache users
+        with self._lock:
+            now = time.time()
+            snapshot = {
+                ns: (
+                    [self._cache[key] for key in self._buckets.get(ns, ())],
+                    dict(self._ns_stats.get(ns) or dict.fromkeys(_NS_EVENTS, 0)),
+                )
+                for ns in set(self._buckets) | set(self._ns_stats)
+            }
+            hot = heapq.nlargest(
+                top_n, self._cache.items(), key=lambda kv: kv[1].hits
+            )
+            hot_keys = [
+                {
+                    "key": key,
+                    "hits": entry.hits,
+                    "age_sec": round(now - entry.created_at, 1),
+                }
+                for key, entry in hot
+                if entry.hits
+            ]
+            total_entries = len(self._cache)
+
+        namespaces: dict[str, dict[str, Any]] = {}
+        for ns, (entries, counters) in snapshot.items():
+            lookups = counters["hits"] + counters["stale_hits"] + counters["misses"]
+            histogram = dict.fromkeys(_AGE_LABELS, 0)
+            size = fresh = 0
+            for entry in entries:
+                age = now - entry.created_at
+                histogram[_age_bucket(age)] += 1
+                fresh += age < entry.ttl_seconds
+                size += _approx_size(entry.value)
+            namespaces[ns] = {
+                "count": len(entries),
+                "fresh": fresh,
+                "stale": len(entries) - fresh,
+                "bytes": size,
+                **counters,
+                "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+                "stale_rate": (
+                    round(counters["stale_hits"] / lookups, 4) if lookups else 0.0
+                ),
+                "miss_rate": round(counters["misses"] / lookups, 4) if lookups else 0.0,
+                "age_histogram": histogram,
+            }
+        return {
+            "total_entries": total_entries,
+            "maxsize": self.maxsize,
+            "namespaces": dict(sorted(namespaces.items())),
+            "hot_keys": hot_keys,
+        }
+
+    def export_entries(
+        self, prefixes: Optional[tuple[str, ...]] = None
+    ) -> list[tuple[str, CacheEntry]]:
+        """Return live entries (optionally only keys with given prefixes),
+        least recently used first"""
+        with self._lock:
+            self._evict_expired()
+            return [
+                (key, self._cache[key])
+                for key in self._access_order
+                if key in self._cache
+                and (prefixes is None or key.startswith(prefixes))
+            ]
+
+    def import_entries(self, items: list[tuple[str, CacheEntry]]) -> int:
+        """Insert entries keeping their created_at; existing newer entries win.
+
+        Items are applied in order, so passing them least recently used first
+        preserves LRU order. Returns the number of entries inserted.
+        """
+        inserted = 0
+        with self._lock:
+            for key, entry in items:
+                if entry.should_evict:
+                    continue
+                current = self._cache.get(key)
+                if current is not None and current.created_at >= entry.created_at:
+                    continue
+                if current is None:
+                    self._evict_lru()
+                self._store(key, entry)
+                inserted += 1
+        return inserted
+
     def clear(self) -> None:
         """Clear all cache entries"""
         with self._lock:
             self._cache.clear()
             self._access_order.clear()
+            self._buckets.clear()
+            self._ns_stats.clear()
 
     def stats(self) -> dict[str, Any]:
         """Get cache statistics"""
@@ -0,0 +1,261 @@
+"""Snapshot in-process caches to disk across deploys.
+
+A deploy used to start every instance cold. With `CACHE_SNAPSHOT_PATH` set,
+the registered in-process caches are dumped at shutdown (and optionally on a
+timer) and restored at startup, so the first minutes after a deploy are hits.
+
+Only keys under opted-in namespaces (key prefixes) are persisted, so only
+plain serializable data (forecasts, geocodes, photo meta) reaches disk.
+
+File format (version 1)::
+
+    magic "SUNSNAP1" | version:u16 | codec version:u8 | saved_at:f64 | zlib(records)
+    record: cache name (u8 len) | key (u16 len) | age:f64 | ttl:u32 | swr:u32
+            | value format:u8 | value (u32 len)
+
+Entries store their age at dump time rather than an absolute timestamp. On
+load the age grows by the downtime (never negative if clocks disagree), and
+entries past TTL + SWR are skipped.
+
+Configuration:
+    CACHE_SNAPSHOT_PATH: snapshot file; unset disables snapshots
+    CACHE_SNAPSHOT_NAMESPACES: comma-separated key prefixes to persist
+        (default "wx:,geocode:,unsplash:meta:")
+    CACHE_SNAPSHOT_INTERVAL_SEC: also dump periodically (0 disables)
+"""
+
+import asyncio
+import io
+import logging
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from Backend.utils.cache_codec import CODEC_VERSION, decode_value, encode_value
+from Backend.utils.cache_inproc import CacheEntry, InProcessCache
+from Backend.utils.external_cache import named_caches
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SUNSNAP1"
+SNAPSHOT_VERSION = 1
+DEFAULT_NAMESPACES = ("wx:", "geocode:", "unsplash:meta:")
+
+_HEADER = struct.Struct("!8sHBd")
+_TIMES = struct.Struct("!dIIB")
+_U8 = struct.Struct("!B")
+_U16 = struct.Struct("!H")
+_U32 = struct.Struct("!I")
+
+
+def snapshot_namespaces() -> Tuple[str, ...]:
+    raw = os.environ.get("CACHE_SNAPSHOT_NAMESPACES")
+    if raw is None:
+        return DEFAULT_NAMESPACES
+    return tuple(p.strip() for p in raw.split(",") if p.strip())
+
+
+def _encode_records(
+    caches: Dict[str, InProcessCache], prefixes: Tuple[str, ...], now: float
+) -> Tuple[bytes, int]:
+    buf = io.BytesIO()
+    count = 0
+    for name, cache in caches.items():
+        name_b = name.encode("utf-8")[:255]
+        for key, entry in cache.export_entries(prefixes):
+            try:
+                fmt, payload = encode_value(entry.value)
+            except (TypeError, ValueError):
+                logger.debug("Skipping unserializable snapshot entry %s", key)
+                continue
+            key_b = key.encode("utf-8")
+            if len(key_b) > 0xFFFF:
+                continue
+            buf.write(_U8.pack(len(name_b)) + name_b)
+            buf.write(_U16.pack(len(key_b)) + key_b)
+            buf.write(
+                _TIMES.pack(
+                    max(0.0, now - entry.created_at),
+                    entry.ttl_seconds,
+                    entry.swr_seconds,
+                    fmt,
+                )
+            )
+            buf.write(_U32.pack(len(payload)) + payload)
+            count += 1
+    return buf.getvalue(), count
+
+
+def dump_snapshot(
+    path: str,
+    caches: Optional[Dict[str, InProcessCache]] = None,
+    prefixes: Optional[Tuple[str, ...]] = None,
+) -> int:
+    """Write a snapshot atomically; returns the number of entries written."""
+    now = time.time()
+    body, count = _encode_records(
+        caches if caches is not None else named_caches(),
+        prefixes if prefixes is not None else snapshot_namespaces(),
+        now,
+    )
+    data = _HEADER.pack(MAGIC, SNAPSHOT_VERSION, CODEC_VERSION, now) + zlib.compress(body)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # Atomic swap so a crash mid-write never leaves a truncated snapshot
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+def _decode_records(
+    body: bytes, saved_at: float, now: float
+) -> Dict[str, List[Tuple[str, CacheEntry]]]:
+    downtime = max(0.0, now - saved_at)
+    out: Dict[str, List[Tuple[str, CacheEntry]]] = {}
+    view = memoryview(body)
+    pos = 0
+    while pos < len(view):
+        (name_len,) = _U8.unpack_from(view, pos)
+        pos += _U8.size
+        name = bytes(view[pos : pos + name_len]).decode("utf-8")
+        pos += name_len
+        (key_len,) = _U16.unpack_from(view, pos)
+        pos += _U16.size
+        key = bytes(view[pos : pos + key_len]).decode("utf-8")
+        pos += key_len
+        age, ttl, swr, fmt = _TIMES.unpack_from(view, pos)
+        pos += _TIMES.size
+        (value_len,) = _U32.unpack_from(view, pos)
+        pos += _U32.size
+        payload = bytes(view[pos : pos + value_len])
+        pos += value_len
+
+        age += downtime
+        if age >= ttl + swr:
+            continue
+        entry = CacheEntry(
+            value=decode_value(fmt, payload),
+            created_at=now - age,
+            ttl_seconds=ttl,
+            swr_seconds=swr,
+        )
+        out.setdefault(name, []).append((key, entry))
+    return out
+
+
+def load_snapshot(
+    path: str,
+    caches: Optional[Dict[str, InProcessCache]] = None,
+    prefixes: Optional[Tuple[str, ...]] = None,
+) -> int:
+    """Restore a snapshot; returns the number of entries loaded.
+
+    Missing, foreign or corrupt files are ignored (logged) so a bad snapshot
+    never blocks startup.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return 0
+    if len(data) < _HEADER.size:
+        logger.warning("Ignoring truncated cache snapshot %s", path)
+        return 0
+    magic, version, codec_version, saved_at = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != SNAPSHOT_VERSION or codec_version != CODEC_VERSION:
+        logger.warning("Ignoring cache snapshot %s with unsupported version", path)
+        return 0
+    try:
+        records = _decode_records(
+            zlib.decompress(data[_HEADER.size :]), saved_at, time.time()
+        )
+    except Exception:
+        logger.warning("Ignoring corrupt cache snapshot %s", path, exc_info=True)
+        return 0
+
+    caches = caches if caches is not None else named_caches()
+    prefixes = prefixes if prefixes is not None else snapshot_namespaces()
+    loaded = 0
+    for name, items in records.items():
+        cache = caches.get(name)
+        if cache is None:
+            continue
+        # Namespaces dropped from the opt-in list since the dump stay on disk only
+        loaded += cache.import_entries([kv for kv in items if kv[0].startswith(prefixes)])
+    return loaded
+
+
+class SnapshotTimer:
+    """Dumps a snapshot every `interval` seconds in the background."""
+
+    def __init__(self, path: str, interval: float):
+        self.path = path
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # File I/O off the event loop
+                await asyncio.to_thread(dump_snapshot, self.path)
+            except Exception:
+                logger.warning("Periodic cache snapshot failed", exc_info=True)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_timer: Optional[SnapshotTimer] = None
+
+
+async def restore_cache_snapshot() -> int:
+    """Load the configured snapshot and start the optional timer (startup)."""
+    global _timer
+    path = os.environ.get("CACHE_SNAPSHOT_PATH")
+    if not path:
+        return 0
+    loaded = await asyncio.to_thread(load_snapshot, path)
+    logger.info("Restored %d cache entries from %s", loaded, path)
+    interval = float(os.environ.get("CACHE_SNAPSHOT_INTERVAL_SEC", "0"))
+    if interval > 0 and _timer is None:
+        _timer = SnapshotTimer(path, interval)
+        _timer.start()
+    return loaded
+
+
+async def save_cache_snapshot() -> int:
+    """Stop the timer and write a final snapshot (shutdown)."""
+    global _timer
+    if _timer is not None:
+        await _timer.stop()
+        _timer = None
+    path = os.environ.get("CACHE_SNAPSHOT_PATH")
+    if not path:
+        return 0
+    count = await asyncio.to_thread(dump_snapshot, path)
+    logger.info("Saved %d cache entries to %s", count, path)
+    return count
@@ -1,10 +1,49 @@
+"""Per-upstream circuit breakers.
+
+One breaker per upstream host (Open-Meteo, Mapbox, Unsplash), shared by every
+caller of that host, so a dead upstream is rejected in microseconds instead
+of costing each request a timeout.
+
+- CLOSED: calls pass; outcomes land in a rolling window of one-second
+  buckets. Once the window holds `min_calls` calls and the failure rate or
+  the slow-call rate crosses its threshold, the breaker opens.
+- OPEN: calls are rejected with `CircuitBreakerOpenException` until
+  `open_sec` has passed.
+- HALF_OPEN: at most `half_open_probes` calls are let through; everything
+  else is still rejected. If they all succeed the breaker closes with a fresh
+  window; any failed or slow probe reopens it.
+
+State is guarded by a thread lock and nothing blocks while holding it, so a
+breaker can be shared by coroutines and by sync code running in worker
+threads. Transitions and rejections are exported as metrics
+(`circuit.<name>.state` gauge: 0 closed, 1 half open, 2 open).
+
+Configuration (defaults for every breaker):
+    CIRCUIT_WINDOW_SEC: rolling window length (default 30)
+    CIRCUIT_MIN_CALLS: calls needed in the window before it can open (default 10)
+    CIRCUIT_FAILURE_RATE: failure ratio that opens the breaker (default 0.5)
+    CIRCUIT_SLOW_CALL_SEC: calls at least this long count as slow (default 5)
+    CIRCUIT_SLOW_CALL_RATE: slow-call ratio that opens the breaker (default 0.8)
+    CIRCUIT_OPEN_SEC: time spent open before probing (default 30)
+    CIRCUIT_HALF_OPEN_PROBES: probe calls allowed while half open (default 3)
+"""
+
+import asyncio
 import logging
+import os
+import threading
 import time
+from contextlib import contextmanager
 from enum import Enum
-from typing import Optional, Type
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, TypeVar
+from urllib.parse import urlparse
+
+from Backend.services import metrics
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class CircuitState(Enum):
     CLOSED = "closed"  # Normal operation
@@ -12,122 +51,293 @@ class CircuitState(Enum):
     HALF_OPEN = "half_open"  # Testing if service recovered
 
 
+_STATE_GAUGE = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+class CircuitBreakerOpenException(Exception):
+    """Exception raised when circuit breaker is open."""
+
+    pass
+
+
+class _RollingWindow:
+    """Call/failure/slow counts over the last `seconds` one-second buckets.
+
+    Running totals make reads O(1); buckets are expired lazily as time moves.
+    """
+
+    def __init__(self, seconds: int):
+        self.size = max(1, int(seconds))
+        self.reset()
+
+    def reset(self) -> None:
+        self._calls = [0] * self.size
+        self._failures = [0] * self.size
+        self._slow = [0] * self.size
+        self._last = -1
+        self.calls = self.failures = self.slow = 0
+
+    def _roll(self, now: float) -> None:
+        sec = int(now)
+        if sec <= self._last:
+            return
+        for s in range(max(self._last + 1, sec - self.size + 1), sec + 1):
+            i = s % self.size
+            self.calls -= self._calls[i]
+            self.failures -= self._failures[i]
+            self.slow -= self._slow[i]
+            self._calls[i] = self._failures[i] = self._slow[i] = 0
+        self._last = sec
+
+    def add(self, now: float, ok: bool, slow: bool) -> None:
+        self._roll(now)
+        i = int(now) % self.size
+        self._calls[i] += 1
+        self.calls += 1
+        if not ok:
+            self._failures[i] += 1
+            self.failures += 1
+        if slow:
+            self._slow[i] += 1
+            self.slow += 1
+
+
+class CallOutcome:
+    """Handle yielded by `CircuitBreaker.guard`; mark non-exception failures."""
+
+    __slots__ = ("ok",)
+
+    def __init__(self) -> None:
+        self.ok = True
+
+    def fail(self) -> None:
+        self.ok = False
+
+
 class CircuitBreaker:
-    """Simple circuit breaker for external service calls."""
+    """Rolling-window circuit breaker with bounded half-open probing."""
 
     def __init__(
         self,
-        failure_threshold: int = 5,
-        recovery_timeout: int = 60,
-        expected_exception: Type[Exception] = Exception,
+        name: str = "default",
+        *,
+        window_sec: int = 30,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_sec: float = 5.0,
+        slow_call_rate: float = 0.8,
+        open_sec: float = 30.0,
+        half_open_probes: int = 3,
     ):
-        self.failure_threshold = failure_threshold
-        self.recovery_timeout = recovery_timeout
-        self.expected_exception = expected_exception
-
-        self.failure_count = 0
-        self.last_failure_time: Optional[float] = None
-        self.state = CircuitState.CLOSED
-
-    def _should_attempt_reset(self) -> bool:
-        """Check if we should try to reset the circuit."""
-        if self.state != CircuitState.OPEN:
-            return False
-
-        if self.last_failure_time is None:
-            return True
-
-        return (time.time() - self.last_failure_time) >= self.recovery_timeout
-
-    def _record_success(self):
-        """Record a successful call."""
-        self.failure_count = 0
-        self.last_failure_time = None
-        self.state = CircuitState.CLOSED
-        logger.info("Circuit breaker reset to CLOSED state")
-
-    def _record_failure(self):
-        """Record a failed call."""
-        self.failure_count += 1
-        self.last_failure_time = time.time()
-
-        if self.failure_count >= self.failure_threshold:
-            self.state = CircuitState.OPEN
-            logger.warning(
-                f"Circuit breaker opened after {self.failure_count} failures"
-            )
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_sec = slow_call_sec
+        self.slow_call_rate = slow_call_rate
+        self.open_sec = open_sec
+        self.half_open_probes = max(1, half_open_probes)
 
-    def call(self, func, *args, **kwargs):
-        """Execute function with circuit breaker protection."""
-        if self.state == CircuitState.OPEN:
-            if self._should_attempt_reset():
-                self.state = CircuitState.HALF_OPEN
-                logger.info("Circuit breaker moving to HALF_OPEN state")
-            else:
-                raise CircuitBreakerOpenException("Circuit breaker is OPEN")
+        self._lock = threading.Lock()
+        self._window = _RollingWindow(window_sec)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        self.stats: Dict[str, int] = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0}
+        metrics.set_gauge(f"circuit.{name}.state", 0)
 
-        try:
-            result = func(*args, **kwargs)
-            if self.state == CircuitState.HALF_OPEN:
-                self._record_success()
-            return result
-        except Exception as e:
-            self._record_failure()
-            raise e
-
-    async def async_call(self, func, *args, **kwargs):
-        """Execute async function with circuit breaker protection."""
-        if self.state == CircuitState.OPEN:
-            if self._should_attempt_reset():
-                self.state = CircuitState.HALF_OPEN
-                logger.info("Circuit breaker moving to HALF_OPEN state")
-            else:
-                raise CircuitBreakerOpenException("Circuit breaker is OPEN")
+    # -- state --
 
-        try:
-            result = await func(*args, **kwargs)
-            if self.state == CircuitState.HALF_OPEN:
-                self._record_success()
-            return result
-        except Exception as e:
-            self._record_failure()
-            raise e
+    def _transition(self, new: CircuitState, now: float) -> None:
+        old, self._state = self._state, new
+        if new is CircuitState.OPEN:
+            self._opened_at = now
+        if new is CircuitState.HALF_OPEN:
+            self._probes_started = self._probes_succeeded = 0
+        if new is CircuitState.CLOSED:
+            self._window.reset()
+        metrics.incr(f"circuit.{self.name}.transition.{old.value}_to_{new.value}")
+        metrics.set_gauge(f"circuit.{self.name}.state", _STATE_GAUGE[new])
+        log = logger.warning if new is CircuitState.OPEN else logger.info
+        log("Circuit %s: %s -> %s", self.name, old.value, new.value)
+
+    def _refresh(self, now: float) -> None:
+        if (
+            self._state is CircuitState.OPEN
+            and now - self._opened_at >= self.open_sec
+        ):
+            self._transition(CircuitState.HALF_OPEN, now)
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
 
     @property
     def is_open(self) -> bool:
         """Check if circuit breaker is open."""
-        return self.state == CircuitState.OPEN
+        return self.state is CircuitState.OPEN
 
+    @property
+    def is_rejecting(self) -> bool:
+        """True if a call made now would be rejected."""
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state is CircuitState.OPEN:
+                return True
+            return (
+                self._state is CircuitState.HALF_OPEN
+                and self._probes_started >= self.half_open_probes
+            )
 
-class CircuitBreakerOpenException(Exception):
-    """Exception raised when circuit breaker is open."""
+    # -- call protocol --
 
-    pass
+    def acquire(self) -> bool:
+        """Admit a call; returns True if it is a half-open probe.
+
+        Raises CircuitBreakerOpenException if the call is rejected.
+        """
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state is CircuitState.CLOSED:
+                return False
+            if (
+                self._state is CircuitState.HALF_OPEN
+                and self._probes_started < self.half_open_probes
+            ):
+                self._probes_started += 1
+                return True
+            self.stats["rejected"] += 1
+        metrics.incr(f"circuit.{self.name}.rejected")
+        raise CircuitBreakerOpenException(f"Circuit {self.name} is open")
+
+    def release(self, probe: bool) -> None:
+        """Give back an admitted call that finished without an outcome."""
+        if probe:
+            with self._lock:
+                if self._state is CircuitState.HALF_OPEN and self._probes_started:
+                    self._probes_started -= 1
+
+    def record(self, ok: bool, elapsed: float, probe: bool = False) -> None:
+        """Record the outcome of an admitted call."""
+        now = time.monotonic()
+        slow = elapsed >= self.slow_call_sec
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["failures"] += not ok
+            self.stats["slow"] += slow
+            if probe:
+                if self._state is not CircuitState.HALF_OPEN:
+                    return
+                if not ok or slow:
+                    self._transition(CircuitState.OPEN, now)
+                    return
+                self._probes_succeeded += 1
+                if self._probes_succeeded >= self.half_open_probes:
+                    self._transition(CircuitState.CLOSED, now)
+                return
+            if self._state is not CircuitState.CLOSED:
+                # Late result of a call admitted before the breaker opened
+                return
+            window = self._window
+            window.add(now, ok, slow)
+            if window.calls >= self.min_calls and (
+                window.failures >= self.failure_rate * window.calls
+                or window.slow >= self.slow_call_rate * window.calls
+            ):
+                self._transition(CircuitState.OPEN, now)
+
+    @contextmanager
+    def guard(self) -> Iterator[CallOutcome]:
+        """Run a block as one breaker call.
+
+        Exceptions count as failures (cancellation counts as nothing); call
+        `outcome.fail()` for failures signalled by return values, such as
+        HTTP 5xx responses.
+        """
+        probe = self.acquire()
+        outcome = CallOutcome()
+        start = time.monotonic()
+        try:
+            yield outcome
+        except asyncio.CancelledError:
+            self.release(probe)
+            raise
+        except BaseException:
+            self.record(False, time.monotonic() - start, probe)
+            raise
+        self.record(outcome.ok, time.monotonic() - start, probe)
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """Await `func(*args, **kwargs)` under the breaker."""
+        with self.guard():
+            return await func(*args, **kwargs)
 
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh(time.monotonic())
+            return {
+                "state": self._state.value,
+                "window_calls": self._window.calls,
+                "window_failures": self._window.failures,
+                "window_slow": self._window.slow,
+                **self.stats,
+            }
 
-# Global circuit breaker for Unsplash API
-_unsplash_circuit_breaker: Optional[CircuitBreaker] = None
+
+# -- registry --
+
+_registry: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def _from_env() -> Dict[str, Any]:
+    env = os.environ.get
+    return {
+        "window_sec": int(env("CIRCUIT_WINDOW_SEC", "30")),
+        "min_calls": int(env("CIRCUIT_MIN_CALLS", "10")),
+        "failure_rate": float(env("CIRCUIT_FAILURE_RATE", "0.5")),
+        "slow_call_sec": float(env("CIRCUIT_SLOW_CALL_SEC", "5")),
+        "slow_call_rate": float(env("CIRCUIT_SLOW_CALL_RATE", "0.8")),
+        "open_sec": float(env("CIRCUIT_OPEN_SEC", "30")),
+        "half_open_probes": int(env("CIRCUIT_HALF_OPEN_PROBES", "3")),
+    }
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Get (or create) the breaker for an upstream, usually its host name."""
+    breaker = _registry.get(name)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _registry.get(name)
+            if breaker is None:
+                breaker = _registry[name] = CircuitBreaker(name, **_from_env())
+    return breaker
+
+
+def breaker_for_url(url: str) -> CircuitBreaker:
+    """Breaker keyed by the host of `url`."""
+    return get_breaker(urlparse(url).hostname or url)
+
+
+def breakers() -> List[CircuitBreaker]:
+    return list(_registry.values())
+
+
+def reset_breakers() -> None:
+    """Drop every breaker (tests, config reloads)."""
+    with _registry_lock:
+        _registry.clear()
 
 
 def get_unsplash_circuit_breaker() -> CircuitBreaker:
-    """Get the global Unsplash circuit breaker."""
-    global _unsplash_circuit_breaker
-    if _unsplash_circuit_breaker is None:
-        import os
-
-        failure_threshold = int(
-            os.environ.get("UNSPLASH_CIRCUIT_FAILURE_THRESHOLD", "5")
-        )
-        recovery_timeout = int(
-            os.environ.get("UNSPLASH_CIRCUIT_RECOVERY_TIMEOUT", "60")
-        )
-        _unsplash_circuit_breaker = CircuitBreaker(
-            failure_threshold=failure_threshold, recovery_timeout=recovery_timeout
-        )
-        logger.info(
-            "Initialized Unsplash circuit breaker: %d failures, %ds recovery",
-            failure_threshold,
-            recovery_timeout,
-        )
-
-    return _unsplash_circuit_breaker
+    """Get the Unsplash API breaker."""
+    return get_breaker("api.unsplash.com")
+
+
+def get_weather_circuit_breaker() -> CircuitBreaker:
+    """Get the breaker for the configured weather provider."""
+    return breaker_for_url(
+        os.getenv("WEATHER_BASE_URL", "https://api.open-meteo.com/v1/forecast")
+    )
@@ -1,14 +1,147 @@
+"""Cache backends shared by the weather, geocode and Unsplash paths.
+
+Without Redis every path uses the in-process cache. When `REDIS_URL` is set
+(or `CACHE_L2_BACKEND=local` selects the in-memory stand-in) each in-process
+cache becomes the L1 of a `LayeredCacheBackend` in front of one shared L2, so
+horizontally scaled instances share a single hot working set:
+
+- L2 entries carry value, created_at, ttl and swr, so every instance agrees on
+  freshness and stale-while-revalidate windows.
+- An L1 miss (or stale L1 entry) is filled from L2 with its original age.
+- Recomputation is single-flight within a process (shared task) and across
+  instances (a short-lived `SET NX PX` lock in Redis).
+- When a cache bus is running (`cache_bus`), freshly computed values are
+  announced so peers adopt them into their L1 without refetching, and
+  invalidations by key or prefix reach every instance.
+- L2 entries use the compact binary codec in `cache_codec`, and multi-key
+  reads/writes (`get_many`/`set_many`) go out as one MGET or one pipelined
+  round trip instead of one command per key.
+"""
+
+import asyncio
+import inspect
 import logging
 import os
+import re
+import time
+import uuid
 from abc import ABC, abstractmethod
-from typing import Any, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from Backend.services import metrics
+from Backend.utils import cache_inproc
+from Backend.utils.cache import _is_error_marker
+from Backend.utils.cache_codec import decode_entry, encode_entry
+from Backend.utils.cache_inproc import CacheEntry, InProcessCache
+from Backend.utils.local_redis import LocalRedis
 
 logger = logging.getLogger(__name__)
 
-# Cache status constants
+# Cache status constants (match InProcessCache.get_status)
 CACHE_MISS = "miss"
-CACHE_HIT = "hit"
-CACHE_STALE = "stale"
+CACHE_HIT = "hit_fresh"
+CACHE_STALE = "hit_stale"
+
+# Compare-and-delete so an instance only releases a lock it still owns
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+else
+    return 0
+end
+"""
+
+
+def _release_lock_local(store: LocalRedis, keys: list, args: list) -> int:
+    if store.get_now(keys[0]) == args[0]:
+        return store.delete_now(keys[0])
+    return 0
+
+
+LocalRedis.register_script(RELEASE_LOCK_SCRIPT, _release_lock_local)
+
+
+async def _call_factory(factory: Callable[[], Any]) -> Any:
+    """Run a sync or async factory."""
+    result = factory()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+# Named in-process caches, so peers and tooling can address them by name
+_named_caches: Dict[str, InProcessCache] = {}
+
+
+def register_cache(name: str, cache: InProcessCache) -> InProcessCache:
+    """Register an in-process cache under a fleet-wide name."""
+    _named_caches[name] = cache
+    return cache
+
+
+def named_caches() -> Dict[str, InProcessCache]:
+    """Return registered caches, including the global cache as "default"."""
+    caches = {"default": cache_inproc.cache}
+    caches.update(_named_caches)
+    return caches
+
+
+def cache_name(cache: InProcessCache) -> Optional[str]:
+    for name, candidate in named_caches().items():
+        if candidate is cache:
+            return name
+    return None
+
+
+async def _announce(l1: InProcessCache, key: str, entry: CacheEntry) -> None:
+    """Broadcast a new value for `key` to peers, if a cache bus is running."""
+    from Backend.utils.cache_bus import get_cache_bus
+
+    bus = get_cache_bus()
+    if bus is None:
+        return
+    name = cache_name(l1)
+    if name is None:
+        return
+    try:
+        await bus.publish_set(name, key, entry)
+    except Exception:
+        logger.debug("Cache bus publish failed for %s", key)
+
+
+def _announcing(
+    factory: Callable[[], Any], l1: InProcessCache, key: str, ttl: int, swr: int
+) -> Callable[[], Awaitable[Any]]:
+    """Wrap a factory so each value it computes is announced to peers."""
+
+    async def run() -> Any:
+        value = await _call_factory(factory)
+        entry = CacheEntry(
+            value=value,
+            created_at=time.time(),
+            ttl_seconds=int(ttl),
+            swr_seconds=int(swr or 0),
+        )
+        await _announce(l1, key, entry)
+        return value
+
+    return run
+
+
+def _entry_status(entry: Optional[CacheEntry]) -> Tuple[Optional[Any], str]:
+    if entry is None or entry.should_evict:
+        return None, CACHE_MISS
+    if entry.is_fresh:
+        return entry.value, CACHE_HIT
+    return entry.value, CACHE_STALE
+
+
+def _log_refresh_failure(task: asyncio.Future) -> None:
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.warning("Background refresh failed: %s", exc)
 
 
 class CacheBackend(ABC):
@@ -29,112 +162,586 @@ class CacheBackend(ABC):
         """Get value or compute and set it."""
         pass
 
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[Optional[Any], str]]:
+        """Get value and status for several keys (one lookup per key by default)."""
+        return {key: await self.get_status(key) for key in keys}
+
+    async def set_many(self, items: Dict[str, Any], ttl: int, swr: int = 0) -> None:
+        """Set several values sharing one TTL/SWR."""
+        for key, value in items.items():
+            await self.set(key, value, ttl, swr)
+
+
+class _SingleFlight:
+    """Per-process coalescing of concurrent loads and background refreshes."""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _start(
+        self, key: str, make_coro: Callable[[], Awaitable[Any]]
+    ) -> asyncio.Future:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(make_coro())
+            self._inflight[key] = task
+
+            def _done(t: asyncio.Future, k: str = key) -> None:
+                if self._inflight.get(k) is t:
+                    self._inflight.pop(k, None)
+
+            task.add_done_callback(_done)
+        return task
+
+    async def _single_flight(
+        self, key: str, make_coro: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        # Shield so a cancelled caller doesn't cancel the shared load
+        return await asyncio.shield(self._start(key, make_coro))
+
+    async def _refresh_in_background(
+        self, key: str, make_coro: Callable[[], Awaitable[Any]]
+    ) -> None:
+        if key in self._inflight:
+            return
+        task = self._start(key, make_coro)
+        task.add_done_callback(_log_refresh_failure)
+        if cache_inproc.SYNC_REFRESH:
+            # Deterministic mode for tests: finish the refresh inline
+            try:
+                await asyncio.shield(task)
+            except Exception:
+                pass
+
 
 class InProcCacheBackend(CacheBackend):
     """In-process cache backend using the existing inproc cache."""
 
-    def __init__(self):
-        from Backend.utils.cache_inproc import cache as inproc_cache
+    def __init__(self, cache: Optional[InProcessCache] = None):
+        if cache is None:
+            from Backend.utils.cache_inproc import cache as inproc_cache
 
-        self._cache = inproc_cache
+            cache = inproc_cache
+        self._cache = cache
 
     async def get_status(self, key: str) -> Tuple[Optional[Any], str]:
         return await self._cache.get_status(key)
 
-    async def set(self, key: str, value: Any, ttl: int, swr: int = 0) -> None:
-        await self._cache.set(key, value, ttl=ttl, swr=swr)
+    async def set(self, key: str, value: Any, ttl: int, swr: Optional[int] = 0) -> None:
+        swr = self._cache.default_swr if swr is None else swr
+        created_at = time.time()
+        await self._cache.set(key, value, ttl=ttl, swr=swr, created_at=created_at)
+        if not _is_error_marker(value):
+            await _announce(
+                self._cache, key, CacheEntry(value, created_at, int(ttl), int(swr))
+            )
 
     async def get_or_set(self, key: str, factory, ttl: int, swr: int = 0) -> Any:
-        return await self._cache.get_or_set(key, factory, ttl=ttl, swr=swr)
+        return await self._cache.get_or_set(
+            key, _announcing(factory, self._cache, key, ttl, swr), ttl=ttl, swr=swr
+        )
+
+
+class SharedCacheTier(_SingleFlight, CacheBackend):
+    """A cache tier shared by several processes (Redis, shared memory).
+
+    Entries carry value, created_at, TTL and SWR so every reader agrees on
+    freshness. `load` recomputes a key at most once across processes using
+    the tier's lock primitives (`acquire_lock`/`release_lock`).
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock_wait_sec = float(os.environ.get("CACHE_LOCK_WAIT_SEC", "5"))
+
+    @abstractmethod
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Return the stored entry for key, or None."""
+
+    @abstractmethod
+    async def set_entry(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry, keeping it until TTL + SWR from its creation."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> int:
+        """Drop one key; returns the number removed."""
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str) -> int:
+        """Drop every key starting with prefix; returns the number removed."""
+
+    @abstractmethod
+    async def acquire_lock(self, key: str) -> Optional[str]:
+        """Try to take the recompute lock for `key`; return its token or None."""
+
+    @abstractmethod
+    async def release_lock(self, key: str, token: str) -> None:
+        """Release a lock taken with `acquire_lock`."""
+
+    async def get_entries(self, keys: List[str]) -> List[Optional[CacheEntry]]:
+        return [await self.get_entry(key) for key in keys]
+
+    async def set_entries(self, entries: Dict[str, CacheEntry]) -> None:
+        for key, entry in entries.items():
+            await self.set_entry(key, entry)
+
+    async def set_many(self, items: Dict[str, Any], ttl: int, swr: int = 0) -> None:
+        created_at = time.time()
+        await self.set_entries(
+            {
+                key: CacheEntry(
+                    value=value,
+                    created_at=created_at,
+                    ttl_seconds=int(ttl),
+                    swr_seconds=int(swr or 0),
+                )
+                for key, value in items.items()
+            }
+        )
+
+    async def get_status(self, key: str) -> Tuple[Optional[Any], str]:
+        return _entry_status(await self.get_entry(key))
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[Optional[Any], str]]:
+        keys = list(dict.fromkeys(keys))
+        entries = await self.get_entries(keys)
+        return {key: _entry_status(entry) for key, entry in zip(keys, entries)}
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int,
+        swr: Optional[int] = 0,
+        created_at: Optional[float] = None,
+    ) -> None:
+        entry = CacheEntry(
+            value=value,
+            created_at=time.time() if created_at is None else created_at,
+            ttl_seconds=int(ttl),
+            swr_seconds=int(swr or 0),
+        )
+        await self.set_entry(key, entry)
+
+    async def _wait_for_fresh(self, key: str) -> Optional[CacheEntry]:
+        waited, delay = 0.0, 0.01
+        while waited < self._lock_wait_sec:
+            await asyncio.sleep(delay)
+            waited += delay
+            entry = await self.get_entry(key)
+            if entry is not None and entry.is_fresh:
+                return entry
+            delay = min(delay * 2, 0.2)
+        return None
+
+    async def load(
+        self,
+        key: str,
+        factory: Callable[[], Any],
+        ttl: int,
+        swr: int = 0,
+        *,
+        refresh: bool = False,
+    ) -> Optional[CacheEntry]:
+        """Recompute `key` at most once across instances and store it.
+
+        When another process holds the lock, a miss waits for its result while
+        a background refresh simply gives up (returns None). If the tier is
+        unreachable, or the lock holder doesn't finish in time, the value is
+        computed without the lock.
+        """
+        try:
+            token = await self.acquire_lock(key)
+        except Exception:
+            logger.warning("Cache lock unavailable for %s; computing locally", key)
+            token = ""
+        if token is None:
+            if refresh:
+                return None
+            entry = await self._wait_for_fresh(key)
+            if entry is not None:
+                return entry
+            token = ""
+
+        try:
+            if token:
+                # Another instance may have finished just before we got the lock
+                entry = await self.get_entry(key)
+                if entry is not None and entry.is_fresh:
+                    return entry
+            value = await _call_factory(factory)
+            entry = CacheEntry(
+                value=value,
+                created_at=time.time(),
+                ttl_seconds=int(ttl),
+                swr_seconds=int(swr or 0),
+            )
+            await self.set_entry(key, entry)
+            return entry
+        finally:
+            if token:
+                await self.release_lock(key, token)
+
+    async def get_or_set(self, key: str, factory, ttl: int, swr: int = 0) -> Any:
+        value, status = await self.get_status(key)
+        if status == CACHE_HIT:
+            return value
+        if status == CACHE_STALE:
+            await self._refresh_in_background(
+                key, lambda: self.load(key, factory, ttl, swr, refresh=True)
+            )
+            return value
+        entry = await self._single_flight(
+            key, lambda: self.load(key, factory, ttl, swr)
+        )
+        return entry.value
+
+    async def close(self) -> None:
+        return None
+
+
+# Characters with a meaning in Redis SCAN MATCH patterns
+_GLOB_SPECIAL = re.compile(r"([*?\[\]\\])")
 
 
-class RedisCacheBackend(CacheBackend):
+class RedisCacheBackend(SharedCacheTier):
     """Redis cache backend for multi-instance deployments.
 
+    Entries are stored in the binary codec with their creation time, TTL and
+    SWR window; the Redis expiry covers TTL + SWR so stale values stay
+    available for revalidation.
+
     Notes:
         We intentionally avoid adding a hard dependency on redis stubs; for type
         checking we silence the missing type information. At runtime, if redis
         is unavailable this backend shouldn't be constructed (callers fall back
         to the in-process cache)."""
 
-    def __init__(self):
-        try:
-            import redis.asyncio as redis  # type: ignore[import-untyped]
-        except Exception as exc:  # pragma: no cover - defensive
-            raise RuntimeError(
-                "redis.asyncio is required for RedisCacheBackend but is not installed"
-            ) from exc
+    def __init__(self, client: Optional[Any] = None):
+        super().__init__()
+        if client is None:
+            try:
+                import redis.asyncio as redis  # type: ignore[import-untyped]
+            except Exception as exc:  # pragma: no cover - defensive
+                raise RuntimeError(
+                    "redis.asyncio is required for RedisCacheBackend but is not installed"
+                ) from exc
 
-        redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379")
-        self._client = redis.from_url(redis_url, decode_responses=True)  # type: ignore[attr-defined]
+            client = redis.Redis(connection_pool=_connection_pool(redis))
+        self._client = client
+        self._lock_timeout_ms = int(os.environ.get("CACHE_LOCK_TIMEOUT_MS", "10000"))
 
-    async def get_status(self, key: str) -> Tuple[Optional[Any], str]:
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
         try:
-            import json
-
-            value = await self._client.get(key)
-            if value is None:
-                return None, CACHE_MISS
-
-            # Check if value has expired (simple TTL check)
-            # In production, you'd want Redis TTL, but this works for our use case
-            return json.loads(value), CACHE_HIT
+            raw = await self._client.get(key)
         except Exception:
             logger.warning("Redis cache error")
-            return None, CACHE_MISS
-
-    async def set(self, key: str, value: Any, ttl: int, swr: int = 0) -> None:
+            return None
+        if raw is None:
+            return None
+        # Unknown codec versions or legacy formats decode as a miss
+        return decode_entry(raw)
+
+    async def get_entries(self, keys: List[str]) -> List[Optional[CacheEntry]]:
+        """Fetch several entries with a single MGET round trip."""
+        if not keys:
+            return []
         try:
-            import json
+            raws = await self._client.mget(keys)
+        except Exception:
+            logger.warning("Redis cache error")
+            return [None] * len(keys)
+        return [None if raw is None else decode_entry(raw) for raw in raws]
+
+    @staticmethod
+    def _expiry_ms(entry: CacheEntry) -> int:
+        age = time.time() - entry.created_at
+        remaining = entry.ttl_seconds + entry.swr_seconds - age
+        return int(remaining * 1000) if remaining > 0 else 0
+
+    async def set_entry(self, key: str, entry: CacheEntry) -> None:
+        px = self._expiry_ms(entry)
+        if px <= 0:
+            return
+        try:
+            await self._client.set(key, encode_entry(entry), px=max(1, px))
+        except Exception:
+            logger.warning("Redis cache set error")
 
-            await self._client.setex(key, ttl, json.dumps(value))
+    async def set_entries(self, entries: Dict[str, CacheEntry]) -> None:
+        """Write several entries in one pipelined round trip."""
+        pipe = self._client.pipeline(transaction=False)
+        queued = 0
+        for key, entry in entries.items():
+            px = self._expiry_ms(entry)
+            if px <= 0:
+                continue
+            try:
+                raw = encode_entry(entry)
+            except Exception:
+                # One unencodable value must not drop the rest of the batch
+                logger.warning("Skipping unencodable cache entry %s", key)
+                metrics.incr("cache.l2.encode_errors")
+                continue
+            pipe.set(key, raw, px=max(1, px))
+            queued += 1
+        if not queued:
+            return
+        try:
+            await pipe.execute()
         except Exception:
             logger.warning("Redis cache set error")
 
-    async def get_or_set(self, key: str, factory, ttl: int, swr: int = 0) -> Any:
-        value, status = await self.get_status(key)
-        if status != CACHE_MISS:
-            return value
+    async def delete(self, key: str) -> int:
+        try:
+            return await self._client.delete(key)
+        except Exception:
+            logger.warning("Redis cache delete error")
+            return 0
 
-        # Compute new value
+    async def delete_prefix(self, prefix: str, batch: int = 500) -> int:
+        """Delete every key starting with `prefix` (SCAN + pipelined DEL)."""
+        removed = 0
+        keys: List[Any] = []
         try:
-            value = factory()
-            await self.set(key, value, ttl, swr)
-            return value
+            match = _GLOB_SPECIAL.sub(r"\\\1", prefix) + "*"
+            async for key in self._client.scan_iter(match=match, count=batch):
+                keys.append(key)
+                if len(keys) >= batch:
+                    removed += await self._client.delete(*keys)
+                    keys = []
+            if keys:
+                removed += await self._client.delete(*keys)
+        except Exception:
+            logger.warning("Redis cache delete error")
+        return removed
+
+    async def acquire_lock(self, key: str) -> Optional[str]:
+        """Try to take the recompute lock for `key`; return its token or None."""
+        token = uuid.uuid4().hex
+        ok = await self._client.set(
+            f"lock:{key}", token, px=self._lock_timeout_ms, nx=True
+        )
+        return token if ok else None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        try:
+            await self._client.eval(RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
         except Exception:
-            logger.exception("Error computing cache value for %s", key)
-            raise
+            logger.debug("Failed to release cache lock for %s", key)
 
+    async def close(self) -> None:
+        close = getattr(self._client, "aclose", None) or self._client.close
+        await close()
 
-# Global cache instance
-_cache_backend: Optional[CacheBackend] = None
 
+class LayeredCacheBackend(_SingleFlight, CacheBackend):
+    """In-process L1 in front of a shared L2 (Redis or shared memory)."""
 
-def get_cache_backend() -> CacheBackend:
-    """Get the configured cache backend."""
-    global _cache_backend
-    if _cache_backend is None:
-        # Check if Redis is configured and available
+    def __init__(self, l1: InProcessCache, l2: SharedCacheTier):
+        super().__init__()
+        self.l1 = l1
+        self.l2 = l2
+        self.stats: Dict[str, int] = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+
+    async def _fill_l1(self, key: str, entry: CacheEntry) -> None:
+        await self.l1.set(
+            key,
+            entry.value,
+            entry.ttl_seconds,
+            entry.swr_seconds,
+            created_at=entry.created_at,
+        )
+
+    async def get_status(self, key: str) -> Tuple[Optional[Any], str]:
+        value, status = await self.l1.get_status(key)
+        if status == CACHE_HIT:
+            self.stats["l1_hits"] += 1
+            return value, status
+
+        # L1 missing or stale: another instance may hold a newer copy in L2
+        entry = await self.l2.get_entry(key)
+        l2_value, l2_status = _entry_status(entry)
+        if entry is None or l2_status == CACHE_MISS:
+            if status == CACHE_MISS:
+                self.stats["misses"] += 1
+            else:
+                self.stats["l1_hits"] += 1
+            return value, status
+
+        self.stats["l2_hits"] += 1
+        await self._fill_l1(key, entry)
+        return l2_value, l2_status
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[Optional[Any], str]]:
+        results: Dict[str, Tuple[Optional[Any], str]] = {}
+        pending: List[str] = []
+        for key in dict.fromkeys(keys):
+            value, status = await self.l1.get_status(key)
+            results[key] = (value, status)
+            if status == CACHE_HIT:
+                self.stats["l1_hits"] += 1
+            else:
+                pending.append(key)
+
+        # Everything L1 couldn't answer fresh goes to L2 in one MGET
+        for key, entry in zip(pending, await self.l2.get_entries(pending)):
+            l2_value, l2_status = _entry_status(entry)
+            if entry is None or l2_status == CACHE_MISS:
+                if results[key][1] == CACHE_MISS:
+                    self.stats["misses"] += 1
+                else:
+                    self.stats["l1_hits"] += 1
+                continue
+            self.stats["l2_hits"] += 1
+            await self._fill_l1(key, entry)
+            results[key] = (l2_value, l2_status)
+        return results
+
+    async def set(self, key: str, value: Any, ttl: int, swr: Optional[int] = 0) -> None:
+        # One SWR window for every tier and for peers
+        swr = self.l1.default_swr if swr is None else swr
+        created_at = time.time()
+        await self.l1.set(key, value, ttl, swr, created_at=created_at)
+        await self.l2.set(key, value, ttl, swr, created_at=created_at)
+        if not _is_error_marker(value):
+            await _announce(
+                self.l1, key, CacheEntry(value, created_at, int(ttl), int(swr))
+            )
+
+    async def set_many(
+        self, items: Dict[str, Any], ttl: int, swr: Optional[int] = 0
+    ) -> None:
+        swr = self.l1.default_swr if swr is None else swr
+        created_at = time.time()
+        for key, value in items.items():
+            await self.l1.set(key, value, ttl, swr, created_at=created_at)
+        await self.l2.set_many(items, ttl, swr)
+        for key, value in items.items():
+            if not _is_error_marker(value):
+                await _announce(
+                    self.l1, key, CacheEntry(value, created_at, int(ttl), int(swr))
+                )
+
+    async def _load(
+        self,
+        key: str,
+        factory: Callable[[], Any],
+        ttl: int,
+        swr: int,
+        refresh: bool = False,
+    ) -> Any:
+        entry = await self.l2.load(
+            key, _announcing(factory, self.l1, key, ttl, swr), ttl, swr, refresh=refresh
+        )
+        if entry is None:
+            return None
+        await self._fill_l1(key, entry)
+        return entry.value
+
+    async def get_or_set(self, key: str, factory, ttl: int, swr: int = 0) -> Any:
+        value, status = await self.get_status(key)
+        if status == CACHE_HIT:
+            return value
+        if status == CACHE_STALE:
+            await self._refresh_in_background(
+                key, lambda: self._load(key, factory, ttl, swr, refresh=True)
+            )
+            return value
+        return await self._single_flight(
+            key, lambda: self._load(key, factory, ttl, swr)
+        )
+
+
+def _connection_pool(redis: Any) -> Any:
+    """Build the shared connection pool from REDIS_* settings."""
+    return redis.ConnectionPool.from_url(
+        os.environ.get("REDIS_URL", "redis://localhost:6379"),
+        max_connections=int(os.environ.get("REDIS_MAX_CONNECTIONS", "50")),
+        socket_timeout=float(os.environ.get("REDIS_SOCKET_TIMEOUT_SEC", "1.0")),
+        socket_connect_timeout=float(
+            os.environ.get("REDIS_CONNECT_TIMEOUT_SEC", "1.0")
+        ),
+        health_check_interval=int(os.environ.get("REDIS_HEALTH_CHECK_SEC", "30")),
+        # Values are binary (cache_codec); lock tokens are compared as bytes
+        decode_responses=False,
+    )
+
+
+# Global cache instances
+_cache_backend: Optional[CacheBackend] = None
+_l2_backend: Optional[SharedCacheTier] = None
+_l2_checked = False
+_backends_by_l1: Dict[int, CacheBackend] = {}
+
+
+def get_l2_backend() -> Optional[SharedCacheTier]:
+    """Return the shared L2 backend, or None when running in-process only.
+
+    REDIS_URL selects Redis (shared by every host). Otherwise
+    CACHE_L2_BACKEND=shm shares one memory-mapped table between the worker
+    processes of a host, and CACHE_L2_BACKEND=local uses the in-memory Redis
+    stand-in.
+    """
+    global _l2_backend, _l2_checked
+    if not _l2_checked:
+        _l2_checked = True
         redis_url = os.environ.get("REDIS_URL")
         if redis_url:
             try:
-                _cache_backend = RedisCacheBackend()
-                logger.info("Using Redis cache backend")
+                _l2_backend = RedisCacheBackend()
+                logger.info("Using Redis L2 cache backend")
             except Exception:
                 logger.warning(
                     "Failed to initialize Redis cache, falling back to in-process"
                 )
-                _cache_backend = InProcCacheBackend()
-        else:
-            _cache_backend = InProcCacheBackend()
-            logger.info("Using in-process cache backend")
+        elif os.environ.get("CACHE_L2_BACKEND", "").lower() == "shm":
+            from Backend.utils.shm_cache import SharedMemoryCacheBackend
+
+            try:
+                _l2_backend = SharedMemoryCacheBackend()
+                logger.info("Using shared-memory L2 cache backend")
+            except Exception:
+                logger.warning(
+                    "Failed to open shared-memory cache, falling back to in-process"
+                )
+        elif os.environ.get("CACHE_L2_BACKEND", "").lower() == "local":
+            _l2_backend = RedisCacheBackend(client=LocalRedis())
+            logger.info("Using local stand-in L2 cache backend")
+    return _l2_backend
+
+
+def cache_backend_for(l1: InProcessCache) -> CacheBackend:
+    """Return the backend for an in-process cache, layered over L2 if configured."""
+    backend = _backends_by_l1.get(id(l1))
+    if backend is None:
+        l2 = get_l2_backend()
+        backend = LayeredCacheBackend(l1, l2) if l2 else InProcCacheBackend(l1)
+        _backends_by_l1[id(l1)] = backend
+    return backend
+
+
+def get_cache_backend() -> CacheBackend:
+    """Get the configured cache backend."""
+    global _cache_backend
+    if _cache_backend is None:
+        from Backend.utils.cache_inproc import cache as inproc_cache
+
+        _cache_backend = cache_backend_for(inproc_cache)
+        logger.info("Using %s", type(_cache_backend).__name__)
 
     return _cache_backend
 
 
 async def close_cache():
     """Close cache connections (call on shutdown)."""
-    global _cache_backend
-    if _cache_backend and hasattr(_cache_backend, "_client"):
-        await _cache_backend._client.close()
+    global _cache_backend, _l2_backend, _l2_checked
+    if _l2_backend is not None:
+        try:
+            await _l2_backend.close()
+        except Exception:
+            logger.debug("Error closing L2 cache client")
     _cache_backend = None
+    _l2_backend = None
+    _l2_checked = False
+    _backends_by_l1.clear()
@@ -1,4 +1,5 @@
 import logging
+import os
 from typing import Any, Dict, Optional
 
 import httpx
@@ -19,8 +20,13 @@ def get_async_client() -> httpx.AsyncClient:
     """Get or create the global async HTTP client."""
     global _client
     if _client is None:
+        max_connections = int(os.environ.get("UNSPLASH_HTTP_MAX_CONNECTIONS", "20"))
         _client = httpx.AsyncClient(
             timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
             follow_redirects=True,
             headers={"Accept-Version": "v1"},
         )
@@ -39,11 +45,20 @@ async def async_get(
     url: str,
     headers: Optional[Dict[str, str]] = None,
     params: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
 ) -> httpx.Response:
-    """Async GET request with retry logic for transient failures."""
+    """Async GET request with retry logic for transient failures.
+
+    `timeout` overrides the client's default for this request.
+    """
     client = get_async_client()
     try:
-        response = await client.get(url, headers=headers, params=params)
+        response = await client.get(
+            url,
+            headers=headers,
+            params=params,
+            timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout,
+        )
         # Handle rate limiting with a simple retry
         if response.status_code == 429:
             logger.warning("Rate limited by Unsplash API, retrying...")
@@ -0,0 +1,209 @@
+"""In-memory stand-in for the subset of `redis.asyncio` the backend uses.
+
+Used by tests and single-host development so the Redis-backed code paths can
+run without a server. Only the commands the cache, lock and bus code rely on
+are implemented, with the same call signatures as `redis.asyncio.Redis`;
+`pipeline()` batches commands into one simulated round trip.
+
+Lua scripts cannot be executed here; modules that use `eval` register a
+Python equivalent of their script with `LocalRedis.register_script`.
+"""
+
+import asyncio
+import re
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+ScriptHandler = Callable[["LocalRedis", List[Any], List[Any]], Any]
+
+
+@lru_cache(maxsize=128)
+def _glob(pattern: str) -> "re.Pattern[str]":
+    """Compile a Redis MATCH pattern (`*`, `?`, `[...]`, backslash escapes)."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\" and i + 1 < len(pattern):
+            i += 1
+            out.append(re.escape(pattern[i]))
+        elif c == "*":
+            out.append(".*")
+        elif c == "?":
+            out.append(".")
+        elif c == "[" and "]" in pattern[i + 1 :]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1 : end]
+            negate = body.startswith("^")
+            body = re.escape(body[1:] if negate else body).replace("\\-", "-")
+            out.append(f"[{'^' if negate else ''}{body}]")
+            i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return re.compile("".join(out), re.DOTALL)
+
+
+class LocalRedis:
+    """Async, single-process imitation of a Redis client."""
+
+    _scripts: Dict[str, ScriptHandler] = {}
+
+    def __init__(self, latency_sec: float = 0.0):
+        # Optional simulated round-trip latency, used by benchmarks
+        self.latency_sec = latency_sec
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self.commands = 0
+
+    @classmethod
+    def register_script(cls, source: str, handler: ScriptHandler) -> None:
+        """Register a Python implementation for a Lua script body."""
+        cls._scripts[source] = handler
+
+    async def _roundtrip(self) -> None:
+        self.commands += 1
+        if self.latency_sec:
+            await asyncio.sleep(self.latency_sec)
+        else:
+            await asyncio.sleep(0)
+
+    def _live(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and time.time() >= expires_at:
+            self._data.pop(key, None)
+            return None
+        return value
+
+    # -- synchronous primitives (shared by commands and scripts) --
+
+    def get_now(self, key: str) -> Optional[Any]:
+        return self._live(key)
+
+    def set_now(
+        self,
+        key: str,
+        value: Any,
+        ex: Optional[float] = None,
+        px: Optional[float] = None,
+        nx: bool = False,
+    ) -> bool:
+        if nx and self._live(key) is not None:
+            return False
+        expires_at = None
+        if ex is not None:
+            expires_at = time.time() + float(ex)
+        elif px is not None:
+            expires_at = time.time() + float(px) / 1000.0
+        self._data[key] = (value, expires_at)
+        return True
+
+    def delete_now(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._live(key) is not None:
+                removed += 1
+            self._data.pop(key, None)
+        return removed
+
+    # -- redis.asyncio compatible commands --
+
+    async def get(self, key: str) -> Optional[Any]:
+        await self._roundtrip()
+        return self.get_now(key)
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ex: Optional[float] = None,
+        px: Optional[float] = None,
+        nx: bool = False,
+    ) -> Optional[bool]:
+        await self._roundtrip()
+        # redis-py returns None when NX prevents the write
+        return True if self.set_now(key, value, ex=ex, px=px, nx=nx) else None
+
+    async def mget(self, keys: List[str], *args: str) -> List[Optional[Any]]:
+        await self._roundtrip()
+        return [self._live(k) for k in [*keys, *args]]
+
+    async def setex(self, key: str, seconds: float, value: Any) -> bool:
+        await self._roundtrip()
+        return self.set_now(key, value, ex=seconds)
+
+    async def delete(self, *keys: str) -> int:
+        await self._roundtrip()
+        return self.delete_now(*keys)
+
+    async def exists(self, *keys: str) -> int:
+        await self._roundtrip()
+        return sum(1 for k in keys if self._live(k) is not None)
+
+    async def scan_iter(
+        self, match: Optional[str] = None, count: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        await self._roundtrip()
+        for key in list(self._data):
+            if self._live(key) is None:
+                continue
+            if match is None or _glob(match).fullmatch(key):
+                yield key
+
+    async def eval(self, script: str, numkeys: int, *keys_and_args: Any) -> Any:
+        await self._roundtrip()
+        handler = self._scripts.get(script)
+        if handler is None:
+            raise NotImplementedError("LocalRedis has no handler for this script")
+        keys = list(keys_and_args[:numkeys])
+        args = list(keys_and_args[numkeys:])
+        return handler(self, keys, args)
+
+    def pipeline(self, transaction: bool = True) -> "LocalPipeline":
+        return LocalPipeline(self)
+
+    async def flushdb(self) -> bool:
+        await self._roundtrip()
+        self._data.clear()
+        return True
+
+    async def close(self) -> None:
+        return None
+
+    async def aclose(self) -> None:
+        return None
+
+
+
+class LocalPipeline:
+    """Buffers commands and applies them in a single simulated round trip."""
+
+    def __init__(self, store: LocalRedis):
+        self._store = store
+        self._ops: List[Tuple[str, tuple, dict]] = []
+
+    def set(self, key: str, value: Any, **kwargs: Any) -> "LocalPipeline":
+        self._ops.append(("set_now", (key, value), kwargs))
+        return self
+
+    def get(self, key: str) -> "LocalPipeline":
+        self._ops.append(("get_now", (key,), {}))
+        return self
+
+    def delete(self, *keys: str) -> "LocalPipeline":
+        self._ops.append(("delete_now", keys, {}))
+        return self
+
+    async def execute(self) -> List[Any]:
+        ops, self._ops = self._ops, []
+        await self._store._roundtrip()
+        return [getattr(self._store, name)(*args, **kw) for name, args, kw in ops]
+
+    async def __aenter__(self) -> "LocalPipeline":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self._ops = []
@@ -0,0 +1,213 @@
+"""Consistent-hash peer cache fill across instances (groupcache-style).
+
+Without a shared Redis every instance would fetch the same upstream cells
+independently, multiplying upstream QPS by the fleet size. In peer mode each
+key has one owner on a consistent-hash ring built from a static peer list;
+non-owners ask the owner over `GET /internal/cache/peer/{namespace}` and the
+owner loads the value through its own cache. Each key is then fetched
+upstream at most once per fleet (per TTL).
+
+- The ring uses virtual nodes so keys spread evenly and adding/removing a
+  peer only moves ~1/N of the keys.
+- Values travel in the binary cache codec, so the caller keeps the owner's
+  creation time and freshness window.
+- Requests served for a peer are never forwarded again (no loops if two
+  instances disagree about the ring); if the owner is unreachable the caller
+  falls back to loading locally.
+
+Configuration:
+    CACHE_PEERS: comma-separated base URLs of every instance (including self)
+    CACHE_SELF_URL: this instance's base URL as it appears in CACHE_PEERS
+    CACHE_PEER_TOKEN: shared secret sent as X-Peer-Token; required, since the
+        peer endpoint bypasses the beta gate and triggers upstream fetches
+    CACHE_PEER_TIMEOUT_SEC: per-request timeout (default 2.0)
+"""
+
+import asyncio
+import bisect
+import contextvars
+import hashlib
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+from Backend.utils.cache_codec import decode_entry
+from Backend.utils.cache_inproc import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+PEER_TOKEN_HEADER = "X-Peer-Token"
+
+# Loaders by namespace: key -> entry, computed through the owner's cache
+PeerLoader = Callable[[str], Awaitable[CacheEntry]]
+_loaders: Dict[str, PeerLoader] = {}
+
+# Set while serving a peer request so the load never hops again
+_serving_peer: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "serving_peer", default=False
+)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes."""
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = 128):
+        self.nodes = sorted(set(nodes))
+        points = sorted(
+            (_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [n for _, n in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        idx = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[idx]
+
+
+class PeerCache:
+    """Routes cache loads to the owning peer."""
+
+    def __init__(
+        self,
+        peers: List[str],
+        self_url: str,
+        *,
+        token: str = "",
+        timeout: float = 2.0,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.self_url = self_url.rstrip("/")
+        self.ring = HashRing(p.rstrip("/") for p in peers)
+        self.token = token
+        self._timeout = timeout
+        self._client = client
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Dict[str, int] = {
+            "local": 0,
+            "remote_hits": 0,
+            "remote_errors": 0,
+        }
+
+    def owner(self, key: str) -> Optional[str]:
+        return self.ring.owner(key)
+
+    def is_owner(self, key: str) -> bool:
+        owner = self.owner(key)
+        return owner is None or owner == self.self_url
+
+    def should_forward(self, key: str) -> bool:
+        return not _serving_peer.get() and not self.is_owner(key)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self._timeout)
+        return self._client
+
+    async def fetch(self, namespace: str, key: str) -> Optional[CacheEntry]:
+        """Ask the key's owner for the entry; None means load locally.
+
+        Concurrent fetches for the same key share one request to the owner.
+        """
+        if not self.should_forward(key):
+            self.stats["local"] += 1
+            return None
+        slot = f"{namespace}\x00{key}"
+        task = self._inflight.get(slot)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_remote(namespace, key))
+            self._inflight[slot] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(slot, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_remote(self, namespace: str, key: str) -> Optional[CacheEntry]:
+        owner = self.owner(key)
+        headers = {PEER_TOKEN_HEADER: self.token} if self.token else {}
+        try:
+            resp = await self._get_client().get(
+                f"{owner}/internal/cache/peer/{namespace}",
+                params={"key": key},
+                headers=headers,
+            )
+            resp.raise_for_status()
+            entry = decode_entry(resp.content)
+        except Exception as exc:
+            logger.warning("Peer fill from %s failed for %s: %s", owner, key, exc)
+            entry = None
+        if entry is None:
+            self.stats["remote_errors"] += 1
+            return None
+        self.stats["remote_hits"] += 1
+        return entry
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def register_loader(namespace: str, loader: PeerLoader) -> None:
+    """Register how the owner loads a key for `namespace`."""
+    _loaders[namespace] = loader
+
+
+def get_loader(namespace: str) -> Optional[PeerLoader]:
+    return _loaders.get(namespace)
+
+
+async def serve_peer(namespace: str, key: str) -> CacheEntry:
+    """Load `key` on behalf of a peer; never forwards to another peer."""
+    loader = _loaders.get(namespace)
+    if loader is None:
+        raise KeyError(namespace)
+    token = _serving_peer.set(True)
+    try:
+        return await loader(key)
+    finally:
+        _serving_peer.reset(token)
+
+
+_peer_cache: Optional[PeerCache] = None
+_peer_checked = False
+
+
+def get_peer_cache() -> Optional[PeerCache]:
+    """Return the peer cache when CACHE_PEERS is configured, else None."""
+    global _peer_cache, _peer_checked
+    if not _peer_checked:
+        _peer_checked = True
+        peers = [p.strip() for p in os.environ.get("CACHE_PEERS", "").split(",")]
+        peers = [p for p in peers if p]
+        self_url = os.environ.get("CACHE_SELF_URL", "").strip()
+        token = os.environ.get("CACHE_PEER_TOKEN", "")
+        if len(peers) > 1 and self_url:
+            if self_url.rstrip("/") not in {p.rstrip("/") for p in peers}:
+                logger.warning("CACHE_SELF_URL is not in CACHE_PEERS; peer mode off")
+            elif not token:
+                logger.error("CACHE_PEERS set without CACHE_PEER_TOKEN; peer mode off")
+            else:
+                _peer_cache = PeerCache(
+                    peers,
+                    self_url,
+                    token=token,
+                    timeout=float(os.environ.get("CACHE_PEER_TIMEOUT_SEC", "2.0")),
+                )
+                logger.info("Peer cache fill enabled across %d peers", len(peers))
+    return _peer_cache
+
+
+async def close_peer_cache() -> None:
+    global _peer_cache, _peer_checked
+    if _peer_cache is not None:
+        await _peer_cache.close()
+    _peer_cache = None
+    _peer_checked = False
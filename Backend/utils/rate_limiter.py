@@ -1,78 +1,218 @@
+"""Per-key rate limiting (GCRA, the generic cell rate algorithm).
+
+Each key stores a single number, its theoretical arrival time (TAT): the
+time at which its bucket would be full again. A request is allowed when
+pushing the TAT forward by one emission interval (`window / max_requests`)
+keeps it within `window` of now, so every call is O(1) and a key allows
+`max_requests` at once and then one request per interval, exactly like a
+token bucket.
+
+The in-process limiter keeps keys in LRU order. Keys whose TAT has passed
+carry no state (a full bucket) and are dropped as they reach the front; if
+more than `max_keys` are still tracked the least recently used one is
+evicted, so memory stays bounded no matter how many distinct keys are seen.
+
+`RedisRateLimiter` runs the same algorithm as one Lua script for limits
+shared by every instance, using the Redis clock and a key expiry equal to
+the remaining TAT. If Redis fails it falls back to the in-process limiter.
+
+Configuration:
+    RATE_LIMIT_WINDOW: window in seconds (default 60)
+    RATE_LIMIT_MAX_REQUESTS: requests allowed per window and key (default 100)
+    RATE_LIMIT_MAX_KEYS: keys tracked in process before LRU eviction (default 10000)
+    RATE_LIMIT_BACKEND: "redis" (over REDIS_URL) or "local" (in-memory Redis
+        stand-in) for the shared limiter; unset keeps limits per process
+"""
+
 import logging
+import math
 import os
+import threading
 import time
-from collections import defaultdict
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from Backend.services import metrics
+from Backend.utils.local_redis import LocalRedis
 
 logger = logging.getLogger(__name__)
 
+# Float slack so exactly `max_requests` bursts are not rejected by rounding
+_EPSILON = 1e-9
 
-class SlidingWindowRateLimiter:
-    """Simple sliding window rate limiter using in-memory storage."""
 
-    def __init__(self, window_seconds: int = 60, max_requests: int = 100):
-        self.window_seconds = window_seconds
-        self.max_requests = max_requests
-        # Store timestamps for each key
-        self._requests: Dict[str, list] = defaultdict(list)
+class GCRARateLimiter:
+    """In-process GCRA limiter with bounded, LRU-ordered key state."""
 
-    def is_allowed(self, key: str) -> bool:
-        """Check if request is allowed for the given key."""
-        now = time.time()
-        window_start = now - self.window_seconds
+    def __init__(
+        self, window_seconds: float = 60, max_requests: int = 100, max_keys: int = 10000
+    ):
+        self.window_seconds = float(window_seconds)
+        self.max_requests = max(1, int(max_requests))
+        self.max_keys = max(1, int(max_keys))
+        self.interval = self.window_seconds / self.max_requests
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "allowed": 0,
+            "rejected": 0,
+            "expired": 0,
+            "evicted": 0,
+        }
 
-        # Clean old requests outside the window
-        self._requests[key] = [
-            timestamp for timestamp in self._requests[key] if timestamp > window_start
-        ]
+    def __len__(self) -> int:
+        return len(self._tat)
 
-        # Check if under limit
-        if len(self._requests[key]) < self.max_requests:
-            self._requests[key].append(now)
-            return True
+    def _expire(self, now: float) -> None:
+        # Idle keys are at full capacity; forgetting them changes nothing
+        tat = self._tat
+        while tat:
+            key, value = next(iter(tat.items()))
+            if value > now:
+                break
+            del tat[key]
+            self.stats["expired"] += 1
 
-        logger.warning(f"Rate limit exceeded for key: {key}")
-        return False
+    def _current(self, key: str, now: float) -> float:
+        return max(self._tat.get(key, now), now)
+
+    def is_allowed(self, key: str) -> bool:
+        """Admit one request for `key` if its bucket has room."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            new_tat = self._current(key, now) + self.interval
+            if new_tat - now > self.window_seconds + _EPSILON:
+                # Keep hot keys at the back so eviction never resets them
+                if key in self._tat:
+                    self._tat.move_to_end(key)
+                self.stats["rejected"] += 1
+                allowed = False
+            else:
+                self._tat[key] = new_tat
+                self._tat.move_to_end(key)
+                if len(self._tat) > self.max_keys:
+                    self._tat.popitem(last=False)
+                    self.stats["evicted"] += 1
+                self.stats["allowed"] += 1
+                allowed = True
+        if not allowed:
+            metrics.incr("rate_limit.rejected")
+            logger.warning("Rate limit exceeded for key: %s", key)
+        return allowed
 
     def get_remaining_requests(self, key: str) -> int:
-        """Get remaining requests allowed in current window."""
-        now = time.time()
-        window_start = now - self.window_seconds
+        """Requests `key` could make right now."""
+        now = time.monotonic()
+        with self._lock:
+            used = self._current(key, now) - now
+        return max(0, int((self.window_seconds - used) / self.interval + _EPSILON))
 
-        # Clean old requests
-        self._requests[key] = [
-            timestamp for timestamp in self._requests[key] if timestamp > window_start
-        ]
+    def get_reset_time(self, key: str) -> float:
+        """Seconds until `key` may make its next request."""
+        now = time.monotonic()
+        with self._lock:
+            tat = self._current(key, now)
+        return max(0.0, tat + self.interval - self.window_seconds - now)
 
-        return max(0, self.max_requests - len(self._requests[key]))
+    def clear(self) -> None:
+        with self._lock:
+            self._tat.clear()
 
-    def get_reset_time(self, key: str) -> float:
-        """Get time until rate limit resets (next request allowed)."""
-        if not self._requests[key]:
-            return 0.0
 
-        now = time.time()
-        window_start = now - self.window_seconds
-        oldest_request = min(self._requests[key])
+# KEYS[1] = bucket; ARGV = emission interval (ms), window (ms).
+# Returns {allowed, remaining, retry_after_ms}.
+GCRA_SCRIPT = """
+local t = redis.call("TIME")
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local tat = tonumber(redis.call("GET", KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+if new_tat - now > window + 0.000001 then
+    return {0, 0, math.ceil(new_tat - window - now)}
+end
+redis.call("SET", KEYS[1], tostring(new_tat), "PX", math.ceil(new_tat - now))
+return {1, math.floor((window - (new_tat - now)) / interval), 0}
+"""
+
+
+def _gcra_local(store: LocalRedis, keys: list, args: list) -> List[int]:
+    now = time.time() * 1000
+    interval, window = float(args[0]), float(args[1])
+    raw = store.get_now(keys[0])
+    tat = max(float(raw), now) if raw is not None else now
+    new_tat = tat + interval
+    if new_tat - now > window + 1e-6:
+        return [0, 0, math.ceil(new_tat - window - now)]
+    store.set_now(keys[0], str(new_tat), px=new_tat - now)
+    return [1, int((window - (new_tat - now)) / interval + 1e-6), 0]
+
 
-        if oldest_request <= window_start:
-            return 0.0
+LocalRedis.register_script(GCRA_SCRIPT, _gcra_local)
 
-        return oldest_request - window_start
 
+class RedisRateLimiter:
+    """Fleet-wide GCRA limiter: one atomic script call per request."""
 
-# Global rate limiter instance
-_rate_limiter: Optional[SlidingWindowRateLimiter] = None
+    def __init__(
+        self,
+        client: Any,
+        window_seconds: float = 60,
+        max_requests: int = 100,
+        prefix: str = "ratelimit:",
+        fallback: Optional[GCRARateLimiter] = None,
+    ):
+        self._client = client
+        self.window_seconds = float(window_seconds)
+        self.max_requests = max(1, int(max_requests))
+        self.prefix = prefix
+        self._interval_ms = self.window_seconds * 1000 / self.max_requests
+        self._window_ms = self.window_seconds * 1000
+        self._fallback = fallback or GCRARateLimiter(window_seconds, max_requests)
 
+    async def acquire(self, key: str) -> List[int]:
+        """Run the script for `key`: [allowed, remaining, retry_after_ms]."""
+        result = await self._client.eval(
+            GCRA_SCRIPT,
+            1,
+            self.prefix + key,
+            repr(self._interval_ms),
+            repr(self._window_ms),
+        )
+        return [int(v) for v in result]
+
+    async def is_allowed(self, key: str) -> bool:
+        try:
+            allowed, _, _ = await self.acquire(key)
+        except Exception:
+            logger.warning("Shared rate limiter unavailable, limiting in process")
+            metrics.incr("rate_limit.shared_errors")
+            return self._fallback.is_allowed(key)
+        if not allowed:
+            metrics.incr("rate_limit.rejected")
+            logger.warning("Rate limit exceeded for key: %s", key)
+        return bool(allowed)
+
+
+# Global rate limiter instances
+_rate_limiter: Optional[GCRARateLimiter] = None
+_shared_limiter: Optional[RedisRateLimiter] = None
+_shared_checked = False
 
-def get_rate_limiter() -> SlidingWindowRateLimiter:
-    """Get the global rate limiter instance."""
+
+def get_rate_limiter() -> GCRARateLimiter:
+    """Get the global in-process rate limiter instance."""
     global _rate_limiter
     if _rate_limiter is None:
         # Configure from environment
         window_seconds = int(os.environ.get("RATE_LIMIT_WINDOW", "60"))
         max_requests = int(os.environ.get("RATE_LIMIT_MAX_REQUESTS", "100"))
-        _rate_limiter = SlidingWindowRateLimiter(window_seconds, max_requests)
+        max_keys = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "10000"))
+        _rate_limiter = GCRARateLimiter(window_seconds, max_requests, max_keys)
         logger.info(
             f"Initialized rate limiter: {max_requests} requests per {window_seconds}s"
         )
@@ -80,6 +220,49 @@ def get_rate_limiter() -> SlidingWindowRateLimiter:
     return _rate_limiter
 
 
+def get_shared_rate_limiter() -> Optional[RedisRateLimiter]:
+    """Return the fleet-wide limiter, or None when limits are per process."""
+    global _shared_limiter, _shared_checked
+    if not _shared_checked:
+        _shared_checked = True
+        backend = os.environ.get("RATE_LIMIT_BACKEND", "").lower()
+        local = get_rate_limiter()
+        if backend == "redis":
+            try:
+                import redis.asyncio as redis  # type: ignore[import-untyped]
+
+                from Backend.utils.external_cache import _connection_pool
+
+                client = redis.Redis(connection_pool=_connection_pool(redis))
+                _shared_limiter = RedisRateLimiter(
+                    client, local.window_seconds, local.max_requests, fallback=local
+                )
+                logger.info("Using Redis rate limiter")
+            except Exception:
+                logger.warning("Failed to initialize Redis rate limiter, using in-process")
+        elif backend == "local":
+            _shared_limiter = RedisRateLimiter(
+                LocalRedis(), local.window_seconds, local.max_requests, fallback=local
+            )
+    return _shared_limiter
+
+
+def reset_rate_limiters() -> None:
+    """Forget the configured limiters (tests, config reloads)."""
+    global _rate_limiter, _shared_limiter, _shared_checked
+    _rate_limiter = None
+    _shared_limiter = None
+    _shared_checked = False
+
+
 def check_rate_limit(key: str) -> bool:
-    """Check if request is allowed for the given key."""
+    """Check if request is allowed for the given key (in-process limit)."""
+    return get_rate_limiter().is_allowed(key)
+
+
+async def check_rate_limit_async(key: str) -> bool:
+    """Check `key` against the shared limiter if configured, else in process."""
+    shared = get_shared_rate_limiter()
+    if shared is not None:
+        return await shared.is_allowed(key)
     return get_rate_limiter().is_allowed(key)
@@ -0,0 +1,389 @@
+"""Shared-memory cache tier for multi-worker deployments on one host.
+
+With `uvicorn --workers N` each worker has its own in-process caches, so
+memory is multiplied by N and hit rates divided by N. This module keeps one
+fixed-size hash table in a memory-mapped file that every worker on the host
+maps, so forecasts and photo meta fetched by one worker are hits for all of
+them without a network hop. It plugs in as the L2 of `LayeredCacheBackend`
+(`CACHE_L2_BACKEND=shm`).
+
+The table lives in `<SHM_CACHE_PATH>.v<layout>-<slots>x<slot bytes>`, so a
+worker started with another geometry (or a newer layout) maps its own file
+instead of resizing one that running workers still have mapped. A file whose
+header does not match its name is refused, and the cache falls back to
+in-process only.
+
+File layout::
+
+    header (64 B): magic | layout version | slot count | slot size
+    slot[i]:       seq:u32 | key_hash:u64 | key_len:u16 | val_len:u32 | key | value
+
+- Keys live at `hash % slots`, probing up to `PROBE` neighbouring slots.
+  A full window evicts an expired entry first, then the oldest one.
+- Values are `cache_codec` entries (packed forecasts, creation time, TTL,
+  SWR), so freshness is decided the same way as for Redis.
+- Readers take no lock (seqlock): the writer makes `seq` odd while it
+  rewrites a slot and even when done, and a reader retries if `seq` was odd
+  or changed while it copied the slot.
+- Writers serialize on an `fcntl` lock (plus a thread lock, since `fcntl`
+  locks are per process). The async backend takes it without blocking and
+  only waits for a busy lock in a worker thread, never on the event loop.
+- Recomputation is single-flight across workers via per-key byte-range
+  locks on a companion lock file; the kernel releases them if a worker dies.
+  Stripes held by this process are tracked too, since a second `lockf` from
+  the same process would succeed.
+
+Configuration:
+    SHM_CACHE_PATH: backing file prefix (default /dev/shm/sunchaser-cache.bin,
+        or the temp dir when /dev/shm is missing)
+    SHM_CACHE_SLOTS: number of slots (default 4096)
+    SHM_CACHE_SLOT_BYTES: bytes per slot (default 4096); larger values skip
+        this tier
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from Backend.utils.cache_codec import decode_entry, encode_entry, peek_header
+from Backend.utils.cache_inproc import CacheEntry
+from Backend.utils.external_cache import SharedCacheTier
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SUNSHM01"
+LAYOUT_VERSION = 1
+PROBE = 8
+READ_RETRIES = 64
+LOCK_STRIPES = 65536
+
+_FILE_HEADER = struct.Struct("!8sIII")
+_HEADER_BYTES = 64
+_SLOT = struct.Struct("!IQHI")
+_SEQ = struct.Struct("!I")
+
+
+class LockBusy(Exception):
+    """The writer lock is held elsewhere and the caller asked not to wait."""
+
+
+def _key_hash(key: bytes) -> int:
+    # Never 0, so a zero hash can't be confused with an empty slot
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big") or 1
+
+
+def _default_path() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "sunchaser-cache.bin")
+
+
+class SharedMemoryCache:
+    """Fixed-slot hash table in a memory-mapped file, safe across processes."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        slots: int = 4096,
+        slot_bytes: int = 4096,
+    ):
+        if slot_bytes <= _SLOT.size + 64:
+            raise ValueError("slot_bytes too small")
+        self.path = (
+            f"{path or _default_path()}.v{LAYOUT_VERSION}-{slots}x{slot_bytes}"
+        )
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._size = _HEADER_BYTES + slots * slot_bytes
+        self._thread_lock = threading.Lock()
+        self._stripes: Set[int] = set()
+        self._stripes_lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "oversize": 0,
+            "read_retries": 0,
+            "lock_waits": 0,
+        }
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._lock_fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            with self._write_lock():
+                self._init_file()
+            self._mm = mmap.mmap(self._fd, self._size)
+        except BaseException:
+            os.close(self._fd)
+            os.close(self._lock_fd)
+            raise
+
+    def _init_file(self) -> None:
+        """Initialize a new file, or check that an existing one is ours.
+
+        Never resizes or rewrites an existing file: other workers may have it
+        mapped, and truncating under them would crash them with SIGBUS.
+        """
+        expected = _FILE_HEADER.pack(MAGIC, LAYOUT_VERSION, self.slots, self.slot_bytes)
+        size = os.fstat(self._fd).st_size
+        if size == 0:
+            os.ftruncate(self._fd, self._size)
+            os.pwrite(self._fd, expected, 0)
+            return
+        if size != self._size or os.pread(self._fd, _FILE_HEADER.size, 0) != expected:
+            raise ValueError(f"Shared cache {self.path} has an unexpected layout")
+
+    # -- locking --
+
+    @contextmanager
+    def _write_lock(self, blocking: bool = True) -> Iterator[None]:
+        """Exclusive writer lock across threads and processes.
+
+        With blocking=False raises LockBusy instead of waiting.
+        """
+        if not self._thread_lock.acquire(blocking):
+            raise LockBusy()
+        try:
+            try:
+                fcntl.lockf(
+                    self._lock_fd,
+                    fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB,
+                    1,
+                    0,
+                )
+            except OSError:
+                if blocking:
+                    raise
+                raise LockBusy() from None
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, 0)
+        finally:
+            self._thread_lock.release()
+
+    def try_lock_key(self, key: str) -> Optional[int]:
+        """Take the cross-process recompute lock for key (non-blocking)."""
+        stripe = 1 + _key_hash(key.encode("utf-8")) % LOCK_STRIPES
+        with self._stripes_lock:
+            # lockf would grant a stripe this process already holds
+            if stripe in self._stripes:
+                return None
+            try:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, stripe)
+            except OSError:
+                return None
+            self._stripes.add(stripe)
+        return stripe
+
+    def unlock_key(self, stripe: int) -> None:
+        with self._stripes_lock:
+            if stripe in self._stripes:
+                self._stripes.discard(stripe)
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, stripe)
+
+    # -- slot access --
+
+    def _offset(self, index: int) -> int:
+        return _HEADER_BYTES + index * self.slot_bytes
+
+    def _read_slot(
+        self, index: int, want_hash: Optional[int] = None
+    ) -> Optional[Tuple[int, bytes, bytes]]:
+        """Consistent (hash, key, value) snapshot of a slot, or None if empty.
+
+        With `want_hash`, slots holding another hash return None without
+        copying their payload.
+        """
+        off = self._offset(index)
+        mm = self._mm
+        for _ in range(READ_RETRIES):
+            (seq,) = _SEQ.unpack_from(mm, off)
+            if seq & 1:
+                self.stats["read_retries"] += 1
+                continue
+            _, khash, key_len, val_len = _SLOT.unpack_from(mm, off)
+            if key_len == 0 or (want_hash is not None and khash != want_hash):
+                result = None
+            else:
+                start = off + _SLOT.size
+                end = min(start + key_len + val_len, off + self.slot_bytes)
+                data = mm[start:end]
+                result = (khash, data[:key_len], data[key_len:])
+            (seq_after,) = _SEQ.unpack_from(mm, off)
+            if seq_after == seq:
+                return result
+            self.stats["read_retries"] += 1
+        return None
+
+    def _write_slot(self, index: int, khash: int, key: bytes, value: bytes) -> None:
+        """Rewrite a slot; caller holds the write lock."""
+        off = self._offset(index)
+        mm = self._mm
+        (seq,) = _SEQ.unpack_from(mm, off)
+        seq = (seq | 1) & 0xFFFFFFFF
+        _SEQ.pack_into(mm, off, seq)  # odd: readers back off
+        _SLOT.pack_into(mm, off, seq, khash, len(key), len(value))
+        start = off + _SLOT.size
+        mm[start : start + len(key) + len(value)] = key + value
+        _SEQ.pack_into(mm, off, (seq + 1) & 0xFFFFFFFF)  # even: consistent
+
+    def _clear_slot(self, index: int) -> None:
+        self._write_slot(index, 0, b"", b"")
+
+    def _window(self, khash: int) -> List[int]:
+        return [(khash + i) % self.slots for i in range(min(PROBE, self.slots))]
+
+    # -- public API --
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        kb = key.encode("utf-8")
+        khash = _key_hash(kb)
+        for index in self._window(khash):
+            slot = self._read_slot(index, khash)
+            if slot is not None and slot[1] == kb:
+                entry = decode_entry(slot[2])
+                if entry is None or entry.should_evict:
+                    break
+                self.stats["hits"] += 1
+                return entry
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, entry: CacheEntry, blocking: bool = True) -> bool:
+        """Store an entry; returns False if it doesn't fit in a slot."""
+        kb = key.encode("utf-8")
+        value = encode_entry(entry)
+        if _SLOT.size + len(kb) + len(value) > self.slot_bytes:
+            self.stats["oversize"] += 1
+            return False
+        khash = _key_hash(kb)
+        with self._write_lock(blocking):
+            target = self._choose_slot(khash, kb)
+            self._write_slot(target, khash, kb, value)
+        self.stats["sets"] += 1
+        return True
+
+    def _choose_slot(self, khash: int, kb: bytes) -> int:
+        empty: Optional[int] = None
+        expired: Optional[int] = None
+        oldest: Tuple[float, int] = (float("inf"), -1)
+        now = time.time()
+        for index in self._window(khash):
+            slot = self._read_slot(index)
+            if slot is None:
+                if empty is None:
+                    empty = index
+                continue
+            if slot[0] == khash and slot[1] == kb:
+                return index
+            times = peek_header(slot[2])
+            if times is None or now - times[0] >= times[1] + times[2]:
+                if expired is None:
+                    expired = index
+            elif times[0] < oldest[0]:
+                oldest = (times[0], index)
+        if empty is not None:
+            return empty
+        if expired is not None:
+            return expired
+        self.stats["evictions"] += 1
+        return oldest[1]
+
+    def delete(self, key: str, blocking: bool = True) -> bool:
+        kb = key.encode("utf-8")
+        khash = _key_hash(kb)
+        with self._write_lock(blocking):
+            for index in self._window(khash):
+                slot = self._read_slot(index, khash)
+                if slot is not None and slot[1] == kb:
+                    self._clear_slot(index)
+                    return True
+        return False
+
+    def delete_prefix(self, prefix: str, blocking: bool = True) -> int:
+        """Remove every key starting with prefix (full table scan)."""
+        pb = prefix.encode("utf-8")
+        removed = 0
+        with self._write_lock(blocking):
+            for index in range(self.slots):
+                slot = self._read_slot(index)
+                if slot is not None and slot[1].startswith(pb):
+                    self._clear_slot(index)
+                    removed += 1
+        return removed
+
+    def keys(self) -> List[str]:
+        out = []
+        for index in range(self.slots):
+            slot = self._read_slot(index)
+            if slot is not None:
+                out.append(slot[1].decode("utf-8", "replace"))
+        return out
+
+    def clear(self) -> None:
+        with self._write_lock():
+            for index in range(self.slots):
+                self._clear_slot(index)
+
+    def close(self) -> None:
+        try:
+            self._mm.close()
+        finally:
+            os.close(self._fd)
+            os.close(self._lock_fd)
+
+
+class SharedMemoryCacheBackend(SharedCacheTier):
+    """`SharedCacheTier` over a host-local `SharedMemoryCache`."""
+
+    def __init__(self, table: Optional[SharedMemoryCache] = None):
+        super().__init__()
+        if table is None:
+            table = SharedMemoryCache(
+                path=os.environ.get("SHM_CACHE_PATH") or None,
+                slots=int(os.environ.get("SHM_CACHE_SLOTS", "4096")),
+                slot_bytes=int(os.environ.get("SHM_CACHE_SLOT_BYTES", "4096")),
+            )
+        self.table = table
+
+    async def _write(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Run a table write; wait for a busy lock off the event loop."""
+        try:
+            return method(*args, blocking=False)
+        except LockBusy:
+            self.table.stats["lock_waits"] += 1
+            return await asyncio.to_thread(method, *args)
+
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        return self.table.get(key)
+
+    async def set_entry(self, key: str, entry: CacheEntry) -> None:
+        if entry.should_evict:
+            return
+        await self._write(self.table.set, key, entry)
+
+    async def delete(self, key: str) -> int:
+        return int(await self._write(self.table.delete, key))
+
+    async def delete_prefix(self, prefix: str) -> int:
+        return await self._write(self.table.delete_prefix, prefix)
+
+    async def acquire_lock(self, key: str) -> Optional[str]:
+        stripe = self.table.try_lock_key(key)
+        return None if stripe is None else str(stripe)
+
+    async def release_lock(self, key: str, token: str) -> None:
+        self.table.unlock_key(int(token))
+
+    async def close(self) -> None:
+        self.table.close()